@@ -22,6 +22,7 @@ from amatak.interpreter import Interpreter, Context
 from amatak.lexer import Lexer
 from amatak.parser import Parser
 from amatak.errors import AmatakError
+from amatak.core.ast.passes import PassManager, OPT_LEVELS, DEFAULT_OPT_LEVEL
 
 # Database support check
 try:
@@ -131,36 +132,109 @@ class Runtime:
                 raise AmatakError(f"Disconnection failed: {str(e)}")
         return False
 
-    def execute(self, code, filename='<string>'):
-        """Execute Amatak source code"""
+    def execute(self, code, filename='<string>', passes=None):
+        """Execute Amatak source code, optimized by ``passes`` if given"""
         try:
             lexer = Lexer(code, debug=self.debug)
             tokens = lexer.get_tokens()
             
             parser = Parser(tokens, debug=self.debug)
             tree = parser.parse()
+            if passes is not None:
+                tree = passes.run(tree)
             
             self.interpreter = Interpreter(tree, debug=self.debug, context=self.context)
             return self.interpreter.interpret()
         except Exception as e:
             raise AmatakError(f"Runtime error: {str(e)}")
     
-    def compile(self, filename: str) -> str:
-        """Compile Amatak source to bytecode"""
+    def compile(self, filename: str, passes=None) -> str:
+        """Compile Amatak source to bytecode, at -O2 unless ``passes`` is given"""
         try:
             with open(filename, 'r', encoding='utf-8') as f:
                 code = f.read()
             
+            from amatak.core.codegen import compile_source
+            from amatak.core.akc import write_module
+            
             base_name = os.path.splitext(filename)[0]
-            output_file = f"{base_name}.amc"
+            output_file = f"{base_name}.akc"
             
-            with open(output_file, 'wb') as f:
-                f.write(b"AMATAK_BYTECODE")
+            module = compile_source(code, DEFAULT_OPT_LEVEL, passes)
+            write_module(module, output_file)
             
             return output_file
         except Exception as e:
             raise AmatakError(f"Compilation error: {str(e)}")
 
+    def execute_bytecode(self, filename: str, opcode_stats: Optional[str] = None,
+                         jit_cache: Optional[str] = None, passes=None,
+                         memoize: Optional[int] = None, inferrer=None):
+        """Execute a compiled .akc module or a source file on the bytecode VM
+
+        Opcode statistics describe the interpreter, so they disable the JIT.
+        With ``memoize``, results of pure functions are cached (at most that
+        many per function) and the hit rate is reported on stderr. With an
+        ``inferrer``, functions of source files carry their inferred
+        signatures (see ``check``).
+        """
+        try:
+            from amatak.core.vm import VM
+            vm = VM(jit_enabled=not opcode_stats, jit_cache=jit_cache)
+            if opcode_stats:
+                vm.enable_counters()
+            if memoize:
+                vm.enable_memoization(memoize)
+            if filename.endswith('.akc'):
+                result = vm.run_file(filename)
+            else:
+                from amatak.core.codegen import compile_source
+                with open(filename, 'r', encoding='utf-8') as f:
+                    result = vm.run_module(compile_source(f.read(), DEFAULT_OPT_LEVEL, passes, inferrer))
+            if opcode_stats:
+                vm.counters.dump(opcode_stats)
+            if memoize:
+                stats = vm.memo.stats()
+                print(f"memoization: {stats['hits']} hits, {stats['misses']} misses "
+                      f"({stats['hit_rate']:.1%}), pure: {', '.join(stats['pure']) or '-'}",
+                      file=sys.stderr)
+            return result
+        except AmatakError:
+            raise
+        except Exception as e:
+            raise AmatakError(f"Bytecode execution error: {str(e)}")
+
+    def check(self, filename: str, infer: bool = False, types_cache: Optional[str] = None):
+        """Parse a source file and, with ``infer``, infer its types
+
+        Returns the ``ProgramTypes`` (None without ``infer``). Unit analyses
+        are kept in ``types_cache`` if given, so checking an edited file
+        re-analyses only the functions the edit affects.
+        """
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                code = f.read()
+            tree = Parser(Lexer(code).get_tokens()).parse()
+            if not infer:
+                return None
+            from amatak.runtime.types.program import ProgramInferrer, SignatureCache
+            cache = SignatureCache(types_cache) if types_cache else None
+            return ProgramInferrer(cache).infer(tree)
+        except AmatakError:
+            raise
+        except Exception as e:
+            raise AmatakError(f"Check error: {str(e)}")
+
+    def disassemble(self, filename: str) -> str:
+        """Disassemble a source file or .akc module"""
+        try:
+            from amatak.core.dis import disassemble_file
+            return disassemble_file(filename)
+        except AmatakError:
+            raise
+        except Exception as e:
+            raise AmatakError(f"Disassembly error: {str(e)}")
+
     def start_repl(self):
         """Start enhanced interactive REPL"""
         print(f"Amatak REPL {__version__} (Type 'exit' or 'quit' to exit)")
@@ -238,10 +312,37 @@ class AmatakCLI:
         run_parser = subparsers.add_parser('run', help='Execute Amatak script')
         run_parser.add_argument('file', help='Amatak source file')
         run_parser.add_argument('--debug', action='store_true')
+        run_parser.add_argument('--opcode-stats', metavar='JSON',
+                                help='Run on the bytecode VM and write per-opcode counters to JSON')
+        run_parser.add_argument('--jit-cache', metavar='DIR',
+                                help='Directory for persisted JIT code and profiles '
+                                     '(default: $AMATAK_JIT_CACHE or ~/.amatak/cache/jit)')
+        run_parser.add_argument('--no-jit-cache', action='store_true',
+                                help='Do not read or write the JIT cache')
+        run_parser.add_argument('--memoize', metavar='SIZE', type=int, nargs='?', const=256,
+                                help='Run on the bytecode VM and cache results of pure functions '
+                                     '(at most SIZE per function, default 256)')
+        run_parser.add_argument('--infer', action='store_true',
+                                help='Run on the bytecode VM with inferred function signatures')
+        self.add_optimization_arguments(run_parser)
+        
+        check_parser = subparsers.add_parser('check', help='Check a script without running it')
+        check_parser.add_argument('file', help='Amatak source file')
+        check_parser.add_argument('--infer', action='store_true',
+                                  help='Infer and print function signatures and report type errors')
+        check_parser.add_argument('--types-cache', metavar='DIR',
+                                  help='Directory for cached signatures '
+                                       '(default: $AMATAK_TYPES_CACHE or ~/.amatak/cache/types)')
+        check_parser.add_argument('--no-types-cache', action='store_true',
+                                  help='Do not read or write the signature cache')
         
         build_parser = subparsers.add_parser('build', help='Compile to bytecode')
         build_parser.add_argument('file', help='Amatak source file')
         build_parser.add_argument('--debug', action='store_true')
+        self.add_optimization_arguments(build_parser)
+        
+        dis_parser = subparsers.add_parser('dis', help='Disassemble to VM bytecode')
+        dis_parser.add_argument('file', help='Amatak source file or .akc module')
         
         repl_parser = subparsers.add_parser('repl', help='Start interactive REPL')
         repl_parser.add_argument('--debug', action='store_true')
@@ -259,6 +360,14 @@ class AmatakCLI:
         parser.add_argument('--version', action='store_true', help='Show version')
         return parser
 
+    @staticmethod
+    def add_optimization_arguments(parser: argparse.ArgumentParser):
+        parser.add_argument('-O', dest='opt_level', type=int, choices=sorted(OPT_LEVELS),
+                            default=DEFAULT_OPT_LEVEL, metavar='LEVEL',
+                            help=f'Optimization level 0-3 (default: {DEFAULT_OPT_LEVEL})')
+        parser.add_argument('--opt-report', action='store_true',
+                            help='Print per-pass optimization time and rewrite counts to stderr')
+
     def handle_db_terminal(self, args):
         try:
             if args.type == 'sqlite':
@@ -287,11 +396,16 @@ class AmatakCLI:
         print(f"Amatak Language v{__version__}")
         print("Copyright (c) 2025 Amatak Project")
 
-    def handle_run(self, filename: str):
+    def handle_run(self, filename: str, opcode_stats: Optional[str] = None,
+                   jit_cache: Optional[str] = None, passes=None, memoize: Optional[int] = None,
+                   inferrer=None):
         if not os.path.exists(filename):
             raise AmatakError(f"File not found: {filename}")
         
         abs_path = os.path.abspath(filename)
+        if abs_path.endswith('.akc') or opcode_stats or memoize or inferrer:
+            self.runtime.execute_bytecode(abs_path, opcode_stats, jit_cache, passes, memoize, inferrer)
+            return
         try:
             with open(abs_path, 'r', encoding='utf-8') as f:
                 code = f.read()
@@ -299,19 +413,41 @@ class AmatakCLI:
             if self.debug:
                 print(f"Executing: {abs_path}")
                 
-            result = self.runtime.execute(code, filename=abs_path)
+            result = self.runtime.execute(code, filename=abs_path, passes=passes)
             if result is not None and self.debug:
                 print(f"Return value: {result}")
         except Exception as e:
             raise AmatakError(f"Error executing {filename}: {str(e)}")
 
-    def handle_build(self, filename: str):
+    def handle_build(self, filename: str, passes=None):
         if not os.path.exists(filename):
             raise AmatakError(f"File not found: {filename}")
         
-        output_file = self.runtime.compile(filename)
+        output_file = self.runtime.compile(filename, passes)
         print(f"Compiled to: {output_file}")
 
+    def handle_check(self, filename: str, infer: bool = False, types_cache: Optional[str] = None):
+        if not os.path.exists(filename):
+            raise AmatakError(f"File not found: {filename}")
+        
+        types = self.runtime.check(filename, infer, types_cache)
+        if types is None:
+            print(f"{filename}: OK")
+            return
+        for line in types.format_signatures():
+            print(line)
+        diagnostics = types.format_diagnostics()
+        for line in diagnostics:
+            print(f"{filename}: {line}", file=sys.stderr)
+        if diagnostics:
+            sys.exit(1)
+
+    def handle_dis(self, filename: str):
+        if not os.path.exists(filename):
+            raise AmatakError(f"File not found: {filename}")
+        
+        print(self.runtime.disassemble(filename))
+
     def main(self):
         """Main CLI entry point"""
         parser = self.create_parser()
@@ -325,9 +461,31 @@ class AmatakCLI:
             
         try:
             if args.command == 'run':
-                self.handle_run(args.file)
+                jit_cache = None
+                if not args.no_jit_cache:
+                    from amatak.core.jitcache import default_cache_dir
+                    jit_cache = args.jit_cache or default_cache_dir()
+                passes = PassManager.for_level(args.opt_level, whole_program=True)
+                inferrer = None
+                if args.infer:
+                    from amatak.runtime.types.program import ProgramInferrer
+                    inferrer = ProgramInferrer()
+                self.handle_run(args.file, args.opcode_stats, jit_cache, passes, args.memoize, inferrer)
+                if args.opt_report:
+                    print(passes.format_report(), file=sys.stderr)
+            elif args.command == 'check':
+                types_cache = None
+                if args.infer and not args.no_types_cache:
+                    from amatak.runtime.types.program import default_cache_dir
+                    types_cache = args.types_cache or default_cache_dir()
+                self.handle_check(args.file, args.infer, types_cache)
+            elif args.command == 'dis':
+                self.handle_dis(args.file)
             elif args.command == 'build':
-                self.handle_build(args.file)
+                passes = PassManager.for_level(args.opt_level, whole_program=True)
+                self.handle_build(args.file, passes)
+                if args.opt_report:
+                    print(passes.format_report(), file=sys.stderr)
             elif args.command == 'repl':
                 self.runtime.start_repl()
             elif args.command == 'db' and DB_SUPPORT:
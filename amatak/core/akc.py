@@ -0,0 +1,274 @@
+"""Amatak compiled module (.akc) container
+
+Layout (all integers big-endian, matching core.vm operand encoding)::
+
+    header          HEADER (magic, version, section counts/offsets, crc32s)
+    constant pool   u32 offset index, then tagged entries; deduplicated and
+                    shared by every function (function names live here too)
+    function table  FUNC_ENTRY per function; entry 0 is the module body
+    line table      LINE_ENTRY (pc, line) runs, referenced by function entries
+    code            concatenated bytecode of all functions
+
+Loading maps the file read-only and hands the VM ``memoryview`` slices of the
+code section, so nothing is copied per function and constants are decoded on
+first use. Only the header, the pool index and the function table are
+checksummed on load, so loading stays independent of the module size; pass
+``verify=True`` to also check the crc32 of the whole file.
+"""
+import mmap
+import struct
+import zlib
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from ..errors import CompilationError, AmatakRuntimeError
+from .vm import Function
+from .codegen import CompiledModule, MODULE_NAME
+
+MAGIC = b'AKCM'
+FORMAT_VERSION = 2
+
+# magic, version, flags, pool count/offset, function count/offset,
+# line count/offset, code offset/size, crc32 of everything after the header,
+# crc32 of the section tables (the header up to here, pool index, function table)
+HEADER = struct.Struct('>4sHHIIIIIIIIII')
+_TABLE_CRC = HEADER.size - 4
+# name pool index, arg count, local count, reserved, code offset/length,
+# first line entry, line entry count
+FUNC_ENTRY = struct.Struct('>IBBHIIII')
+LINE_ENTRY = struct.Struct('>II')
+POOL_OFFSET = struct.Struct('>I')
+
+TAG_NONE = 0
+TAG_TRUE = 1
+TAG_FALSE = 2
+TAG_INT = 3
+TAG_FLOAT = 4
+TAG_STR = 5
+TAG_BIGINT = 6
+
+_INT64 = struct.Struct('>q')
+_FLOAT64 = struct.Struct('>d')
+_LENGTH = struct.Struct('>I')
+_MISSING = object()
+
+def _encode_constant(value: Any) -> bytes:
+    if value is None:
+        return bytes([TAG_NONE])
+    if value is True:
+        return bytes([TAG_TRUE])
+    if value is False:
+        return bytes([TAG_FALSE])
+    if isinstance(value, int):
+        if -(1 << 63) <= value < (1 << 63):
+            return bytes([TAG_INT]) + _INT64.pack(value)
+        data = str(value).encode('ascii')
+        return bytes([TAG_BIGINT]) + _LENGTH.pack(len(data)) + data
+    if isinstance(value, float):
+        return bytes([TAG_FLOAT]) + _FLOAT64.pack(value)
+    if isinstance(value, str):
+        data = value.encode('utf-8')
+        return bytes([TAG_STR]) + _LENGTH.pack(len(data)) + data
+    raise CompilationError(f"Cannot store constant of type {type(value).__name__} in .akc")
+
+def _decode_constant(buf, offset: int) -> Any:
+    tag = buf[offset]
+    if tag == TAG_NONE:
+        return None
+    if tag == TAG_TRUE:
+        return True
+    if tag == TAG_FALSE:
+        return False
+    if tag == TAG_INT:
+        return _INT64.unpack_from(buf, offset + 1)[0]
+    if tag == TAG_FLOAT:
+        return _FLOAT64.unpack_from(buf, offset + 1)[0]
+    if tag in (TAG_STR, TAG_BIGINT):
+        length = _LENGTH.unpack_from(buf, offset + 1)[0]
+        text = str(buf[offset + 5:offset + 5 + length], 'utf-8')
+        return text if tag == TAG_STR else int(text)
+    raise AmatakRuntimeError(f"Corrupt .akc constant pool: unknown tag {tag}")
+
+class ConstantPool(Sequence):
+    """Lazily decoded view of an .akc constant pool"""
+    def __init__(self, buf, index_offset: int, count: int):
+        self._buf = buf
+        self._index_offset = index_offset
+        self._count = count
+        self._values: List[Any] = [_MISSING] * count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        value = self._values[index]
+        if value is _MISSING:
+            entry = POOL_OFFSET.unpack_from(
+                self._buf, self._index_offset + (index % self._count) * POOL_OFFSET.size
+            )[0]
+            value = self._values[index] = _decode_constant(self._buf, entry)
+        return value
+
+def write_module(module: CompiledModule, path: str) -> int:
+    """Serialize a compiled module to an .akc file, returning its size"""
+    data = serialize_module(module)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+def serialize_module(module: CompiledModule) -> bytes:
+    """Serialize a compiled module to .akc bytes"""
+    # Module-wide pool: keep the generator's indices (LOAD_CONST operands
+    # refer to them) and append function names that are not already there
+    pool = list(module.constants)
+    index = {(type(v), v): i for i, v in enumerate(pool)}
+    bodies = [(MODULE_NAME, 0, 0, module.code)] + [
+        (f.name, f.arg_count, f.local_count, bytes(f.bytecode)) for f in module.functions
+    ]
+    name_indices = []
+    for name, _, _, _ in bodies:
+        key = (str, name)
+        if key not in index:
+            index[key] = len(pool)
+            pool.append(name)
+        name_indices.append(index[key])
+
+    entries = [_encode_constant(v) for v in pool]
+    pool_offset = HEADER.size
+    entry_base = pool_offset + POOL_OFFSET.size * len(entries)
+    pool_index = bytearray()
+    pool_data = bytearray()
+    for entry in entries:
+        pool_index += POOL_OFFSET.pack(entry_base + len(pool_data))
+        pool_data += entry
+
+    func_offset = entry_base + len(pool_data)
+    line_offset = func_offset + FUNC_ENTRY.size * len(bodies)
+    func_table = bytearray()
+    line_table = bytearray()
+    code = bytearray()
+    line_count = 0
+    for name_idx, (name, argc, locals_, body) in zip(name_indices, bodies):
+        lines = module.lines.get(name, [])
+        func_table += FUNC_ENTRY.pack(
+            name_idx, argc, locals_, 0, len(code), len(body), line_count, len(lines)
+        )
+        for pc, line in lines:
+            line_table += LINE_ENTRY.pack(pc, line)
+        line_count += len(lines)
+        code += body
+
+    code_offset = line_offset + len(line_table)
+    payload = bytes(pool_index + pool_data + func_table + line_table + code)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0,
+        len(entries), pool_offset,
+        len(bodies), func_offset,
+        line_count, line_offset,
+        code_offset, len(code),
+        zlib.crc32(payload), 0
+    )
+    tables = _table_crc(header, pool_index, func_table)
+    return header[:_TABLE_CRC] + struct.pack('>I', tables) + payload
+
+def _table_crc(header, pool_index, func_table) -> int:
+    crc = zlib.crc32(header[:_TABLE_CRC])
+    crc = zlib.crc32(pool_index, crc)
+    return zlib.crc32(func_table, crc)
+
+class AKCModule:
+    """A memory-mapped .akc module
+
+    Exposes the same ``code``/``constants``/``functions``/``lines`` shape as
+    ``CompiledModule``; bytecode attributes are zero-copy ``memoryview``
+    slices of the mapping, so call ``close`` only once the VM is done.
+    """
+    def __init__(self, path: str, verify: bool = False):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        try:
+            self._parse(verify)
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self, verify: bool):
+        view = self._view
+        if len(view) < HEADER.size:
+            raise AmatakRuntimeError(f"{self.path}: truncated .akc header")
+        (magic, version, _flags, pool_count, pool_offset, func_count, func_offset,
+         line_count, line_offset, code_offset, code_size, checksum,
+         table_checksum) = HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise AmatakRuntimeError(f"{self.path}: not an Amatak compiled module")
+        if version != FORMAT_VERSION:
+            raise AmatakRuntimeError(f"{self.path}: unsupported .akc version {version}")
+        pool_end = pool_offset + pool_count * POOL_OFFSET.size
+        func_end = func_offset + func_count * FUNC_ENTRY.size
+        if max(pool_end, func_end, code_offset + code_size) > len(view):
+            raise AmatakRuntimeError(f"{self.path}: truncated .akc module")
+        tables = _table_crc(view[:HEADER.size], view[pool_offset:pool_end], view[func_offset:func_end])
+        if tables != table_checksum:
+            raise AmatakRuntimeError(f"{self.path}: .akc section table checksum mismatch")
+        if verify and zlib.crc32(view[HEADER.size:]) != checksum:
+            raise AmatakRuntimeError(f"{self.path}: .akc checksum mismatch")
+
+        self.checksum = checksum
+        self.constants = ConstantPool(view, pool_offset, pool_count)
+        self._line_offset = line_offset
+        self._line_ranges: Dict[str, Tuple[int, int]] = {}
+        self.functions: List[Function] = []
+        self.code = None
+        code = view[code_offset:code_offset + code_size]
+        for i in range(func_count):
+            (name_idx, argc, locals_, _, start, length,
+             line_start, lines) = FUNC_ENTRY.unpack_from(view, func_offset + i * FUNC_ENTRY.size)
+            if name_idx >= pool_count or start + length > code_size:
+                raise AmatakRuntimeError(f"{self.path}: corrupt .akc function table")
+            name = self.constants[name_idx]
+            body = code[start:start + length]
+            self._line_ranges[name] = (line_start, lines)
+            if i == 0:
+                self.code = body
+                continue
+            self.functions.append(Function(
+                name=name,
+                arg_count=argc,
+                bytecode=body,
+                constants=self.constants,
+                local_count=locals_
+            ))
+
+    @property
+    def lines(self) -> Dict[str, List[Tuple[int, int]]]:
+        """Decoded line tables for every function"""
+        return {name: self.line_table(name) for name in self._line_ranges}
+
+    def line_table(self, func_name: str) -> List[Tuple[int, int]]:
+        start, count = self._line_ranges.get(func_name, (0, 0))
+        base = self._line_offset + start * LINE_ENTRY.size
+        return [LINE_ENTRY.unpack_from(self._view, base + i * LINE_ENTRY.size) for i in range(count)]
+
+    def line_for(self, func_name: str, pc: int) -> Optional[int]:
+        """Source line for a bytecode offset, if recorded"""
+        table = self.line_table(func_name)
+        i = bisect_right([entry[0] for entry in table], pc) - 1
+        return table[i][1] if i >= 0 else None
+
+    def close(self):
+        """Release the mapping (fails while the VM still holds slices)"""
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def load_module(path: str, verify: bool = False) -> AKCModule:
+    """Map an .akc file for execution (``verify`` checksums the whole file)"""
+    return AKCModule(path, verify=verify)
@@ -1,83 +1,1086 @@
-from ..nodes import *
-from .visitor import ASTVisitor
+"""AST optimizer run before bytecode generation and tree interpretation
+
+Passes, selected, ordered and repeated by ``passes.PassManager``:
+
+- inlining of small leaf functions (no calls, straight-line bodies) at
+  statement-level call sites, with the callee's variables renamed;
+- constant folding, on the parser's ``TokenType`` operators (string
+  operators from hand-built trees are accepted too), with the VM's Python
+  semantics; operations that would raise are left for run time;
+- constant propagation of ``let`` bindings through straight-line code,
+  merged at ``if`` joins and killed by loops and by calls to functions
+  that assign the name;
+- unreachable code elimination: statements after ``return``, branches of
+  constant ``if`` and ternary conditions, loops whose condition is
+  constantly false;
+- loop optimizations on ``for``: full unrolling of short constant-trip
+  loops, strength reduction of multiplies by the loop variable and
+  hoisting of loop-invariant arithmetic out of the condition and body;
+- dead store elimination of side-effect free assignments to names that are
+  never read (top-level ones only when optimizing a whole program, since
+  the REPL and embedders can read globals later);
+- common subexpression elimination within straight-line statement runs:
+  repeated pure arithmetic is computed once into a ``__cse`` temporary;
+- typed identities, when optimizing a whole program: ``x + 0``, ``x - 0``
+  and ``x * 1`` become ``x`` where whole-program inference
+  (runtime.types.program) proves ``x`` an integer (any number for
+  ``* 1``). The program's functions are assumed to be called only by the
+  program.
+"""
+import copy
+import operator
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from ...nodes import (
+    ASTNode, AssignmentNode, ArrayAccessNode, ArrayNode, BinOpNode, BooleanNode,
+    CallNode, ForNode, FuncNode, IdentifierNode, IfNode, NumberNode, PrintNode,
+    ReturnNode, StringNode, TernaryNode, UnaryOpNode
+)
+from ...tokens import TokenType
+from .visitor import ASTVisitor, copy_line, walk
+
+BINARY_FOLDS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '%': operator.mod,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+}
+
+# Folded results larger than this stay as run-time operations
+MAX_FOLDED_INT = 1 << 63
+MAX_FOLDED_STR = 4096
+
+_NO_VALUE = object()
+
+def operator_symbol(op) -> str:
+    """Operator text for a ``TokenType`` or string operator"""
+    return op.value if isinstance(op, TokenType) else op
+
+def literal_value(node) -> Any:
+    """Python value of a literal node, or ``_NO_VALUE``"""
+    if isinstance(node, NumberNode):
+        value = node.value
+        if isinstance(value, str):
+            try:
+                return float(value) if '.' in value else int(value)
+            except ValueError:
+                return _NO_VALUE
+        return value
+    if isinstance(node, StringNode):
+        return node.value
+    if isinstance(node, BooleanNode):
+        return bool(node.value)
+    return _NO_VALUE
+
+def is_literal(node) -> bool:
+    return literal_value(node) is not _NO_VALUE
+
+def make_literal(value: Any) -> Optional[ASTNode]:
+    """Literal node for a folded value, in the parser's representation
+
+    Returns None for values the parser could not have produced (floats
+    without a plain decimal form, oversized ints and strings).
+    """
+    if isinstance(value, bool):
+        return BooleanNode(value)
+    if isinstance(value, int):
+        return NumberNode(str(value)) if abs(value) < MAX_FOLDED_INT else None
+    if isinstance(value, float):
+        text = repr(value)
+        return NumberNode(text) if '.' in text and 'e' not in text and 'n' not in text else None
+    if isinstance(value, str):
+        return StringNode(value) if len(value) <= MAX_FOLDED_STR else None
+    return None
+
+def _copy_literal(node):
+    return make_literal(literal_value(node)) or node
+
+def assigned_names(node) -> Set[str]:
+    """Variables assigned anywhere under ``node``"""
+    names = set()
+    for current in walk(node):
+        if isinstance(current, AssignmentNode):
+            name = target_name(current)
+            if name is not None:
+                names.add(name)
+        elif isinstance(current, ForNode):
+            names.add(current.var_name)
+    return names
+
+def read_names(node) -> Set[str]:
+    """Variables read anywhere under ``node``
+
+    Assignment targets are identifiers too, so a name counts as read when it
+    occurs more often than it is assigned.
+    """
+    counts: Dict[str, int] = {}
+    targets: Dict[str, int] = {}
+    for current in walk(node):
+        if isinstance(current, IdentifierNode):
+            counts[current.name] = counts.get(current.name, 0) + 1
+        elif isinstance(current, AssignmentNode) and isinstance(current.name, IdentifierNode):
+            targets[current.name.name] = targets.get(current.name.name, 0) + 1
+    return {name for name, n in counts.items() if n > targets.get(name, 0)}
+
+def target_name(node: AssignmentNode) -> Optional[str]:
+    """Variable assigned by an assignment, None for array element stores"""
+    target = node.name
+    if isinstance(target, IdentifierNode):
+        return target.name
+    if isinstance(target, str):
+        return target
+    return None
+
+def has_call(node) -> bool:
+    return any(isinstance(current, CallNode) for current in walk(node))
+
+def is_removable(node) -> bool:
+    """True if evaluating ``node`` can neither fail nor have side effects"""
+    if is_literal(node):
+        return True
+    if isinstance(node, ArrayNode):
+        return all(is_removable(el) for el in node.elements)
+    return False
+
+def expression_key(node) -> Optional[Tuple]:
+    """Structural key of a pure arithmetic expression, or None"""
+    keys = []
+    todo = [(node, False)]
+    while todo:
+        current, ready = todo.pop()
+        if ready:
+            right = keys.pop()
+            left = keys.pop()
+            keys.append(('op', operator_symbol(current.op), left, right))
+        elif isinstance(current, BinOpNode):
+            todo.append((current, True))
+            todo.append((current.right, False))
+            todo.append((current.left, False))
+        elif isinstance(current, IdentifierNode):
+            keys.append(('id', current.name))
+        elif is_literal(current):
+            value = literal_value(current)
+            keys.append(('const', type(value).__name__, value))
+        else:
+            return None
+    return keys[0]
+
+def _key_leaves(key: Tuple):
+    todo = [key]
+    while todo:
+        current = todo.pop()
+        if current[0] == 'op':
+            todo.append(current[3])
+            todo.append(current[2])
+        else:
+            yield current
+
+def _key_names(key: Tuple) -> Set[str]:
+    return {leaf[1] for leaf in _key_leaves(key) if leaf[0] == 'id'}
+
+def _key_size(key: Tuple) -> int:
+    # A tree of n leaves has n - 1 operators
+    return 2 * sum(1 for _ in _key_leaves(key)) - 1
 
 class ASTOptimizer(ASTVisitor):
-    def __init__(self):
+    """Multi-pass AST optimizer
+
+    ``optimize`` accepts the parser's statement list (or a single node) and
+    returns the optimized tree; input nodes are not modified. Per-pass
+    rewrite counts are kept in ``stats``.
+    """
+
+    PASSES = ('inline', 'propagate', 'unroll', 'strength', 'licm', 'dead_stores', 'cse', 'typed')
+    STATS = (
+        'inlined', 'folded', 'propagated', 'unreachable', 'unrolled',
+        'strength_reduced', 'hoisted', 'dead_stores', 'cse', 'identities',
+    )
+    # Size limits, in AST nodes
+    INLINE_MAX_NODES = 24
+    UNROLL_MAX_NODES = 96
+    UNROLL_MAX_TRIPS = 8
+
+    def __init__(self, whole_program: bool = False):
         super().__init__()
+        self.whole_program = whole_program
         self.optimizations = 0
+        self.stats: Dict[str, int] = {}
+        # Names assigned by some function body: a call may change them
+        self._clobbered: Set[str] = set()
+        self._reads: Set[str] = set()
+        self._temps = 0
+        self._names: Set[str] = set()
 
     def optimize(self, node):
-        """Entry point for optimization"""
+        """Run every pass to a fixed point (the ``-O3`` preset)"""
+        from .passes import PassManager
+        return PassManager.for_level(3, optimizer=self).run(node)
+
+    def begin(self, node) -> List[Any]:
+        """Reset statistics for a new tree and return it as a statement list"""
         self.optimizations = 0
-        optimized_node = self.visit(node)
-        print(f"Performed {self.optimizations} optimizations")
-        return optimized_node
+        self.stats = {kind: 0 for kind in self.STATS}
+        tree = list(node) if isinstance(node, list) else [node]
+        self._names = {n.name for n in walk(tree) if isinstance(n, IdentifierNode)}
+        return tree
 
-    def visit_BinOpNode(self, node):
-        # Constant folding for binary operations
-        left = self.visit(node.left)
-        right = self.visit(node.right)
-        
-        if isinstance(left, NumberNode) and isinstance(right, NumberNode):
-            self.optimizations += 1
-            if node.op == '+':
-                return NumberNode(left.value + right.value)
-            elif node.op == '-':
-                return NumberNode(left.value - right.value)
-            elif node.op == '*':
-                return NumberNode(left.value * right.value)
-            elif node.op == '/':
-                return NumberNode(left.value / right.value)
-            elif node.op == '<':
-                return NumberNode(1 if left.value < right.value else 0)
-            elif node.op == '>':
-                return NumberNode(1 if left.value > right.value else 0)
-            elif node.op == '==':
-                return NumberNode(1 if left.value == right.value else 0)
-        
-        return BinOpNode(left, node.op, right)
-
-    def visit_UnaryOpNode(self, node):
-        operand = self.visit(node.operand)
-        
-        if isinstance(operand, NumberNode):
-            self.optimizations += 1
-            if node.op == '-':
-                return NumberNode(-operand.value)
-            elif node.op == '!':
-                return NumberNode(0 if operand.value else 1)
-        
-        return UnaryOpNode(node.op, operand)
-
-    def visit_IfNode(self, node):
-        condition = self.visit(node.condition)
-        
-        # Evaluate constant conditions
-        if isinstance(condition, NumberNode):
-            self.optimizations += 1
-            if condition.value:
-                return self.visit(node.then_branch)
-            elif node.else_branch:
-                return self.visit(node.else_branch)
+    def run_pass(self, name: str, tree: List[Any]) -> List[Any]:
+        """Run one pass over a statement list"""
+        self._clobbered = set()
+        for current in walk(tree):
+            if isinstance(current, FuncNode):
+                self._clobbered |= assigned_names(current.body)
+        if name == 'inline':
+            candidates = self._inline_candidates(tree)
+            return self._inline_block(tree, candidates) if candidates else tree
+        if name == 'propagate':
+            return self._block(tree, {})
+        if name == 'unroll':
+            return self._loops_block(tree, lambda loop: self._unroll(loop) or [loop])
+        if name == 'strength':
+            return self._loops_block(tree, self._reduce_strength)
+        if name == 'licm':
+            return self._loops_block(tree, self._hoist)
+        if name == 'dead_stores':
+            self._reads = read_names(tree)
+            return self._dead_stores(tree, top_level=True)
+        if name == 'cse':
+            return self._cse_block(tree)
+        if name == 'typed':
+            return self._typed(tree) if self.whole_program else tree
+        raise ValueError(f"Unknown optimizer pass: {name}")
+
+    def _count(self, kind: str, n: int = 1):
+        self.stats[kind] = self.stats.get(kind, 0) + n
+        self.optimizations += n
+
+    # Folding and propagation
+
+    def _block(self, stmts, env: Dict[str, ASTNode]) -> List[Any]:
+        """Optimize a statement list, updating ``env`` to its exit state"""
+        if not isinstance(stmts, list):
+            stmts = [stmts]
+        out: List[Any] = []
+        for i, stmt in enumerate(stmts):
+            out.extend(self._statement(stmt, env))
+            if self._clobbered and has_call(stmt):
+                for name in self._clobbered:
+                    env.pop(name, None)
+            if out and isinstance(out[-1], ReturnNode):
+                rest = len(stmts) - i - 1
+                if rest:
+                    self._count('unreachable', rest)
+                break
+        return out
+
+    def _statement(self, stmt, env: Dict[str, ASTNode]) -> List[Any]:
+        if isinstance(stmt, list):
+            return self._block(stmt, env)
+        if isinstance(stmt, AssignmentNode):
+            return [self._assignment(stmt, env)]
+        if isinstance(stmt, PrintNode):
+            return [copy_line(stmt, PrintNode(self._expr(stmt.value, env)))]
+        if isinstance(stmt, ReturnNode):
+            value = self._expr(stmt.expression, env) if stmt.expression is not None else None
+            return [copy_line(stmt, ReturnNode(value))]
+        if isinstance(stmt, IfNode):
+            return self._if(stmt, env)
+        if isinstance(stmt, ForNode):
+            return self._for(stmt, env)
+        if isinstance(stmt, FuncNode):
+            return [copy_line(stmt, FuncNode(stmt.name, stmt.params, self._block(stmt.body, {})))]
+        if isinstance(stmt, ASTNode):
+            expr = self._expr(stmt, env)
+            if is_removable(expr):
+                self._count('unreachable')
+                return []
+            return [copy_line(stmt, expr)]
+        return [stmt]
+
+    def _assignment(self, stmt: AssignmentNode, env: Dict[str, ASTNode]) -> AssignmentNode:
+        target = stmt.name
+        if isinstance(target, ArrayAccessNode):
+            target = ArrayAccessNode(self._expr(target.array, env), self._expr(target.index, env))
+        value = self._expr(stmt.value, env)
+        name = target_name(stmt)
+        if name is not None:
+            if is_literal(value):
+                env[name] = value
+            else:
+                env.pop(name, None)
+        return copy_line(stmt, AssignmentNode(target, value))
+
+    def _if(self, stmt: IfNode, env: Dict[str, ASTNode]) -> List[Any]:
+        condition = self._expr(stmt.condition, env)
+        value = literal_value(condition)
+        if value is not _NO_VALUE:
+            self._count('unreachable')
+            if value:
+                return self._block(stmt.then_branch, env)
+            return self._block(stmt.else_branch, env) if stmt.else_branch is not None else []
+        then_env, else_env = dict(env), dict(env)
+        then_branch = self._block(stmt.then_branch, then_env)
+        else_branch = self._block(stmt.else_branch, else_env) if stmt.else_branch is not None else None
+        # Keep only bindings both paths agree on
+        env.clear()
+        for name, node in then_env.items():
+            other = else_env.get(name)
+            if other is not None and expression_key(other) == expression_key(node):
+                env[name] = node
+        return [copy_line(stmt, IfNode(condition, then_branch, else_branch))]
+
+    def _for(self, stmt: ForNode, env: Dict[str, ASTNode]) -> List[Any]:
+        start = self._expr(stmt.start, env)
+        # Anything the loop assigns differs between iterations
+        killed = assigned_names([stmt.body, stmt.step]) | {stmt.var_name}
+        if has_call([stmt.condition, stmt.body, stmt.step]):
+            killed |= self._clobbered
+        for name in killed:
+            env.pop(name, None)
+        condition = self._expr(stmt.condition, env)
+        if is_literal(start) and not has_call(stmt.condition):
+            # Evaluate the first check with the loop variable bound to start
+            counters = self.optimizations, dict(self.stats)
+            first = self._fold(condition, {stmt.var_name: start})
+            self.optimizations, self.stats = counters
+        else:
+            first = condition
+        init_value = literal_value(first)
+        if init_value is not _NO_VALUE and not init_value:
+            # The condition is false before the first iteration
+            self._count('unreachable')
+            return [copy_line(stmt, AssignmentNode(IdentifierNode(stmt.var_name), start))]
+        body = self._block(stmt.body, dict(env))
+        if isinstance(stmt.step, AssignmentNode):
+            step = self._assignment(stmt.step, dict(env))
+        else:
+            step = self._expr(stmt.step, dict(env))
+        return [copy_line(stmt, ForNode(stmt.var_name, start, condition, step, body))]
+
+    def _expr(self, node, env: Dict[str, ASTNode]):
+        if node is None:
+            return None
+        if env and has_call(node) and self._clobbered:
+            # A call may reassign these before they are read
+            env = {name: value for name, value in env.items() if name not in self._clobbered}
+        return self._fold(node, env)
+
+    def _fold(self, node, env: Dict[str, ASTNode]):
+        if isinstance(node, IdentifierNode):
+            bound = env.get(node.name)
+            if bound is not None:
+                self._count('propagated')
+                return _copy_literal(bound)
+            return node
+        if isinstance(node, BinOpNode):
+            return self._fold_chain(node, env)
+        if isinstance(node, UnaryOpNode):
+            operand = self._fold(node.operand, env)
+            value = literal_value(operand)
+            symbol = operator_symbol(node.op)
+            if value is not _NO_VALUE:
+                folded = None
+                if symbol == '-' and isinstance(value, (int, float)) and not isinstance(value, bool):
+                    folded = make_literal(-value)
+                elif symbol in ('!', 'not'):
+                    folded = make_literal(not value)
+                if folded is not None:
+                    self._count('folded')
+                    return folded
+            return UnaryOpNode(node.op, operand)
+        if isinstance(node, TernaryNode):
+            condition = self._fold(node.condition, env)
+            value = literal_value(condition)
+            if value is not _NO_VALUE:
+                self._count('unreachable')
+                return self._fold(node.true_expr if value else node.false_expr, env)
+            return TernaryNode(condition, self._fold(node.true_expr, env), self._fold(node.false_expr, env))
+        if isinstance(node, CallNode):
+            return copy_line(node, CallNode(node.name, [self._fold(arg, env) for arg in node.args]))
+        if isinstance(node, ArrayNode):
+            return ArrayNode([self._fold(el, env) for el in node.elements])
+        if isinstance(node, ArrayAccessNode):
+            return ArrayAccessNode(self._fold(node.array, env), self._fold(node.index, env))
+        return node
+
+    def _fold_chain(self, node: BinOpNode, env: Dict[str, ASTNode]):
+        """``_fold`` for nested binary operations, with an explicit stack so
+        long generated chains do not hit the recursion limit"""
+        values = []
+        todo = [(node, False)]
+        while todo:
+            current, ready = todo.pop()
+            if not ready:
+                if isinstance(current, BinOpNode):
+                    todo.append((current, True))
+                    todo.append((current.right, False))
+                    todo.append((current.left, False))
+                else:
+                    values.append(self._fold(current, env))
+                continue
+            right = values.pop()
+            left = values.pop()
+            folded = self._fold_binary(operator_symbol(current.op), left, right)
+            if folded is not None:
+                self._count('folded')
+                values.append(folded)
+            elif left is current.left and right is current.right:
+                values.append(current)
+            else:
+                values.append(BinOpNode(left, current.op, right))
+        return values[0]
+
+    def _fold_binary(self, symbol: str, left, right) -> Optional[ASTNode]:
+        fold = BINARY_FOLDS.get(symbol)
+        a, b = literal_value(left), literal_value(right)
+        if fold is None or a is _NO_VALUE or b is _NO_VALUE:
+            return None
+        if isinstance(a, str) != isinstance(b, str) and symbol not in ('==', '!='):
+            # Mixed string/number operations are left to the runtime
             return None
-        
-        return IfNode(
-            condition,
-            self.visit(node.then_branch),
-            self.visit(node.else_branch) if node.else_branch else None
-        )
+        if symbol == '*' and (isinstance(a, str) or isinstance(b, str)):
+            return None
+        try:
+            return make_literal(fold(a, b))
+        except (ArithmeticError, TypeError, ValueError):
+            return None
+
+    # Dead stores
+
+    def _dead_stores(self, stmts: List[Any], top_level: bool) -> List[Any]:
+        out = []
+        for stmt in stmts:
+            if isinstance(stmt, list):
+                stmt = self._dead_stores(stmt, top_level)
+            elif isinstance(stmt, AssignmentNode):
+                name = target_name(stmt)
+                if (name is not None and name not in self._reads and is_removable(stmt.value)
+                        and (self.whole_program or not top_level)):
+                    self._count('dead_stores')
+                    continue
+            elif isinstance(stmt, FuncNode):
+                stmt = copy_line(stmt, FuncNode(stmt.name, stmt.params, self._dead_stores(stmt.body, False)))
+            elif isinstance(stmt, IfNode):
+                then_branch = self._dead_stores(self._as_list(stmt.then_branch), top_level)
+                else_branch = (self._dead_stores(self._as_list(stmt.else_branch), top_level)
+                               if stmt.else_branch is not None else None)
+                stmt = copy_line(stmt, IfNode(stmt.condition, then_branch, else_branch))
+            elif isinstance(stmt, ForNode):
+                body = self._dead_stores(stmt.body, top_level)
+                stmt = copy_line(stmt, ForNode(stmt.var_name, stmt.start, stmt.condition, stmt.step, body))
+            out.append(stmt)
+        return out
+
+    @staticmethod
+    def _as_list(stmts) -> List[Any]:
+        return stmts if isinstance(stmts, list) else [stmts]
+
+    # Common subexpressions
+
+    def _cse_block(self, stmts: List[Any]) -> List[Any]:
+        out: List[Any] = []
+        run: List[Any] = []
+        for stmt in self._as_list(stmts):
+            if isinstance(stmt, (AssignmentNode, PrintNode, ReturnNode, CallNode)):
+                run.append(stmt)
+                continue
+            out.extend(self._cse_run(run))
+            run = []
+            if isinstance(stmt, FuncNode):
+                stmt = copy_line(stmt, FuncNode(stmt.name, stmt.params, self._cse_block(stmt.body)))
+            elif isinstance(stmt, IfNode):
+                else_branch = self._cse_block(stmt.else_branch) if stmt.else_branch is not None else None
+                stmt = copy_line(stmt, IfNode(stmt.condition, self._cse_block(stmt.then_branch), else_branch))
+            elif isinstance(stmt, ForNode):
+                stmt = copy_line(stmt, ForNode(
+                    stmt.var_name, stmt.start, stmt.condition, stmt.step, self._cse_block(stmt.body)
+                ))
+            out.append(stmt)
+        out.extend(self._cse_run(run))
+        return out
+
+    def _cse_run(self, run: List[Any]) -> List[Any]:
+        """Hoist repeated pure expressions of a straight-line run into temporaries"""
+        if len(run) < 1:
+            return run
+        # key -> [(statement index, node)] for the current window of each key
+        open_groups: Dict[Tuple, List[Tuple[int, Any]]] = {}
+        groups: List[Tuple[Tuple, List[Tuple[int, Any]]]] = []
+
+        def close(names: Set[str]):
+            for key in [k for k in open_groups if _key_names(k) & names]:
+                groups.append((key, open_groups.pop(key)))
+
+        for i, stmt in enumerate(run):
+            calls = has_call(stmt)
+            if calls:
+                close(self._clobbered)
+            for node in self._evaluated(stmt):
+                key = expression_key(node)
+                if calls and key is not None and _key_names(key) & self._clobbered:
+                    continue
+                if key is not None and key[0] == 'op':
+                    open_groups.setdefault(key, []).append((i, node))
+            if calls:
+                close(self._clobbered)
+            if isinstance(stmt, AssignmentNode) and target_name(stmt) is not None:
+                close({target_name(stmt)})
+        groups.extend(open_groups.items())
+
+        replace: Dict[int, str] = {}
+        inserts: Dict[int, List[Any]] = {}
+        consumed: Set[int] = set()
+        for key, occurrences in sorted(groups, key=lambda group: -_key_size(group[0])):
+            occurrences = [(i, node) for i, node in occurrences if id(node) not in consumed]
+            size = _key_size(key)
+            uses = len(occurrences)
+            # Recomputing costs size * uses; the temporary costs one
+            # evaluation plus a store and a load per use
+            if uses < 2 or size * (uses - 1) <= uses + 2:
+                continue
+            first = occurrences[0][0]
+            if has_call(run[first]):
+                # The definition would run, and maybe raise, before calls
+                # the statement makes ahead of the expression
+                continue
+            name = self._new_temp()
+            definition = AssignmentNode(IdentifierNode(name), occurrences[0][1])
+            inserts.setdefault(first, []).append(definition)
+            for _, node in occurrences:
+                replace[id(node)] = name
+                consumed.update(id(inner) for inner in walk(node))
+            self._count('cse')
+        if not replace:
+            return run
+        out = []
+        for i, stmt in enumerate(run):
+            out.extend(inserts.get(i, []))
+            out.append(_Substitute(replace).visit(stmt))
+        return out
+
+    def _evaluated(self, stmt) -> List[Any]:
+        """Candidate subexpressions a statement always evaluates"""
+        roots: List[Any] = []
+        if isinstance(stmt, AssignmentNode):
+            if isinstance(stmt.name, ArrayAccessNode):
+                roots += [stmt.name.array, stmt.name.index]
+            roots.append(stmt.value)
+        elif isinstance(stmt, PrintNode):
+            roots.append(stmt.value)
+        elif isinstance(stmt, ReturnNode) and stmt.expression is not None:
+            roots.append(stmt.expression)
+        elif isinstance(stmt, CallNode):
+            roots += stmt.args
+        found = []
+        todo = list(roots)
+        while todo:
+            node = todo.pop()
+            if isinstance(node, BinOpNode):
+                found.append(node)
+                todo += [node.left, node.right]
+            elif isinstance(node, CallNode):
+                todo += node.args
+            elif isinstance(node, ArrayNode):
+                todo += node.elements
+            elif isinstance(node, ArrayAccessNode):
+                todo += [node.array, node.index]
+            elif isinstance(node, TernaryNode):
+                # Only the condition is evaluated unconditionally
+                todo.append(node.condition)
+        return found
+
+    # Inlining
+
+    def _inline_candidates(self, tree: List[Any]) -> Dict[str, FuncNode]:
+        """Functions small and simple enough to inline, by name
+
+        Only leaf functions qualify: with no calls in the body a function
+        cannot recurse, and no callee can observe its frame through the VM's
+        dynamic variable lookup.
+        """
+        defined: Dict[str, List[FuncNode]] = {}
+        for current in walk(tree):
+            if isinstance(current, FuncNode):
+                defined.setdefault(current.name, []).append(current)
+        candidates = {}
+        for name, funcs in defined.items():
+            if len(funcs) == 1 and self._inlinable(funcs[0]):
+                candidates[name] = funcs[0]
+        return candidates
+
+    def _inlinable(self, func: FuncNode) -> bool:
+        body = self._as_list(func.body)
+        if len(set(func.params)) != len(func.params) or has_call(body):
+            return False
+        if sum(1 for _ in walk(body)) > self.INLINE_MAX_NODES:
+            return False
+        local = set(func.params) | assigned_names(body)
+        bound = set(func.params)
+        for i, stmt in enumerate(body):
+            if isinstance(stmt, ReturnNode):
+                if i != len(body) - 1 or stmt.expression is None:
+                    return False
+                value = stmt.expression
+            elif isinstance(stmt, PrintNode):
+                value = stmt.value
+            elif isinstance(stmt, AssignmentNode) and target_name(stmt) is not None:
+                value = stmt.value
+            else:
+                return False
+            # A local read before its first store resolves in the caller's
+            # frame; renaming it would change that
+            if {n.name for n in walk(value) if isinstance(n, IdentifierNode)} & (local - bound):
+                return False
+            if isinstance(stmt, AssignmentNode):
+                bound.add(target_name(stmt))
+        return True
+
+    def _inline_block(self, stmts, candidates: Dict[str, FuncNode]) -> List[Any]:
+        out: List[Any] = []
+        for stmt in self._as_list(stmts):
+            if isinstance(stmt, list):
+                out.append(self._inline_block(stmt, candidates))
+            elif isinstance(stmt, FuncNode):
+                out.append(copy_line(stmt, FuncNode(stmt.name, stmt.params, self._inline_block(stmt.body, candidates))))
+            elif isinstance(stmt, IfNode):
+                else_branch = self._inline_block(stmt.else_branch, candidates) if stmt.else_branch is not None else None
+                out.append(copy_line(stmt, IfNode(stmt.condition, self._inline_block(stmt.then_branch, candidates), else_branch)))
+            elif isinstance(stmt, ForNode):
+                out.append(copy_line(stmt, ForNode(
+                    stmt.var_name, stmt.start, stmt.condition, stmt.step, self._inline_block(stmt.body, candidates)
+                )))
+            else:
+                out.extend(self._inline_statement(stmt, candidates))
+        return out
+
+    def _inline_statement(self, stmt, candidates: Dict[str, FuncNode]) -> List[Any]:
+        calls = self._calls_in_order(stmt)
+        if not calls:
+            return [stmt]
+        value = self._statement_value(stmt)
+        for call in calls:
+            func = candidates.get(self._call_name(call))
+            if func is None or len(call.args) != len(func.params) or has_call(call.args):
+                return [stmt]
+            body = self._as_list(func.body)
+            returns = bool(body) and isinstance(body[-1], ReturnNode)
+            effects = any(isinstance(s, PrintNode) for s in body)
+            # Hoisting a body with output ahead of the rest of the statement
+            # is only safe when the call is all the statement evaluates
+            if (effects or not returns) and call is not value:
+                return [stmt]
+            if not returns and call is not stmt:
+                return [stmt]
+        prefix: List[Any] = []
+        replace: Dict[int, Any] = {}
+        for call in calls:
+            func = candidates[self._call_name(call)]
+            body = self._as_list(func.body)
+            rename = {name: self._new_temp(f'__inl_{name}_') for name in set(func.params) | assigned_names(body)}
+            for param, arg in zip(func.params, call.args):
+                prefix.append(copy_line(stmt, AssignmentNode(IdentifierNode(rename[param]), arg)))
+            for inner in body:
+                if isinstance(inner, ReturnNode):
+                    replace[id(call)] = clone(inner.expression, rename)
+                else:
+                    prefix.append(copy_line(stmt, clone(inner, rename)))
+            self._count('inlined')
+        if isinstance(stmt, CallNode) and id(stmt) not in replace:
+            return prefix
+        return prefix + [copy_line(stmt, _Substitute(replace).visit(stmt))]
+
+    @staticmethod
+    def _call_name(call: CallNode) -> str:
+        return call.name.name if isinstance(call.name, IdentifierNode) else call.name
+
+    @staticmethod
+    def _statement_value(stmt):
+        if isinstance(stmt, AssignmentNode) and not isinstance(stmt.name, ArrayAccessNode):
+            return stmt.value
+        if isinstance(stmt, PrintNode):
+            return stmt.value
+        if isinstance(stmt, ReturnNode):
+            return stmt.expression
+        return stmt
+
+    def _calls_in_order(self, stmt) -> List[CallNode]:
+        """Calls a statement makes, in VM evaluation order
+
+        Calls inside ternary branches are conditional; one is reported as
+        a non-inlinable site so the statement is left alone.
+        """
+        calls: List[CallNode] = []
+
+        def visit(node):
+            if isinstance(node, CallNode):
+                for arg in node.args:
+                    visit(arg)
+                calls.append(node)
+            elif isinstance(node, BinOpNode):
+                visit(node.left)
+                visit(node.right)
+            elif isinstance(node, UnaryOpNode):
+                visit(node.operand)
+            elif isinstance(node, ArrayNode):
+                for element in node.elements:
+                    visit(element)
+            elif isinstance(node, ArrayAccessNode):
+                visit(node.array)
+                visit(node.index)
+            elif isinstance(node, TernaryNode):
+                visit(node.condition)
+                if has_call([node.true_expr, node.false_expr]):
+                    calls.append(CallNode('', []))
+            elif isinstance(node, AssignmentNode):
+                visit(node.name)
+                visit(node.value)
+            elif isinstance(node, (PrintNode, ReturnNode)):
+                visit(node.value if isinstance(node, PrintNode) else node.expression)
+
+        visit(stmt)
+        return calls
+
+    # Loops
+
+    def _loops_block(self, stmts, rewrite: Callable[[ForNode], List[Any]]) -> List[Any]:
+        """Apply ``rewrite`` to every loop, innermost first"""
+        out: List[Any] = []
+        for stmt in self._as_list(stmts):
+            if isinstance(stmt, list):
+                out.append(self._loops_block(stmt, rewrite))
+            elif isinstance(stmt, FuncNode):
+                out.append(copy_line(stmt, FuncNode(stmt.name, stmt.params, self._loops_block(stmt.body, rewrite))))
+            elif isinstance(stmt, IfNode):
+                else_branch = self._loops_block(stmt.else_branch, rewrite) if stmt.else_branch is not None else None
+                out.append(copy_line(stmt, IfNode(
+                    stmt.condition, self._loops_block(stmt.then_branch, rewrite), else_branch
+                )))
+            elif isinstance(stmt, ForNode):
+                out.extend(rewrite(copy_line(stmt, ForNode(
+                    stmt.var_name, stmt.start, stmt.condition, stmt.step, self._loops_block(stmt.body, rewrite)
+                ))))
+            else:
+                out.append(stmt)
+        return out
+
+    def _counted(self, loop: ForNode) -> Optional[Tuple[int, int]]:
+        """(start, increment) of a loop whose variable steps by an int constant"""
+        start = literal_value(loop.start)
+        if type(start) is not int or loop.var_name in assigned_names(loop.body):
+            return None
+        step = loop.step
+        if isinstance(step, AssignmentNode):
+            value = step.value
+            if (target_name(step) != loop.var_name or not isinstance(value, BinOpNode)
+                    or not isinstance(value.left, IdentifierNode) or value.left.name != loop.var_name):
+                return None
+            increment = literal_value(value.right)
+            if type(increment) is not int or operator_symbol(value.op) not in ('+', '-'):
+                return None
+            if operator_symbol(value.op) == '-':
+                increment = -increment
+        else:
+            increment = literal_value(step)
+            if type(increment) is not int:
+                return None
+        return (start, increment) if increment else None
+
+    def _trip_values(self, loop: ForNode, start: int, increment: int) -> Optional[List[int]]:
+        """Values the loop variable takes, if few and known at compile time"""
+        condition = loop.condition
+        if not isinstance(condition, BinOpNode):
+            return None
+        symbol = operator_symbol(condition.op)
+        left, right = condition.left, condition.right
+        if isinstance(right, IdentifierNode) and right.name == loop.var_name:
+            left, right = right, left
+            symbol = {'<': '>', '>': '<', '<=': '>=', '>=': '<='}.get(symbol, symbol)
+        bound = literal_value(right)
+        if (not isinstance(left, IdentifierNode) or left.name != loop.var_name or type(bound) is not int
+                or symbol not in ('<', '>', '<=', '>=', '!=')):
+            return None
+        compare = BINARY_FOLDS[symbol]
+        values = []
+        value = start
+        while compare(value, bound):
+            if len(values) == self.UNROLL_MAX_TRIPS:
+                return None
+            values.append(value)
+            value += increment
+        values.append(value)
+        return values
+
+    def _unroll(self, loop: ForNode) -> Optional[List[Any]]:
+        """Replace a short constant-trip loop by copies of its body"""
+        counted = self._counted(loop)
+        if counted is None or any(isinstance(n, FuncNode) for n in walk(loop.body)):
+            return None
+        values = self._trip_values(loop, *counted)
+        if values is None:
+            return None
+        body = self._as_list(loop.body)
+        size = sum(1 for _ in walk(body))
+        if size * (len(values) - 1) > self.UNROLL_MAX_NODES:
+            return None
+        out: List[Any] = []
+        for value in values[:-1]:
+            out.append(copy_line(loop, AssignmentNode(IdentifierNode(loop.var_name), NumberNode(str(value)))))
+            out.extend(clone(body))
+        # The variable keeps its exit value after the loop
+        out.append(copy_line(loop, AssignmentNode(IdentifierNode(loop.var_name), NumberNode(str(values[-1])))))
+        self._count('unrolled')
+        return out
+
+    def _reduce_strength(self, loop: ForNode) -> List[Any]:
+        """Turn ``i * c`` on the loop variable into a running sum
+
+        Each use saves a constant load and a multiply; the extra add at the
+        end of the body costs five instructions, so three uses are needed.
+        """
+        counted = self._counted(loop)
+        if counted is None or any(isinstance(n, FuncNode) for n in walk(loop.body)):
+            return [loop]
+        start, increment = counted
+        groups: Dict[int, List[BinOpNode]] = {}
+        for node in walk([loop.condition, loop.body]):
+            if isinstance(node, BinOpNode) and operator_symbol(node.op) == '*':
+                for a, b in ((node.left, node.right), (node.right, node.left)):
+                    factor = literal_value(b)
+                    if isinstance(a, IdentifierNode) and a.name == loop.var_name and type(factor) is int:
+                        groups.setdefault(factor, []).append(node)
+                        break
+        replace: Dict[int, Any] = {}
+        prefix: List[Any] = []
+        updates: List[Any] = []
+        for factor, uses in groups.items():
+            if len(uses) < 3:
+                continue
+            name = self._new_temp('__sr')
+            for node in uses:
+                replace[id(node)] = name
+            prefix.append(copy_line(loop, AssignmentNode(IdentifierNode(name), NumberNode(str(start * factor)))))
+            updates.append(AssignmentNode(
+                IdentifierNode(name),
+                BinOpNode(IdentifierNode(name), TokenType.PLUS, NumberNode(str(increment * factor)))
+            ))
+            self._count('strength_reduced')
+        if not replace:
+            return [loop]
+        substitute = _Substitute(replace)
+        body = [substitute.visit(stmt) for stmt in self._as_list(loop.body)] + updates
+        return prefix + [copy_line(loop, ForNode(
+            loop.var_name, loop.start, substitute.visit(loop.condition), loop.step, body
+        ))]
+
+    def _hoist(self, loop: ForNode) -> List[Any]:
+        """Move loop-invariant arithmetic out of the condition and body
+
+        The condition runs at least once, so its invariants can be computed
+        before the loop. Body (and step) invariants only run when the loop
+        is entered, so they are computed behind a copy of the first check.
+        Any operation may raise, so body invariants are taken only from
+        statements no earlier side effect (print, call, element store) of
+        the iteration precedes.
+        """
+        variant = assigned_names([loop.body, loop.step]) | {loop.var_name}
+        if has_call([loop.condition, loop.body, loop.step]):
+            variant |= self._clobbered
+        before: List[Any] = []
+        entered: List[Any] = []
+        replace: Dict[int, Any] = {}
+        hoisted: Dict[Tuple, str] = {}
+
+        def hoist(roots, into):
+            for node in self._invariants(roots, variant):
+                key = expression_key(node)
+                if key not in hoisted:
+                    hoisted[key] = self._new_temp('__licm')
+                    into.append(copy_line(loop, AssignmentNode(IdentifierNode(hoisted[key]), clone(node))))
+                    self._count('hoisted')
+                replace[id(node)] = hoisted[key]
+
+        hoist([loop.condition], before)
+        if not has_call(loop.condition):
+            body = self._as_list(loop.body)
+            straight = []
+            effect = False
+            for stmt in body:
+                if not isinstance(stmt, (AssignmentNode, PrintNode, CallNode)) or has_call(stmt):
+                    effect = True
+                    break
+                straight.append(stmt)
+                if isinstance(stmt, PrintNode) or target_name(stmt) is None:
+                    # Its operands are evaluated before the effect, later statements' after
+                    effect = True
+                    break
+            roots = [root for stmt in straight for root in self._evaluated_roots(stmt)]
+            if not effect and not isinstance(loop.step, AssignmentNode):
+                roots.append(loop.step)
+            hoist(roots, entered)
+        if not replace:
+            return [loop]
+        substitute = _Substitute(replace)
+        condition = substitute.visit(loop.condition)
+        step = substitute.visit(loop.step)
+        body = [substitute.visit(stmt) for stmt in self._as_list(loop.body)]
+        if not entered and not has_call(loop.start):
+            return before + [copy_line(loop, ForNode(loop.var_name, loop.start, condition, step, body))]
+        # Evaluate start once (calls in it run before the invariants), then
+        # guard the body invariants with the first check
+        init = copy_line(loop, AssignmentNode(IdentifierNode(loop.var_name), loop.start))
+        inner = copy_line(loop, ForNode(loop.var_name, IdentifierNode(loop.var_name), condition, step, body))
+        if not entered:
+            return [init] + before + [inner]
+        guard = copy_line(loop, IfNode(clone(condition), entered + [inner], None))
+        return [init] + before + [guard]
+
+    @staticmethod
+    def _evaluated_roots(stmt) -> List[Any]:
+        if isinstance(stmt, AssignmentNode):
+            roots = [stmt.value]
+            if isinstance(stmt.name, ArrayAccessNode):
+                roots = [stmt.name.array, stmt.name.index] + roots
+            return roots
+        if isinstance(stmt, PrintNode):
+            return [stmt.value]
+        return list(stmt.args)
+
+    @staticmethod
+    def _invariants(roots: List[Any], variant: Set[str]) -> List[BinOpNode]:
+        """Largest unconditionally evaluated invariant operations under ``roots``"""
+        found = []
+        todo = list(roots)
+        while todo:
+            node = todo.pop()
+            if isinstance(node, BinOpNode):
+                key = expression_key(node)
+                if key is not None and not _key_names(key) & variant:
+                    found.append(node)
+                    continue
+                todo += [node.left, node.right]
+            elif isinstance(node, CallNode):
+                todo += node.args
+            elif isinstance(node, ArrayNode):
+                todo += node.elements
+            elif isinstance(node, ArrayAccessNode):
+                todo += [node.array, node.index]
+            elif isinstance(node, TernaryNode):
+                todo.append(node.condition)
+        return found
+
+    # Typed identities
+
+    def _typed(self, tree: List[Any]) -> List[Any]:
+        from ...runtime.types.program import MODULE, ProgramInferrer
+        types = ProgramInferrer().infer(tree)
+        rewriter = _Identities(types, MODULE)
+        tree = rewriter.visit(tree)
+        self._count('identities', rewriter.rewrites)
+        return tree
+
+    def _new_temp(self, prefix: str = '__cse') -> str:
+        while True:
+            name = f'{prefix}{self._temps}'
+            self._temps += 1
+            if name not in self._names:
+                return name
+
+class _Substitute(ASTVisitor):
+    """Replace specific expression nodes (by identity) with temporaries"""
+
+    def __init__(self, replace: Dict[int, Any]):
+        super().__init__()
+        self.replace = replace
+
+    def enter(self, node):
+        replacement = self.replace.get(id(node))
+        if isinstance(replacement, str):
+            return IdentifierNode(replacement)
+        if replacement is not None:
+            return clone(replacement)
+        return None
+
+class _Identities(ASTVisitor):
+    """Drop ``+ 0``, ``- 0`` and ``* 1`` from operands of proven types"""
+
+    def __init__(self, types, unit: str):
+        super().__init__()
+        self.types = types
+        self.typer = types.typer(unit)
+        self.rewrites = 0
+        # id(node) -> inferred type, for nodes built or kept by this visit
+        self._known: Dict[int, Any] = {}
+
+    def enter(self, node):
+        if isinstance(node, FuncNode):
+            inner = _Identities(self.types, node.name)
+            body = inner.visit(node.body)
+            self.rewrites += inner.rewrites
+            if body is node.body:
+                return node
+            func = copy.copy(node)
+            func.body = body
+            return func
+        return None
+
+    def _type(self, node):
+        known = self._known.get(id(node), _NO_VALUE)
+        return self.typer.expression(node) if known is _NO_VALUE else known
+
+    def visit_BinOpNode(self, node):
+        from ...runtime.types.core import FLOAT, INTEGER
+        symbol = operator_symbol(node.op)
+        left, right = self._type(node.left), self._type(node.right)
+        result = None
+        if symbol in ('+', '-') and literal_value(node.right) == 0 and right is INTEGER and left is INTEGER:
+            result = node.left
+        elif symbol == '+' and literal_value(node.left) == 0 and left is INTEGER and right is INTEGER:
+            result = node.right
+        elif symbol == '*' and right is INTEGER and literal_value(node.right) == 1 and left in (INTEGER, FLOAT):
+            result = node.left
+        elif symbol == '*' and left is INTEGER and literal_value(node.left) == 1 and right in (INTEGER, FLOAT):
+            result = node.right
+        if result is None:
+            self._known[id(node)] = self.typer.binary(symbol, left, right)
+            return node
+        self.rewrites += 1
+        return result
+
+class _Clone(ASTVisitor):
+    """Deep copy of a tree, leaves included, optionally renaming variables"""
+
+    def __init__(self, rename: Optional[Dict[str, str]] = None):
+        super().__init__()
+        self.rename = rename or {}
+
+    def rebuild(self, node, fields, values):
+        node = copy.copy(node)
+        for name, value in zip(fields, values):
+            setattr(node, name, value)
+        return node
+
+    def rebuild_list(self, items, values):
+        return values
+
+    def visit_IdentifierNode(self, node):
+        node.name = self.rename.get(node.name, node.name)
+        return node
+
+    def visit_AssignmentNode(self, node):
+        if isinstance(node.name, str):
+            node.name = self.rename.get(node.name, node.name)
+        return node
 
     def visit_ForNode(self, node):
-        # Optimize loop bounds if they're constants
-        start = self.visit(node.start)
-        end = self.visit(node.end)
-        step = self.visit(node.step)
-        
-        # If all bounds are constant, we might unroll the loop
-        if (isinstance(start, NumberNode) and 
-            isinstance(end, NumberNode) and 
-            isinstance(step, NumberNode)):
-            # Simple case: loop runs zero times
-            if (step.value > 0 and start.value >= end.value) or \
-               (step.value < 0 and start.value <= end.value):
-                self.optimizations +=
\ No newline at end of file
+        node.var_name = self.rename.get(node.var_name, node.var_name)
+        return node
+
+def clone(node, rename: Optional[Dict[str, str]] = None):
+    """Copy of ``node`` that shares no nodes with it"""
+    return _Clone(rename).visit(node)
@@ -0,0 +1,166 @@
+"""Optimization pass registry, ``-O`` presets and the pass manager
+
+A pass is a function from a statement list to a statement list. It gets
+the manager's ``ASTOptimizer``, which holds the per-tree state passes share
+(rewrite counters, names in use, the whole-program flag). Passes declare the
+passes they rely on having run before them; the manager adds missing
+requirements, orders passes so requirements come first and repeats the
+pipeline until a round rewrites nothing.
+"""
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from .optimizer import ASTOptimizer
+
+@dataclass(frozen=True)
+class OptimizationPass:
+    name: str
+    run: Callable[[List[Any], ASTOptimizer], List[Any]]
+    requires: Tuple[str, ...] = ()
+    description: str = ''
+    # Passes that are not idempotent rewrites (lowerings) run once
+    repeat: bool = True
+
+PASSES: Dict[str, OptimizationPass] = {}
+
+def register_pass(name: str, run: Callable[[List[Any], ASTOptimizer], List[Any]],
+                  requires: Sequence[str] = (), description: str = '', repeat: bool = True) -> OptimizationPass:
+    """Add a pass to the registry, replacing any pass of the same name"""
+    opt_pass = OptimizationPass(name, run, tuple(requires), description, repeat)
+    PASSES[name] = opt_pass
+    return opt_pass
+
+def _optimizer_pass(name: str):
+    return lambda tree, optimizer: optimizer.run_pass(name, tree)
+
+register_pass('inline', _optimizer_pass('inline'), (),
+              'inline small leaf functions at statement-level call sites')
+register_pass('propagate', _optimizer_pass('propagate'), (),
+              'constant folding and propagation, unreachable code removal')
+register_pass('unroll', _optimizer_pass('unroll'), ('propagate',),
+              'fully unroll short constant-trip loops')
+register_pass('strength', _optimizer_pass('strength'), ('propagate',),
+              'replace multiplies by the loop variable with running sums')
+register_pass('licm', _optimizer_pass('licm'), (),
+              'hoist loop-invariant arithmetic out of loops')
+register_pass('dead_stores', _optimizer_pass('dead_stores'), (),
+              'remove side-effect free stores that are never read')
+register_pass('cse', _optimizer_pass('cse'), ('propagate',),
+              'compute repeated arithmetic once per straight-line run')
+register_pass('typed', _optimizer_pass('typed'), ('propagate',),
+              'drop arithmetic identities on operands of proven types (whole program)')
+
+OPT_LEVELS: Dict[int, Tuple[str, ...]] = {
+    0: (),
+    1: ('propagate', 'dead_stores'),
+    2: ('propagate', 'strength', 'licm', 'dead_stores', 'cse'),
+    3: ASTOptimizer.PASSES,
+}
+DEFAULT_OPT_LEVEL = 2
+
+def resolve_passes(names: Sequence[str], registry: Optional[Dict[str, OptimizationPass]] = None) -> List[OptimizationPass]:
+    """Passes to run for ``names``, with requirements added and ordered first
+
+    Raises ValueError for unknown passes and dependency cycles.
+    """
+    registry = PASSES if registry is None else registry
+    ordered: List[OptimizationPass] = []
+    done = set()
+    active = []
+
+    def add(name: str):
+        if name in done:
+            return
+        if name in active:
+            raise ValueError(f"Optimization pass dependency cycle: {' -> '.join(active + [name])}")
+        opt_pass = registry.get(name)
+        if opt_pass is None:
+            raise ValueError(f"Unknown optimization pass: {name}")
+        active.append(name)
+        for required in opt_pass.requires:
+            add(required)
+        active.pop()
+        done.add(name)
+        ordered.append(opt_pass)
+
+    for name in names:
+        add(name)
+    return ordered
+
+class PassManager:
+    """Runs a pipeline of passes over a tree and records what each one did"""
+
+    MAX_ROUNDS = 6
+
+    def __init__(self, passes: Sequence[str] = ASTOptimizer.PASSES, whole_program: bool = False,
+                 optimizer: Optional[ASTOptimizer] = None, level: Optional[int] = None):
+        self.passes = resolve_passes(passes)
+        self.optimizer = optimizer or ASTOptimizer(whole_program)
+        self.level = level
+        self.rounds = 0
+        self.timings: Dict[str, float] = {}
+        self.rewrites: Dict[str, int] = {}
+
+    @classmethod
+    def for_level(cls, level: int, whole_program: bool = False,
+                  optimizer: Optional[ASTOptimizer] = None) -> 'PassManager':
+        """Pass manager for an ``-O`` preset"""
+        if level not in OPT_LEVELS:
+            raise ValueError(f"Unknown optimization level: -O{level}")
+        return cls(OPT_LEVELS[level], whole_program, optimizer, level)
+
+    def run(self, node):
+        """Optimize a statement list (or a single node); the input is not modified"""
+        single = not isinstance(node, list)
+        tree = self.optimizer.begin(node)
+        self.rounds = 0
+        self.timings = {opt_pass.name: 0.0 for opt_pass in self.passes}
+        self.rewrites = {opt_pass.name: 0 for opt_pass in self.passes}
+        for round_number in range(self.MAX_ROUNDS if self.passes else 0):
+            self.rounds += 1
+            before = self.optimizer.optimizations
+            for opt_pass in self.passes:
+                if round_number and not opt_pass.repeat:
+                    continue
+                count = self.optimizer.optimizations
+                start = time.perf_counter()
+                tree = opt_pass.run(tree, self.optimizer)
+                self.timings[opt_pass.name] += time.perf_counter() - start
+                self.rewrites[opt_pass.name] += self.optimizer.optimizations - count
+            if self.optimizer.optimizations == before:
+                break
+        if single:
+            return tree[0] if tree else None
+        return tree
+
+    def report(self) -> Dict[str, Any]:
+        """Per-pass wall time and rewrite counts of the last run"""
+        return {
+            'level': self.level,
+            'rounds': self.rounds,
+            'passes': [
+                {
+                    'name': opt_pass.name,
+                    'time_ms': self.timings.get(opt_pass.name, 0.0) * 1000,
+                    'rewrites': self.rewrites.get(opt_pass.name, 0),
+                }
+                for opt_pass in self.passes
+            ],
+            'rewrites': dict(self.optimizer.stats),
+        }
+
+    def format_report(self) -> str:
+        """``report`` as a table for ``--opt-report``"""
+        report = self.report()
+        level = f"-O{report['level']}" if report['level'] is not None else 'custom'
+        lines = [f"Optimization report ({level}, {report['rounds']} rounds)",
+                 f"{'pass':<14}{'time ms':>10}{'rewrites':>10}"]
+        for entry in report['passes']:
+            lines.append(f"{entry['name']:<14}{entry['time_ms']:>10.3f}{entry['rewrites']:>10}")
+        total_ms = sum(entry['time_ms'] for entry in report['passes'])
+        total = sum(entry['rewrites'] for entry in report['passes'])
+        lines.append(f"{'total':<14}{total_ms:>10.3f}{total:>10}")
+        details = ', '.join(f'{kind}={n}' for kind, n in report['rewrites'].items() if n)
+        if details:
+            lines.append(f"rewrites: {details}")
+        return '\n'.join(lines)
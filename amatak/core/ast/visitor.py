@@ -1,95 +1,152 @@
-from abc import ABC, abstractmethod
-from ..nodes import *
+import copy
+from typing import Any, Callable, Dict, Tuple
+from ...nodes import *
+
+# Child attributes of each node type, in evaluation order. Values may be
+# nodes, statement lists or plain values (names, None), which are kept.
+CHILD_FIELDS: Dict[type, Tuple[str, ...]] = {
+    NumberNode: (),
+    StringNode: (),
+    BooleanNode: (),
+    IdentifierNode: (),
+    BinOpNode: ('left', 'right'),
+    UnaryOpNode: ('operand',),
+    TernaryNode: ('condition', 'true_expr', 'false_expr'),
+    AssignmentNode: ('name', 'value'),
+    IfNode: ('condition', 'then_branch', 'else_branch'),
+    ForNode: ('start', 'condition', 'step', 'body'),
+    FuncNode: ('body',),
+    CallNode: ('args',),
+    ReturnNode: ('expression',),
+    ArrayNode: ('elements',),
+    ArrayAccessNode: ('array', 'index'),
+    PrintNode: ('value',),
+}
+
+def child_fields(node) -> Tuple[str, ...]:
+    """Child attribute names of ``node``; other ``ASTNode`` types expose
+    every attribute holding a node or a list"""
+    fields = CHILD_FIELDS.get(type(node))
+    if fields is None:
+        if not isinstance(node, ASTNode):
+            return ()
+        fields = tuple(name for name, value in vars(node).items() if isinstance(value, (ASTNode, list)))
+    return fields
+
+def walk(node):
+    """Every node under ``node`` (statement lists included), parents first"""
+    todo = [node]
+    while todo:
+        current = todo.pop()
+        if isinstance(current, list):
+            todo.extend(reversed(current))
+        elif isinstance(current, ASTNode):
+            yield current
+            for name in reversed(child_fields(current)):
+                value = getattr(current, name)
+                if isinstance(value, (ASTNode, list)):
+                    todo.append(value)
+
+def copy_line(old, new):
+    """Carry the source line of a rewritten statement over to its replacement"""
+    line = getattr(old, 'line', None)
+    if line is not None and new is not None and getattr(new, 'line', None) is None:
+        new.line = line
+    return new
+
+# Work items of the explicit-stack traversal
+_ENTER, _EXIT, _EXIT_LIST = range(3)
+
+class ASTVisitor:
+    """Base class for AST rewriting visitors
+
+    ``visit`` rewrites a tree bottom-up with an explicit stack, so deeply
+    nested expressions do not hit Python's recursion limit. Children are
+    visited first; then ``visit_<Type>`` is called with the node whose
+    children have been replaced and returns the node to use in its place.
+    Types without a ``visit_*`` method go through ``generic_visit``, which
+    keeps the node. Handlers are looked up once per node type and class.
+
+    With ``in_place=False`` (the default) input trees are never modified:
+    a node is shallow-copied only when one of its children changed, so
+    unchanged subtrees are shared with the input. With ``in_place=True``
+    changed children are assigned on the existing nodes and lists.
+
+    ``enter`` runs before a node's children; returning a value other than
+    None replaces the node without visiting it further.
+    """
+
+    in_place = False
+    _handlers: Dict[type, Callable] = {}
+
+    def __init__(self, in_place: bool = False):
+        self.in_place = in_place
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._handlers = {}
+
+    def handler(self, node_type: type) -> Callable:
+        """Unbound ``visit_*`` method for a node type (cached per class)"""
+        handlers = type(self)._handlers
+        method = handlers.get(node_type)
+        if method is None:
+            method = getattr(type(self), f'visit_{node_type.__name__}', None) or type(self).generic_visit
+            handlers[node_type] = method
+        return method
 
-class ASTVisitor(ABC):
-    """Base class for AST visitors"""
-    
-    @abstractmethod
     def visit(self, node):
-        pass
-    
-    def visit_NumberNode(self, node):
-        return node
-    
-    def visit_StringNode(self, node):
+        results = []
+        todo = [(_ENTER, node)]
+        while todo:
+            action, item = todo.pop()
+            if action == _ENTER:
+                if isinstance(item, list):
+                    todo.append((_EXIT_LIST, item))
+                    todo.extend((_ENTER, stmt) for stmt in reversed(item))
+                    continue
+                if not isinstance(item, ASTNode):
+                    results.append(item)
+                    continue
+                replacement = self.enter(item)
+                if replacement is not None:
+                    results.append(replacement)
+                    continue
+                fields = child_fields(item)
+                todo.append((_EXIT, item))
+                todo.extend((_ENTER, getattr(item, name)) for name in reversed(fields))
+            elif action == _EXIT:
+                fields = child_fields(item)
+                values = results[len(results) - len(fields):]
+                del results[len(results) - len(fields):]
+                rebuilt = self.rebuild(item, fields, values)
+                results.append(self.handler(type(rebuilt))(self, rebuilt))
+            else:
+                values = results[len(results) - len(item):]
+                del results[len(results) - len(item):]
+                results.append(self.rebuild_list(item, values))
+        return results[0]
+
+    def enter(self, node) -> Any:
+        return None
+
+    def generic_visit(self, node):
         return node
-    
-    def visit_IdentifierNode(self, node):
+
+    def rebuild(self, node, fields: Tuple[str, ...], values: list):
+        """``node`` with its ``fields`` set to ``values``"""
+        if all(getattr(node, name) is value for name, value in zip(fields, values)):
+            return node
+        if not self.in_place:
+            node = copy.copy(node)
+        for name, value in zip(fields, values):
+            setattr(node, name, value)
         return node
-    
-    def visit_BinOpNode(self, node):
-        left = self.visit(node.left)
-        right = self.visit(node.right)
-        return BinOpNode(left, node.op, right)
-    
-    def visit_UnaryOpNode(self, node):
-        operand = self.visit(node.operand)
-        return UnaryOpNode(node.op, operand)
-    
-    def visit_AssignmentNode(self, node):
-        target = self.visit(node.target)
-        value = self.visit(node.value)
-        return AssignmentNode(target, value)
-    
-    def visit_IfNode(self, node):
-        condition = self.visit(node.condition)
-        then_branch = self.visit(node.then_branch)
-        else_branch = self.visit(node.else_branch) if node.else_branch else None
-        return IfNode(condition, then_branch, else_branch)
-    
-    def visit_WhileNode(self, node):
-        condition = self.visit(node.condition)
-        body = self.visit(node.body)
-        return WhileNode(condition, body)
-    
-    def visit_ForNode(self, node):
-        start = self.visit(node.start)
-        end = self.visit(node.end)
-        step = self.visit(node.step)
-        body = [self.visit(stmt) for stmt in node.body]
-        return ForNode(node.var_name, start, end, step, body)
-    
-    def visit_FuncNode(self, node):
-        params = node.params
-        body = [self.visit(stmt) for stmt in node.body]
-        return FuncNode(node.name, params, body)
-    
-    def visit_CallNode(self, node):
-        args = [self.visit(arg) for arg in node.args]
-        return CallNode(node.name, args)
-    
-    def visit_ReturnNode(self, node):
-        value = self.visit(node.value) if node.value else None
-        return ReturnNode(value)
-    
-    def visit_ArrayNode(self, node):
-        elements = [self.visit(el) for el in node.elements]
-        return ArrayNode(elements)
-    
-    def visit_ArrayAccessNode(self, node):
-        array = self.visit(node.array)
-        index = self.visit(node.index)
-        return ArrayAccessNode(array, index)
-    
-    def visit_ArrayAssignNode(self, node):
-        array = self.visit(node.array)
-        index = self.visit(node.index)
-        value = self.visit(node.value)
-        return ArrayAssignNode(array, index, value)
-    
-    def visit_BlockNode(self, node):
-        statements = [self.visit(stmt) for stmt in node.statements]
-        return BlockNode(statements)
-    
-    def visit_ExpressionNode(self, node):
-        expr = self.visit(node.expression)
-        return ExpressionNode(expr)
-    
-    def visit_PrintNode(self, node):
-        value = self.visit(node.value)
-        return PrintNode(value)
-    
-    def visit_LambdaNode(self, node):
-        params = node.params
-        body = self.visit(node.body)
-        return LambdaNode(params, body)
\ No newline at end of file
+
+    def rebuild_list(self, items: list, values: list) -> list:
+        if all(old is new for old, new in zip(items, values)):
+            return items
+        if self.in_place:
+            items[:] = values
+            return items
+        return values
@@ -0,0 +1,231 @@
+import struct
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+from ..errors import CompilationError
+from .escape import scalar_replace_module
+from .ir import BINARY_SYMBOLS, IRBuilder, IRFunction, IRInstr, Temp, simplify_cfg
+from .vm import OpCode, Function
+
+MODULE_NAME = "<module>"
+
+@dataclass
+class CompiledModule:
+    """VM-ready output of the bytecode generator"""
+    code: bytes
+    constants: List[Any]
+    functions: List[Function] = field(default_factory=list)
+    # function name -> [(pc, source line)], sorted by pc
+    lines: Dict[str, List[Tuple[int, int]]] = field(default_factory=dict)
+
+class _CodeBuffer:
+    """Bytecode under construction for a single function body"""
+    def __init__(self):
+        self.code = bytearray()
+        self.lines: List[Tuple[int, int]] = []
+
+    def emit(self, op: OpCode, operands: bytes = b"") -> int:
+        pos = len(self.code)
+        self.code.append(op.value)
+        self.code += operands
+        return pos
+
+    def mark_line(self, line: Optional[int]):
+        if line is None:
+            return
+        if self.lines and self.lines[-1][1] == line:
+            return
+        self.lines.append((len(self.code), line))
+
+class BytecodeGenerator:
+    """Lowers the parser's AST to core.vm bytecode through the IR (core.ir)
+
+    IR temporaries map onto the operand stack: a temporary read once, by
+    the next instruction that pops it, stays on the stack. Any other
+    temporary is spilled to a hidden ``$t<id>`` variable of the frame.
+
+    With ``optimize`` set, arrays that do not escape are scalar-replaced
+    (core.escape) before emission; ``whole_program`` allows this for
+    module-level variables too.
+    """
+
+    def __init__(self, optimize: bool = False, whole_program: bool = False):
+        self.optimize = optimize
+        self.whole_program = whole_program
+        self.constants: List[Any] = []
+        self._const_index: Dict[Tuple[type, Any], int] = {}
+        self.functions: List[Function] = []
+        self.lines: Dict[str, List[Tuple[int, int]]] = {}
+
+    def generate(self, tree: List[Any]) -> CompiledModule:
+        """Generate a module from a list of top-level statements"""
+        module = IRBuilder().build(tree, MODULE_NAME)
+        if self.optimize:
+            scalar_replace_module(module, self.whole_program)
+        for ir_func in module.functions:
+            code = self.emit_function(ir_func)
+            self.functions.append(Function(
+                name=ir_func.name,
+                arg_count=ir_func.arg_count,
+                bytecode=code,
+                constants=self.constants,
+                local_count=ir_func.arg_count
+            ))
+        code = self.emit_function(module.body)
+        return CompiledModule(
+            code=code,
+            constants=self.constants,
+            functions=self.functions,
+            lines=self.lines
+        )
+
+    # Operand encoding
+
+    def constant(self, value: Any) -> int:
+        """Get the pool index of a constant, adding it once"""
+        key = (type(value), value)
+        if key not in self._const_index:
+            if len(self.constants) > 0xFFFF:
+                raise CompilationError("Too many constants in module")
+            self._const_index[key] = len(self.constants)
+            self.constants.append(value)
+        return self._const_index[key]
+
+    @staticmethod
+    def encode_name(name: str) -> bytes:
+        data = name.encode('utf-8')
+        return struct.pack('>H', len(data)) + data
+
+    # IR -> bytecode
+
+    def emit_function(self, func: IRFunction) -> bytes:
+        """Bytecode for an IR function; records its line table"""
+        simplify_cfg(func)
+        counts = func.use_counts()
+        spilled = self._spilled_temps(func, counts)
+        buffer = _CodeBuffer()
+        offsets: Dict[int, int] = {}
+        patches: List[Tuple[int, int]] = []
+        for i, block in enumerate(func.blocks):
+            offsets[block.label] = len(buffer.code)
+            next_label = func.blocks[i + 1].label if i + 1 < len(func.blocks) else None
+            for instr in block.instrs:
+                buffer.mark_line(instr.line)
+                self._emit_instruction(buffer, instr, spilled, counts, next_label, patches)
+        for operand_pos, label in patches:
+            offset = offsets[label] - (operand_pos + 2)
+            if not -0x8000 <= offset <= 0x7FFF:
+                raise CompilationError("Jump target out of range")
+            struct.pack_into('>h', buffer.code, operand_pos, offset)
+        self.lines[func.name] = buffer.lines
+        return bytes(buffer.code)
+
+    def _spilled_temps(self, func: IRFunction, counts: Dict[Temp, int]) -> Set[Temp]:
+        """Temporaries that cannot live on the operand stack
+
+        Simulates each block's stack: the operands an instruction reads must
+        be the top of the stack, in order, followed only by spilled ones
+        (which are loaded when read). Failing instructions spill all their
+        operands and the simulation restarts.
+        """
+        local = func.local_temps()
+        spilled = {temp for temp, n in counts.items() if n > 1 or temp not in local}
+        restart = True
+        while restart:
+            restart = False
+            for block in func.blocks:
+                stack: List[Temp] = []
+                for instr in block.instrs:
+                    operands = instr.uses()
+                    resident = [temp for temp in operands if temp not in spilled]
+                    if operands[:len(resident)] != resident or stack[len(stack) - len(resident):] != resident:
+                        spilled.update(operands)
+                        restart = True
+                        break
+                    del stack[len(stack) - len(resident):]
+                    if instr.dest is not None and instr.dest not in spilled and counts.get(instr.dest):
+                        stack.append(instr.dest)
+                if restart:
+                    break
+        return spilled
+
+    def _emit_instruction(self, buffer: _CodeBuffer, instr: IRInstr, spilled: Set[Temp],
+                          counts: Dict[Temp, int], next_label: Optional[int], patches: List[Tuple[int, int]]):
+        op, args = instr.op, instr.args
+        for temp in instr.uses():
+            if temp in spilled:
+                buffer.emit(OpCode.LOAD_VAR, self.encode_name(f'${temp}'))
+        if op == 'const':
+            buffer.emit(OpCode.LOAD_CONST, struct.pack('>H', self.constant(args[0])))
+        elif op == 'load':
+            buffer.emit(OpCode.LOAD_VAR, self.encode_name(args[0]))
+        elif op == 'arg':
+            buffer.emit(OpCode.LOAD_ARG, bytes([args[0]]))
+        elif op == 'copy':
+            pass
+        elif op == 'binop':
+            buffer.emit(BINARY_SYMBOLS[args[0]])
+        elif op == 'index':
+            buffer.emit(OpCode.ARRAY_GET)
+        elif op == 'array':
+            buffer.emit(OpCode.MAKE_ARRAY, struct.pack('>H', len(args)))
+        elif op == 'call':
+            buffer.emit(OpCode.CALL_FUNCTION, self.encode_name(args[0]) + bytes([len(args) - 1]))
+        elif op == 'store':
+            buffer.emit(OpCode.STORE_VAR, self.encode_name(args[0]))
+            buffer.emit(OpCode.POP)
+        elif op == 'setindex':
+            buffer.emit(OpCode.ARRAY_SET)
+            buffer.emit(OpCode.POP)
+        elif op == 'print':
+            buffer.emit(OpCode.PRINT)
+        elif op == 'return':
+            buffer.emit(OpCode.RETURN)
+        elif op == 'jump':
+            if args[0] != next_label:
+                self._emit_jump(buffer, OpCode.JUMP, args[0], patches)
+        elif op == 'branch':
+            _, then_label, else_label = args
+            self._emit_jump(buffer, OpCode.JUMP_IF_FALSE, else_label, patches)
+            if then_label != next_label:
+                self._emit_jump(buffer, OpCode.JUMP, then_label, patches)
+        else:
+            raise CompilationError(f"Unknown IR instruction: {op}")
+
+        if instr.dest is not None:
+            if instr.dest in spilled:
+                buffer.emit(OpCode.STORE_VAR, self.encode_name(f'${instr.dest}'))
+                buffer.emit(OpCode.POP)
+            elif not counts.get(instr.dest):
+                buffer.emit(OpCode.POP)
+
+    @staticmethod
+    def _emit_jump(buffer: _CodeBuffer, op: OpCode, label: int, patches: List[Tuple[int, int]]):
+        buffer.emit(op, b"\x00\x00")
+        patches.append((len(buffer.code) - 2, label))
+
+def compile_source(source: str, opt_level: int = 0, passes=None, inferrer=None) -> CompiledModule:
+    """Lex, parse and generate bytecode for Amatak source
+
+    ``opt_level`` selects an ``-O`` preset of AST passes; alternatively pass
+    a ``PassManager`` as ``passes`` to choose passes or to read its report
+    afterwards. Either way the source is treated as a whole program, so
+    globals it never reads may be dropped. From ``-O2`` non-escaping arrays
+    are scalar-replaced. With an ``inferrer`` (a
+    ``runtime.types.program.ProgramInferrer``) the signatures inferred for
+    the optimized tree are recorded on the module's functions.
+    """
+    from ..lexer import Lexer
+    from ..parser import Parser
+    tokens = Lexer(source).get_tokens()
+    tree = Parser(tokens).parse()
+    if passes is None and opt_level:
+        from .ast.passes import PassManager
+        passes = PassManager.for_level(opt_level, whole_program=True)
+    if passes is not None:
+        tree = passes.run(tree)
+        if passes.level is not None:
+            opt_level = passes.level
+    module = BytecodeGenerator(optimize=opt_level >= 2, whole_program=True).generate(tree)
+    if inferrer is not None:
+        inferrer.infer(tree).annotate(module)
+    return module
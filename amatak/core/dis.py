@@ -0,0 +1,85 @@
+from bisect import bisect_right
+from typing import Any, List, Optional, Sequence, Tuple, TextIO
+from .vm import OpCode, Instruction, iter_instructions
+
+def format_instruction(instr: Instruction, constants: Optional[Sequence[Any]] = None) -> str:
+    """Render one instruction with its operands resolved"""
+    op = instr.op
+    args = instr.operands
+    detail = ""
+    if op == OpCode.LOAD_CONST:
+        arg = str(args[0])
+        if constants is not None and args[0] < len(constants):
+            detail = repr(constants[args[0]])
+    elif op in (OpCode.LOAD_VAR, OpCode.STORE_VAR):
+        arg = ""
+        detail = args[0]
+    elif op == OpCode.LOAD_ARG:
+        arg = str(args[0])
+        detail = f"arg{args[0]}"
+    elif op == OpCode.CALL_FUNCTION:
+        arg = str(args[1])
+        detail = f"{args[0]}, {args[1]} args"
+    elif op in (OpCode.JUMP, OpCode.JUMP_IF_FALSE):
+        arg = str(args[0])
+        detail = f"to {instr.next_offset + args[0]}"
+    elif op == OpCode.MAKE_FUNCTION:
+        arg = ""
+        detail = f"{args[0]}, {args[1]} args, {args[2]} bytes"
+    elif args:
+        arg = " ".join(str(a) for a in args)
+    else:
+        arg = ""
+    text = f"{op.name:<16} {arg:>5}"
+    if detail:
+        text += f" ({detail})"
+    return text.rstrip()
+
+def disassemble_code(bytecode: bytes, constants: Optional[Sequence[Any]] = None,
+                     lines: Optional[List[Tuple[int, int]]] = None,
+                     name: str = '<module>') -> List[str]:
+    """Disassemble one bytecode buffer into text lines"""
+    out = [f"Disassembly of {name}:"]
+    line_pcs = [pc for pc, _ in lines] if lines else []
+    nested = []
+    last_line = None
+    for instr in iter_instructions(bytecode):
+        line = None
+        if line_pcs:
+            i = bisect_right(line_pcs, instr.offset) - 1
+            line = lines[i][1] if i >= 0 else None
+        line_col = str(line) if line is not None and line != last_line else ""
+        last_line = line if line is not None else last_line
+        out.append(f"{line_col:>5} {instr.offset:>6} {format_instruction(instr, constants)}")
+        if instr.op == OpCode.MAKE_FUNCTION:
+            nested.append((instr.operands[0], instr.operands[3]))
+    for func_name, body in nested:
+        out.append("")
+        out.extend(disassemble_code(body, constants, None, func_name))
+    return out
+
+def disassemble(module, file: Optional[TextIO] = None) -> str:
+    """Disassemble a CompiledModule or AKCModule
+
+    Returns the listing and also writes it to ``file`` when given.
+    """
+    lines = module.lines
+    out = disassemble_code(module.code, module.constants, lines.get('<module>'), '<module>')
+    for func in module.functions:
+        out.append("")
+        out.extend(disassemble_code(func.bytecode, module.constants, lines.get(func.name), func.name))
+    text = "\n".join(out)
+    if file is not None:
+        print(text, file=file)
+    return text
+
+def disassemble_file(path: str, file: Optional[TextIO] = None) -> str:
+    """Disassemble an .akc module or an Amatak source file"""
+    if path.endswith('.akc'):
+        from .akc import load_module
+        module = load_module(path)
+    else:
+        from .codegen import compile_source
+        with open(path, 'r', encoding='utf-8') as f:
+            module = compile_source(f.read())
+    return disassemble(module, file)
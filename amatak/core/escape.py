@@ -0,0 +1,205 @@
+"""Escape analysis and scalar replacement of arrays on the IR (core.ir)
+
+An array is replaced by one scalar per element when it never escapes:
+
+- an array temporary read only through constant in-range indexes becomes
+  the element temporaries themselves;
+- a variable assigned only fresh array literals of one length, and read
+  only by constant in-range index loads and stores, becomes variables
+  ``<name>$0``..``<name>$<n-1>``. Reads must come after the variable is
+  assigned on every path (otherwise they would reach a caller's binding),
+  and the name must not be readable by callees, which see the caller's
+  frames.
+
+Reads that print or return the whole array do not force the allocation on
+every path: the array is rebuilt from its scalars at those reads only
+(allocation sinking). This is done only when it cannot multiply
+allocations, i.e. when every such read sits outside loops or the array is
+allocated inside a loop as well.
+"""
+from typing import Dict, List, Optional, Set
+from .ir import IRFunction, IRInstr, IRModule, Temp, remove_dead_temps
+
+# Whole-array reads that may use a copy rebuilt from the scalars
+_MATERIALIZING = {'print', 'return'}
+
+def shared_names(module: IRModule, whole_program: bool = False) -> Dict[str, Optional[Set[str]]]:
+    """Per function, the variables its callees might read
+
+    None stands for every variable (module globals outside whole-program
+    compilation, which embedders and the REPL can read later).
+    """
+    loads: Dict[str, Set[str]] = {}
+    calls: Dict[str, bool] = {}
+    for func in [module.body] + module.functions:
+        loads[func.name] = {instr.args[0] for instr in func.instructions() if instr.op == 'load'}
+        calls[func.name] = any(instr.op == 'call' for instr in func.instructions())
+    shared: Dict[str, Optional[Set[str]]] = {}
+    for func in [module.body] + module.functions:
+        if func is module.body and not whole_program:
+            shared[func.name] = None
+        elif not calls[func.name]:
+            shared[func.name] = set()
+        else:
+            shared[func.name] = set().union(*(names for name, names in loads.items() if name != func.name))
+    return shared
+
+def scalar_replace_module(module: IRModule, whole_program: bool = False) -> int:
+    shared = shared_names(module, whole_program)
+    return sum(scalar_replace(func, shared[func.name]) for func in [module.body] + module.functions)
+
+def scalar_replace(func: IRFunction, shared: Optional[Set[str]] = frozenset()) -> int:
+    """Scalar-replace non-escaping arrays in ``func``; returns how many
+    array variables and temporaries were replaced"""
+    defs = func.definitions()
+    users: Dict[Temp, List[IRInstr]] = {}
+    for instr in func.instructions():
+        for temp in instr.uses():
+            users.setdefault(temp, []).append(instr)
+    consts = {temp: instrs[0].args[0] for temp, instrs in defs.items()
+              if len(instrs) == 1 and instrs[0].op == 'const'}
+    arrays = {temp: instrs[0] for temp, instrs in defs.items()
+              if len(instrs) == 1 and instrs[0].op == 'array' and instrs[0].args}
+
+    def element(array: Temp, index: Temp, length: int) -> Optional[int]:
+        value = consts.get(index)
+        if type(value) is not int or not -length <= value < length:
+            return None
+        return value % length
+
+    # Temporaries: arrays only ever indexed by constants
+    temp_arrays = {}
+    for temp, alloc in arrays.items():
+        uses = users.get(temp, [])
+        if uses and all(use.op == 'index' and use.args[0] == temp
+                        and element(temp, use.args[1], len(alloc.args)) is not None for use in uses):
+            temp_arrays[temp] = alloc
+
+    variables = {} if shared is None else _array_variables(func, shared, users, arrays, element)
+    if not temp_arrays and not variables:
+        return 0
+
+    cyclic = _cyclic_blocks(func)
+    for name, info in list(variables.items()):
+        escapes = info['materialize']
+        if any(cyclic[label] for label in escapes) and not all(cyclic[label] for label in info['allocs']):
+            del variables[name]
+    if not temp_arrays and not variables:
+        return 0
+
+    for block in func.blocks:
+        out: List[IRInstr] = []
+        for instr in block.instrs:
+            op, args = instr.op, instr.args
+            if op == 'array' and (instr.dest in temp_arrays or any(
+                    instr.dest in info['values'] for info in variables.values())):
+                continue
+            if op == 'store' and args[0] in variables:
+                elements = arrays[args[1]].args
+                for k in reversed(range(len(elements))):
+                    out.append(IRInstr('store', None, (f'{args[0]}${k}', elements[k]), instr.line))
+                continue
+            if op == 'load' and args[0] in variables:
+                info = variables[args[0]]
+                if instr.dest in info['rebuilt']:
+                    parts = []
+                    for k in range(info['length']):
+                        part = func.new_temp()
+                        out.append(IRInstr('load', part, (f'{args[0]}${k}',), instr.line))
+                        parts.append(part)
+                    out.append(IRInstr('array', instr.dest, tuple(parts), instr.line))
+                continue
+            if op in ('index', 'setindex'):
+                array = args[0]
+                if array in temp_arrays:
+                    alloc = temp_arrays[array]
+                    k = element(array, args[1], len(alloc.args))
+                    out.append(IRInstr('copy', instr.dest, (alloc.args[k],), instr.line))
+                    continue
+                owner = _owner(variables, array)
+                if owner is not None:
+                    name, info = owner
+                    k = element(array, args[1], info['length'])
+                    if op == 'index':
+                        out.append(IRInstr('load', instr.dest, (f'{name}${k}',), instr.line))
+                    else:
+                        out.append(IRInstr('store', None, (f'{name}${k}', args[2]), instr.line))
+                    continue
+            out.append(instr)
+        block.instrs = out
+    remove_dead_temps(func)
+    return len(temp_arrays) + len(variables)
+
+def _owner(variables, temp: Temp):
+    for name, info in variables.items():
+        if temp in info['loads'] and temp not in info['rebuilt']:
+            return name, info
+    return None
+
+def _array_variables(func: IRFunction, shared: Set[str], users, arrays, element) -> Dict[str, dict]:
+    """Variables holding only non-escaping arrays, with what rewriting them needs"""
+    candidates: Dict[str, dict] = {}
+    rejected: Set[str] = set(shared)
+    for block in func.blocks:
+        for instr in block.instrs:
+            if instr.op != 'store' or instr.args[0] in rejected:
+                continue
+            name, value = instr.args
+            alloc = arrays.get(value)
+            if alloc is None or len(users.get(value, [])) != 1:
+                rejected.add(name)
+                continue
+            info = candidates.setdefault(name, {
+                'length': len(alloc.args), 'values': set(), 'allocs': set(),
+                'loads': set(), 'rebuilt': set(), 'materialize': set(),
+            })
+            if info['length'] != len(alloc.args):
+                rejected.add(name)
+                continue
+            info['values'].add(value)
+            info['allocs'].add(block.label)
+
+    assigned_in = func.definitely_assigned(set())
+    for block in func.blocks:
+        assigned = set(assigned_in[block.label])
+        for instr in block.instrs:
+            if instr.op == 'store':
+                assigned.add(instr.args[0])
+            if instr.op != 'load' or instr.args[0] not in candidates:
+                continue
+            name, temp = instr.args[0], instr.dest
+            info = candidates[name]
+            if name not in assigned:
+                rejected.add(name)
+                continue
+            info['loads'].add(temp)
+            uses = users.get(temp, [])
+            whole = [use for use in uses if use.op in _MATERIALIZING]
+            indexed = [use for use in uses if use.op in ('index', 'setindex') and use.args[0] == temp
+                       and element(temp, use.args[1], info['length']) is not None
+                       and temp not in use.args[2:]]
+            if len(whole) + len(indexed) != len(uses):
+                rejected.add(name)
+            elif whole:
+                if any(use.op == 'setindex' for use in indexed):
+                    # Stores into a rebuilt copy would be lost
+                    rejected.add(name)
+                info['rebuilt'].add(temp)
+                info['materialize'].add(block.label)
+    return {name: info for name, info in candidates.items() if name not in rejected}
+
+def _cyclic_blocks(func: IRFunction) -> Dict[int, bool]:
+    """Whether each block lies on a cycle of the CFG"""
+    blocks = func.block_map()
+    cyclic = {}
+    for label in blocks:
+        seen = set()
+        todo = list(blocks[label].successors())
+        while todo and label not in seen:
+            current = todo.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            todo.extend(blocks[current].successors())
+        cyclic[label] = label in seen
+    return cyclic
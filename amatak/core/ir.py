@@ -0,0 +1,641 @@
+"""Three-address IR between the AST and the backends
+
+A function is a list of basic blocks in layout order. Every block ends in
+exactly one terminator (``jump``, ``branch`` or ``return``), so the
+control-flow graph is the blocks' successor lists. Instructions write their
+result to an explicit temporary and read temporaries, never an implicit
+stack; constants are materialized by ``const`` instructions.
+
+Instructions (``dest <- op args``):
+
+    const   t <- value              load    t <- name
+    arg     t <- index              copy    t <- value
+    binop   t <- symbol, left, right
+    index   t <- array, index       array   t <- element...
+    call    t <- name, arg...
+    store   name, value             setindex  array, index, value
+    print   value
+    jump    label                   branch  cond, then_label, else_label
+    return  [value]
+
+Temporaries produced by ``IRBuilder`` are assigned once and read once, in
+evaluation order. ``lift`` rebuilds IR from verified bytecode for the
+tiers; values live across blocks there are copied into one temporary per
+stack slot, which is assigned in every predecessor.
+
+``core.codegen`` emits VM bytecode from this IR and ``core.pytier``
+translates lifted IR to Python. The passes at the bottom of this module
+(``simplify_cfg``, ``fold_constants``) are shared by both.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+from ..errors import CompilationError, VerificationError
+from ..nodes import (
+    AssignmentNode, ArrayAccessNode, BinOpNode, ForNode, FuncNode, IdentifierNode, IfNode,
+    PrintNode, ReturnNode
+)
+from .ast.optimizer import BINARY_FOLDS, MAX_FOLDED_INT, MAX_FOLDED_STR, operator_symbol
+from .vm import OpCode
+
+# Instructions without side effects; the ones that cannot raise either may
+# be dropped when their result is unused
+PURE_OPS = {'const', 'load', 'arg', 'copy', 'binop', 'index', 'array'}
+DROPPABLE_OPS = {'const', 'arg', 'copy'}
+TERMINATORS = {'jump', 'branch', 'return'}
+
+# VM opcode <-> IR binary operator
+BINARY_OPCODES = {
+    OpCode.BINARY_ADD: '+',
+    OpCode.BINARY_SUB: '-',
+    OpCode.BINARY_MUL: '*',
+    OpCode.BINARY_DIV: '/',
+    OpCode.BINARY_MOD: '%',
+    OpCode.COMPARE_EQ: '==',
+    OpCode.COMPARE_NE: '!=',
+    OpCode.COMPARE_LT: '<',
+    OpCode.COMPARE_GT: '>',
+    OpCode.COMPARE_LE: '<=',
+    OpCode.COMPARE_GE: '>=',
+}
+BINARY_SYMBOLS = {symbol: op for op, symbol in BINARY_OPCODES.items()}
+
+# Node types the tree interpreter runs but bytecode cannot express, by name
+UNSUPPORTED_CONSTRUCTS = {
+    'MethodCallNode': 'method calls (obj.method(...))',
+    'UnaryOpNode': 'unary operators',
+}
+
+@dataclass(frozen=True)
+class Temp:
+    """A temporary; named ``t<id>``"""
+    id: int
+
+    def __str__(self):
+        return f't{self.id}'
+
+@dataclass
+class IRInstr:
+    op: str
+    dest: Optional[Temp] = None
+    args: Tuple[Any, ...] = ()
+    line: Optional[int] = None
+
+    @property
+    def is_terminator(self) -> bool:
+        return self.op in TERMINATORS
+
+    def uses(self) -> List[Temp]:
+        """Temporaries read by the instruction, in operand order"""
+        return [arg for arg in self.args if isinstance(arg, Temp)]
+
+    def successors(self) -> List[int]:
+        """Labels control can reach after a terminator"""
+        if self.op == 'jump':
+            return [self.args[0]]
+        if self.op == 'branch':
+            return [self.args[1], self.args[2]]
+        return []
+
+    def __str__(self):
+        args = ', '.join(str(arg) if isinstance(arg, Temp) else repr(arg) for arg in self.args)
+        if self.dest is not None:
+            return f'{self.dest} = {self.op} {args}'.rstrip()
+        return f'{self.op} {args}'.rstrip()
+
+@dataclass
+class BasicBlock:
+    label: int
+    instrs: List[IRInstr] = field(default_factory=list)
+
+    @property
+    def terminator(self) -> Optional[IRInstr]:
+        if self.instrs and self.instrs[-1].is_terminator:
+            return self.instrs[-1]
+        return None
+
+    def successors(self) -> List[int]:
+        terminator = self.terminator
+        return terminator.successors() if terminator is not None else []
+
+@dataclass
+class IRFunction:
+    name: str
+    arg_count: int = 0
+    blocks: List[BasicBlock] = field(default_factory=list)
+    temp_count: int = 0
+
+    def new_temp(self) -> Temp:
+        temp = Temp(self.temp_count)
+        self.temp_count += 1
+        return temp
+
+    @property
+    def entry(self) -> BasicBlock:
+        return self.blocks[0]
+
+    def block_map(self) -> Dict[int, BasicBlock]:
+        return {block.label: block for block in self.blocks}
+
+    def predecessors(self) -> Dict[int, List[int]]:
+        preds: Dict[int, List[int]] = {block.label: [] for block in self.blocks}
+        for block in self.blocks:
+            for target in block.successors():
+                if block.label not in preds[target]:
+                    preds[target].append(block.label)
+        return preds
+
+    def instructions(self):
+        for block in self.blocks:
+            yield from block.instrs
+
+    def stored_names(self) -> Set[str]:
+        return {instr.args[0] for instr in self.instructions() if instr.op == 'store'}
+
+    def use_counts(self) -> Dict[Temp, int]:
+        counts: Dict[Temp, int] = {}
+        for instr in self.instructions():
+            for temp in instr.uses():
+                counts[temp] = counts.get(temp, 0) + 1
+        return counts
+
+    def definitions(self) -> Dict[Temp, List[IRInstr]]:
+        defs: Dict[Temp, List[IRInstr]] = {}
+        for instr in self.instructions():
+            if instr.dest is not None:
+                defs.setdefault(instr.dest, []).append(instr)
+        return defs
+
+    def local_temps(self) -> Set[Temp]:
+        """Temporaries assigned once and only read in the block assigning them"""
+        home: Dict[Temp, Optional[int]] = {}
+        for block in self.blocks:
+            for instr in block.instrs:
+                for temp in instr.uses():
+                    if home.get(temp, block.label) != block.label:
+                        home[temp] = None
+                if instr.dest is not None:
+                    home[instr.dest] = block.label if instr.dest not in home else None
+        return {temp for temp, label in home.items() if label is not None}
+
+    def definitely_assigned(self, initial: Set[str]) -> Dict[int, Set[str]]:
+        """Forward must-analysis of which variables are bound on block entry"""
+        blocks = self.block_map()
+        entry = self.entry.label
+        ins: Dict[int, Optional[Set[str]]] = {label: None for label in blocks}
+        ins[entry] = set(initial)
+        changed = True
+        while changed:
+            changed = False
+            for block in self.blocks:
+                if ins[block.label] is None:
+                    continue
+                out = set(ins[block.label])
+                for instr in block.instrs:
+                    if instr.op == 'store':
+                        out.add(instr.args[0])
+                for target in block.successors():
+                    merged = out if ins[target] is None else ins[target] & out
+                    if target == entry:
+                        merged = merged & ins[entry]
+                    if merged != ins[target]:
+                        ins[target] = merged
+                        changed = True
+        return {label: (names or set()) for label, names in ins.items()}
+
+    def __str__(self):
+        lines = [f'function {self.name}({self.arg_count}):']
+        for block in self.blocks:
+            lines.append(f'  L{block.label}:')
+            lines.extend(f'    {instr}' for instr in block.instrs)
+        return '\n'.join(lines)
+
+@dataclass
+class IRModule:
+    body: IRFunction
+    functions: List[IRFunction] = field(default_factory=list)
+
+class IRBuilder:
+    """Lowers the parser's AST to IR
+
+    ``if`` and ``for`` become blocks joined by ``branch`` and ``jump``;
+    comparisons stay ordinary ``binop`` instructions.
+    """
+
+    def __init__(self):
+        self.functions: List[IRFunction] = []
+        self._func: Optional[IRFunction] = None
+        self._block: Optional[BasicBlock] = None
+        self._labels = 0
+        self._line: Optional[int] = None
+
+    def build(self, tree: List[Any], name: str = '<module>') -> IRModule:
+        """Lower a list of top-level statements"""
+        body = self._function(name, [], tree)
+        return IRModule(body=body, functions=self.functions)
+
+    def _function(self, name: str, params: List[str], body: List[Any]) -> IRFunction:
+        outer = self._func, self._block, self._labels, self._line
+        self._func = IRFunction(name, len(params))
+        self._labels = 0
+        self._line = None
+        self._start(self._new_block())
+        for i, param in enumerate(params):
+            self._store(param, self._emit('arg', i))
+        for stmt in body:
+            self.visit_statement(stmt)
+        if self._block.terminator is None:
+            self._terminate('return')
+        func = self._func
+        self._func, self._block, self._labels, self._line = outer
+        return func
+
+    # Blocks
+
+    def _new_block(self) -> BasicBlock:
+        block = BasicBlock(self._labels)
+        self._labels += 1
+        return block
+
+    def _start(self, block: BasicBlock):
+        """Append ``block`` to the layout and emit into it"""
+        self._func.blocks.append(block)
+        self._block = block
+
+    def _emit(self, op: str, *args) -> Temp:
+        if self._block.terminator is not None:
+            # Code after a return; kept until simplify_cfg drops it
+            self._start(self._new_block())
+        dest = self._func.new_temp()
+        self._block.instrs.append(IRInstr(op, dest, args, self._line))
+        return dest
+
+    def _effect(self, op: str, *args):
+        if self._block.terminator is not None:
+            self._start(self._new_block())
+        self._block.instrs.append(IRInstr(op, None, args, self._line))
+
+    def _terminate(self, op: str, *args):
+        self._effect(op, *args)
+
+    def _store(self, name: str, value: Temp) -> Temp:
+        self._effect('store', name, value)
+        return value
+
+    # Statements
+
+    def visit_statement(self, node):
+        if isinstance(node, list):
+            for stmt in node:
+                self.visit_statement(stmt)
+            return
+        line = getattr(node, 'line', None)
+        if line is not None:
+            self._line = line
+        if isinstance(node, PrintNode):
+            self._effect('print', self.visit(node.value))
+        elif isinstance(node, AssignmentNode):
+            self.visit_AssignmentNode(node)
+        elif isinstance(node, FuncNode):
+            self.functions.append(self._function(node.name, node.params, node.body))
+        elif isinstance(node, ReturnNode):
+            if node.expression is not None:
+                self._terminate('return', self.visit(node.expression))
+            else:
+                self._terminate('return')
+        elif isinstance(node, IfNode):
+            self.visit_IfNode(node)
+        elif isinstance(node, ForNode):
+            self.visit_ForNode(node)
+        else:
+            self.visit(node)
+
+    def visit_IfNode(self, node):
+        cond = self.visit(node.condition)
+        then_block = self._new_block()
+        else_block = self._new_block() if node.else_branch is not None else None
+        end = self._new_block()
+        self._terminate('branch', cond, then_block.label, (else_block or end).label)
+        self._start(then_block)
+        self.visit_statement(node.then_branch)
+        self._terminate('jump', end.label)
+        if else_block is not None:
+            self._start(else_block)
+            self.visit_statement(node.else_branch)
+            self._terminate('jump', end.label)
+        self._start(end)
+
+    def visit_ForNode(self, node):
+        """for let v = start; condition; step { body }
+
+        ``step`` is either an assignment (``i = i + 1``) or an increment
+        expression added to the loop variable.
+        """
+        self._store(node.var_name, self.visit(node.start))
+        header = self._new_block()
+        body = self._new_block()
+        exit_block = self._new_block()
+        self._terminate('jump', header.label)
+        self._start(header)
+        self._terminate('branch', self.visit(node.condition), body.label, exit_block.label)
+        self._start(body)
+        for stmt in node.body:
+            self.visit_statement(stmt)
+        if isinstance(node.step, AssignmentNode):
+            self.visit_AssignmentNode(node.step)
+        else:
+            current = self._emit('load', node.var_name)
+            self._store(node.var_name, self._emit('binop', '+', current, self.visit(node.step)))
+        self._terminate('jump', header.label)
+        self._start(exit_block)
+
+    # Expressions
+
+    def visit(self, node) -> Temp:
+        method_name = f'visit_{type(node).__name__}'
+        visitor = getattr(self, method_name, None)
+        if visitor is None:
+            kind = type(node).__name__
+            line = getattr(node, 'line', None) or self._line
+            where = f" (line {line})" if line is not None else ""
+            raise CompilationError(f"Cannot compile {UNSUPPORTED_CONSTRUCTS.get(kind, kind)} to bytecode"
+                                   f"{where}; run the source with 'amatak run' instead")
+        return visitor(node)
+
+    def visit_NumberNode(self, node) -> Temp:
+        value = node.value
+        if isinstance(value, str):
+            value = float(value) if '.' in value else int(value)
+        return self._emit('const', value)
+
+    def visit_StringNode(self, node) -> Temp:
+        return self._emit('const', node.value)
+
+    def visit_BooleanNode(self, node) -> Temp:
+        return self._emit('const', bool(node.value))
+
+    def visit_IdentifierNode(self, node) -> Temp:
+        return self._emit('load', node.name)
+
+    def visit_BinOpNode(self, node) -> Temp:
+        # Nested operations are lowered with an explicit stack, so long
+        # generated chains do not hit the recursion limit
+        values: List[Temp] = []
+        todo = [(node, False)]
+        while todo:
+            current, ready = todo.pop()
+            if not ready:
+                if isinstance(current, BinOpNode):
+                    if operator_symbol(current.op) not in BINARY_SYMBOLS:
+                        raise CompilationError(f"Unsupported operator: {current.op}")
+                    todo.append((current, True))
+                    todo.append((current.right, False))
+                    todo.append((current.left, False))
+                else:
+                    values.append(self.visit(current))
+                continue
+            right = values.pop()
+            left = values.pop()
+            values.append(self._emit('binop', operator_symbol(current.op), left, right))
+        return values[0]
+
+    def visit_ArrayNode(self, node) -> Temp:
+        elements = [self.visit(element) for element in node.elements]
+        return self._emit('array', *elements)
+
+    def visit_ArrayAccessNode(self, node) -> Temp:
+        array = self.visit(node.array)
+        index = self.visit(node.index)
+        return self._emit('index', array, index)
+
+    def visit_AssignmentNode(self, node) -> Temp:
+        """Returns the assigned value"""
+        target = node.name
+        if isinstance(target, ArrayAccessNode):
+            array = self.visit(target.array)
+            index = self.visit(target.index)
+            value = self.visit(node.value)
+            self._effect('setindex', array, index, value)
+            return value
+        name = target.name if isinstance(target, IdentifierNode) else target
+        return self._store(name, self.visit(node.value))
+
+    def visit_TernaryNode(self, node) -> Temp:
+        # Both arms define the result temporary
+        result = self._func.new_temp()
+        cond = self.visit(node.condition)
+        true_block = self._new_block()
+        false_block = self._new_block()
+        end = self._new_block()
+        self._terminate('branch', cond, true_block.label, false_block.label)
+        for block, expr in ((true_block, node.true_expr), (false_block, node.false_expr)):
+            self._start(block)
+            value = self.visit(expr)
+            self._block.instrs.append(IRInstr('copy', result, (value,), self._line))
+            self._terminate('jump', end.label)
+        self._start(end)
+        return result
+
+    def visit_CallNode(self, node) -> Temp:
+        args = [self.visit(arg) for arg in node.args]
+        name = node.name.name if isinstance(node.name, IdentifierNode) else node.name
+        return self._emit('call', name, *args)
+
+def lift(name: str, arg_count: int, result, constants) -> IRFunction:
+    """IR for a bytecode function from its ``verifier.VerificationResult``
+
+    Block labels are bytecode offsets. Temporaries ``t0``..``t<max_stack-1>``
+    stand for the stack slots live across block boundaries.
+    """
+    from .verifier import successors
+    instructions = result.instructions
+    order = sorted(instructions)
+    starts = set(result.block_starts) | {order[0]}
+    # Blocks begin at jump targets and after any control transfer
+    for offset in order:
+        instr = instructions[offset]
+        if instr.op in (OpCode.JUMP, OpCode.JUMP_IF_FALSE, OpCode.RETURN):
+            if instr.next_offset in instructions:
+                starts.add(instr.next_offset)
+
+    func = IRFunction(name, arg_count, temp_count=result.max_stack)
+    slots = [Temp(i) for i in range(result.max_stack)]
+    block = None
+    stack: List[Temp] = []
+
+    def emit(op, *args, dest=True):
+        temp = func.new_temp() if dest else None
+        block.instrs.append(IRInstr(op, temp, args))
+        return temp
+
+    def spill():
+        # Hand live stack values to the successors in their slot temporaries
+        for i, value in enumerate(stack):
+            if value != slots[i]:
+                block.instrs.append(IRInstr('copy', slots[i], (value,)))
+
+    for offset in order:
+        instr = instructions[offset]
+        if offset in starts:
+            block = BasicBlock(offset)
+            func.blocks.append(block)
+            stack = slots[:result.depths[offset]]
+        op = instr.op
+        if op == OpCode.LOAD_CONST:
+            stack.append(emit('const', constants[instr.operands[0]]))
+        elif op == OpCode.LOAD_VAR:
+            stack.append(emit('load', instr.operands[0]))
+        elif op == OpCode.LOAD_ARG:
+            stack.append(emit('arg', instr.operands[0]))
+        elif op == OpCode.STORE_VAR:
+            emit('store', instr.operands[0], stack[-1], dest=False)
+        elif op in BINARY_OPCODES:
+            right = stack.pop()
+            left = stack.pop()
+            stack.append(emit('binop', BINARY_OPCODES[op], left, right))
+        elif op == OpCode.ARRAY_GET:
+            index = stack.pop()
+            array = stack.pop()
+            stack.append(emit('index', array, index))
+        elif op == OpCode.MAKE_ARRAY:
+            count = instr.operands[0]
+            elements = stack[len(stack) - count:] if count else []
+            del stack[len(stack) - count:]
+            stack.append(emit('array', *elements))
+        elif op == OpCode.ARRAY_SET:
+            value, index, array = stack.pop(), stack.pop(), stack.pop()
+            emit('setindex', array, index, value, dest=False)
+            stack.append(value)
+        elif op == OpCode.POP:
+            stack.pop()
+        elif op == OpCode.PRINT:
+            emit('print', stack.pop(), dest=False)
+        elif op == OpCode.CALL_FUNCTION:
+            callee, argc = instr.operands
+            args = stack[len(stack) - argc:] if argc else []
+            del stack[len(stack) - argc:]
+            stack.append(emit('call', callee, *args))
+        elif op == OpCode.RETURN:
+            emit('return', *stack[-1:], dest=False)
+            continue
+        elif op == OpCode.JUMP:
+            spill()
+            emit('jump', successors(instr)[0], dest=False)
+            continue
+        elif op == OpCode.JUMP_IF_FALSE:
+            cond = stack.pop()
+            spill()
+            fallthrough, target = successors(instr)
+            emit('branch', cond, fallthrough, target, dest=False)
+            continue
+        else:
+            raise VerificationError(f"Cannot lift {op.name} to IR", function=name, offset=offset)
+        if instr.next_offset in starts:
+            spill()
+            emit('jump', instr.next_offset, dest=False)
+    return func
+
+# Passes
+
+def simplify_cfg(func: IRFunction) -> int:
+    """Thread jumps through empty blocks and drop unreachable blocks"""
+    return thread_jumps(func) + remove_unreachable(func)
+
+def thread_jumps(func: IRFunction) -> int:
+    """Retarget branches and jumps to blocks that only jump elsewhere"""
+    forward: Dict[int, int] = {}
+    for block in func.blocks[1:]:
+        if len(block.instrs) == 1 and block.instrs[0].op == 'jump':
+            forward[block.label] = block.instrs[0].args[0]
+
+    def final(label: int) -> int:
+        seen = set()
+        while label in forward and label not in seen:
+            seen.add(label)
+            label = forward[label]
+        return label
+
+    rewrites = 0
+    for block in func.blocks:
+        terminator = block.terminator
+        if terminator is None:
+            continue
+        if terminator.op == 'jump':
+            target = final(terminator.args[0])
+            if target != terminator.args[0]:
+                terminator.args = (target,)
+                rewrites += 1
+        elif terminator.op == 'branch':
+            cond, then_label, else_label = terminator.args
+            args = (cond, final(then_label), final(else_label))
+            if args != terminator.args:
+                terminator.args = args
+                rewrites += 1
+    return rewrites
+
+def remove_unreachable(func: IRFunction) -> int:
+    blocks = func.block_map()
+    reachable = set()
+    todo = [func.entry.label]
+    while todo:
+        label = todo.pop()
+        if label in reachable:
+            continue
+        reachable.add(label)
+        todo.extend(blocks[label].successors())
+    removed = len(func.blocks) - len(reachable)
+    func.blocks = [block for block in func.blocks if block.label in reachable]
+    return removed
+
+def fold_constants(func: IRFunction) -> int:
+    """Fold binary operations on constants and branches on constant conditions
+
+    Operations that would raise, and results too large to be worth a
+    constant, are left for run time. Constants left unused are dropped.
+    """
+    defs = func.definitions()
+    values: Dict[Temp, Any] = {}
+    for temp, instrs in defs.items():
+        if len(instrs) == 1 and instrs[0].op == 'const':
+            values[temp] = instrs[0].args[0]
+
+    rewrites = 0
+    for block in func.blocks:
+        for instr in block.instrs:
+            if instr.op == 'binop':
+                symbol, left, right = instr.args
+                if left not in values or right not in values or len(defs[instr.dest]) != 1:
+                    continue
+                try:
+                    value = BINARY_FOLDS[symbol](values[left], values[right])
+                except Exception:
+                    continue
+                if isinstance(value, int) and not isinstance(value, bool) and abs(value) >= MAX_FOLDED_INT:
+                    continue
+                if isinstance(value, str) and len(value) > MAX_FOLDED_STR:
+                    continue
+                instr.op, instr.args = 'const', (value,)
+                values[instr.dest] = value
+                rewrites += 1
+            elif instr.op == 'branch' and instr.args[0] in values:
+                cond, then_label, else_label = instr.args
+                instr.op, instr.args = 'jump', (then_label if values[cond] else else_label,)
+                rewrites += 1
+    if rewrites:
+        remove_dead_temps(func)
+        remove_unreachable(func)
+    return rewrites
+
+def remove_dead_temps(func: IRFunction) -> int:
+    """Drop unread temporaries computed by instructions that cannot fail"""
+    removed = 0
+    while True:
+        counts = func.use_counts()
+        dead = 0
+        for block in func.blocks:
+            kept = [instr for instr in block.instrs
+                    if not (instr.op in DROPPABLE_OPS and counts.get(instr.dest, 0) == 0)]
+            dead += len(block.instrs) - len(kept)
+            block.instrs = kept
+        if not dead:
+            return removed
+        removed += dead
@@ -1,26 +1,60 @@
 import ctypes
-import mmap
 import platform
 import struct
-from dataclasses import dataclass
-from typing import Dict, List, Optional
-from .vm import OpCode, VM
-from ..errors import AmatakRuntimeError
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from .vm import OpCode, VM, Function, iter_instructions
+from .pytier import TierDeopt
+from .jitcache import JITCache, closure_digest, function_digest
+from .x86_64 import (
+    NativeCodegen, NativeUnsupported, SUPPORTED, INT, FLOAT, BOOL,
+    value_type, encode_value, decode_value
+)
+from ..errors import AmatakRuntimeError, VerificationError
 from ..runtime.memory.allocator import MemoryAllocator
-from ..runtime.types.core import AmatakType
+from ..runtime.types.core import AmatakType, DynamicType, IntegerType, FloatType, BooleanType
+
+_NATIVE_FUNC = ctypes.CFUNCTYPE(ctypes.c_int64, ctypes.c_void_p, ctypes.c_void_p)
 
 @dataclass
 class NativeFunction:
     address: int
     arg_count: int
     return_type: AmatakType
+    # Static argument types this variant was compiled for (see core.x86_64)
+    signature: Tuple[str, ...] = ()
+    size: int = 0
+    function: Optional[Function] = field(default=None, repr=False)
+    # Cell holding ``address``; native callers call through it
+    cell: Any = field(default=None, repr=False)
+    entry: Optional[Callable] = field(default=None, repr=False)
+    # Static return type, None while unknown
+    returns: Optional[str] = None
+    # (name, Function) pairs the code was compiled against
+    deps: Tuple = ()
+    constants: Any = field(default=None, repr=False)
 
 class JITCompiler:
+    """Native backend for pure numeric VM functions
+
+    Functions are compiled per argument signature (ints and floats) and
+    entered through ``native_entry``, which checks arguments and
+    dependencies and raises ``TierDeopt`` when the call must run in the VM.
+    """
     def __init__(self, vm: VM):
         self.vm = vm
         self.memory = MemoryAllocator()
-        self.compiled_functions: Dict[str, NativeFunction] = {}
+        self.compiled_functions: Dict[str, NativeFunction] = {}  # name -> latest variant
+        self.variants: Dict[Tuple[str, Tuple[str, ...]], NativeFunction] = {}
         self.platform = platform.machine().lower()
+        self.deopts: Dict[str, int] = {}
+        self.max_deopts = 3
+        self.max_variants = 4
+        self._pending: Dict[Tuple[str, Tuple[str, ...]], NativeFunction] = {}
+        # Native recursion depth, checked on every native entry
+        self._depth = ctypes.c_int64(0)
+        # Persistent code cache (core.jitcache), set by JITContext
+        self.cache: Optional[JITCache] = None
         
         # Architecture-specific configurations
         self.arch_config = {
@@ -29,132 +63,403 @@ class JITCompiler:
                 'return_reg': 'rax',
                 'call_conv': self._compile_x86_64
             },
-            'arm64': {
-                'register_args': ['x0', 'x1', 'x2', 'x3', 'x4', 'x5', 'x6', 'x7'],
-                'return_reg': 'x0',
-                'call_conv': self._compile_arm64
-            }
         }
+        self.arch_config['amd64'] = self.arch_config['x86_64']
+        self.supported = self.platform in self.arch_config and platform.system() == 'Linux'
 
-    def compile_function(self, func_name: str, bytecode: bytes) -> NativeFunction:
-        """Compile Amatak bytecode to native machine code"""
-        if func_name in self.compiled_functions:
-            return self.compiled_functions[func_name]
-        
-        # Get architecture-specific compiler
-        compiler = self.arch_config.get(self.platform)
-        if not compiler:
+    def compile_function(self, func_name: str, signature: Optional[Tuple[str, ...]] = None) -> NativeFunction:
+        """Compile a VM function to native code for an argument signature
+
+        The signature defaults to all-int arguments.
+        """
+        if not self.supported:
             raise AmatakRuntimeError(f"JIT not supported on {self.platform}")
+        func = self.vm.functions.get(func_name)
+        if func is None:
+            raise AmatakRuntimeError(f"Undefined function: {func_name}")
+        if signature is None:
+            signature = (INT,) * func.arg_count
+        try:
+            native = self._compile(func, tuple(signature))
+        except NativeUnsupported as e:
+            raise AmatakRuntimeError(f"Cannot compile {func_name} natively: {e}")
+        # Call sites that cached the interpreted target must re-resolve
+        self.vm.invalidate_call_sites()
+        return native
 
-        # Generate native code
-        native_code = compiler['call_conv'](bytecode)
-        
-        # Allocate executable memory
-        exec_mem = self.memory.allocate_executable(len(native_code))
-        ctypes.memmove(exec_mem, native_code, len(native_code))
-        
-        # Create function wrapper
-        func_type = ctypes.CFUNCTYPE(ctypes.c_void_p, *[ctypes.c_void_p]*6)
-        native_func = func_type(exec_mem)
-        
-        # Store metadata
-        compiled = NativeFunction(
-            address=exec_mem,
-            arg_count=self._count_args(bytecode),
-            return_type=self._get_return_type(bytecode)
+    def accepts(self, func: Function) -> bool:
+        """Cheap check that a function is in the native subset"""
+        if not self.supported or self.deopts.get(func.name, 0) >= self.max_deopts:
+            return False
+        local_names = {f'arg{i}' for i in range(func.arg_count)}
+        loaded = set()
+        try:
+            for instr in iter_instructions(func.bytecode):
+                if instr.op not in SUPPORTED:
+                    return False
+                if instr.op == OpCode.STORE_VAR:
+                    local_names.add(instr.operands[0])
+                elif instr.op == OpCode.LOAD_VAR:
+                    loaded.add(instr.operands[0])
+                elif instr.op == OpCode.LOAD_CONST:
+                    if value_type(self.vm.constants[instr.operands[0]]) is None:
+                        return False
+        except (VerificationError, IndexError):
+            return False
+        return loaded <= local_names
+
+    def native_entry(self, func: Function) -> Callable:
+        """Tier entry point for ``func``: compiles per argument signature"""
+        def entry(*args):
+            signature = self._signature(args)
+            if signature is None:
+                raise TierDeopt()
+            native = self.variants.get((func.name, signature))
+            if native is None or not self._is_current(native):
+                try:
+                    native = self._compile(func, signature)
+                except NativeUnsupported:
+                    # Leave the function to the Python tier from now on
+                    self.deopts[func.name] = self.max_deopts
+                    raise TierDeopt()
+            return self.call(native, args)
+        entry.__amatak_native__ = True
+        return entry
+
+    def call(self, native: NativeFunction, args) -> Any:
+        """Run a compiled variant, raising TierDeopt if the VM must take over"""
+        if not self._is_current(native):
+            raise TierDeopt()
+        packed = (ctypes.c_int64 * (2 * len(args) or 1))()
+        for i, arg in enumerate(args):
+            packed[2 * i], packed[2 * i + 1] = encode_value(arg)
+        out = (ctypes.c_int64 * 2)()
+        if native.entry(packed, out):
+            raise TierDeopt()
+        return decode_value(out[0], out[1])
+
+    def record_deopt(self, func: Function):
+        """Note a failed native guard; repeat offenders move to the Python tier"""
+        self.deopts[func.name] = self.deopts.get(func.name, 0) + 1
+
+    def proven_signature(self, func: Function) -> Optional[Tuple[str, ...]]:
+        """Native signature of ``func``'s proven parameter types, if they are
+        all Integer or Float (see ``ProgramTypes.annotate``)
+
+        Calls still go through the argument check in ``native_entry``: a
+        proven Integer may not fit in 64 bits.
+        """
+        if len(func.param_types) != func.arg_count:
+            return None
+        signature = []
+        for typ in func.param_types:
+            if type(typ) is IntegerType:
+                signature.append(INT)
+            elif type(typ) is FloatType:
+                signature.append(FLOAT)
+            else:
+                return None
+        return tuple(signature)
+
+    def _signature(self, args) -> Optional[Tuple[str, ...]]:
+        signature = tuple(value_type(arg) for arg in args)
+        if None in signature or BOOL in signature:
+            return None
+        return signature
+
+    def _is_current(self, native: NativeFunction) -> bool:
+        functions = self.vm.functions
+        if self.vm.constants is not native.constants:
+            return False
+        for name, func in native.deps:
+            if functions.get(name) is not func:
+                return False
+        return True
+
+    def _compile(self, func: Function, signature: Tuple[str, ...]) -> NativeFunction:
+        key = (func.name, signature)
+        pending = self._pending.get(key)
+        if pending is not None:
+            # Recursive call: the cell is filled in once compilation finishes
+            return pending
+        existing = self.variants.get(key)
+        if existing is not None and existing.function is func and self._is_current(existing):
+            return existing
+        if sum(1 for name, _ in self.variants if name == func.name) >= self.max_variants and existing is None:
+            raise NativeUnsupported("too many signatures")
+
+        native = NativeFunction(
+            address=0,
+            arg_count=func.arg_count,
+            return_type=DynamicType(),
+            signature=signature,
+            function=func,
+            cell=ctypes.c_void_p(0),
+            constants=self.vm.constants
         )
-        self.compiled_functions[func_name] = compiled
-        
-        return compiled
+        self._pending[key] = native
+        try:
+            cache_key = self._cache_key(func, signature)
+            loaded = self._load_cached(cache_key)
+            if loaded is not None:
+                code, returns, calls = loaded
+            else:
+                codegen = NativeCodegen(
+                    func, signature, self.vm.constants, self._resolve_call, ctypes.addressof(self._depth)
+                )
+                code = self.arch_config[self.platform]['call_conv'](codegen)
+                returns, calls = codegen.return_type, codegen.calls
+                if cache_key is not None:
+                    self.cache.store_code(cache_key, code, codegen.relocations, returns)
+        finally:
+            del self._pending[key]
 
-    def _compile_x86_64(self, bytecode: bytes) -> bytes:
-        """Generate x86_64 machine code"""
-        # Prologue
-        code = b'\x55'                           # push rbp
-        code += b'\x48\x89\xE5'                  # mov rbp, rsp
-        
-        # TODO: Implement actual bytecode translation
-        # This is a placeholder that just returns 42
-        code += b'\x48\xC7\xC0\x2A\x00\x00\x00' # mov rax, 42
-        
-        # Epilogue
-        code += b'\x5D'                           # pop rbp
-        code += b'\xC3'                           # ret
-        
-        return code
+        # Copy into the code arena; pages are read+exec once written
+        exec_mem = self.memory.allocate_code(code)
 
-    def _compile_arm64(self, bytecode: bytes) -> bytes:
-        """Generate ARM64 machine code"""
-        # Prologue
-        code = b'\xFD\x03\x00\x91'               # mov x29, sp
-        
-        # TODO: Implement actual bytecode translation
-        # This is a placeholder that just returns 42
-        code += b'\x28\x00\x80\xD2'              # mov x0, #42
-        
-        # Epilogue
-        code += b'\xFD\x03\x00\x91'              # mov sp, x29
-        code += b'\xC0\x03\x5F\xD6'              # ret
-        
-        return code
+        deps = {func.name: func}
+        for name in calls:
+            deps[name] = self.vm.functions[name]
+        for callee in set(calls):
+            for other in self.variants.values():
+                if other.function is self.vm.functions[callee]:
+                    deps.update(other.deps)
+        native.address = exec_mem
+        native.size = len(code)
+        native.cell.value = exec_mem
+        native.entry = _NATIVE_FUNC(exec_mem)
+        native.returns = returns
+        native.return_type = self._get_return_type(returns)
+        native.deps = tuple(deps.items())
+        stale = self.variants.get(key)
+        self.variants[key] = native
+        self.compiled_functions[func.name] = native
+        if stale is not None:
+            # Code still calling the stale variant is itself stale: its
+            # dependencies include the function that was recompiled
+            self.release(stale)
+        return native
+
+    def release(self, native: NativeFunction):
+        """Free an invalidated variant's code; compacts when the arena is mostly holes"""
+        if native.address:
+            self.memory.free(native.address)
+        native.address = 0
+        native.cell.value = 0
+        native.entry = None
+        stats = self.memory.code_arena.get_stats()
+        if stats['chunks'] > 1 and stats['code_bytes'] * 2 < stats['mapped_bytes']:
+            self.compact_code()
+
+    def compact_code(self) -> int:
+        """Repack live native code and repoint variants; returns bytes unmapped"""
+        before = self.memory.code_arena.get_stats()['mapped_bytes']
+        moved = self.memory.code_arena.compact()
+        for native in self.variants.values():
+            address = moved.get(native.address)
+            if address is None:
+                continue
+            native.address = address
+            native.cell.value = address
+            native.entry = _NATIVE_FUNC(address)
+        return before - self.memory.code_arena.get_stats()['mapped_bytes']
+
+    def _cache_key(self, func: Function, signature: Tuple[str, ...]) -> Optional[str]:
+        if self.cache is None:
+            return None
+        closure = closure_digest(func, self.vm.functions, self.vm.constants)
+        return self.cache.code_key(func.name, signature, closure) if closure else None
+
+    def _load_cached(self, cache_key: Optional[str]):
+        """Map a cached variant back in: (code, returns, calls) or None"""
+        if cache_key is None:
+            return None
+        entry = self.cache.load_code(cache_key)
+        if entry is None:
+            return None
+        calls = []
+        try:
+            for offset, kind, *details in entry.relocations:
+                if kind == 'depth':
+                    address = ctypes.addressof(self._depth)
+                elif kind == 'call':
+                    name, arg_types, assumed = details
+                    address, returns = self._resolve_call(name, tuple(arg_types))
+                    # The caller was typed against the callee's return type
+                    if assumed is not None and returns != assumed:
+                        return None
+                    calls.append(name)
+                else:
+                    return None
+                struct.pack_into('<q', entry.code, offset, address)
+        except (struct.error, ValueError, TypeError):
+            # Malformed entry that passed the digest: compile instead
+            return None
+        return bytes(entry.code), entry.returns, calls
 
-    def _count_args(self, bytecode: bytes) -> int:
-        """Count arguments from bytecode"""
-        # Simple implementation - count LOAD_ARG ops
-        return bytecode.count(OpCode.LOAD_ARG.value)
+    def _resolve_call(self, name: str, arg_types: Tuple[str, ...]):
+        callee = self.vm.functions.get(name)
+        if callee is None:
+            raise NativeUnsupported(f"call to undefined function {name!r}")
+        if callee.arg_count != len(arg_types):
+            raise NativeUnsupported(f"call to {name!r} with wrong arity")
+        native = self._compile(callee, arg_types)
+        return ctypes.addressof(native.cell), native.returns
 
-    def _get_return_type(self, bytecode: bytes) -> AmatakType:
-        """Determine return type from bytecode"""
-        # Default to dynamic type for now
-        from ..runtime.types.core import DynamicType
+    def _compile_x86_64(self, codegen: NativeCodegen) -> bytes:
+        """Generate x86_64 machine code"""
+        return codegen.compile()
+
+    def _get_return_type(self, returns: Optional[str]) -> AmatakType:
+        """Map a static native return type onto the runtime type system"""
+        if returns == INT:
+            return IntegerType()
+        if returns == FLOAT:
+            return FloatType()
+        if returns == BOOL:
+            return BooleanType()
         return DynamicType()
 
     def execute_native(self, func_name: str, *args) -> object:
         """Execute a compiled native function"""
-        if func_name not in self.compiled_functions:
-            raise AmatakRuntimeError(f"Function {func_name} not compiled")
-        
-        func = self.compiled_functions[func_name]
-        
-        # Convert Python args to C types
-        c_args = []
-        for arg in args:
-            if isinstance(arg, int):
-                c_args.append(ctypes.c_long(arg))
-            elif isinstance(arg, float):
-                c_args.append(ctypes.c_double(arg))
-            else:
-                c_args.append(ctypes.py_object(arg))
-        
-        # Call the native function
-        func_type = ctypes.CFUNCTYPE(ctypes.py_object, *[type(arg) for arg in c_args])
-        native_func = func_type(func.address)
-        return native_func(*args)
+        func = self.vm.functions.get(func_name)
+        signature = self._signature(args)
+        if func is None or signature is None:
+            raise AmatakRuntimeError(f"Function {func_name} not compiled for these arguments")
+        native = self.variants.get((func_name, signature))
+        if native is None:
+            native = self.compile_function(func_name, signature)
+        try:
+            return self.call(native, args)
+        except TierDeopt:
+            return self.vm._interpret(func, list(args))
 
-    def warmup(self, functions: Dict[str, bytes]):
-        """Pre-compile frequently used functions"""
-        for name, bytecode in functions.items():
-            self.compile_function(name, bytecode)
+    def warmup(self, functions: Iterable[str]):
+        """Pre-compile functions and install them as their tier"""
+        for name in functions:
+            self.compile_function(name)
+            func = self.vm.functions[name]
+            func.tier = self.native_entry(func)
+        self.vm.invalidate_call_sites()
 
 class JITContext:
-    """Runtime context for JIT compilation"""
-    def __init__(self, vm: VM):
+    """Runtime context for JIT compilation
+
+    Counts calls per function and promotes functions that cross the
+    hotness threshold: pure numeric functions go to the native backend
+    (core.x86_64) where supported, everything else to the Python-codegen
+    tier (core.pytier). Tiered code that fails a guard is deoptimized back
+    to the interpreter.
+
+    With a ``cache`` (a directory or JITCache), native code and the set of
+    promoted functions persist across processes (see core.jitcache).
+    """
+    def __init__(self, vm: VM, threshold: int = 10, cache=None):
+        from .pytier import PythonTierCompiler
+        self.vm = vm
         self.jit = JITCompiler(vm)
+        if isinstance(cache, str):
+            cache = JITCache(cache, arch=self.jit.platform)
+        self.cache: Optional[JITCache] = cache
+        self.jit.cache = cache
+        self.python_tier = PythonTierCompiler(vm)
         self.hot_functions: Dict[str, int] = {}  # function_name -> call_count
+        self.threshold = threshold
+        self._rejected: Dict[str, object] = {}  # name -> Function that cannot be tiered
         
     def should_compile(self, func_name: str) -> bool:
         """Determine if a function should be JIT compiled"""
-        return self.hot_functions.get(func_name, 0) > 10
+        return self.hot_functions.get(func_name, 0) > self.threshold
         
     def record_call(self, func_name: str):
         """Track function call frequency"""
         self.hot_functions[func_name] = self.hot_functions.get(func_name, 0) + 1
+
+    def promote(self, func) -> bool:
+        """Move a hot function to the native or Python tier"""
+        if func.tier is not None or self._rejected.get(func.name) is func:
+            return False
+        if self.jit.accepts(func):
+            self._compile_proven(func)
+            tiered = self.jit.native_entry(func)
+        else:
+            tiered = self.python_tier.compile(func)
+        if tiered is None:
+            self._rejected[func.name] = func
+            return False
+        func.tier = tiered
+        # Call sites holding the interpreted target must pick up the tier
+        self.vm.invalidate_call_sites()
+        return True
+
+    def deoptimize(self, func):
+        """Drop a function's tiered code after a guard failure"""
+        native = getattr(func.tier, '__amatak_native__', False)
+        func.tier = None
+        if native:
+            self.jit.record_deopt(func)
+        else:
+            self.python_tier.record_deopt(func)
+        self.hot_functions[func.name] = 0
+        self.vm.invalidate_call_sites()
         
+    def preload(self, functions: Iterable[Function]):
+        """Promote functions that were hot in earlier runs"""
+        if self.cache is None:
+            return
+        for func in functions:
+            if func.tier is not None:
+                continue
+            digest = self._digest(func)
+            profile = self.cache.profile_for(digest) if digest else None
+            if profile is None:
+                continue
+            if profile['tier'] == 'native' and self.jit.accepts(func):
+                for signature in profile['signatures']:
+                    try:
+                        self.jit._compile(func, tuple(signature))
+                    except NativeUnsupported:
+                        pass
+                self._compile_proven(func)
+                func.tier = self.jit.native_entry(func)
+            else:
+                func.tier = self.python_tier.compile(func)
+        self.vm.invalidate_call_sites()
+
+    def _compile_proven(self, func):
+        """Compile the variant for a function's proven signature up front"""
+        signature = self.jit.proven_signature(func)
+        if signature is not None:
+            try:
+                self.jit._compile(func, signature)
+            except NativeUnsupported:
+                pass
+
+    def save_profiles(self):
+        """Record which functions are tiered, and how, in the cache"""
+        if self.cache is None:
+            return
+        for func in self.vm.functions.values():
+            digest = self._digest(func) if func.tier is not None else None
+            if digest is None:
+                continue
+            if getattr(func.tier, '__amatak_native__', False):
+                signatures = [sig for (_, sig), native in self.jit.variants.items() if native.function is func]
+                self.cache.record_profile(digest, 'native', signatures)
+            else:
+                self.cache.record_profile(digest, 'python')
+        self.cache.save_profiles()
+
+    def _digest(self, func) -> Optional[str]:
+        # Functions left over from another module may not match the current pool
+        try:
+            return function_digest(func, self.vm.constants)
+        except (IndexError, VerificationError):
+            return None
+
     def compile_hot_functions(self):
         """Compile frequently called functions"""
         for func_name, count in self.hot_functions.items():
-            if count > 10 and func_name not in self.jit.compiled_functions:
-                # Get bytecode from VM
-                bytecode = self.jit.vm.get_function_bytecode(func_name)
-                if bytecode:
-                    self.jit.compile_function(func_name, bytecode)
\ No newline at end of file
+            func = self.vm.functions.get(func_name)
+            if count > self.threshold and func is not None:
+                self.promote(func)
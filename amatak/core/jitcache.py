@@ -0,0 +1,186 @@
+"""Persistent cache for native JIT code and tiering profiles
+
+Native code is stored per function variant, keyed by a hash of the
+target architecture, runtime version, argument signature and the
+bytecode (plus referenced constants) of the function and every function
+it can call. Absolute addresses in the code are recorded as relocations
+and patched when an entry is mapped back in. Each entry carries a SHA-256
+of its code and relocation table; an entry that fails the digest or has a
+relocation outside its code is a miss, never executed.
+
+Profiles record which functions became hot in earlier runs and in which
+tier, keyed by the function's content digest, so a new process can
+promote them at load time instead of waiting for them to warm up again.
+"""
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .vm import OpCode, Function, iter_instructions
+
+MAGIC = b'AJIT'
+CACHE_VERSION = 2
+PROFILE_FILE = 'profiles.json'
+
+def default_cache_dir() -> str:
+    """``$AMATAK_JIT_CACHE``, else ``cache/jit`` under ``$AMATAK_HOME`` or ``~/.amatak``"""
+    explicit = os.environ.get('AMATAK_JIT_CACHE')
+    if explicit:
+        return explicit
+    home = os.environ.get('AMATAK_HOME') or os.path.join(os.path.expanduser('~'), '.amatak')
+    return os.path.join(home, 'cache', 'jit')
+
+def function_digest(func: Function, constants: Sequence[Any]) -> str:
+    """Content hash of a function: arity, bytecode and the constants it loads"""
+    h = hashlib.sha256()
+    h.update(struct.pack('>B', func.arg_count))
+    h.update(func.bytecode)
+    for instr in iter_instructions(func.bytecode):
+        if instr.op == OpCode.LOAD_CONST:
+            value = constants[instr.operands[0]]
+            h.update(f'{type(value).__name__}:{value!r};'.encode('utf-8'))
+    return h.hexdigest()
+
+def closure_digest(func: Function, functions: Dict[str, Function], constants: Sequence[Any]) -> Optional[str]:
+    """Hash of a function and everything it can call, or None if a callee is missing"""
+    seen: Dict[str, str] = {}
+    todo = [func.name]
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        current = func if name == func.name else functions.get(name)
+        if current is None:
+            return None
+        seen[name] = function_digest(current, constants)
+        for instr in iter_instructions(current.bytecode):
+            if instr.op == OpCode.CALL_FUNCTION:
+                todo.append(instr.operands[0])
+    h = hashlib.sha256()
+    for name in sorted(seen):
+        h.update(f'{name}={seen[name]};'.encode('utf-8'))
+    return h.hexdigest()
+
+def _entry_digest(code: bytes, relocations: List[list], returns: Optional[str]) -> str:
+    h = hashlib.sha256(code)
+    h.update(json.dumps([relocations, returns], sort_keys=True).encode('utf-8'))
+    return h.hexdigest()
+
+def _check_relocations(relocations: Any, code_size: int):
+    if not isinstance(relocations, list):
+        raise ValueError("bad relocation table")
+    for relocation in relocations:
+        if not isinstance(relocation, list) or not relocation:
+            raise ValueError("bad relocation")
+        offset = relocation[0]
+        if type(offset) is not int or not 0 <= offset <= code_size - 8:
+            raise ValueError("relocation outside code")
+
+@dataclass
+class CachedCode:
+    code: bytearray
+    # [offset, kind, *details]; kinds are 'depth' and 'call'
+    relocations: List[list]
+    returns: Optional[str]
+
+class JITCache:
+    """Directory-backed store for native code and tiering profiles
+
+    Unreadable or corrupt entries are treated as misses; failures to write
+    are ignored so caching never affects program results.
+    """
+
+    def __init__(self, directory: Optional[str] = None, arch: str = '', version: Optional[str] = None):
+        if version is None:
+            from .. import __version__ as version
+        self.directory = directory or default_cache_dir()
+        self.arch = arch
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._profiles: Optional[Dict[str, dict]] = None
+
+    def code_key(self, name: str, signature: Tuple[str, ...], closure: str) -> str:
+        text = f'{CACHE_VERSION}|{self.arch}|{self.version}|{name}|{",".join(signature)}|{closure}'
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def load_code(self, key: str) -> Optional[CachedCode]:
+        """Read a code entry, or None on a miss"""
+        try:
+            with open(self._path(f'{key}.bin'), 'rb') as f:
+                data = f.read()
+            if data[:4] != MAGIC:
+                raise ValueError("bad magic")
+            meta_len, = struct.unpack_from('>I', data, 4)
+            meta = json.loads(data[8:8 + meta_len].decode('utf-8'))
+            code = data[8 + meta_len:]
+            relocations, returns = meta['relocations'], meta['returns']
+            if meta['digest'] != _entry_digest(code, relocations, returns):
+                raise ValueError("digest mismatch")
+            _check_relocations(relocations, len(code))
+            entry = CachedCode(bytearray(code), relocations, returns)
+        except (OSError, ValueError, KeyError, TypeError, struct.error):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def store_code(self, key: str, code: bytes, relocations: List[list], returns: Optional[str]):
+        """Write a code entry atomically"""
+        meta = json.dumps({
+            'relocations': relocations,
+            'returns': returns,
+            'digest': _entry_digest(code, relocations, returns),
+        }).encode('utf-8')
+        self._write(f'{key}.bin', MAGIC + struct.pack('>I', len(meta)) + meta + code)
+
+    # Profiles
+
+    @property
+    def profiles(self) -> Dict[str, dict]:
+        if self._profiles is None:
+            try:
+                with open(self._path(PROFILE_FILE), 'r', encoding='utf-8') as f:
+                    self._profiles = json.load(f)
+                if not isinstance(self._profiles, dict):
+                    self._profiles = {}
+            except (OSError, ValueError):
+                self._profiles = {}
+        return self._profiles
+
+    def profile_for(self, digest: str) -> Optional[dict]:
+        return self.profiles.get(digest)
+
+    def record_profile(self, digest: str, tier: str, signatures: List[Tuple[str, ...]] = ()):
+        self.profiles[digest] = {'tier': tier, 'signatures': [list(s) for s in signatures]}
+
+    def save_profiles(self):
+        """Merge recorded profiles into the profile file"""
+        if self._profiles is None:
+            return
+        recorded = self._profiles
+        self._profiles = None
+        merged = dict(self.profiles)
+        merged.update(recorded)
+        self._profiles = merged
+        self._write(PROFILE_FILE, json.dumps(merged, indent=1, sort_keys=True).encode('utf-8'))
+
+    def _write(self, filename: str, data: bytes):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, self._path(filename))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError:
+            pass
@@ -0,0 +1,52 @@
+import json
+from typing import Dict, Optional, Tuple
+from .vm import OpCode
+
+class OpcodeCounter:
+    """Per-opcode and per-opcode-pair execution histogram for the VM
+
+    Times are inclusive wall-clock nanoseconds per handler, so a
+    CALL_FUNCTION also counts the callee's instructions.
+    """
+
+    def __init__(self):
+        size = max(op.value for op in OpCode) + 1
+        self.counts = [0] * size
+        self.times = [0] * size
+        self.pairs: Dict[Tuple[int, int], int] = {}
+
+    def record(self, prev: Optional[int], op: int, elapsed_ns: int):
+        """Record one executed instruction"""
+        self.counts[op] += 1
+        self.times[op] += elapsed_ns
+        if prev is not None:
+            key = (prev, op)
+            self.pairs[key] = self.pairs.get(key, 0) + 1
+
+    def reset(self):
+        """Clear all counters"""
+        self.counts = [0] * len(self.counts)
+        self.times = [0] * len(self.times)
+        self.pairs.clear()
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def to_dict(self) -> dict:
+        """Histogram as plain data, most frequent first"""
+        opcodes = {
+            op.name: {'count': self.counts[op.value], 'time_ns': self.times[op.value]}
+            for op in sorted(OpCode, key=lambda o: -self.counts[o.value])
+            if self.counts[op.value]
+        }
+        pairs = {
+            f"{OpCode(a).name} -> {OpCode(b).name}": count
+            for (a, b), count in sorted(self.pairs.items(), key=lambda item: -item[1])
+        }
+        return {'total': self.total, 'opcodes': opcodes, 'pairs': pairs}
+
+    def dump(self, path: str) -> None:
+        """Write the histogram as JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
@@ -0,0 +1,179 @@
+"""Purity analysis of VM functions and opt-in memoization of pure calls
+
+A function is pure when its result depends only on its arguments and
+calling it has no observable effect:
+
+- it does not print, define functions or store into arrays (an array
+  argument belongs to the caller);
+- every variable it reads was assigned by the function itself on every
+  path before the read, so no caller or global binding is visible through
+  dynamic scoping (stores only ever bind in the callee's own frame);
+- every function it calls is pure. This is a greatest fixpoint, so
+  recursive functions can be pure.
+
+``MemoCache`` caches results of pure functions in one bounded LRU per
+function, keyed by argument values. Only calls whose arguments and result
+are immutable scalars are cached: arrays are mutable and fresh on every
+call, so sharing one between calls would be visible. Purity is recomputed
+when the VM's set of functions changes.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set
+from ..errors import VerificationError
+from .ir import IRFunction, lift
+from .verifier import BytecodeVerifier
+
+# Instructions with effects visible outside the call
+_EFFECTS = {'print', 'setindex'}
+
+# Values that may be cache keys and cached results
+_SCALARS = (bool, int, float, str, type(None))
+
+def local_facts(func: IRFunction):
+    """Whether ``func`` is pure apart from its calls, and the names it calls"""
+    callees = set()
+    assigned_in = func.definitely_assigned(set())
+    for block in func.blocks:
+        assigned = set(assigned_in[block.label])
+        for instr in block.instrs:
+            if instr.op in _EFFECTS:
+                return False, callees
+            if instr.op == 'load' and instr.args[0] not in assigned:
+                return False, callees
+            if instr.op == 'store':
+                assigned.add(instr.args[0])
+            elif instr.op == 'call':
+                callees.add(instr.args[0])
+    return True, callees
+
+def pure_functions(functions: Iterable, constants) -> Set[str]:
+    """Names of the pure functions among VM ``Function`` objects"""
+    verifier = BytecodeVerifier(constants)
+    candidates: Dict[str, Set[str]] = {}
+    for func in functions:
+        try:
+            result = verifier.verify(func.bytecode, func.arg_count, func.name)
+            ir = lift(func.name, func.arg_count, result, constants)
+        except VerificationError:
+            continue
+        pure, callees = local_facts(ir)
+        if pure:
+            candidates[func.name] = callees
+    changed = True
+    while changed:
+        changed = False
+        for name, callees in list(candidates.items()):
+            if not callees <= candidates.keys():
+                del candidates[name]
+                changed = True
+    return set(candidates)
+
+def _hit_rate(hits: int, misses: int) -> float:
+    calls = hits + misses
+    return hits / calls if calls else 0.0
+
+class MemoCache:
+    """Bounded per-function LRU caches for pure VM functions (see VM.enable_memoization)"""
+
+    # Returned by get() when a call is not cached
+    MISSING = object()
+
+    def __init__(self, vm, max_size: int = 256):
+        if max_size < 1:
+            raise ValueError("max_size must be positive")
+        self.vm = vm
+        self.max_size = max_size
+        self.pure: Set[str] = set()
+        self.entries: Dict[str, OrderedDict] = {}
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.evictions = 0
+        self._stamp = None
+        self._functions: Dict[str, Any] = {}
+        self._constants = None
+
+    def key(self, func, args) -> Optional[tuple]:
+        """Cache key for a call, or None when it must not be memoized"""
+        if self._stamp is not self.vm._call_stamp:
+            self._refresh()
+        if func.name not in self.pure:
+            return None
+        for arg in args:
+            if type(arg) not in _SCALARS:
+                return None
+        # The type keeps 1, 1.0 and True apart; floats are keyed by repr,
+        # which keeps 0.0 and -0.0 apart and makes NaN arguments hit
+        return tuple((float, repr(arg)) if type(arg) is float else (type(arg), arg) for arg in args)
+
+    def get(self, name: str, key: tuple) -> Any:
+        """Cached result, or ``MISSING``"""
+        entries = self.entries.get(name)
+        if entries is not None:
+            value = entries.get(key, self.MISSING)
+            if value is not self.MISSING:
+                entries.move_to_end(key)
+                self.hits[name] = self.hits.get(name, 0) + 1
+                return value
+        self.misses[name] = self.misses.get(name, 0) + 1
+        return self.MISSING
+
+    def put(self, name: str, key: tuple, value: Any) -> None:
+        if type(value) not in _SCALARS:
+            return
+        entries = self.entries.get(name)
+        if entries is None:
+            entries = self.entries[name] = OrderedDict()
+        entries[key] = value
+        if len(entries) > self.max_size:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def is_pure(self, func) -> bool:
+        """Whether calls to ``func`` may be served from the cache"""
+        if self._stamp is not self.vm._call_stamp:
+            self._refresh()
+        return func.name in self.pure
+
+    def clear(self) -> None:
+        """Drop cached results and counters"""
+        self.entries.clear()
+        self.hits.clear()
+        self.misses.clear()
+        self.evictions = 0
+
+    def stats(self) -> dict:
+        """Hit and miss counts, overall and per function"""
+        names = sorted(self.hits.keys() | self.misses.keys())
+        functions = {
+            name: {
+                'hits': self.hits.get(name, 0),
+                'misses': self.misses.get(name, 0),
+                'hit_rate': _hit_rate(self.hits.get(name, 0), self.misses.get(name, 0)),
+                'size': len(self.entries.get(name, ())),
+            }
+            for name in names
+        }
+        hits = sum(self.hits.values())
+        misses = sum(self.misses.values())
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': _hit_rate(hits, misses),
+            'evictions': self.evictions,
+            'max_size': self.max_size,
+            'pure': sorted(self.pure),
+            'functions': functions,
+        }
+
+    def _refresh(self) -> None:
+        # The call stamp also moves when functions are JIT-compiled; results
+        # stay valid as long as every name maps to the same function
+        self._stamp = self.vm._call_stamp
+        functions = dict(self.vm.functions)
+        if self._constants is self.vm.constants and functions.keys() == self._functions.keys() and all(
+                functions[name] is func for name, func in self._functions.items()):
+            return
+        self._functions = functions
+        self._constants = self.vm.constants
+        self.pure = pure_functions(functions.values(), self.vm.constants)
+        self.entries.clear()
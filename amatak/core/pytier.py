@@ -0,0 +1,260 @@
+"""Portable optimizing tier: VM bytecode -> specialized Python source
+
+A hot function's bytecode is verified, lifted to IR (core.ir), cleaned up
+by the shared IR passes and translated into a Python function. IR
+temporaries read once in their own block become nested expressions, other
+temporaries become Python locals (``t0``..``tN``), and variables written
+by the function live in Python locals with write-through to the VM frame
+(callees may still read them, as in the interpreter). Constants are
+inlined as literals.
+
+Guards:
+- entry: the VM constant pool must be the one the code was compiled
+  against, otherwise ``TierDeopt`` is raised before any side effect and the
+  VM interprets the call instead;
+- call sites: a direct reference to the callee is used while the VM call
+  stamp is unchanged, otherwise the site re-resolves through the VM;
+- names not written by the function are looked up through the VM frames.
+"""
+from typing import Callable, Dict, List, Optional, Set
+from ..errors import VerificationError
+from ..runtime.types.specialize import generic_operation
+from .escape import scalar_replace
+from .ir import PURE_OPS, BasicBlock, IRFunction, Temp, fold_constants, lift, simplify_cfg
+from .vm import OpCode, Function
+from .verifier import BytecodeVerifier
+
+class TierDeopt(Exception):
+    """Raised by tiered code when an entry guard fails"""
+    pass
+
+_LITERAL_TYPES = (bool, int, float, str, type(None))
+_UNBOUND = object()
+
+def _ident(name: str) -> str:
+    """Map an Amatak variable name onto a Python identifier"""
+    safe = ''.join(c if c.isalnum() or c == '_' else f'_{ord(c):x}_' for c in name)
+    return f'v_{safe}'
+
+class _Emitter:
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def line(self, indent: int, text: str):
+        self.lines.append('    ' * indent + text)
+
+class PythonTierCompiler:
+    """Translates verified VM functions into Python callables"""
+
+    def __init__(self, vm):
+        self.vm = vm
+        self.compiled: Dict[str, Callable] = {}
+        self.sources: Dict[str, str] = {}
+        self.deopts: Dict[str, int] = {}
+        self.max_deopts = 3
+        # Counter naming call-site cache variables in the function being generated
+        self._sites = 0
+
+    def can_compile(self, func: Function) -> bool:
+        return self.deopts.get(func.name, 0) < self.max_deopts
+
+    def compile(self, func: Function) -> Optional[Callable]:
+        """Compile a function, or return None if it must stay interpreted"""
+        if not self.can_compile(func):
+            return None
+        pool = self.vm.constants
+        try:
+            result = BytecodeVerifier(pool).verify(func.bytecode, func.arg_count, func.name)
+        except VerificationError:
+            return None
+        instructions = result.instructions
+        if any(instr.op == OpCode.MAKE_FUNCTION for instr in instructions.values()):
+            # Defining functions from tiered code is left to the interpreter
+            return None
+        for instr in instructions.values():
+            if instr.op == OpCode.LOAD_CONST and not isinstance(pool[instr.operands[0]], _LITERAL_TYPES):
+                return None
+
+        try:
+            ir = lift(func.name, func.arg_count, result, pool)
+        except VerificationError:
+            return None
+        fold_constants(ir)
+        simplify_cfg(ir)
+        if not any(instr.op == 'call' for instr in ir.instructions()):
+            # No callee can see this frame, so its arrays may live in scalars
+            scalar_replace(ir)
+        source = self._generate(func, ir)
+        namespace = {
+            '__vm': self.vm,
+            '__pool': pool,
+            '__Deopt': TierDeopt,
+            '__U': _UNBOUND,
+            '__add': generic_operation('+'),
+        }
+        code = compile(source, f'<tier:{func.name}>', 'exec')
+        exec(code, namespace)
+        tiered = namespace['__tier']
+        tiered.__amatak_source__ = source
+        self.compiled[func.name] = tiered
+        self.sources[func.name] = source
+        return tiered
+
+    def record_deopt(self, func: Function):
+        """Note a failed guard; repeat offenders stay interpreted"""
+        self.deopts[func.name] = self.deopts.get(func.name, 0) + 1
+        self.compiled.pop(func.name, None)
+
+    # Code generation
+
+    def _generate(self, func: Function, ir: IRFunction) -> str:
+        blocks = ir.blocks
+        stored = ir.stored_names()
+        params = [f'a{i}' for i in range(func.arg_count)]
+        arg_names = {f'arg{i}' for i in range(func.arg_count)}
+        assigned_in = ir.definitely_assigned(arg_names)
+        counts = ir.use_counts()
+        # Single-use values computed and read in one block stay symbolic
+        inline = {temp for temp in ir.local_temps() if counts.get(temp) == 1}
+
+        out = _Emitter()
+        out.line(0, f"def __tier({', '.join(params)}):")
+        out.line(1, "vm = __vm")
+        out.line(1, "if vm.constants is not __pool:")
+        out.line(2, "raise __Deopt()")
+        frame_items = ', '.join(f"'arg{i}': a{i}" for i in range(func.arg_count))
+        out.line(1, f"frame = {{{frame_items}}}")
+        out.line(1, "frames = vm.frames")
+        if func.arg_count:
+            out.line(1, "if vm._shadows_globals(frame):")
+            out.line(2, "vm.invalidate_global_sites()")
+        for i in range(func.arg_count):
+            out.line(1, f"{_ident(f'arg{i}')} = a{i}")
+        for name in sorted(stored - arg_names):
+            out.line(1, f"{_ident(name)} = __U")
+        out.line(1, "lookup = vm.lookup_var")
+        out.line(1, "frames.append(frame)")
+        out.line(1, "try:")
+
+        single = len(blocks) == 1
+        if single:
+            body_indent = 2
+        else:
+            out.line(2, f"b = {blocks[0].label}")
+            out.line(2, "while True:")
+            body_indent = 4
+        self._sites = 0
+        for n, block in enumerate(blocks):
+            if not single:
+                if n == 0:
+                    out.line(3, f"if b == {block.label}:")
+                elif n == len(blocks) - 1:
+                    out.line(3, f"else:  # b == {block.label}")
+                else:
+                    out.line(3, f"elif b == {block.label}:")
+            self._emit_block(out, body_indent, block, set(assigned_in[block.label]),
+                             stored | arg_names, inline, counts)
+        out.line(1, "finally:")
+        out.line(2, "frames.pop()")
+        out.line(0, "")
+        return '\n'.join(out.lines)
+
+    def _emit_block(self, out: _Emitter, indent: int, block: BasicBlock, assigned: Set[str],
+                    local_names: Set[str], inline: Set[Temp], counts: Dict[Temp, int]):
+        # Symbolic values not yet assigned to their temporary, in definition order
+        pending: Dict[Temp, str] = {}
+
+        def value(temp: Temp) -> str:
+            return pending.pop(temp) if temp in pending else str(temp)
+
+        def flush(keep: List[Temp]):
+            # Evaluate pending values before a side effect that is not their reader
+            for temp in [t for t in pending if t not in keep]:
+                out.line(indent, f"{temp} = {pending.pop(temp)}")
+
+        for instr in block.instrs:
+            op, args = instr.op, instr.args
+            if op not in PURE_OPS:
+                flush(instr.uses())
+            if op == 'const':
+                expr = repr(args[0])
+            elif op == 'arg':
+                expr = f'a{args[0]}'
+            elif op == 'copy':
+                expr = value(args[0])
+            elif op == 'load':
+                name = args[0]
+                var = _ident(name)
+                if name in local_names and name in assigned:
+                    expr = var
+                elif name in local_names:
+                    expr = f"({var} if {var} is not __U else lookup({name!r}))"
+                else:
+                    expr = f"lookup({name!r})"
+            elif op == 'binop':
+                left = value(args[1])
+                right = value(args[2])
+                if args[0] == '+':
+                    # May concatenate a string with a number
+                    expr = f"__add({left}, {right})"
+                else:
+                    expr = f"({left} {args[0]} {right})"
+            elif op == 'index':
+                array = value(args[0])
+                expr = f"{array}[{value(args[1])}]"
+            elif op == 'array':
+                expr = f"[{', '.join(value(temp) for temp in args)}]"
+            elif op == 'store':
+                name = args[0]
+                if name not in assigned:
+                    # A new local may shadow a global that load sites cached
+                    out.line(indent, f"if {name!r} not in frame and {name!r} in frames[0]:")
+                    out.line(indent + 1, "vm.invalidate_global_sites()")
+                out.line(indent, f"{_ident(name)} = frame[{name!r}] = {value(args[1])}")
+                assigned.add(name)
+                continue
+            elif op == 'setindex':
+                array, index, item = (value(temp) for temp in args)
+                out.line(indent, f"{array}[{index}] = {item}")
+                continue
+            elif op == 'print':
+                out.line(indent, f"print(str({value(args[0])}), flush=True)")
+                continue
+            elif op == 'call':
+                name = args[0]
+                call_args = [value(temp) for temp in args[1:]]
+                site = f"site{self._sites}"
+                self._sites += 1
+                out.line(indent, f"if {site}[0] is vm._call_stamp:")
+                out.line(indent + 1, f"{instr.dest} = {site}[1]({', '.join(call_args)})")
+                out.line(indent, "else:")
+                out.line(indent + 1, f"{instr.dest} = vm.tier_call({site}, {name!r}, ({''.join(a + ', ' for a in call_args)}))")
+                self._declare_site(out, site)
+                continue
+            elif op == 'return':
+                out.line(indent, f"return {value(args[0]) if args else 'None'}")
+                return
+            elif op == 'jump':
+                out.line(indent, f"b = {args[0]}")
+                out.line(indent, "continue")
+                return
+            elif op == 'branch':
+                cond, then_label, else_label = args
+                out.line(indent, f"if not {value(cond)}:")
+                out.line(indent + 1, f"b = {else_label}")
+                out.line(indent + 1, "continue")
+                out.line(indent, f"b = {then_label}")
+                out.line(indent, "continue")
+                return
+            else:
+                raise VerificationError(f"Unsupported IR instruction in tier: {op}")
+
+            # Pure instruction: keep it symbolic, assign it, or drop it if unread
+            if instr.dest in inline:
+                pending[instr.dest] = expr
+            elif counts.get(instr.dest):
+                out.line(indent, f"{instr.dest} = {expr}")
+
+    def _declare_site(self, out: _Emitter, site: str):
+        # Sites are module globals of the generated code: [stamp, target]
+        out.lines.insert(0, f"{site} = [None, None]")
@@ -0,0 +1,176 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+from ..errors import VerificationError
+from .vm import OpCode, Function, Instruction, decode_instruction
+
+# Fixed (pops, pushes) per opcode; CALL_FUNCTION and MAKE_ARRAY depend on operands
+STACK_EFFECTS = {
+    OpCode.LOAD_CONST: (0, 1),
+    OpCode.LOAD_VAR: (0, 1),
+    OpCode.STORE_VAR: (1, 1),
+    OpCode.LOAD_ARG: (0, 1),
+    OpCode.RETURN: (0, 0),
+    OpCode.BINARY_ADD: (2, 1),
+    OpCode.BINARY_SUB: (2, 1),
+    OpCode.BINARY_MUL: (2, 1),
+    OpCode.BINARY_DIV: (2, 1),
+    OpCode.BINARY_MOD: (2, 1),
+    OpCode.COMPARE_EQ: (2, 1),
+    OpCode.COMPARE_NE: (2, 1),
+    OpCode.COMPARE_GT: (2, 1),
+    OpCode.COMPARE_LT: (2, 1),
+    OpCode.COMPARE_GE: (2, 1),
+    OpCode.COMPARE_LE: (2, 1),
+    OpCode.JUMP: (0, 0),
+    OpCode.JUMP_IF_FALSE: (1, 0),
+    OpCode.MAKE_FUNCTION: (0, 0),
+    OpCode.ARRAY_GET: (2, 1),
+    OpCode.ARRAY_SET: (3, 1),
+    OpCode.POP: (1, 0),
+    OpCode.PRINT: (1, 0),
+}
+
+def stack_effect(instr: Instruction):
+    """(pops, pushes) for a decoded instruction"""
+    if instr.op == OpCode.CALL_FUNCTION:
+        return instr.operands[1], 1
+    if instr.op == OpCode.MAKE_ARRAY:
+        return instr.operands[0], 1
+    return STACK_EFFECTS[instr.op]
+
+def successors(instr: Instruction) -> List[int]:
+    """Offsets control can reach after an instruction"""
+    if instr.op == OpCode.RETURN:
+        return []
+    if instr.op == OpCode.JUMP:
+        return [instr.next_offset + instr.operands[0]]
+    if instr.op == OpCode.JUMP_IF_FALSE:
+        return [instr.next_offset, instr.next_offset + instr.operands[0]]
+    return [instr.next_offset]
+
+@dataclass
+class VerificationResult:
+    """Facts proven about a verified bytecode buffer"""
+    max_stack: int
+    instructions: Dict[int, Instruction]
+    # offset -> stack depth on entry
+    depths: Dict[int, int]
+    block_starts: List[int]
+    nested: List['VerificationResult'] = field(default_factory=list)
+
+class BytecodeVerifier:
+    """Load-time checks for core.vm bytecode
+
+    Verifies that every reachable instruction decodes with in-bounds
+    operands, jump targets land on instruction boundaries, the stack never
+    underflows and has the same depth on every path into a basic block, and
+    control never runs off the end of the buffer. The maximum stack depth is
+    recorded so execution can skip those checks.
+    """
+
+    def __init__(self, constants: Optional[Sequence[Any]] = None):
+        self.constants = constants
+
+    def verify_function(self, func: Function) -> VerificationResult:
+        """Verify a function and record its max stack depth"""
+        result = self.verify(func.bytecode, func.arg_count, func.name)
+        func.max_stack = result.max_stack
+        func.verified = True
+        return result
+
+    def verify_module(self, module) -> VerificationResult:
+        """Verify a module body and every function it carries"""
+        self.constants = module.constants
+        for func in module.functions:
+            self.verify_function(func)
+        return self.verify(module.code, 0, '<module>')
+
+    def verify(self, bytecode: bytes, arg_count: int = 0, name: str = '<module>') -> VerificationResult:
+        """Verify a bytecode buffer, raising VerificationError on failure"""
+        end = len(bytecode)
+        if end == 0:
+            raise VerificationError("Empty bytecode", function=name, offset=0)
+
+        instructions: Dict[int, Instruction] = {}
+        depths: Dict[int, int] = {0: 0}
+        leaders = {0}
+        nested: List[VerificationResult] = []
+        worklist = [0]
+        max_stack = 0
+
+        while worklist:
+            offset = worklist.pop()
+            depth = depths[offset]
+            instr = instructions.get(offset)
+            if instr is None:
+                try:
+                    instr = decode_instruction(bytecode, offset)
+                except VerificationError as e:
+                    raise VerificationError(e.message, function=name, offset=offset)
+                self._check_operands(instr, arg_count, name)
+                instructions[offset] = instr
+                if instr.op == OpCode.MAKE_FUNCTION:
+                    _, body_argc, _, body, _ = instr.operands
+                    nested.append(self.verify(body, body_argc, instr.operands[0]))
+
+            pops, pushes = stack_effect(instr)
+            if depth < pops:
+                raise VerificationError(
+                    f"Stack underflow in {instr.op.name} (depth {depth}, needs {pops})",
+                    function=name, offset=offset
+                )
+            depth = depth - pops + pushes
+            max_stack = max(max_stack, depth)
+
+            targets = successors(instr)
+            if instr.op in (OpCode.JUMP, OpCode.JUMP_IF_FALSE):
+                leaders.update(targets)
+            for target in targets:
+                if target == end:
+                    raise VerificationError(
+                        "Control falls off the end of the bytecode", function=name, offset=offset
+                    )
+                if not 0 <= target < end:
+                    raise VerificationError(
+                        f"Jump target {target} out of range", function=name, offset=offset
+                    )
+                known = depths.get(target)
+                if known is None:
+                    depths[target] = depth
+                    worklist.append(target)
+                elif known != depth:
+                    raise VerificationError(
+                        f"Stack depth mismatch at {target}: {known} vs {depth}",
+                        function=name, offset=offset
+                    )
+
+        # Every jump must land on the start of a decoded instruction
+        for target in leaders:
+            if target not in instructions:
+                raise VerificationError(
+                    f"Jump target {target} is not an instruction boundary", function=name, offset=target
+                )
+
+        return VerificationResult(
+            max_stack=max_stack,
+            instructions=instructions,
+            depths=depths,
+            block_starts=sorted(leaders),
+            nested=nested
+        )
+
+    def _check_operands(self, instr: Instruction, arg_count: int, name: str):
+        if instr.op == OpCode.LOAD_CONST and self.constants is not None:
+            if instr.operands[0] >= len(self.constants):
+                raise VerificationError(
+                    f"Constant index {instr.operands[0]} out of range", function=name, offset=instr.offset
+                )
+        elif instr.op == OpCode.LOAD_ARG and instr.operands[0] >= arg_count and name != '<module>':
+            raise VerificationError(
+                f"Argument index {instr.operands[0]} out of range", function=name, offset=instr.offset
+            )
+
+def verify_bytecode(bytecode: bytes, constants: Optional[Sequence[Any]] = None,
+                    arg_count: int = 0, name: str = '<module>') -> VerificationResult:
+    """Verify a single bytecode buffer"""
+    return BytecodeVerifier(constants).verify(bytecode, arg_count, name)
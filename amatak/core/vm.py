@@ -1,11 +1,13 @@
 import struct
+import time
 from enum import Enum, auto
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
-from ..errors import AmatakRuntimeError
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
+from dataclasses import dataclass, field
+from ..errors import AmatakRuntimeError, VerificationError
 from ..runtime.memory.allocator import MemoryAllocator
 from ..runtime.types.core import AmatakType, DynamicType
-from .jit import JITCompiler
+
+_UNBOUND = object()
 
 class OpCode(Enum):
     """Bytecode operation codes"""
@@ -28,6 +30,82 @@ class OpCode(Enum):
     MAKE_ARRAY = auto()
     ARRAY_GET = auto()
     ARRAY_SET = auto()
+    POP = auto()
+    PRINT = auto()
+    BINARY_MOD = auto()
+    COMPARE_NE = auto()
+    COMPARE_LE = auto()
+    COMPARE_GE = auto()
+
+# Operand encoding per opcode: 'B' u8, 'H' u16, 'h' i16, 's' u16-length
+# prefixed UTF-8 string, 'c' inline code whose length is the preceding 'H'
+OPERANDS: Dict[OpCode, str] = {
+    OpCode.LOAD_CONST: 'H',
+    OpCode.LOAD_VAR: 's',
+    OpCode.STORE_VAR: 's',
+    OpCode.LOAD_ARG: 'B',
+    OpCode.CALL_FUNCTION: 'sB',
+    OpCode.JUMP: 'h',
+    OpCode.JUMP_IF_FALSE: 'h',
+    OpCode.MAKE_FUNCTION: 'sBHcB',
+    OpCode.MAKE_ARRAY: 'H',
+}
+
+@dataclass
+class Instruction:
+    """A decoded bytecode instruction"""
+    offset: int
+    op: OpCode
+    operands: Tuple[Any, ...]
+    size: int
+
+    @property
+    def next_offset(self) -> int:
+        return self.offset + self.size
+
+def decode_instruction(bytecode: bytes, offset: int) -> Instruction:
+    """Decode the instruction at ``offset``, rejecting truncated operands"""
+    end = len(bytecode)
+    try:
+        op = OpCode(bytecode[offset])
+    except ValueError:
+        raise VerificationError(f"Invalid opcode {bytecode[offset]}", offset=offset)
+    pos = offset + 1
+    operands = []
+    for kind in OPERANDS.get(op, ''):
+        if kind == 'B':
+            width = 1
+        elif kind in 'Hh':
+            width = 2
+        elif kind == 's':
+            if pos + 2 > end:
+                raise VerificationError(f"Truncated {op.name} operand", offset=offset)
+            width = 2 + struct.unpack_from('>H', bytecode, pos)[0]
+        else:
+            width = operands[-1]
+        if pos + width > end:
+            raise VerificationError(f"Truncated {op.name} operand", offset=offset)
+        if kind == 'B':
+            operands.append(bytecode[pos])
+        elif kind in 'Hh':
+            operands.append(struct.unpack_from('>' + kind, bytecode, pos)[0])
+        elif kind == 's':
+            try:
+                operands.append(str(bytecode[pos + 2:pos + width], 'utf-8'))
+            except UnicodeDecodeError:
+                raise VerificationError(f"Invalid UTF-8 in {op.name} operand", offset=offset)
+        else:
+            operands.append(bytecode[pos:pos + width])
+        pos += width
+    return Instruction(offset, op, tuple(operands), pos - offset)
+
+def iter_instructions(bytecode: bytes) -> Iterator[Instruction]:
+    """Linearly decode every instruction in a bytecode buffer"""
+    offset = 0
+    while offset < len(bytecode):
+        instr = decode_instruction(bytecode, offset)
+        yield instr
+        offset = instr.next_offset
 
 @dataclass
 class Function:
@@ -36,47 +114,64 @@ class Function:
     bytecode: bytes
     constants: List[Any]
     local_count: int
-    returns: AmatakType = DynamicType()
+    returns: AmatakType = field(default_factory=DynamicType)
+    # Proven parameter types, set by ``ProgramTypes.annotate`` (empty if unknown)
+    param_types: Tuple[AmatakType, ...] = ()
+    # Filled in by the bytecode verifier
+    max_stack: int = 0
+    verified: bool = False
+    # Optimized entry point installed by the tiering JIT (see core.pytier)
+    tier: Optional[Callable] = field(default=None, repr=False, compare=False)
+
+@dataclass
+class InlineCache:
+    """Per-site cache for CALL_FUNCTION and LOAD_VAR
+
+    ``stamp`` is the VM version object the entry was filled under; the
+    entry is valid only while it is the *same object* as the VM's current
+    stamp, so a hit costs a single identity check. ``next_pc`` lets a hit
+    skip decoding the site's operands.
+    """
+    stamp: Any = None
+    target: Any = None
+    next_pc: int = 0
+    hits: int = 0
+    misses: int = 0
 
 class VM:
-    def __init__(self, jit_enabled: bool = True):
+    # Bytecode objects tracked in the inline cache and verified-code tables
+    MAX_CODE_ENTRIES = 1024
+
+    def __init__(self, jit_enabled: bool = True, verify: bool = True, jit_cache=None):
         self.stack: List[Any] = []
         self.frames: List[Dict[str, Any]] = [{}]
         self.functions: Dict[str, Function] = {}
         self.constants: List[Any] = []
         self.memory = MemoryAllocator()
-        self.jit = JITCompiler(self) if jit_enabled else None
         self.current_function: Optional[Function] = None
         self.pc = 0  # Program counter
         self.running = False
 
-    def execute(self, bytecode: bytes) -> Any:
-        """Execute bytecode in the VM"""
-        self.running = True
-        self.pc = 0
-        
-        try:
-            while self.running and self.pc < len(bytecode):
-                op = OpCode(bytecode[self.pc])
-                self.pc += 1
-                self._dispatch(op, bytecode)
-                
-                # Check for JIT opportunities
-                if self.jit and self.current_function:
-                    self.jit.record_call(self.current_function.name)
-                    if self.jit.should_compile(self.current_function.name):
-                        self.jit.compile_function(
-                            self.current_function.name,
-                            self.current_function.bytecode
-                        )
-        except Exception as e:
-            raise AmatakRuntimeError(f"VM execution error: {str(e)}")
-        
-        return self.stack.pop() if self.stack else None
+        # Inline caches, keyed by id(bytecode) -> (bytecode, {site_pc: cache}).
+        # The bytecode object is kept so a recycled id can never alias a site;
+        # bytes cannot be weakly referenced, so the table is capped instead
+        # (see _remember).
+        self._inline_caches: Dict[int, Tuple[bytes, Dict[int, InlineCache]]] = {}
+        self._site_caches: Dict[int, InlineCache] = {}
+        # Version stamps: replaced (never mutated) on invalidation
+        self._call_stamp = object()
+        self._global_stamp = object()
 
-    def _dispatch(self, op: OpCode, bytecode: bytes):
-        """Dispatch to operation handlers"""
-        handlers = {
+        # Bytecode objects proven safe by the verifier, keyed like the caches
+        self.verify_bytecode = verify
+        self._verified: Dict[int, Any] = {}
+
+        # Opt-in opcode histogram (see enable_counters)
+        self.counters = None
+        # Opt-in result cache for pure functions (see enable_memoization)
+        self.memo = None
+
+        self._handlers = {
             OpCode.LOAD_CONST: self._load_const,
             OpCode.LOAD_VAR: self._load_var,
             OpCode.STORE_VAR: self._store_var,
@@ -96,8 +191,182 @@ class VM:
             OpCode.MAKE_ARRAY: self._make_array,
             OpCode.ARRAY_GET: self._array_get,
             OpCode.ARRAY_SET: self._array_set,
+            OpCode.POP: self._pop,
+            OpCode.PRINT: self._print,
+            OpCode.BINARY_MOD: self._binary_mod,
+            OpCode.COMPARE_NE: self._compare_ne,
+            OpCode.COMPARE_LE: self._compare_le,
+            OpCode.COMPARE_GE: self._compare_ge,
+        }
+        # Raw opcode byte -> handler, for verified code that skips OpCode()
+        self._opcode_table = [None] * (max(op.value for op in OpCode) + 1)
+        for op, handler in self._handlers.items():
+            self._opcode_table[op.value] = handler
+
+        # Imported here: the JIT module itself depends on OpCode and VM.
+        # The context counts calls and promotes hot functions between tiers;
+        # self.jit is its native backend.
+        from .jit import JITContext
+        self.jit_context = JITContext(self, cache=jit_cache) if jit_enabled else None
+        self.jit = self.jit_context.jit if self.jit_context else None
+
+    def execute(self, bytecode: bytes) -> Any:
+        """Execute bytecode in the VM"""
+        self.running = True
+        self.pc = 0
+        self._site_caches = self._caches_for(bytecode)
+        
+        if self.counters is not None:
+            return self._execute_counted(bytecode)
+        if self._is_verified(bytecode):
+            return self._execute_verified(bytecode)
+        
+        try:
+            while self.running and self.pc < len(bytecode):
+                op = OpCode(bytecode[self.pc])
+                self.pc += 1
+                self._dispatch(op, bytecode)
+
+        except AmatakRuntimeError:
+            raise
+        except Exception as e:
+            raise AmatakRuntimeError(f"VM execution error: {str(e)}")
+        
+        return self.stack.pop() if self.stack else None
+
+    def _execute_verified(self, bytecode: bytes) -> Any:
+        """Interpreter loop for verifier-approved bytecode
+
+        Opcodes and operand bounds were checked at load time and control
+        cannot fall off the end, so the loop skips OpCode() validation and
+        the per-instruction length check.
+        """
+        handlers = self._opcode_table
+        try:
+            while self.running:
+                op = bytecode[self.pc]
+                self.pc += 1
+                handlers[op](bytecode)
+
+        except AmatakRuntimeError:
+            raise
+        except Exception as e:
+            raise AmatakRuntimeError(f"VM execution error: {str(e)}")
+        
+        return self.stack.pop() if self.stack else None
+
+    def _execute_counted(self, bytecode: bytes) -> Any:
+        """Interpreter loop that feeds the opcode histogram"""
+        counters = self.counters
+        clock = time.perf_counter_ns
+        prev = None
+        try:
+            while self.running and self.pc < len(bytecode):
+                raw = bytecode[self.pc]
+                op = OpCode(raw)
+                self.pc += 1
+                start = clock()
+                self._dispatch(op, bytecode)
+                counters.record(prev, raw, clock() - start)
+                prev = raw
+
+        except AmatakRuntimeError:
+            raise
+        except Exception as e:
+            raise AmatakRuntimeError(f"VM execution error: {str(e)}")
+        
+        return self.stack.pop() if self.stack else None
+
+    def enable_counters(self):
+        """Start recording per-opcode and opcode-pair counts and times"""
+        from .opstats import OpcodeCounter
+        if self.counters is None:
+            self.counters = OpcodeCounter()
+        return self.counters
+
+    def disable_counters(self) -> None:
+        """Stop recording and return to the uninstrumented loops"""
+        self.counters = None
+
+    def enable_memoization(self, max_size: int = 256):
+        """Cache results of pure functions (see core.purity), at most
+        ``max_size`` per function; returns the cache, whose ``stats()``
+        reports hit rates"""
+        from .purity import MemoCache
+        if self.memo is None or self.memo.max_size != max_size:
+            self.memo = MemoCache(self, max_size)
+            # Tiered call sites hold direct references to their callees
+            self.invalidate_call_sites()
+        return self.memo
+
+    def disable_memoization(self) -> None:
+        """Stop caching and drop cached results"""
+        if self.memo is not None:
+            self.memo = None
+            self.invalidate_call_sites()
+
+    def verify(self, module) -> None:
+        """Verify a module's bytecode and mark it for the fast loop"""
+        from .verifier import BytecodeVerifier
+        BytecodeVerifier(module.constants).verify_module(module)
+        self._mark_verified(module.code)
+        for func in module.functions:
+            self._mark_verified(func.bytecode)
+
+    def _mark_verified(self, bytecode: bytes) -> None:
+        # Code dropped from the table runs on the checked loop
+        self._remember(self._verified, id(bytecode), bytecode)
+
+    def _is_verified(self, bytecode: bytes) -> bool:
+        return self._verified.get(id(bytecode)) is bytecode
+
+    def _dispatch(self, op: OpCode, bytecode: bytes):
+        """Dispatch to operation handlers"""
+        self._handlers[op](bytecode)
+
+    def _caches_for(self, bytecode: bytes) -> Dict[int, InlineCache]:
+        """Get the inline cache table for a bytecode object"""
+        entry = self._inline_caches.get(id(bytecode))
+        if entry is None or entry[0] is not bytecode:
+            entry = (bytecode, {})
+            self._remember(self._inline_caches, id(bytecode), entry)
+        return entry[1]
+
+    def _remember(self, table: Dict[int, Any], key: int, value: Any) -> None:
+        """Add to a per-bytecode table, dropping the oldest entries beyond
+        ``MAX_CODE_ENTRIES`` (they are rebuilt if that code runs again)"""
+        table.pop(key, None)
+        while len(table) >= self.MAX_CODE_ENTRIES:
+            del table[next(iter(table))]
+        table[key] = value
+
+    def _site_cache(self, site: int) -> InlineCache:
+        """Get (or create) the inline cache for an instruction site"""
+        cache = self._site_caches.get(site)
+        if cache is None:
+            cache = self._site_caches[site] = InlineCache()
+        return cache
+
+    def invalidate_call_sites(self) -> None:
+        """Invalidate every call-site cache (function defined or JIT-compiled)"""
+        self._call_stamp = object()
+
+    def invalidate_global_sites(self) -> None:
+        """Invalidate every global load-site cache"""
+        self._global_stamp = object()
+
+    def get_cache_stats(self) -> dict:
+        """Get inline cache hit/miss counters"""
+        sites = [
+            cache
+            for _, caches in self._inline_caches.values()
+            for cache in caches.values()
+        ]
+        return {
+            'sites': len(sites),
+            'hits': sum(c.hits for c in sites),
+            'misses': sum(c.misses for c in sites),
         }
-        handlers[op](bytecode)
 
     def _load_const(self, bytecode: bytes):
         """Load constant onto stack"""
@@ -106,17 +375,40 @@ class VM:
 
     def _load_var(self, bytecode: bytes):
         """Load variable onto stack"""
+        cache = self._site_cache(self.pc)
+        if cache.stamp is self._global_stamp:
+            cache.hits += 1
+            self.pc = cache.next_pc
+            self.stack.append(cache.target)
+            return
+
+        cache.misses += 1
         var_name = self._read_string(bytecode)
-        for frame in reversed(self.frames):
+        for depth, frame in enumerate(reversed(self.frames)):
             if var_name in frame:
-                self.stack.append(frame[var_name])
+                value = frame[var_name]
+                if depth == len(self.frames) - 1:
+                    # Resolved in the global frame: cacheable until rebound
+                    cache.stamp = self._global_stamp
+                    cache.target = value
+                    cache.next_pc = self.pc
+                self.stack.append(value)
                 return
         raise AmatakRuntimeError(f"Undefined variable: {var_name}")
 
     def _store_var(self, bytecode: bytes):
         """Store top of stack in variable"""
         var_name = self._read_string(bytecode)
-        self.frames[-1][var_name] = self.stack[-1]
+        frame = self.frames[-1]
+        value = self.stack[-1]
+        if frame is self.frames[0]:
+            # Rebinding a global
+            if frame.get(var_name, _UNBOUND) is not value:
+                self.invalidate_global_sites()
+        elif var_name not in frame and var_name in self.frames[0]:
+            # A new local now shadows a cached global
+            self.invalidate_global_sites()
+        frame[var_name] = value
 
     def _load_arg(self, bytecode: bytes):
         """Load function argument"""
@@ -125,59 +417,147 @@ class VM:
 
     def _call_function(self, bytecode: bytes):
         """Call a function"""
-        func_name = self._read_string(bytecode)
-        arg_count = self._read_uint8(bytecode)
-        
-        # Try JIT first if available
-        if self.jit and func_name in self.jit.compiled_functions:
+        cache = self._site_cache(self.pc)
+        if cache.stamp is self._call_stamp:
+            cache.hits += 1
+            self.pc = cache.next_pc
+            func = cache.target
+            arg_count = func.arg_count
+        else:
+            cache.misses += 1
+            func_name = self._read_string(bytecode)
+            arg_count = self._read_uint8(bytecode)
+            func = self._resolve_function(func_name, arg_count)
+            cache.stamp = self._call_stamp
+            cache.target = func
+            cache.next_pc = self.pc
+
+        if arg_count:
             args = self.stack[-arg_count:]
-            result = self.jit.execute_native(func_name, *args)
-            self.stack = self.stack[:-arg_count] + [result]
-            return
-        
-        # Fall back to interpreted mode
-        if func_name not in self.functions:
-            raise AmatakRuntimeError(f"Undefined function: {func_name}")
-        
-        func = self.functions[func_name]
-        if arg_count != func.arg_count:
-            raise AmatakRuntimeError(
-                f"Function {func_name} expects {func.arg_count} args, got {arg_count}"
-            )
-        
-        # Setup new frame
+            del self.stack[-arg_count:]
+        else:
+            args = []
+        self.stack.append(self._invoke(func, args))
+
+    def _invoke(self, func: Function, args) -> Any:
+        """Run a function, from the memoization cache if possible"""
+        memo = self.memo
+        if memo is not None:
+            key = memo.key(func, args)
+            if key is not None:
+                result = memo.get(func.name, key)
+                if result is memo.MISSING:
+                    result = self._run_function(func, args)
+                    memo.put(func.name, key, result)
+                return result
+        return self._run_function(func, args)
+
+    def _run_function(self, func: Function, args) -> Any:
+        """Run a function in its best available tier"""
+        context = self.jit_context
+        if context is not None and func.tier is None:
+            context.record_call(func.name)
+            if context.should_compile(func.name):
+                context.promote(func)
+        if func.tier is not None:
+            from .pytier import TierDeopt
+            try:
+                return func.tier(*args)
+            except TierDeopt:
+                context.deoptimize(func)
+        return self._interpret(func, args)
+
+    def _interpret(self, func: Function, args) -> Any:
+        """Run a function on the bytecode interpreter"""
         new_frame = {}
-        for i in range(arg_count):
-            new_frame[f"arg{i}"] = self.stack[-arg_count + i]
+        for i, arg in enumerate(args):
+            new_frame[f"arg{i}"] = arg
+        if self._shadows_globals(new_frame):
+            self.invalidate_global_sites()
         
         self.frames.append(new_frame)
-        self.current_function = func
         
         # Save state
         saved_pc = self.pc
-        saved_stack = self.stack[:-arg_count]
+        saved_stack = self.stack
+        saved_caches = self._site_caches
+        saved_function = self.current_function
+        self.current_function = func
         
         # Execute function
         self.stack = []
         self.pc = 0
-        self.execute(func.bytecode)
-        result = self.stack.pop() if self.stack else None
+        try:
+            return self.execute(func.bytecode)
+        finally:
+            # Restore state
+            self.stack = saved_stack
+            self.frames.pop()
+            self.pc = saved_pc
+            self._site_caches = saved_caches
+            self.current_function = saved_function
+            self.running = True
+
+    def tier_call(self, site: list, func_name: str, args: tuple) -> Any:
+        """Call-site miss path for tiered code
+
+        Resolves the callee and fills ``site`` with ``[call stamp, target]``
+        so later calls from the same site go straight to the target.
+        """
+        func = self._resolve_function(func_name, len(args))
+        if func.tier is not None and not (self.memo is not None and self.memo.is_pure(func)):
+            target = func.tier
+        else:
+            target = lambda *a: self._invoke(func, a)
+        site[0] = self._call_stamp
+        site[1] = target
+        return target(*args)
+
+    def lookup_var(self, name: str) -> Any:
+        """Resolve a variable through the frame chain"""
+        for frame in reversed(self.frames):
+            if name in frame:
+                return frame[name]
+        raise AmatakRuntimeError(f"Undefined variable: {name}")
+
+    def gc_roots(self):
+        """Values on the operand stack and in every frame, for GC root discovery"""
+        yield from self.stack
+        for frame in self.frames:
+            yield from frame.values()
+
+    def _resolve_function(self, func_name: str, arg_count: int) -> Function:
+        """Resolve a call target by name (inline cache miss path)"""
+        if func_name not in self.functions:
+            raise AmatakRuntimeError(f"Undefined function: {func_name}")
         
-        # Restore state
-        self.stack = saved_stack + [result]
-        self.frames.pop()
-        self.pc = saved_pc
-        self.current_function = None
+        func = self.functions[func_name]
+        if arg_count != func.arg_count:
+            raise AmatakRuntimeError(
+                f"Function {func_name} expects {func.arg_count} args, got {arg_count}"
+            )
+        return func
+
+    def _shadows_globals(self, frame: Dict[str, Any]) -> bool:
+        """Check whether a new frame hides any global binding"""
+        if not frame:
+            return False
+        globals_ = self.frames[0]
+        return any(name in globals_ for name in frame)
 
     def _return(self, bytecode: bytes):
         """Return from function"""
         self.running = False
 
     def _binary_add(self, bytecode: bytes):
-        """Binary addition"""
+        """Binary addition; numbers are converted when concatenated with
+        strings, as in the tree interpreter"""
         right = self.stack.pop()
         left = self.stack.pop()
-        self.stack.append(left + right)
+        if isinstance(left, str) or isinstance(right, str):
+            self.stack.append(str(left) + str(right))
+        else:
+            self.stack.append(left + right)
 
     def _binary_sub(self, bytecode: bytes):
         """Binary subtraction"""
@@ -197,6 +577,12 @@ class VM:
         left = self.stack.pop()
         self.stack.append(left / right)
 
+    def _binary_mod(self, bytecode: bytes):
+        """Binary modulo"""
+        right = self.stack.pop()
+        left = self.stack.pop()
+        self.stack.append(left % right)
+
     def _compare_eq(self, bytecode: bytes):
         """Equality comparison"""
         right = self.stack.pop()
@@ -215,6 +601,24 @@ class VM:
         left = self.stack.pop()
         self.stack.append(left < right)
 
+    def _compare_ne(self, bytecode: bytes):
+        """Inequality comparison"""
+        right = self.stack.pop()
+        left = self.stack.pop()
+        self.stack.append(left != right)
+
+    def _compare_le(self, bytecode: bytes):
+        """Less than or equal comparison"""
+        right = self.stack.pop()
+        left = self.stack.pop()
+        self.stack.append(left <= right)
+
+    def _compare_ge(self, bytecode: bytes):
+        """Greater than or equal comparison"""
+        right = self.stack.pop()
+        left = self.stack.pop()
+        self.stack.append(left >= right)
+
     def _jump(self, bytecode: bytes):
         """Unconditional jump"""
         offset = self._read_int16(bytecode)
@@ -234,13 +638,19 @@ class VM:
         func_bytecode = bytecode[self.pc:self.pc + bytecode_len]
         self.pc += bytecode_len
         
-        self.functions[name] = Function(
+        func = Function(
             name=name,
             arg_count=arg_count,
             bytecode=func_bytecode,
-            constants=self.constants.copy(),
+            constants=self.constants,
             local_count=self._read_uint8(bytecode)
         )
+        if self._is_verified(bytecode):
+            # Nested bodies are verified together with their enclosing code
+            func.verified = True
+            self._mark_verified(func_bytecode)
+        self.functions[name] = func
+        self.invalidate_call_sites()
 
     def _make_array(self, bytecode: bytes):
         """Create array"""
@@ -262,6 +672,14 @@ class VM:
         array[index] = value
         self.stack.append(value)
 
+    def _pop(self, bytecode: bytes):
+        """Discard top of stack"""
+        self.stack.pop()
+
+    def _print(self, bytecode: bytes):
+        """Print top of stack"""
+        print(str(self.stack.pop()), flush=True)
+
     def _read_uint8(self, bytecode: bytes) -> int:
         """Read unsigned 8-bit integer"""
         val = bytecode[self.pc]
@@ -283,10 +701,36 @@ class VM:
     def _read_string(self, bytecode: bytes) -> str:
         """Read length-prefixed string"""
         length = self._read_uint16(bytecode)
-        val = bytecode[self.pc:self.pc + length].decode('utf-8')
+        val = str(bytecode[self.pc:self.pc + length], 'utf-8')
         self.pc += length
         return val
 
+    def run_module(self, module) -> Any:
+        """Execute a compiled module (CompiledModule or mapped AKCModule)
+
+        The module's constant pool becomes the VM pool and its functions are
+        registered as-is; bytecode is executed in place without copying.
+        With a JIT cache, functions that were hot in earlier runs start in
+        their tier and this run's profile is saved afterwards.
+        """
+        if self.verify_bytecode:
+            self.verify(module)
+        self.constants = module.constants
+        for func in module.functions:
+            self.functions[func.name] = func
+        self.invalidate_call_sites()
+        if self.jit_context:
+            self.jit_context.preload(module.functions)
+        result = self.execute(module.code)
+        if self.jit_context:
+            self.jit_context.save_profiles()
+        return result
+
+    def run_file(self, path: str, verify: bool = False) -> Any:
+        """Map and execute an .akc file (``verify`` checksums the whole file)"""
+        from .akc import load_module
+        return self.run_module(load_module(path, verify=verify))
+
     def get_function_bytecode(self, func_name: str) -> Optional[bytes]:
         """Get bytecode for a function (for JIT compilation)"""
         if func_name in self.functions:
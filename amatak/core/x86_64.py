@@ -0,0 +1,681 @@
+"""x86-64 (System V) code generation for the native JIT tier
+
+Only pure numeric functions are compiled: locals, int and float
+arithmetic, comparisons, branches/loops and calls to other natively
+compiled functions. Anything else raises ``NativeUnsupported`` and the
+function stays on the Python tier.
+
+Every value lives in a 16-byte frame slot holding an 8-byte payload and an
+8-byte tag (``TAG_INT``, ``TAG_FLOAT``, ``TAG_BOOL``). Types are inferred
+statically from the argument signature; where paths merge an int and a
+float the slot becomes ``NUM`` and operations dispatch on the tag at run
+time. Because native functions have no side effects, any guard failure
+(int overflow, division by zero, an unexpected tag, an int too large to
+convert to a double exactly, excessive recursion) simply returns status 1
+and the caller re-runs the call in the VM.
+
+Native ABI: ``int64 f(int64 *args, int64 *out)`` where ``args`` holds
+``(payload, tag)`` pairs and the result pair is written to ``out``; the
+return value is 0 on success and 1 to request deoptimization.
+"""
+import struct
+from typing import Callable, Dict, List, Optional, Tuple
+from ..errors import VerificationError
+from .vm import OpCode, Function, Instruction
+from .verifier import BytecodeVerifier, successors
+
+TAG_INT = 0
+TAG_FLOAT = 1
+TAG_BOOL = 2
+
+# Static value types
+INT = 'i'
+FLOAT = 'f'
+BOOL = 'b'
+NUM = 'n'   # int or float, decided by the tag at run time
+
+MAX_DEPTH = 10000
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+# Largest magnitude an int can have and still convert to a double exactly
+EXACT_INT = 1 << 53
+
+# Registers
+RAX, RCX, RDX, RBX, RSP, RBP, RSI, RDI = range(8)
+XMM0, XMM1, XMM2 = 0, 1, 2
+
+# Condition codes (low nibble of Jcc/SETcc)
+CC_O, CC_E, CC_NE, CC_BE, CC_A, CC_S, CC_NS, CC_P, CC_NP = 0x0, 0x4, 0x5, 0x6, 0x7, 0x8, 0x9, 0xA, 0xB
+CC_L, CC_GE, CC_LE, CC_G, CC_AE, CC_B = 0xC, 0xD, 0xE, 0xF, 0x3, 0x2
+
+_ARITH = {OpCode.BINARY_ADD, OpCode.BINARY_SUB, OpCode.BINARY_MUL}
+_COMPARE = {OpCode.COMPARE_EQ, OpCode.COMPARE_NE, OpCode.COMPARE_LT,
+            OpCode.COMPARE_LE, OpCode.COMPARE_GT, OpCode.COMPARE_GE}
+# Signed integer condition for each comparison
+_INT_CC = {OpCode.COMPARE_EQ: CC_E, OpCode.COMPARE_NE: CC_NE, OpCode.COMPARE_LT: CC_L,
+           OpCode.COMPARE_LE: CC_LE, OpCode.COMPARE_GT: CC_G, OpCode.COMPARE_GE: CC_GE}
+
+SUPPORTED = {
+    OpCode.LOAD_CONST, OpCode.LOAD_VAR, OpCode.STORE_VAR, OpCode.LOAD_ARG,
+    OpCode.RETURN, OpCode.BINARY_DIV, OpCode.BINARY_MOD, OpCode.JUMP,
+    OpCode.JUMP_IF_FALSE, OpCode.CALL_FUNCTION, OpCode.POP,
+} | _ARITH | _COMPARE
+
+class NativeUnsupported(Exception):
+    """The function is outside the natively compiled subset"""
+    pass
+
+def value_type(value) -> Optional[str]:
+    """Static type of a Python value, or None if it has no native form"""
+    if isinstance(value, bool):
+        return BOOL
+    if isinstance(value, int):
+        return INT if INT64_MIN <= value <= INT64_MAX else None
+    if isinstance(value, float):
+        return FLOAT
+    return None
+
+def encode_value(value) -> Tuple[int, int]:
+    """(payload, tag) for a native value"""
+    if isinstance(value, bool):
+        return int(value), TAG_BOOL
+    if isinstance(value, int):
+        return value, TAG_INT
+    return struct.unpack('<q', struct.pack('<d', value))[0], TAG_FLOAT
+
+def decode_value(payload: int, tag: int):
+    """Python value for a (payload, tag) pair"""
+    if tag == TAG_INT:
+        return payload
+    if tag == TAG_FLOAT:
+        return struct.unpack('<d', struct.pack('<q', payload))[0]
+    return bool(payload)
+
+def merge_types(a: Optional[str], b: Optional[str]) -> str:
+    if a is None:
+        return b
+    if b is None or a == b:
+        return a
+    if BOOL in (a, b):
+        raise NativeUnsupported("value is a bool on one path and a number on another")
+    return NUM
+
+class Assembler:
+    """Minimal x86-64 encoder for the instruction forms the JIT emits
+
+    Memory operands are always ``[base + disp32]`` with a base other than
+    rsp, which keeps every ModRM encoding SIB-free.
+    """
+
+    def __init__(self):
+        self.code = bytearray()
+        self.labels: Dict[object, int] = {}
+        self.fixups: List[Tuple[int, object]] = []
+        # [offset, kind, *details] for every absolute address in the code
+        self.relocations: List[list] = []
+
+    # Encoding helpers
+
+    def _mem(self, reg: int, base: int, disp: int) -> bytes:
+        return bytes([0x80 | (reg << 3) | base]) + struct.pack('<i', disp)
+
+    def _rex_op(self, opcode: bytes, reg: int, base: int, disp: int):
+        self.code += b'\x48' + opcode + self._mem(reg, base, disp)
+
+    def _sse(self, prefix: int, opcode: int, reg: int, base: int, disp: int, rex_w: bool = False):
+        self.code += bytes([prefix]) + (b'\x48' if rex_w else b'') + bytes([0x0F, opcode]) + self._mem(reg, base, disp)
+
+    # Labels
+
+    def label(self, name):
+        self.labels[name] = len(self.code)
+
+    def _rel32(self, name):
+        self.fixups.append((len(self.code), name))
+        self.code += b'\x00\x00\x00\x00'
+
+    def jmp(self, name):
+        self.code += b'\xE9'
+        self._rel32(name)
+
+    def jcc(self, cc: int, name):
+        self.code += bytes([0x0F, 0x80 | cc])
+        self._rel32(name)
+
+    def finish(self) -> bytes:
+        for at, name in self.fixups:
+            target = self.labels[name]
+            self.code[at:at + 4] = struct.pack('<i', target - (at + 4))
+        return bytes(self.code)
+
+    # Integer instructions
+
+    def load(self, reg: int, base: int, disp: int):
+        self._rex_op(b'\x8B', reg, base, disp)           # mov reg, [base+disp]
+
+    def store(self, base: int, disp: int, reg: int):
+        self._rex_op(b'\x89', reg, base, disp)           # mov [base+disp], reg
+
+    def store_imm(self, base: int, disp: int, imm: int):
+        self._rex_op(b'\xC7', 0, base, disp)             # mov qword [base+disp], imm32
+        self.code += struct.pack('<i', imm)
+
+    def mov_imm64(self, reg: int, imm: int):
+        self.code += bytes([0x48, 0xB8 + reg]) + struct.pack('<q', imm)
+
+    def mov_reloc(self, reg: int, address: int, *target):
+        """mov reg, imm64 with the immediate recorded as a relocation"""
+        self.relocations.append([len(self.code) + 2, *target])
+        self.mov_imm64(reg, address)
+
+    def mov_imm32(self, reg: int, imm: int):
+        self.code += bytes([0xB8 + reg]) + struct.pack('<i', imm)
+
+    def lea(self, reg: int, base: int, disp: int):
+        self._rex_op(b'\x8D', reg, base, disp)
+
+    def add(self, reg: int, base: int, disp: int):
+        self._rex_op(b'\x03', reg, base, disp)
+
+    def sub(self, reg: int, base: int, disp: int):
+        self._rex_op(b'\x2B', reg, base, disp)
+
+    def imul(self, reg: int, base: int, disp: int):
+        self.code += b'\x48\x0F\xAF' + self._mem(reg, base, disp)
+
+    def or_(self, reg: int, base: int, disp: int):
+        self._rex_op(b'\x0B', reg, base, disp)
+
+    def cmp(self, reg: int, base: int, disp: int):
+        self._rex_op(b'\x3B', reg, base, disp)
+
+    def cmp_imm8(self, base: int, disp: int, imm: int):
+        self._rex_op(b'\x83', 7, base, disp)             # cmp qword [base+disp], imm8
+        self.code += struct.pack('<b', imm)
+
+    def reg_reg(self, opcode: int, dst: int, src: int):
+        # add/sub/xor/test/mov-style "op r/m64, r64" with both operands registers
+        self.code += bytes([0x48, opcode, 0xC0 | (src << 3) | dst])
+
+    def cmp_reg_imm8(self, reg: int, imm: int):
+        self.code += bytes([0x48, 0x83, 0xF8 | reg]) + struct.pack('<b', imm)
+
+    def cmp_mem_imm32(self, base: int, imm: int):
+        self.code += bytes([0x48, 0x81, 0x38 | base]) + struct.pack('<i', imm)
+
+    def inc_mem(self, base: int):
+        self.code += bytes([0x48, 0xFF, base])
+
+    def dec_mem(self, base: int):
+        self.code += bytes([0x48, 0xFF, 0x08 | base])
+
+    def setcc(self, cc: int, reg8: int):
+        self.code += bytes([0x0F, 0x90 | cc, 0xC0 | reg8])
+
+    def movzx_eax_al(self):
+        self.code += b'\x0F\xB6\xC0'
+
+    def cqo(self):
+        self.code += b'\x48\x99'
+
+    def idiv(self, reg: int):
+        self.code += bytes([0x48, 0xF7, 0xF8 | reg])
+
+    def call_mem(self, base: int):
+        self.code += bytes([0xFF, 0x10 | base])          # call qword [base]
+
+    def test_eax(self):
+        self.code += b'\x85\xC0'
+
+    def prologue(self, frame_size: int):
+        self.code += b'\x55'                             # push rbp
+        self.code += b'\x48\x89\xE5'                     # mov rbp, rsp
+        self.code += b'\x48\x81\xEC' + struct.pack('<i', frame_size)  # sub rsp, imm32
+
+    def epilogue(self):
+        self.code += b'\xC9\xC3'                         # leave; ret
+
+    # SSE2
+
+    def movsd_load(self, xmm: int, base: int, disp: int):
+        self._sse(0xF2, 0x10, xmm, base, disp)
+
+    def movsd_store(self, base: int, disp: int, xmm: int):
+        self._sse(0xF2, 0x11, xmm, base, disp)
+
+    def cvtsi2sd(self, xmm: int, base: int, disp: int):
+        self._sse(0xF2, 0x2A, xmm, base, disp, rex_w=True)
+
+    def sse_rr(self, prefix: int, opcode: int, dst: int, src: int):
+        self.code += bytes([prefix, 0x0F, opcode, 0xC0 | (dst << 3) | src])
+
+    def float_op(self, opcode: int):
+        self.sse_rr(0xF2, opcode, XMM0, XMM1)           # {add,sub,mul,div}sd xmm0, xmm1
+
+    def ucomisd(self, a: int, b: int):
+        self.sse_rr(0x66, 0x2E, a, b)
+
+    def xorpd(self, dst: int, src: int):
+        self.sse_rr(0x66, 0x57, dst, src)
+
+_FLOAT_OPS = {OpCode.BINARY_ADD: 0x58, OpCode.BINARY_SUB: 0x5C, OpCode.BINARY_MUL: 0x59, OpCode.BINARY_DIV: 0x5E}
+_INT_OPS = {OpCode.BINARY_ADD: 'add', OpCode.BINARY_SUB: 'sub', OpCode.BINARY_MUL: 'imul'}
+
+class NativeCodegen:
+    """Compiles one function for one argument signature
+
+    ``resolve_call(name, arg_types)`` returns ``(cell_address, return_type)``
+    for a callee compiled for those argument types, where the cell holds
+    the callee's entry address; it raises ``NativeUnsupported`` when the
+    callee cannot be compiled.
+    """
+
+    def __init__(self, func: Function, signature: Tuple[str, ...], constants,
+                 resolve_call: Callable, depth_address: int):
+        self.func = func
+        self.signature = signature
+        self.constants = constants
+        self.resolve_call = resolve_call
+        self.depth_address = depth_address
+        self.return_type: Optional[str] = None
+        self.calls: List[str] = []
+        self.relocations: List[list] = []
+
+    def compile(self) -> bytes:
+        func = self.func
+        try:
+            result = BytecodeVerifier(self.constants).verify(func.bytecode, func.arg_count, func.name)
+        except VerificationError as e:
+            raise NativeUnsupported(str(e))
+        self.instructions = result.instructions
+        for instr in self.instructions.values():
+            if instr.op not in SUPPORTED:
+                raise NativeUnsupported(f"{instr.op.name} is not supported natively")
+            if instr.op == OpCode.RETURN and result.depths[instr.offset] == 0:
+                raise NativeUnsupported("function can return None")
+
+        names = [f'arg{i}' for i in range(func.arg_count)]
+        for instr in self.instructions.values():
+            if instr.op == OpCode.STORE_VAR and instr.operands[0] not in names:
+                names.append(instr.operands[0])
+        self.local_slots = {name: i for i, name in enumerate(names)}
+        self.stack_base = len(names)
+        self.slot_count = self.stack_base + result.max_stack
+
+        self.states = self._infer_types()
+        return self._emit()
+
+    # Type inference
+
+    def _infer_types(self):
+        """Forward dataflow: (stack types, local types) on entry to each instruction"""
+        entry_locals = {f'arg{i}': t for i, t in enumerate(self.signature)}
+        states: Dict[int, Tuple[tuple, dict]] = {0: ((), entry_locals)}
+        worklist = [0]
+        while worklist:
+            offset = worklist.pop()
+            stack, local_types = states[offset]
+            instr = self.instructions[offset]
+            stack, local_types = self._transfer(instr, list(stack), dict(local_types))
+            for target in successors(instr):
+                incoming = states.get(target)
+                if incoming is None:
+                    states[target] = (tuple(stack), local_types)
+                    worklist.append(target)
+                    continue
+                merged_stack = tuple(merge_types(a, b) for a, b in zip(incoming[0], stack))
+                # A local is usable only if it is bound on every path
+                merged_locals = {
+                    name: merge_types(t, local_types[name])
+                    for name, t in incoming[1].items() if name in local_types
+                }
+                if (merged_stack, merged_locals) != incoming:
+                    states[target] = (merged_stack, merged_locals)
+                    worklist.append(target)
+        return states
+
+    def _transfer(self, instr: Instruction, stack: list, local_types: dict):
+        op = instr.op
+        if op == OpCode.LOAD_CONST:
+            t = value_type(self.constants[instr.operands[0]])
+            if t is None:
+                raise NativeUnsupported("non-numeric constant")
+            stack.append(t)
+        elif op == OpCode.LOAD_ARG:
+            stack.append(self._local_type(local_types, f'arg{instr.operands[0]}'))
+        elif op == OpCode.LOAD_VAR:
+            stack.append(self._local_type(local_types, instr.operands[0]))
+        elif op == OpCode.STORE_VAR:
+            local_types[instr.operands[0]] = stack[-1]
+        elif op in _ARITH:
+            right, left = stack.pop(), stack.pop()
+            self._numeric(left, right)
+            if left == right == INT:
+                stack.append(INT)
+            elif FLOAT in (left, right):
+                stack.append(FLOAT)
+            else:
+                stack.append(NUM)
+        elif op == OpCode.BINARY_DIV:
+            self._numeric(stack.pop(), stack.pop())
+            stack.append(FLOAT)
+        elif op == OpCode.BINARY_MOD:
+            right, left = stack.pop(), stack.pop()
+            if left != INT or right != INT:
+                raise NativeUnsupported("modulo is only compiled for ints")
+            stack.append(INT)
+        elif op in _COMPARE:
+            right, left = stack.pop(), stack.pop()
+            if BOOL in (left, right) and not (left == right == BOOL and op in (OpCode.COMPARE_EQ, OpCode.COMPARE_NE)):
+                raise NativeUnsupported("ordering on bools")
+            stack.append(BOOL)
+        elif op in (OpCode.JUMP_IF_FALSE, OpCode.POP):
+            stack.pop()
+        elif op == OpCode.CALL_FUNCTION:
+            name, argc = instr.operands
+            arg_types = tuple(stack[len(stack) - argc:]) if argc else ()
+            del stack[len(stack) - argc:]
+            if BOOL in arg_types:
+                raise NativeUnsupported("bool arguments")
+            _, returns = self.resolve_call(name, arg_types)
+            stack.append(returns or NUM)
+        elif op == OpCode.RETURN:
+            self.return_type = merge_types(self.return_type, stack[-1])
+        return stack, local_types
+
+    def _local_type(self, local_types: dict, name: str) -> str:
+        if name not in self.local_slots:
+            raise NativeUnsupported(f"reads non-local variable {name!r}")
+        if name not in local_types:
+            raise NativeUnsupported(f"{name!r} may be read before assignment")
+        return local_types[name]
+
+    def _numeric(self, left: str, right: str):
+        if BOOL in (left, right):
+            raise NativeUnsupported("arithmetic on bools")
+
+    # Emission
+
+    def _payload(self, slot: int) -> int:
+        return -self.frame_size + 16 * slot
+
+    def _tag(self, slot: int) -> int:
+        return self._payload(slot) + 8
+
+    def _emit(self) -> bytes:
+        asm = self.asm = Assembler()
+        self.frame_size = 16 * self.slot_count + 16
+        out_ptr = -8
+
+        asm.prologue(self.frame_size)
+        asm.store(RBP, out_ptr, RSI)
+        for i in range(self.func.arg_count):
+            slot = self.local_slots[f'arg{i}']
+            asm.load(RAX, RDI, 16 * i)
+            asm.store(RBP, self._payload(slot), RAX)
+            asm.load(RAX, RDI, 16 * i + 8)
+            asm.store(RBP, self._tag(slot), RAX)
+        # Recursion guard
+        asm.mov_reloc(RAX, self.depth_address, 'depth')
+        asm.inc_mem(RAX)
+        asm.cmp_mem_imm32(RAX, MAX_DEPTH)
+        asm.jcc(CC_G, 'deopt')
+
+        self._labels = 0
+        for offset in sorted(self.instructions):
+            asm.label(offset)
+            stack, local_types = self.states[offset]
+            self._emit_instruction(self.instructions[offset], list(stack))
+
+        asm.label('deopt')
+        asm.mov_imm32(RAX, 1)
+        asm.label('exit')
+        asm.mov_reloc(RCX, self.depth_address, 'depth')
+        asm.dec_mem(RCX)
+        asm.epilogue()
+        self.relocations = asm.relocations
+        return asm.finish()
+
+    def _new_label(self):
+        self._labels += 1
+        return ('L', self._labels)
+
+    def _emit_instruction(self, instr: Instruction, types: list):
+        asm = self.asm
+        op = instr.op
+        depth = len(types)
+        top = self.stack_base + depth - 1
+        if op == OpCode.LOAD_CONST:
+            payload, tag = encode_value(self.constants[instr.operands[0]])
+            asm.mov_imm64(RAX, payload)
+            self._store_value(top + 1, RAX, tag)
+        elif op in (OpCode.LOAD_ARG, OpCode.LOAD_VAR):
+            name = f'arg{instr.operands[0]}' if op == OpCode.LOAD_ARG else instr.operands[0]
+            self._copy(self.local_slots[name], top + 1)
+        elif op == OpCode.STORE_VAR:
+            self._copy(top, self.local_slots[instr.operands[0]])
+        elif op == OpCode.POP:
+            pass
+        elif op in _ARITH or op == OpCode.BINARY_DIV:
+            self._emit_arith(op, top - 1, types[-2], top, types[-1])
+        elif op == OpCode.BINARY_MOD:
+            self._emit_mod(top - 1, top)
+        elif op in _COMPARE:
+            self._emit_compare(op, top - 1, types[-2], top, types[-1])
+        elif op == OpCode.JUMP:
+            asm.jmp(instr.next_offset + instr.operands[0])
+        elif op == OpCode.JUMP_IF_FALSE:
+            self._emit_branch_false(top, types[-1], instr.next_offset + instr.operands[0])
+        elif op == OpCode.CALL_FUNCTION:
+            self._emit_call(instr, types)
+        elif op == OpCode.RETURN:
+            asm.load(RDX, RBP, -8)
+            asm.load(RAX, RBP, self._payload(top))
+            asm.store(RDX, 0, RAX)
+            asm.load(RAX, RBP, self._tag(top))
+            asm.store(RDX, 8, RAX)
+            asm.mov_imm32(RAX, 0)
+            asm.jmp('exit')
+
+    def _store_value(self, slot: int, reg: int, tag: int):
+        self.asm.store(RBP, self._payload(slot), reg)
+        self.asm.store_imm(RBP, self._tag(slot), tag)
+
+    def _copy(self, src: int, dst: int):
+        asm = self.asm
+        asm.load(RAX, RBP, self._payload(src))
+        asm.store(RBP, self._payload(dst), RAX)
+        asm.load(RAX, RBP, self._tag(src))
+        asm.store(RBP, self._tag(dst), RAX)
+
+    def _load_float(self, xmm: int, slot: int, t: str):
+        """Load a numeric slot into an xmm register as a double"""
+        asm = self.asm
+        if t == FLOAT:
+            asm.movsd_load(xmm, RBP, self._payload(slot))
+        elif t == INT:
+            self._int_to_double(xmm, slot)
+        else:
+            is_float, done = self._new_label(), self._new_label()
+            asm.cmp_imm8(RBP, self._tag(slot), TAG_INT)
+            asm.jcc(CC_NE, is_float)
+            self._int_to_double(xmm, slot)
+            asm.jmp(done)
+            asm.label(is_float)
+            asm.movsd_load(xmm, RBP, self._payload(slot))
+            asm.label(done)
+
+    def _int_to_double(self, xmm: int, slot: int):
+        """cvtsi2sd, deoptimizing for ints beyond 2**53
+
+        Larger ints round when widened, while the VM compares and divides
+        them exactly (``2**53 + 1 == 2.0**53`` is false in Python).
+        """
+        asm = self.asm
+        # |x| <= 2**53  <=>  x + 2**53 <= 2**54 as unsigned
+        asm.load(RAX, RBP, self._payload(slot))
+        asm.mov_imm64(RCX, EXACT_INT)
+        asm.reg_reg(0x01, RAX, RCX)                      # add rax, rcx
+        asm.mov_imm64(RCX, 2 * EXACT_INT)
+        asm.reg_reg(0x39, RAX, RCX)                      # cmp rax, rcx
+        asm.jcc(CC_A, 'deopt')
+        asm.cvtsi2sd(xmm, RBP, self._payload(slot))
+
+    def _dispatch_numeric(self, left: int, lt: str, right: int, rt: str, int_path, float_path):
+        """Emit int and/or float variants of an operation, chosen by tag for NUM operands"""
+        if FLOAT in (lt, rt):
+            float_path()
+            return
+        if lt == rt == INT:
+            int_path()
+            return
+        asm = self.asm
+        use_float, done = self._new_label(), self._new_label()
+        # Tags are 0 (int) or 1 (float): a non-zero OR means some float
+        asm.load(RAX, RBP, self._tag(left))
+        asm.or_(RAX, RBP, self._tag(right))
+        asm.jcc(CC_NE, use_float)
+        int_path()
+        asm.jmp(done)
+        asm.label(use_float)
+        float_path()
+        asm.label(done)
+
+    def _emit_arith(self, op: OpCode, left: int, lt: str, right: int, rt: str):
+        asm = self.asm
+
+        def int_path():
+            asm.load(RAX, RBP, self._payload(left))
+            getattr(asm, _INT_OPS[op])(RAX, RBP, self._payload(right))
+            asm.jcc(CC_O, 'deopt')
+            self._store_value(left, RAX, TAG_INT)
+
+        def float_path():
+            self._load_float(XMM0, left, lt)
+            self._load_float(XMM1, right, rt)
+            if op == OpCode.BINARY_DIV:
+                # Let the VM raise ZeroDivisionError
+                asm.xorpd(XMM2, XMM2)
+                asm.ucomisd(XMM1, XMM2)
+                asm.jcc(CC_E, 'deopt')
+            asm.float_op(_FLOAT_OPS[op])
+            asm.movsd_store(RBP, self._payload(left), XMM0)
+            asm.store_imm(RBP, self._tag(left), TAG_FLOAT)
+
+        if op == OpCode.BINARY_DIV:
+            float_path()
+        else:
+            self._dispatch_numeric(left, lt, right, rt, int_path, float_path)
+
+    def _emit_mod(self, left: int, right: int):
+        """Python modulo on ints: the result takes the sign of the divisor"""
+        asm = self.asm
+        zero, done = self._new_label(), self._new_label()
+        asm.load(RAX, RBP, self._payload(left))
+        asm.load(RCX, RBP, self._payload(right))
+        asm.reg_reg(0x85, RCX, RCX)                      # test rcx, rcx
+        asm.jcc(CC_E, 'deopt')
+        asm.cmp_reg_imm8(RCX, -1)
+        asm.jcc(CC_E, zero)
+        asm.cqo()
+        asm.idiv(RCX)
+        asm.reg_reg(0x85, RDX, RDX)                      # test rdx, rdx
+        asm.jcc(CC_E, done)
+        asm.reg_reg(0x89, RAX, RDX)                      # mov rax, rdx
+        asm.reg_reg(0x31, RAX, RCX)                      # xor rax, rcx
+        asm.jcc(CC_NS, done)
+        asm.reg_reg(0x01, RDX, RCX)                      # add rdx, rcx
+        asm.jmp(done)
+        asm.label(zero)
+        asm.reg_reg(0x31, RDX, RDX)                      # xor rdx, rdx
+        asm.label(done)
+        self._store_value(left, RDX, TAG_INT)
+
+    def _emit_compare(self, op: OpCode, left: int, lt: str, right: int, rt: str):
+        asm = self.asm
+
+        def int_path():
+            asm.load(RAX, RBP, self._payload(left))
+            asm.cmp(RAX, RBP, self._payload(right))
+            asm.setcc(_INT_CC[op], RAX)
+            asm.movzx_eax_al()
+            self._store_value(left, RAX, TAG_BOOL)
+
+        def float_path():
+            self._load_float(XMM0, left, lt)
+            self._load_float(XMM1, right, rt)
+            # Unordered (NaN) compares false for everything but !=
+            if op in (OpCode.COMPARE_LT, OpCode.COMPARE_LE):
+                asm.ucomisd(XMM1, XMM0)
+                asm.setcc(CC_A if op == OpCode.COMPARE_LT else CC_AE, RAX)
+            elif op in (OpCode.COMPARE_GT, OpCode.COMPARE_GE):
+                asm.ucomisd(XMM0, XMM1)
+                asm.setcc(CC_A if op == OpCode.COMPARE_GT else CC_AE, RAX)
+            elif op == OpCode.COMPARE_EQ:
+                asm.ucomisd(XMM0, XMM1)
+                asm.setcc(CC_E, RAX)
+                asm.setcc(CC_NP, RCX)
+                asm.code += b'\x20\xC8'                  # and al, cl
+            else:
+                asm.ucomisd(XMM0, XMM1)
+                asm.setcc(CC_NE, RAX)
+                asm.setcc(CC_P, RCX)
+                asm.code += b'\x08\xC8'                  # or al, cl
+            asm.movzx_eax_al()
+            self._store_value(left, RAX, TAG_BOOL)
+
+        if lt == rt == BOOL:
+            int_path()
+        else:
+            self._dispatch_numeric(left, lt, right, rt, int_path, float_path)
+
+    def _emit_branch_false(self, slot: int, t: str, target: int):
+        asm = self.asm
+        done = self._new_label()
+
+        def int_test():
+            asm.cmp_imm8(RBP, self._payload(slot), 0)
+            asm.jcc(CC_E, target)
+
+        def float_test():
+            # NaN is truthy: only jump on an ordered compare equal to 0.0
+            self._load_float(XMM0, slot, FLOAT)
+            asm.xorpd(XMM1, XMM1)
+            asm.ucomisd(XMM0, XMM1)
+            asm.jcc(CC_P, done)
+            asm.jcc(CC_E, target)
+
+        if t in (INT, BOOL):
+            int_test()
+        elif t == FLOAT:
+            float_test()
+        else:
+            is_float = self._new_label()
+            asm.cmp_imm8(RBP, self._tag(slot), TAG_INT)
+            asm.jcc(CC_NE, is_float)
+            int_test()
+            asm.jmp(done)
+            asm.label(is_float)
+            float_test()
+        asm.label(done)
+
+    def _emit_call(self, instr: Instruction, types: list):
+        asm = self.asm
+        name, argc = instr.operands
+        arg_types = tuple(types[len(types) - argc:]) if argc else ()
+        cell, returns = self.resolve_call(name, arg_types)
+        self.calls.append(name)
+        first = self.stack_base + len(types) - argc
+        # Arguments are already contiguous (payload, tag) pairs; the result
+        # overwrites the first argument slot, which the callee copied on entry
+        asm.lea(RDI, RBP, self._payload(first))
+        asm.reg_reg(0x89, RSI, RDI)                      # mov rsi, rdi
+        asm.mov_reloc(RAX, cell, 'call', name, list(arg_types), returns)
+        asm.call_mem(RAX)
+        asm.test_eax()
+        asm.jcc(CC_NE, 'deopt')
+        if returns is None:
+            # Unknown return type (e.g. recursion): only numbers may flow on
+            asm.cmp_imm8(RBP, self._tag(first), TAG_FLOAT)
+            asm.jcc(CC_A, 'deopt')
@@ -1,8 +1,8 @@
 import inspect
 import time
 from functools import wraps
-from typing import Callable, Any
-from ..error_handling import error_handler
+from typing import Any, Callable, Dict
+from .error_handling import error_handler
 
 class DebugTools:
     """Debugging utilities for development"""
@@ -67,6 +67,27 @@ class CompilationError(AmatakError):
     """Errors during code compilation to bytecode or other targets."""
     pass
 
+class VerificationError(AmatakError):
+    """Malformed bytecode rejected by the load-time verifier."""
+    
+    def __init__(self, message: str, function: str = None, offset: int = None):
+        """
+        Initialize verification error with bytecode location.
+        
+        Args:
+            message: Error description
+            function: Name of the function being verified (default: None)
+            offset: Bytecode offset of the offending instruction (default: None)
+        """
+        context = {
+            'function': function,
+            'offset': offset,
+            'error_type': 'verification'
+        }
+        super().__init__(message, context)
+        self.function = function
+        self.offset = offset
+
 class SecurityError(AmatakError):
     """Security-related errors like sandbox violations or unsafe operations."""
     pass
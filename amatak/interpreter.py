@@ -1,6 +1,8 @@
+import weakref
 from .nodes import FuncNode, CallNode, PrintNode, StringNode, BinOpNode
 from .errors import AmatakRuntimeError
 from .tokens import TokenType 
+from .runtime.types.specialize import BinaryOpSite, Specializer
 
 class Context:
     """Runtime context for variable storage and scope management"""
@@ -21,12 +23,28 @@ class Context:
             return self.parent.get(name)
         raise AmatakRuntimeError(f"Undefined variable: '{name}'")
 
+    def gc_roots(self):
+        """Values visible from this context, for GC root discovery"""
+        context = self
+        while context is not None:
+            yield from context.variables.values()
+            yield from context.functions.values()
+            context = context.parent
+
 class Interpreter:
     def __init__(self, tree, debug=False, context=None):
         """Initialize interpreter with AST and setup execution environment"""
         self.tree = tree
         self.context = context if context else Context()
         self.debug = debug
+        # Per-node operation sites with type feedback; weakly keyed so nodes
+        # from finished eval/REPL input are not kept alive
+        self.specializer = Specializer()
+        self.binop_sites = weakref.WeakKeyDictionary()
+
+    def gc_roots(self):
+        """Values held by the current context chain"""
+        return self.context.gc_roots()
 
     def interpret(self):
         """Execute the AST with error handling and debug output"""
@@ -52,11 +70,25 @@ class Interpreter:
                 print(f"! Unexpected Error executing {node}: {e}", file=sys.stderr)
             raise
 
+    # visit_* method per node type, filled in on first use; one table per class
+    _handlers = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._handlers = {}
+
     def visit(self, node):
         """Dispatch to appropriate visit method based on node type"""
-        method_name = f'visit_{type(node).__name__}'
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node)
+        handler = self._handlers.get(type(node))
+        if handler is None:
+            handler = self._handler(type(node))
+        return handler(self, node)
+
+    @classmethod
+    def _handler(cls, node_type):
+        handler = getattr(cls, f'visit_{node_type.__name__}', cls.generic_visit)
+        cls._handlers[node_type] = handler
+        return handler
 
     def generic_visit(self, node):
         """Handle unknown node types"""
@@ -79,6 +111,10 @@ class Interpreter:
         """Return string literal value"""
         return node.value
 
+    def visit_BooleanNode(self, node):
+        """Return boolean literal value (produced by constant folding)"""
+        return bool(node.value)
+
     def visit_ArrayNode(self, node):
         """Evaluate array elements"""
         return [self.visit(element) for element in node.elements]
@@ -134,39 +170,41 @@ class Interpreter:
         
         # In interpreter.py
     def visit_BinOpNode(self, node):
-        """Handle binary operations with type conversion for string concatenation"""
-        left = self.visit(node.left)
-        right = self.visit(node.right)
-        
-        # Convert numbers to strings when concatenating with strings
-        if node.op == TokenType.PLUS:
-            if isinstance(left, str) or isinstance(right, str):
-                return str(left) + str(right)
-            return left + right
-        
-        # Preserve all existing numeric operations
-        elif node.op == TokenType.MINUS:
-            return left - right
-        elif node.op == TokenType.MUL:
-            return left * right
-        elif node.op == TokenType.DIV:
-            return left / right
-        elif node.op == TokenType.MOD:
-            return left % right
-        elif node.op == TokenType.LT:
-            return left < right
-        elif node.op == TokenType.GT:
-            return left > right
-        elif node.op == TokenType.LTE:
-            return left <= right
-        elif node.op == TokenType.GTE:
-            return left >= right
-        elif node.op == TokenType.EQ:
-            return left == right
-        elif node.op == TokenType.NEQ:
-            return left != right
-        else:
+        """Handle binary operations through type-specialized operation sites
+
+        Nested operations are evaluated with an explicit stack, so long
+        generated chains do not hit the recursion limit.
+        """
+        values = []
+        todo = [(node, False)]
+        while todo:
+            current, ready = todo.pop()
+            if not ready:
+                if type(current) is BinOpNode:
+                    todo.append((current, True))
+                    todo.append((current.right, False))
+                    todo.append((current.left, False))
+                else:
+                    values.append(self.visit(current))
+                continue
+            right = values.pop()
+            left = values.pop()
+            site = self.binop_sites.get(current) or self._binop_site(current)
+            # Guarded fast path inlined from BinaryOpSite.__call__
+            if type(left) is site.left_type and type(right) is site.right_type:
+                values.append(site.fast(left, right))
+            else:
+                values.append(site.miss(left, right))
+        return values[0]
+
+    def _binop_site(self, node):
+        symbol = node.op.value if isinstance(node.op, TokenType) else node.op
+        try:
+            site = BinaryOpSite(symbol, self.specializer)
+        except KeyError:
             raise AmatakRuntimeError(f"Unknown operator: {node.op}")
+        self.binop_sites[node] = site
+        return site
 
     def evaluate(self, node):
         """Evaluate expressions to their values"""
@@ -1,14 +1,21 @@
 import os
+import mmap
 import ctypes
 import platform
 from typing import Optional, Dict, Any
 from ....errors import AmatakRuntimeError
 
+MAP_FAILED = ctypes.c_void_p(-1).value
+MREMAP_MAYMOVE = 1
+MADV_DONTNEED = getattr(mmap, 'MADV_DONTNEED', 4)
+MADV_FREE = getattr(mmap, 'MADV_FREE', 8)
+MADV_HUGEPAGE = getattr(mmap, 'MADV_HUGEPAGE', 14)
+
 class LinuxNative:
     """Linux-specific native implementations and system calls"""
     
     def __init__(self):
-        self._libc = ctypes.CDLL("libc.so.6")
+        self._libc = ctypes.CDLL("libc.so.6", use_errno=True)
         self._system_info = self._get_system_info()
         
         # Setup ctypes for common Linux syscalls
@@ -20,6 +27,21 @@ class LinuxNative:
         
         self._libc.syscall.argtypes = [ctypes.c_long]
         self._libc.syscall.restype = ctypes.c_long
+
+        self._libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int,
+                                    ctypes.c_int, ctypes.c_int, ctypes.c_long]
+        self._libc.mmap.restype = ctypes.c_void_p
+
+        self._libc.mremap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_size_t, ctypes.c_int]
+        self._libc.mremap.restype = ctypes.c_void_p
+
+        self._libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        self._libc.munmap.restype = ctypes.c_int
+
+        self._libc.madvise.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int]
+        self._libc.madvise.restype = ctypes.c_int
+        # MADV_FREE needs Linux 4.5; fall back to MADV_DONTNEED once it fails
+        self._madv_free = True
     
     def _get_system_info(self) -> Dict[str, Any]:
         """Get Linux system information"""
@@ -50,6 +72,41 @@ class LinuxNative:
         """Free allocated memory"""
         self._libc.free(ptr)
     
+    def map_anonymous(self, size: int) -> int:
+        """Map private read+write anonymous memory"""
+        ptr = self._libc.mmap(None, size, mmap.PROT_READ | mmap.PROT_WRITE,
+                              mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS, -1, 0)
+        if ptr is None or ptr == MAP_FAILED:
+            raise AmatakRuntimeError(f"mmap failed with errno {ctypes.get_errno()}")
+        return ptr
+
+    def remap(self, address: int, old_size: int, new_size: int) -> int:
+        """Resize a mapping with mremap, moving it only if it cannot grow in place"""
+        ptr = self._libc.mremap(address, old_size, new_size, MREMAP_MAYMOVE)
+        if ptr is None or ptr == MAP_FAILED:
+            raise AmatakRuntimeError(f"mremap failed with errno {ctypes.get_errno()}")
+        return ptr
+
+    def unmap(self, address: int, size: int):
+        """Unmap memory from ``map_anonymous``/``remap``"""
+        if self._libc.munmap(address, size) != 0:
+            raise AmatakRuntimeError(f"munmap failed with errno {ctypes.get_errno()}")
+
+    def advise(self, address: int, size: int, advice: int) -> bool:
+        """madvise a page-aligned range; False if the kernel rejected it"""
+        return self._libc.madvise(address, size, advice) == 0
+
+    def release_pages(self, address: int, size: int):
+        """Give the physical pages of a range back to the kernel, keeping the mapping
+
+        MADV_FREE lets the kernel reclaim lazily; MADV_DONTNEED drops the pages
+        at once. The contents of the range are undefined afterwards.
+        """
+        if self._madv_free and self.advise(address, size, MADV_FREE):
+            return
+        self._madv_free = False
+        self.advise(address, size, MADV_DONTNEED)
+
     def syscall(self, number: int, *args) -> int:
         """Make Linux system call"""
         # Convert args to ctypes compatible types
@@ -50,6 +50,9 @@ class Parser:
                 self.advance()
                 continue
                 
+            # Source line of the statement, kept for bytecode line tables
+            line = self.current_token.line
+            count = len(statements)
             if self.current_token.type == TokenType.FUNC:
                 statements.append(self.parse_function())
             elif self.current_token.type == TokenType.PRINT:
@@ -86,6 +89,8 @@ class Parser:
             else:
                 self.error(f"Unexpected token: {self.current_token.type}")
                 
+            if len(statements) > count and statements[-1] is not None:
+                statements[-1].line = line
             self.skip_newlines()
             
         return statements
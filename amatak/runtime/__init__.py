@@ -1,7 +1,8 @@
 from .interpreter import Interpreter
 from .compiler import Compiler
-from .memory import MemoryManager
-from .types import TypeSystem
+from .memory.allocator import MemoryAllocator
+from .memory.gc import GarbageCollector
+from .types.inference import TypeInferrer
 from ..error_handling import error_handler
 from ..security.middleware import security_middleware
 from ..debug import debug_tools
@@ -10,8 +11,8 @@ class AMatakRuntime:
     def __init__(self, debug: bool = False):
         self.interpreter = Interpreter()
         self.compiler = Compiler()
-        self.memory = MemoryManager()
-        self.types = TypeSystem()
+        self.memory = MemoryAllocator()
+        self.types = TypeInferrer()
         
         # Initialize standard library
         self._init_stdlib()
@@ -28,7 +29,26 @@ class AMatakRuntime:
         # Initialize other components with error handling
         self.interpreter = error_handler.wrap_operation(Interpreter)
         self.compiler = error_handler.wrap_operation(Compiler)
+
+        # Garbage collector rooted in the interpreter's scopes
+        self.gc = GarbageCollector(self.memory)
+        if self.interpreter is not None:
+            self.gc.add_root_provider(self.interpreter)
         
+    def telemetry(self) -> dict:
+        """GC and allocator telemetry for monitoring long-running processes"""
+        return {
+            'gc': self.gc.get_telemetry(),
+            'memory': self.memory.get_telemetry(),
+        }
+
+    def add_gc_listener(self, listener):
+        """Receive a ``GCEvent`` for every collection pause"""
+        self.gc.add_listener(listener)
+
+    def remove_gc_listener(self, listener):
+        self.gc.remove_listener(listener)
+
     @security_middleware.secure_operation
     def execute(self, source: str):
         """Secure execution with error handling"""
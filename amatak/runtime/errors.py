@@ -0,0 +1,12 @@
+from ..errors import AmatakError, AmatakRuntimeError
+
+# AmatakRuntimeError is re-exported for the runtime modules that import it from here
+__all__ = ['AmatakError', 'AmatakRuntimeError', 'AmatakMemoryError', 'AmatakTypeError']
+
+class AmatakMemoryError(AmatakError):
+    """Allocation, protection and reclamation failures in the runtime memory subsystem."""
+    pass
+
+class AmatakTypeError(AmatakError):
+    """Type validation, coercion and inference failures."""
+    pass
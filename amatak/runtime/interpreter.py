@@ -11,6 +11,10 @@ class Interpreter:
         self.modules = {}
         self.debug = False
 
+    def gc_roots(self):
+        """Values held by the current scope chain"""
+        return self.scope.gc_roots()
+
     def add_module(self, name, module):
         """Register a module for import"""
         self.modules[name] = module
@@ -3,8 +3,11 @@ import os
 import ctypes
 import platform
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Any, Dict, List
 from ..errors import AmatakMemoryError
+from .code_arena import CodeArena
+from .slab import Slab, SlabAllocator, size_class
+from .backends import default_mapping
 
 @dataclass
 class MemoryBlock:
@@ -13,15 +16,27 @@ class MemoryBlock:
     size: int
     is_executable: bool
     refcount: int = 1
+    # Backing mapping (unmapped when collected), or the Slab a small block
+    # was carved from
+    mapping: Any = None
 
 class MemoryAllocator:
     """A custom memory allocator for Amatak runtime"""
     
-    def __init__(self):
+    def __init__(self, huge_pages: bool = False):
         self.allocations: Dict[int, MemoryBlock] = {}
         self.free_blocks: Dict[int, List[MemoryBlock]] = {}
         self.page_size = os.sysconf('SC_PAGESIZE')
         self.total_allocated = 0
+        self.peak_allocated = 0
+        # Executable memory lives in a W^X code arena, not in size classes
+        self.code_arena = CodeArena(self.page_size)
+        # Small blocks are carved from shared slabs; larger ones get their own mapping
+        self.slabs = SlabAllocator()
+        # Large blocks: on Linux these grow with mremap and, if enabled,
+        # blocks of 2MB and more are backed by transparent huge pages
+        self.mapping_class = default_mapping()
+        self.huge_pages = huge_pages
         self._initialize_memory_pools()
         
         # Platform-specific configurations
@@ -52,49 +67,62 @@ class MemoryAllocator:
         
         Args:
             size: Size in bytes to allocate
-            executable: Whether memory should be executable
+            executable: Whether memory should be executable. Executable
+                memory comes from the code arena and is read+exec only;
+                fill it with ``write_executable``
             
         Returns:
             Memory address of allocated block
         """
         if size <= 0:
             raise AmatakMemoryError("Allocation size must be positive")
-            
-        # Round up to nearest size class
-        size_class = next(sc for sc in self.size_classes if sc >= size)
-        
-        # Try to reuse free block first
-        if self.free_blocks[size_class]:
-            block = self.free_blocks[size_class].pop()
-            block.is_executable = executable
+        if executable:
+            return self.code_arena.allocate(size)
+
+        if self.slabs.handles(size):
+            address, slab = self.slabs.allocate(size)
+            self.allocations[address] = MemoryBlock(address, slab.block_size, False, mapping=slab)
+            self._grow(slab.block_size)
+            return address
+
+        # Try to reuse a free large block of the same size class first
+        free_blocks = self.free_blocks.get(size_class(size))
+        if free_blocks:
+            block = free_blocks.pop()
             block.refcount = 1
-            self._set_memory_protection(block.address, block.size, executable)
+            self.allocations[block.address] = block
+            self._grow(block.size)
             return block.address
             
-        # Allocate new memory
-        try:
-            # Align size to page boundary
-            aligned_size = ((size + self.page_size - 1) // self.page_size) * self.page_size
-            
-            # Allocate memory with mmap
-            prot = self.prot_exec if executable else self.prot_default
-            mem = mmap.mmap(-1, aligned_size, prot=prot)
-            
-            # Get address and create block
-            address = ctypes.addressof(ctypes.c_char.from_buffer(mem))
-            block = MemoryBlock(address, aligned_size, executable)
-            
-            self.allocations[address] = block
-            self.total_allocated += aligned_size
-            return address
-            
-        except Exception as e:
-            raise AmatakMemoryError(f"Memory allocation failed: {str(e)}")
+        # Large blocks are rounded up to their size class so they can be reused
+        aligned_size = size_class(size) if size <= self.size_classes[-1] else size
+        aligned_size = self._page_align(aligned_size)
+        mapping = self.mapping_class(aligned_size, huge_pages=self.huge_pages)
+        block = MemoryBlock(mapping.address, aligned_size, False, mapping=mapping)
+        self.allocations[block.address] = block
+        self._grow(aligned_size)
+        return block.address
+
+    def _grow(self, size: int) -> None:
+        self.total_allocated += size
+        if self.total_allocated > self.peak_allocated:
+            self.peak_allocated = self.total_allocated
+
+    def _page_align(self, size: int) -> int:
+        return ((size + self.page_size - 1) // self.page_size) * self.page_size
 
     def allocate_executable(self, size: int) -> int:
         """Allocate executable memory block"""
         return self.allocate(size, executable=True)
 
+    def allocate_code(self, code: bytes) -> int:
+        """Allocate executable memory holding ``code``"""
+        return self.code_arena.allocate_code(code)
+
+    def write_executable(self, address: int, code: bytes) -> None:
+        """Copy code into executable memory from ``allocate_executable``"""
+        self.code_arena.write(address, code)
+
     def reallocate(self, address: int, new_size: int) -> int:
         """
         Reallocate memory block to new size
@@ -106,6 +134,13 @@ class MemoryAllocator:
         Returns:
             New memory address (may be same as original)
         """
+        if address not in self.allocations and self.code_arena.owns(address):
+            old_size = self.code_arena.size_of(address)
+            if new_size <= old_size:
+                return address
+            new_address = self.code_arena.allocate_code(ctypes.string_at(address, old_size))
+            self.code_arena.free(address)
+            return new_address
         if address not in self.allocations:
             raise AmatakMemoryError("Invalid memory address for reallocation")
             
@@ -114,6 +149,17 @@ class MemoryAllocator:
         if new_size <= old_block.size:
             # Can reuse the same block if shrinking
             return address
+
+        if old_block.refcount == 1 and not isinstance(old_block.mapping, Slab):
+            # Grow the mapping itself (mremap) when the backend supports it
+            aligned_size = self._page_align(new_size)
+            new_address = old_block.mapping.resize(aligned_size)
+            if new_address is not None:
+                del self.allocations[address]
+                self._grow(aligned_size - old_block.size)
+                old_block.address, old_block.size = new_address, aligned_size
+                self.allocations[new_address] = old_block
+                return new_address
             
         # Allocate new block
         new_address = self.allocate(new_size, old_block.is_executable)
@@ -142,19 +188,47 @@ class MemoryAllocator:
             address: Memory address to free
         """
         if address not in self.allocations:
+            if self.code_arena.owns(address):
+                self.code_arena.free(address)
+                return
             raise AmatakMemoryError("Attempt to free invalid memory address")
             
         block = self.allocations[address]
         block.refcount -= 1
         
         if block.refcount <= 0:
-            # Find appropriate size class
-            size_class = next(sc for sc in self.size_classes if sc >= block.size)
-            
-            # Add to free list for reuse
-            self.free_blocks[size_class].append(block)
             del self.allocations[address]
             self.total_allocated -= block.size
+            if isinstance(block.mapping, Slab):
+                # Small block: back onto its slab's free list
+                self.slabs.free(block.mapping, address)
+                return
+            
+            # Keep large blocks of an exact size class for reuse, with their
+            # pages handed back to the kernel while idle
+            free_blocks = self.free_blocks.get(block.size)
+            if free_blocks is not None:
+                block.mapping.release_pages()
+                free_blocks.append(block)
+            else:
+                block.mapping.close()
+
+    def trim(self) -> int:
+        """
+        Return idle memory to the kernel
+
+        Releases the pages of empty slabs and unmaps cached free large blocks.
+
+        Returns:
+            Number of bytes released
+        """
+        released = self.slabs.trim()
+        for blocks in self.free_blocks.values():
+            for block in blocks:
+                released += block.size
+                block.mapping.close()
+            blocks.clear()
+        return released
 
     def reference(self, address: int) -> None:
         """
@@ -201,11 +275,44 @@ class MemoryAllocator:
         """
         return {
             'total_allocated': self.total_allocated,
+            'peak_allocated': self.peak_allocated,
             'active_blocks': len(self.allocations),
             'free_blocks': sum(len(blocks) for blocks in self.free_blocks.values()),
             'size_class_usage': {
                 size: len(blocks) for size, blocks in self.free_blocks.items()
-            }
+            },
+            'slabs': self.slabs.get_stats(),
+            'code': self.code_arena.get_stats()
+        }
+
+    def get_telemetry(self) -> dict:
+        """
+        Allocator health: usage, peak, fragmentation and slab occupancy
+
+        Fragmentation is the share of mapped bytes (slabs, large blocks,
+        cached free blocks and the code arena) not holding live allocations.
+        """
+        slabs = self.slabs.get_stats()
+        code = self.code_arena.get_stats()
+        large_live = sum(
+            block.size for block in self.allocations.values() if not isinstance(block.mapping, Slab)
+        )
+        large_cached = sum(block.size for blocks in self.free_blocks.values() for block in blocks)
+        mapped = slabs['mapped_bytes'] + large_live + large_cached + code['mapped_bytes']
+        live = slabs['used_bytes'] + large_live + code['code_bytes']
+        return {
+            'allocated_bytes': self.total_allocated,
+            'peak_allocated_bytes': self.peak_allocated,
+            'mapped_bytes': mapped,
+            'fragmentation': 1.0 - live / mapped if mapped else 0.0,
+            'active_blocks': len(self.allocations),
+            'slabs': slabs,
+            'large': {
+                'live_bytes': large_live,
+                'cached_free_bytes': large_cached,
+                'cached_free_blocks': sum(len(blocks) for blocks in self.free_blocks.values()),
+            },
+            'code': code,
         }
 
     def cleanup(self) -> None:
@@ -213,6 +320,7 @@ class MemoryAllocator:
         for address in list(self.allocations.keys()):
             self.free(address)
         self.free_blocks = {size: [] for size in self.size_classes}
+        self.slabs.release_all()
         self.total_allocated = 0
 
     def __del__(self):
@@ -0,0 +1,94 @@
+"""Page-mapping backends for large MemoryAllocator blocks
+
+``PortableMapping`` wraps ``mmap.mmap`` and cannot grow; reallocation
+copies. ``LinuxMapping`` maps through libc (``lib.native.linux``) so it
+can grow with ``mremap`` (page tables move, data is not copied), return
+pages with ``madvise`` and ask for transparent huge pages.
+"""
+import mmap
+import ctypes
+import platform
+from typing import Callable, Optional
+from ..errors import AmatakMemoryError
+
+HUGE_PAGE_SIZE = 2 * 1024 * 1024
+
+class PortableMapping:
+    """Anonymous read+write mapping owned by one large memory block"""
+
+    def __init__(self, size: int, huge_pages: bool = False):
+        try:
+            self._mmap = mmap.mmap(-1, size)
+        except (OSError, ValueError) as e:
+            raise AmatakMemoryError(f"Memory allocation failed: {str(e)}")
+        self.address = ctypes.addressof(ctypes.c_char.from_buffer(self._mmap))
+        self.size = size
+
+    def resize(self, new_size: int) -> Optional[int]:
+        """Grow without copying; returns the new address or None if unsupported"""
+        return None
+
+    def release_pages(self) -> None:
+        """Return the physical pages to the OS; contents become undefined"""
+        advice = getattr(mmap, 'MADV_DONTNEED', None)
+        if advice is not None:
+            self._mmap.madvise(advice)
+
+    def close(self) -> None:
+        self._mmap.close()
+
+class LinuxMapping:
+    """Anonymous mapping managed with mmap/mremap/madvise/munmap"""
+
+    def __init__(self, size: int, huge_pages: bool = False):
+        from ...lib.native.linux import linux_native
+        self._native = linux_native
+        self.huge_pages = huge_pages
+        try:
+            self.address = linux_native.map_anonymous(size)
+        except Exception as e:
+            raise AmatakMemoryError(f"Memory allocation failed: {str(e)}")
+        self.size = size
+        self._advise_huge()
+
+    def _advise_huge(self):
+        if self.huge_pages and self.size >= HUGE_PAGE_SIZE:
+            from ...lib.native.linux import MADV_HUGEPAGE
+            # Best effort: THP may be disabled system-wide
+            self._native.advise(self.address, self.size, MADV_HUGEPAGE)
+
+    def resize(self, new_size: int) -> Optional[int]:
+        try:
+            self.address = self._native.remap(self.address, self.size, new_size)
+        except Exception as e:
+            raise AmatakMemoryError(f"Memory reallocation failed: {str(e)}")
+        self.size = new_size
+        self._advise_huge()
+        return self.address
+
+    def release_pages(self) -> None:
+        self._native.release_pages(self.address, self.size)
+
+    def close(self) -> None:
+        if self.address:
+            self._native.unmap(self.address, self.size)
+            self.address = 0
+
+    def __del__(self):
+        # Unmapped when collected, like mmap.mmap
+        try:
+            self.close()
+        except Exception:
+            pass
+
+def default_mapping() -> Callable[..., object]:
+    """Mapping class for this platform"""
+    if platform.system() == 'Linux':
+        try:
+            # Importing loads libc and binds mmap/mremap; a failure there
+            # (not just a missing module) means falling back to mmap.mmap
+            from ...lib.native.linux import linux_native  # noqa: F401
+            return LinuxMapping
+        except (ImportError, OSError, AttributeError):
+            pass
+    return PortableMapping
@@ -0,0 +1,203 @@
+import mmap
+import ctypes
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+from ..errors import AmatakMemoryError
+
+PROT_RW = mmap.PROT_READ | mmap.PROT_WRITE
+PROT_RX = mmap.PROT_READ | mmap.PROT_EXEC
+
+@dataclass
+class CodeChunk:
+    """One large mapping that code is bump-allocated from"""
+    mapping: mmap.mmap
+    address: int
+    size: int
+    top: int = 0
+    # address -> size of live allocations
+    live: Dict[int, int] = field(default_factory=dict)
+    # (address, size) holes below ``top``, sorted by address
+    holes: List[Tuple[int, int]] = field(default_factory=list)
+
+class CodeArena:
+    """Allocator for JIT machine code with W^X page protection
+
+    Many functions share a few large mappings. Pages are read+exec at all
+    times except while ``write`` is copying code into them, so no page is
+    ever writable and executable at once. Freed space is reused first-fit,
+    and ``compact`` repacks live code into fresh mappings.
+    """
+
+    def __init__(self, page_size: int, chunk_size: int = 256 * 1024, align: int = 16):
+        self.page_size = page_size
+        self.chunk_size = chunk_size
+        self.align = align
+        self.chunks: List[CodeChunk] = []
+        self._libc = None
+
+    # Protection
+
+    def _mprotect(self, address: int, size: int, prot: int):
+        if self._libc is None:
+            libc = ctypes.CDLL(None, use_errno=True)
+            libc.mprotect.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int]
+            libc.mprotect.restype = ctypes.c_int
+            self._libc = libc
+        start = address & ~(self.page_size - 1)
+        end = (address + size + self.page_size - 1) & ~(self.page_size - 1)
+        if self._libc.mprotect(start, end - start, prot) != 0:
+            raise AmatakMemoryError(f"mprotect failed (errno {ctypes.get_errno()})")
+
+    # Allocation
+
+    def _new_chunk(self, min_size: int) -> CodeChunk:
+        size = max(self.chunk_size, min_size)
+        size = (size + self.page_size - 1) // self.page_size * self.page_size
+        try:
+            mapping = mmap.mmap(-1, size, prot=PROT_RW)
+        except (OSError, ValueError, TypeError) as e:
+            raise AmatakMemoryError(f"Code arena mapping failed: {str(e)}")
+        address = ctypes.addressof(ctypes.c_char.from_buffer(mapping))
+        self._mprotect(address, size, PROT_RX)
+        chunk = CodeChunk(mapping, address, size)
+        self.chunks.append(chunk)
+        return chunk
+
+    def allocate(self, size: int) -> int:
+        """
+        Reserve space for code
+
+        Args:
+            size: Size in bytes
+
+        Returns:
+            Address of the reserved (read+exec) region; fill it with ``write``
+        """
+        if size <= 0:
+            raise AmatakMemoryError("Allocation size must be positive")
+        size = (size + self.align - 1) // self.align * self.align
+
+        # Reuse a hole first
+        for chunk in self.chunks:
+            for i, (address, hole) in enumerate(chunk.holes):
+                if hole >= size:
+                    if hole == size:
+                        del chunk.holes[i]
+                    else:
+                        chunk.holes[i] = (address + size, hole - size)
+                    chunk.live[address] = size
+                    return address
+
+        chunk = self.chunks[-1] if self.chunks else None
+        if chunk is None or chunk.size - chunk.top < size:
+            chunk = self._new_chunk(size)
+        address = chunk.address + chunk.top
+        chunk.top += size
+        chunk.live[address] = size
+        return address
+
+    def write(self, address: int, data: bytes):
+        """Copy code into a reserved region, briefly making its pages writable"""
+        chunk = self._chunk_for(address)
+        if len(data) > chunk.live[address]:
+            raise AmatakMemoryError("Code does not fit its allocation")
+        self._mprotect(address, len(data), PROT_RW)
+        try:
+            ctypes.memmove(address, data, len(data))
+        finally:
+            self._mprotect(address, len(data), PROT_RX)
+
+    def allocate_code(self, data: bytes) -> int:
+        """Reserve space for ``data``, copy it in and return its address"""
+        address = self.allocate(len(data))
+        self.write(address, data)
+        return address
+
+    def owns(self, address: int) -> bool:
+        return any(address in chunk.live for chunk in self.chunks)
+
+    def size_of(self, address: int) -> int:
+        """Reserved (aligned) size of an allocation"""
+        return self._chunk_for(address).live[address]
+
+    def free(self, address: int):
+        """Release code; an emptied mapping is unmapped"""
+        chunk = self._chunk_for(address)
+        size = chunk.live.pop(address)
+        if not chunk.live:
+            self._release_chunk(chunk)
+            return
+        if address + size == chunk.address + chunk.top:
+            chunk.top -= size
+            # Holes now at the top fold back into the bump region
+            while chunk.holes and sum(chunk.holes[-1]) == chunk.address + chunk.top:
+                chunk.top -= chunk.holes.pop()[1]
+            return
+        self._add_hole(chunk, address, size)
+
+    def _add_hole(self, chunk: CodeChunk, address: int, size: int):
+        holes = chunk.holes
+        holes.append((address, size))
+        holes.sort()
+        merged: List[Tuple[int, int]] = []
+        for start, length in holes:
+            if merged and merged[-1][0] + merged[-1][1] == start:
+                merged[-1] = (merged[-1][0], merged[-1][1] + length)
+            else:
+                merged.append((start, length))
+        chunk.holes = merged
+
+    def _release_chunk(self, chunk: CodeChunk):
+        self.chunks.remove(chunk)
+        chunk.mapping.close()
+
+    def _chunk_for(self, address: int) -> CodeChunk:
+        for chunk in self.chunks:
+            if address in chunk.live:
+                return chunk
+        raise AmatakMemoryError("Address is not a code arena allocation")
+
+    def compact(self) -> Dict[int, int]:
+        """
+        Repack all live code into as few mappings as possible
+
+        Code must be position independent apart from absolute references to
+        outside data, which the JIT guarantees.
+
+        Returns:
+            Mapping of old address to new address for every moved allocation
+        """
+        live = [(address, size) for chunk in self.chunks for address, size in chunk.live.items()]
+        if not live:
+            return {}
+        total = sum(size for _, size in live)
+        old_chunks = self.chunks
+        self.chunks = []
+        target = self._new_chunk(total)
+        moved: Dict[int, int] = {}
+        self._mprotect(target.address, target.size, PROT_RW)
+        try:
+            for address, size in sorted(live):
+                new_address = target.address + target.top
+                target.top += size
+                target.live[new_address] = size
+                moved[address] = new_address
+                ctypes.memmove(new_address, address, size)
+        finally:
+            self._mprotect(target.address, target.size, PROT_RX)
+        for chunk in old_chunks:
+            chunk.mapping.close()
+        return moved
+
+    def get_stats(self) -> dict:
+        """Code bytes versus mapped bytes"""
+        code = sum(size for chunk in self.chunks for size in chunk.live.values())
+        mapped = sum(chunk.size for chunk in self.chunks)
+        return {
+            'code_bytes': code,
+            'mapped_bytes': mapped,
+            'free_bytes': mapped - code,
+            'chunks': len(self.chunks),
+            'functions': sum(len(chunk.live) for chunk in self.chunks),
+            'utilization': code / mapped if mapped else 0.0,
+        }
@@ -1,12 +1,48 @@
+import sys
 import time
-from typing import Dict, Set, List, Optional
-from weakref import WeakValueDictionary
+from functools import partial
+from typing import Any, Dict, Iterable, Set, List, Optional, Tuple
+from weakref import WeakSet, WeakValueDictionary
 from ..errors import AmatakRuntimeError
 from .allocator import MemoryAllocator
 from ..types.core import AmatakObject, AmatakType
+from .telemetry import GCEvent, GCTelemetry
+
+# Containers whose contents are scanned for objects during root discovery
+_CONTAINERS = (list, tuple, set, frozenset)
+
+# Objects processed between clock checks in an incremental slice
+_SLICE_CHECK = 32
 
 class GarbageCollector:
-    """A generational garbage collector for Amatak runtime"""
+    """A generational garbage collector for Amatak runtime
+
+    Roots come from registered root providers: any object with a
+    ``gc_roots()`` method returning the values it keeps alive (the
+    interpreter ``Context`` chain, ``Scope``, the ``VM`` stack and frames),
+    plus host handles taken with ``pin``. Root values and the values
+    objects return from ``gc_references`` are scanned through lists,
+    tuples, sets and dict values for tracked objects.
+
+    In incremental mode (``set_incremental``) a collection is split into
+    slices of at most ``max_pause_ms`` that run as objects are registered.
+    Marking is tri-colour: ``_marked`` is grey or black, ``_gray`` is the
+    worklist. ``add_reference`` is the write barrier: an edge stored into an
+    already scanned object (or, in a minor cycle, into an old one) greys its
+    target. Mutations that only show up through ``gc_references`` must call
+    ``write_barrier(obj)``. Roots are not barriered: they are scanned in
+    passes that resume from a cursor across slices, like the worklist, and
+    marking only finishes once a pass after the first finds nothing new.
+    An object that the host moves between root containers while that last
+    pass is running can still be missed, so hosts that do this mid-cycle
+    should ``pin`` the object for the move.
+
+    Minor (generation 0) collections trace young objects only. They start
+    from the young roots plus the remembered set: old objects that may hold
+    young ones, recorded by ``add_reference`` (and ``write_barrier``) when an
+    old object gains an edge to a young one, and when a promoted object
+    still points into generation 0.
+    """
     
     def __init__(self, allocator: MemoryAllocator):
         self.allocator = allocator
@@ -21,6 +57,13 @@ class GarbageCollector:
         # Reference tracking
         self.references: Dict[int, Set[int]] = {}
         self.reverse_refs: Dict[int, Set[int]] = {}
+        # Old objects that may reference young ones
+        self.remembered: Set[int] = set()
+
+        # Root discovery
+        self.root_providers: WeakSet = WeakSet()
+        self.handles: Dict[int, Any] = {}
+        self._next_handle = 1
         
         # Collection thresholds
         self.gen0_threshold = 1000
@@ -32,6 +75,36 @@ class GarbageCollector:
         self.enabled = True
         self.debug = False
 
+        # Incremental collection
+        self.incremental = False
+        self.max_pause_ms = 2.0
+        self.telemetry = GCTelemetry()
+        self.pauses = self.telemetry.pauses
+        self._phase = 'idle'  # idle, mark or sweep
+        self._marked: Set[int] = set()
+        self._gray: List[int] = []
+        # Root pass cursor: sources not yet listed, values not yet scanned
+        # and roots newly marked by the pass
+        self._root_sources: List[Any] = []
+        self._root_todo: List[Any] = []
+        self._root_new = 0
+        # Container id -> number of the last pass that expanded it. Kept
+        # across passes so a steady root set never regrows the table, and
+        # retired only once mostly stale (growing or freeing a large table
+        # at once is itself a long pause)
+        self._root_seen: Dict[int, int] = {}
+        self._root_pass = 0
+        self._cycle_first_pass = 0
+        self._root_containers = 0
+        self._stale_seen: List[Dict[int, int]] = []
+        self._sweep_queue: List[Tuple[int, List[int]]] = []  # (generation, object ids)
+        self._cycle_generations: Tuple[int, ...] = (0,)
+        self._young_only = False
+        self._cycle_collected = 0
+        # generation -> [collected, survived, promoted bytes] for the cycle
+        self._cycle_stats: Dict[int, List[int]] = {}
+        self._cycle_seconds = 0.0
+
     def register_object(self, obj: AmatakObject) -> None:
         """Register a new object with the GC"""
         if not isinstance(obj, AmatakObject):
@@ -42,9 +115,15 @@ class GarbageCollector:
             self.gen0[obj_id] = obj
             self.references[obj_id] = set()
             self.reverse_refs[obj_id] = set()
-            
+            if self._phase == 'mark':
+                # Allocate black: new objects survive the cycle in progress
+                self._marked.add(obj_id)
+
             # Check if we need to collect
-            if len(self.gen0) >= self.gen0_threshold:
+            if self.incremental:
+                if self._phase != 'idle' or len(self.gen0) >= self.gen0_threshold:
+                    self.step()
+            elif len(self.gen0) >= self.gen0_threshold:
                 self.collect()
 
     def add_reference(self, from_obj: AmatakObject, to_obj: AmatakObject) -> None:
@@ -55,6 +134,24 @@ class GarbageCollector:
         if from_id in self.references and to_id in self.reverse_refs:
             self.references[from_id].add(to_id)
             self.reverse_refs[to_id].add(from_id)
+            if to_id in self.gen0 and from_id not in self.gen0:
+                self.remembered.add(from_id)
+            # Write barrier: never leave a black object pointing at a white one
+            if self._phase == 'mark' and to_id not in self._marked and self._is_black(from_id):
+                self._marked.add(to_id)
+                self._gray.append(to_id)
+
+    def write_barrier(self, obj: AmatakObject) -> None:
+        """Note that ``obj.gc_references()`` changed; call on every such mutation"""
+        obj_id = id(obj)
+        if obj_id not in self.gen0 and self._is_tracked(obj_id):
+            self.remembered.add(obj_id)
+        if self._phase == 'mark' and self._is_black(obj_id):
+            self._gray.append(obj_id)
+
+    def _is_black(self, obj_id: int) -> bool:
+        # Old objects are never traced by a minor cycle, so they count as scanned
+        return obj_id in self._marked or (self._young_only and obj_id not in self.gen0)
 
     def remove_reference(self, from_obj: AmatakObject, to_obj: AmatakObject) -> None:
         """Remove a tracked reference between objects"""
@@ -65,6 +162,29 @@ class GarbageCollector:
             self.references[from_id].discard(to_id)
             self.reverse_refs[to_id].discard(from_id)
 
+    def add_root_provider(self, provider: Any) -> None:
+        """Register an object whose ``gc_roots()`` values are kept alive
+
+        Providers are held weakly and drop out once they are collected.
+        """
+        if not callable(getattr(provider, 'gc_roots', None)):
+            raise AmatakRuntimeError("Root providers must define gc_roots()")
+        self.root_providers.add(provider)
+
+    def remove_root_provider(self, provider: Any) -> None:
+        self.root_providers.discard(provider)
+
+    def pin(self, value: Any) -> int:
+        """Keep a value alive for the host; returns a handle for ``unpin``"""
+        handle = self._next_handle
+        self._next_handle += 1
+        self.handles[handle] = value
+        return handle
+
+    def unpin(self, handle: int) -> None:
+        if self.handles.pop(handle, None) is None:
+            raise AmatakRuntimeError(f"Unknown GC handle: {handle}")
+
     def collect(self, generation: Optional[int] = None) -> None:
         """
         Run garbage collection
@@ -76,68 +196,329 @@ class GarbageCollector:
         if not self.enabled:
             return
             
-        start_time = time.time()
-        collected = 0
+        start_time = time.perf_counter()
+        collected = survived = promoted = 0
+        oldest = 0
+        if self._phase != 'idle':
+            # Finish the incremental cycle in progress first
+            self._advance(float('inf'))
         
         if generation == 0 or generation is None:
-            # Mark and sweep for generation 0
-            roots = self._find_roots()
-            marked = self._mark(roots)
-            collected += self._sweep_generation(marked, self.gen0)
+            # Mark and sweep for generation 0, tracing young objects only
+            roots = self._young_roots(self._find_roots())
+            marked = self._mark(roots, young_only=True)
+            swept = self._sweep_generation(marked, self.gen0)
+            kept = len(self.gen0)
             
-            # Promote survivors to generation 1
-            self._promote_generation(self.gen0, self.gen1)
+            # Promote survivors to generation 1; nothing is young any more
+            moved = self._promote_generation(self.gen0, self.gen1)
+            self.remembered.clear()
+            self.telemetry.record_generation(0, swept, kept, moved)
+            collected, survived, promoted = collected + swept, survived + kept, promoted + moved
             
         if generation == 1 or (generation is None and len(self.gen1) >= self.gen1_threshold):
             # Mark and sweep for generation 1
             roots = self._find_roots() | set(self.gen0.keys())
             marked = self._mark(roots)
-            collected += self._sweep_generation(marked, self.gen1)
+            swept = self._sweep_generation(marked, self.gen1)
+            kept = len(self.gen1)
             
             # Promote survivors to generation 2
-            self._promote_generation(self.gen1, self.gen2)
+            moved = self._promote_generation(self.gen1, self.gen2)
+            self.telemetry.record_generation(1, swept, kept, moved)
+            collected, survived, promoted = collected + swept, survived + kept, promoted + moved
+            oldest = 1
             
         if generation == 2 or generation is None:
             # Only collect gen2 if we're explicitly asked
             if generation == 2:
                 roots = self._find_roots() | set(self.gen0.keys()) | set(self.gen1.keys())
                 marked = self._mark(roots)
-                collected += self._sweep_generation(marked, self.gen2)
+                swept = self._sweep_generation(marked, self.gen2)
+                self.telemetry.record_generation(2, swept, len(self.gen2), 0)
+                collected, survived = collected + swept, survived + len(self.gen2)
+                oldest = 2
         
         self.collection_count += 1
-        duration = time.time() - start_time
+        duration = time.perf_counter() - start_time
+        self.telemetry.record_pause(duration)
+        self.telemetry.emit(GCEvent('collection', oldest, duration * 1000.0, collected, survived, promoted))
         
         if self.debug:
             print(f"GC: Collected {collected} objects in {duration:.3f}s")
 
+    # Incremental collection
+
+    def set_incremental(self, enabled: bool = True, max_pause_ms: Optional[float] = None) -> None:
+        """Switch incremental collection on or off and set the pause target"""
+        if not enabled and self._phase != 'idle':
+            self._advance(float('inf'))
+        self.incremental = enabled
+        if max_pause_ms is not None:
+            self.max_pause_ms = max(0.01, max_pause_ms)
+
+    def step(self, budget_ms: Optional[float] = None) -> bool:
+        """
+        Run one bounded slice of an incremental collection
+
+        Args:
+            budget_ms: Time budget for the slice, defaults to ``max_pause_ms``
+
+        Returns:
+            True if this slice completed a collection cycle
+        """
+        if not self.enabled:
+            return False
+        start = time.perf_counter()
+        budget = self.max_pause_ms if budget_ms is None else budget_ms
+        finished = self._advance(start + budget / 1000.0)
+        duration = time.perf_counter() - start
+        self.telemetry.record_pause(duration)
+        self._cycle_seconds += duration
+        if self.telemetry.listeners:
+            self.telemetry.emit(GCEvent('slice', max(self._cycle_generations), duration * 1000.0))
+        if finished:
+            self._report_cycle()
+        return finished
+
+    def _advance(self, deadline: float) -> bool:
+        if self._phase == 'idle':
+            self._start_cycle()
+        if self._phase == 'mark' and self._mark_slice(deadline):
+            self._begin_sweep()
+        if self._phase == 'sweep' and self._sweep_slice(deadline):
+            self._end_cycle()
+            return True
+        return False
+
+    def _start_cycle(self) -> None:
+        # Young objects every cycle, middle-aged ones once over threshold
+        self._cycle_generations = (0, 1) if len(self.gen1) >= self.gen1_threshold else (0,)
+        self._young_only = self._cycle_generations == (0,)
+        self._marked = set()
+        self._gray = []
+        self._start_root_pass()
+        self._cycle_first_pass = self._root_pass
+        self._cycle_collected = 0
+        self._cycle_stats = {g: [0, 0, 0] for g in self._cycle_generations}
+        self._cycle_seconds = 0.0
+        self._phase = 'mark'
+
+    def _mark_slice(self, deadline: float) -> bool:
+        """Drain the grey worklist until the deadline; True once marking is complete"""
+        marked, gray = self._marked, self._gray
+        work = 0
+        while True:
+            while gray:
+                self._scan_object(gray.pop(), marked, gray, self._young_only)
+                work += 1
+                if work % _SLICE_CHECK == 0 and time.perf_counter() >= deadline:
+                    return False
+            if self._root_sources or self._root_todo:
+                if not self._root_slice(deadline):
+                    return False
+                continue
+            # Roots have no barrier: every pass runs alongside the mutator, so
+            # marking ends only after a later pass finds nothing new
+            if not self._root_new and self._root_pass > self._cycle_first_pass:
+                return True
+            self._start_root_pass()
+
+    def _start_root_pass(self) -> None:
+        sources: List[Any] = [partial(list, self.handles.values())]
+        sources.extend(provider.gc_roots for provider in list(self.root_providers))
+        if self._young_only:
+            sources.extend(partial(self._remembered_refs, old_id) for old_id in list(self.remembered))
+        self._root_sources = sources
+        self._root_todo = []
+        self._root_new = 0
+        self._root_pass += 1
+        self._root_containers = 0
+
+    def _remembered_refs(self, old_id: int) -> List[Any]:
+        obj = self._get_object(old_id)
+        if obj is None:
+            return []
+        refs = [self._get_object(ref_id) for ref_id in self.references.get(old_id, ())]
+        refs.extend(obj.gc_references())
+        return refs
+
+    def _root_slice(self, deadline: float) -> bool:
+        """Advance the root pass until the deadline; True once it is complete
+
+        Sources are listed one at a time and containers are expanded as they
+        are reached, so no slice walks the whole root set.
+        """
+        marked, gray, todo, seen = self._marked, self._gray, self._root_todo, self._root_seen
+        young = self.gen0
+        stale = self._stale_seen
+        root_pass = self._root_pass
+        work = 0
+        while stale or todo or self._root_sources:
+            if stale:
+                if stale[-1]:
+                    stale[-1].popitem()
+                else:
+                    stale.pop()
+            elif todo:
+                value = todo.pop()
+                if isinstance(value, AmatakObject):
+                    obj_id = id(value)
+                    if (obj_id not in marked and self._is_tracked(obj_id)
+                            and (not self._young_only or obj_id in young)):
+                        marked.add(obj_id)
+                        gray.append(obj_id)
+                        self._root_new += 1
+                elif isinstance(value, (dict,) + _CONTAINERS):
+                    key = id(value)
+                    if seen.get(key) != root_pass:
+                        seen[key] = root_pass
+                        self._root_containers += 1
+                        todo.extend(value.values() if isinstance(value, dict) else value)
+            else:
+                todo.extend(self._root_sources.pop()())
+            work += 1
+            if work % _SLICE_CHECK == 0 and time.perf_counter() >= deadline:
+                return False
+        return True
+
+    def _begin_sweep(self) -> None:
+        generations = (self.gen0, self.gen1, self.gen2)
+        self._sweep_queue = [(g, list(generations[g].keys())) for g in self._cycle_generations]
+        self._phase = 'sweep'
+
+    def _sweep_slice(self, deadline: float) -> bool:
+        """Free or promote queued objects until the deadline; True when done"""
+        generations = (self.gen0, self.gen1, self.gen2)
+        marked = self._marked
+        work = 0
+        while self._sweep_queue:
+            g, pending = self._sweep_queue[-1]
+            source, target = generations[g], generations[min(g + 1, 2)]
+            while pending:
+                obj_id = pending.pop()
+                obj = source.get(obj_id)
+                if obj is not None:
+                    del source[obj_id]
+                    stats = self._cycle_stats[g]
+                    if obj_id in marked:
+                        target[obj_id] = obj
+                        stats[1] += 1
+                        if g < 2:
+                            stats[2] += sys.getsizeof(obj)
+                        if g == 0 and self._points_young(obj_id, obj):
+                            # Young objects allocated during the cycle stay behind
+                            self.remembered.add(obj_id)
+                    else:
+                        obj.__cleanup__()
+                        self.references.pop(obj_id, None)
+                        self.reverse_refs.pop(obj_id, None)
+                        self.remembered.discard(obj_id)
+                        self._cycle_collected += 1
+                        stats[0] += 1
+                work += 1
+                if work % _SLICE_CHECK == 0 and time.perf_counter() >= deadline:
+                    return False
+            self._sweep_queue.pop()
+        return True
+
+    def _end_cycle(self) -> None:
+        self._phase = 'idle'
+        self._marked = set()
+        self._gray = []
+        if len(self._root_seen) > 2 * self._root_containers + 1024:
+            self._stale_seen.append(self._root_seen)
+            self._root_seen = {}
+        # Drop remembered objects whose young referents were promoted or freed
+        self.remembered = {
+            obj_id for obj_id in self.remembered
+            if obj_id not in self.gen0 and self._points_young(obj_id, self._get_object(obj_id))
+        }
+        self.collection_count += 1
+        for g, (collected, survived, promoted) in self._cycle_stats.items():
+            self.telemetry.record_generation(g, collected, survived, promoted)
+        if self.debug:
+            print(f"GC: Incremental cycle collected {self._cycle_collected} objects")
+
+    def _report_cycle(self) -> None:
+        totals = [sum(column) for column in zip(*self._cycle_stats.values())]
+        self.telemetry.emit(GCEvent(
+            'cycle', max(self._cycle_generations), self._cycle_seconds * 1000.0, *totals
+        ))
+
     def _find_roots(self) -> Set[int]:
-        """Find root objects (stack, globals, etc.)"""
-        # TODO: Implement actual root finding from interpreter
-        # For now, return empty set - real implementation would track:
-        # - Stack references
-        # - Global variables
-        # - Active registers
-        return set()
-
-    def _mark(self, roots: Set[int]) -> Set[int]:
-        """Mark phase - find all reachable objects"""
-        marked = set()
+        """Find tracked objects held by root providers and host handles"""
+        values: List[Any] = list(self.handles.values())
+        for provider in list(self.root_providers):
+            values.extend(provider.gc_roots())
+        return self._scan(values)
+
+    def _scan(self, values: Iterable[Any]) -> Set[int]:
+        """Ids of tracked objects in ``values``, looking inside containers"""
+        found: Set[int] = set()
+        seen: Set[int] = set()
+        todo = list(values)
+        while todo:
+            value = todo.pop()
+            if isinstance(value, AmatakObject):
+                if self._is_tracked(id(value)):
+                    found.add(id(value))
+            elif isinstance(value, (dict,) + _CONTAINERS):
+                if id(value) in seen:
+                    continue
+                seen.add(id(value))
+                todo.extend(value.values() if isinstance(value, dict) else value)
+        return found
+
+    def _is_tracked(self, obj_id: int) -> bool:
+        return obj_id in self.gen0 or obj_id in self.gen1 or obj_id in self.gen2
+
+    def _get_object(self, obj_id: int) -> Optional[AmatakObject]:
+        for generation in (self.gen0, self.gen1, self.gen2):
+            obj = generation.get(obj_id)
+            if obj is not None:
+                return obj
+        return None
+
+    def _young_roots(self, roots: Set[int]) -> Set[int]:
+        """Young objects held by roots or by remembered old objects"""
+        young = self.gen0
+        found = {obj_id for obj_id in roots if obj_id in young}
+        for old_id in self.remembered:
+            found.update(ref_id for ref_id in self.references.get(old_id, ()) if ref_id in young)
+            obj = self._get_object(old_id)
+            if obj is not None:
+                found.update(ref_id for ref_id in self._scan(obj.gc_references()) if ref_id in young)
+        return found
+
+    def _points_young(self, obj_id: int, obj: Optional[AmatakObject]) -> bool:
+        young = self.gen0
+        if any(ref_id in young for ref_id in self.references.get(obj_id, ())):
+            return True
+        return obj is not None and any(ref_id in young for ref_id in self._scan(obj.gc_references()))
+
+    def _mark(self, roots: Set[int], young_only: bool = False) -> Set[int]:
+        """Mark phase - find all reachable objects (only young ones if asked)"""
+        marked = set(roots)
         to_process = list(roots)
-        
         while to_process:
-            obj_id = to_process.pop()
-            if obj_id in marked:
-                continue
-                
-            marked.add(obj_id)
-            
-            # Add all referenced objects
-            for ref_id in self.references.get(obj_id, set()):
-                if ref_id not in marked:
-                    to_process.append(ref_id)
-                    
+            self._scan_object(to_process.pop(), marked, to_process, young_only)
         return marked
 
+    def _scan_object(self, obj_id: int, marked: Set[int], gray: List[int], young_only: bool = False) -> None:
+        """Blacken an object: mark and queue everything it references"""
+        young = self.gen0
+        for ref_id in self.references.get(obj_id, ()):
+            if ref_id not in marked and (not young_only or ref_id in young):
+                marked.add(ref_id)
+                gray.append(ref_id)
+        obj = self._get_object(obj_id)
+        if obj is not None:
+            for ref_id in self._scan(obj.gc_references()):
+                if ref_id not in marked and (not young_only or ref_id in young):
+                    marked.add(ref_id)
+                    gray.append(ref_id)
+
     def _sweep_generation(self, marked: Set[int], generation: Dict[int, AmatakObject]) -> int:
         """Sweep phase - collect unreachable objects"""
         collected = 0
@@ -147,10 +528,11 @@ class GarbageCollector:
             if obj_id not in marked:
                 # Clean up object
                 obj = generation.get(obj_id)
-                if obj:
+                if obj is not None:
                     obj.__cleanup__()
                     del self.references[obj_id]
                     del self.reverse_refs[obj_id]
+                    self.remembered.discard(obj_id)
                     dead_objects.append(obj_id)
                     collected += 1
         
@@ -161,11 +543,14 @@ class GarbageCollector:
                 
         return collected
 
-    def _promote_generation(self, source: Dict[int, AmatakObject], target: Dict[int, AmatakObject]) -> None:
-        """Promote surviving objects to next generation"""
+    def _promote_generation(self, source: Dict[int, AmatakObject], target: Dict[int, AmatakObject]) -> int:
+        """Promote surviving objects to next generation; returns their shallow size"""
+        promoted = 0
         for obj_id, obj in list(source.items()):
             target[obj_id] = obj
             del source[obj_id]
+            promoted += sys.getsizeof(obj)
+        return promoted
 
     def disable(self) -> None:
         """Temporarily disable garbage collection"""
@@ -185,9 +570,36 @@ class GarbageCollector:
             'gen1_objects': len(self.gen1),
             'gen2_objects': len(self.gen2),
             'total_references': sum(len(refs) for refs in self.references.values()),
+            'remembered_objects': len(self.remembered),
             'collections': self.collection_count,
-            'enabled': self.enabled
+            'enabled': self.enabled,
+            'incremental': self.incremental,
+            'phase': self._phase,
+            'pauses': self.pauses.to_dict()
+        }
+
+    def get_telemetry(self) -> dict:
+        """Per-generation counts, survival rates, promoted bytes and pause histograms"""
+        telemetry = self.telemetry.snapshot()
+        telemetry['heap'] = {
+            'objects': [len(self.gen0), len(self.gen1), len(self.gen2)],
+            'remembered_objects': len(self.remembered),
+            'root_providers': len(self.root_providers),
+            'handles': len(self.handles),
         }
+        telemetry['incremental'] = {
+            'enabled': self.incremental,
+            'max_pause_ms': self.max_pause_ms,
+            'phase': self._phase,
+        }
+        return telemetry
+
+    def add_listener(self, listener) -> None:
+        """Call ``listener(GCEvent)`` after every collection, slice and incremental cycle"""
+        self.telemetry.add_listener(listener)
+
+    def remove_listener(self, listener) -> None:
+        self.telemetry.remove_listener(listener)
 
     def set_threshold(self, gen0: int = None, gen1: int = None) -> None:
         """Adjust collection thresholds"""
@@ -0,0 +1,163 @@
+import mmap
+import ctypes
+from typing import Dict, List, Set, Tuple
+from ..errors import AmatakMemoryError
+
+MIN_SHIFT = 6            # smallest block is 64 bytes
+SLAB_SIZE = 256 * 1024
+MAX_SLAB_BLOCK = 16 * 1024
+
+def size_class_index(size: int) -> int:
+    """Index of the power-of-two size class holding ``size`` bytes"""
+    return max(size - 1, (1 << MIN_SHIFT) - 1).bit_length() - MIN_SHIFT
+
+def size_class(size: int) -> int:
+    """Smallest power-of-two size class (at least 64 bytes) holding ``size``"""
+    return 1 << (size_class_index(size) + MIN_SHIFT)
+
+class Slab:
+    """One mapping carved into equal blocks
+
+    Free blocks form an intrusive singly linked list: the first 8 bytes of
+    a free block hold the address of the next one (0 ends the list).
+    Blocks past ``bump`` have never been handed out and are carved lazily,
+    so untouched pages of a new slab are never faulted in.
+    """
+    __slots__ = ('mapping', 'address', 'end', 'block_size', 'bump', 'free_head', 'live')
+
+    def __init__(self, mapping: mmap.mmap, address: int, size: int, block_size: int):
+        self.mapping = mapping
+        self.address = address
+        self.end = address + size - size % block_size
+        self.block_size = block_size
+        self.bump = address
+        self.free_head = 0
+        self.live = 0
+
+    @property
+    def capacity(self) -> int:
+        return (self.end - self.address) // self.block_size
+
+    @property
+    def full(self) -> bool:
+        return not self.free_head and self.bump >= self.end
+
+    def pop(self) -> int:
+        address = self.free_head
+        if address:
+            self.free_head = ctypes.c_uint64.from_address(address).value
+        else:
+            address = self.bump
+            self.bump += self.block_size
+        self.live += 1
+        return address
+
+    def push(self, address: int):
+        ctypes.c_uint64.from_address(address).value = self.free_head
+        self.free_head = address
+        self.live -= 1
+
+class SlabAllocator:
+    """Size-class slabs for small blocks
+
+    Each size class keeps the slabs that still have free blocks; allocation
+    and free are O(1) and touch no syscall unless a slab is created or
+    released. One empty slab per class is kept to absorb alloc/free churn.
+    """
+
+    def __init__(self, slab_size: int = SLAB_SIZE, max_block: int = MAX_SLAB_BLOCK):
+        self.slab_size = slab_size
+        self.max_block = max_block
+        classes = size_class_index(max_block) + 1
+        self.partial: List[List[Slab]] = [[] for _ in range(classes)]
+        self.slabs: Set[Slab] = set()
+
+    def handles(self, size: int) -> bool:
+        return size <= self.max_block
+
+    def allocate(self, size: int) -> Tuple[int, Slab]:
+        """Allocate a block: (address, owning slab)"""
+        index = size_class_index(size)
+        partial = self.partial[index]
+        if partial:
+            slab = partial[-1]
+        else:
+            slab = self._new_slab(1 << (index + MIN_SHIFT))
+            partial.append(slab)
+        address = slab.pop()
+        if slab.full:
+            partial.pop()
+        return address, slab
+
+    def free(self, slab: Slab, address: int) -> None:
+        was_full = slab.full
+        slab.push(address)
+        partial = self.partial[size_class_index(slab.block_size)]
+        if was_full:
+            partial.append(slab)
+        elif slab.live == 0 and len(partial) > 1:
+            partial.remove(slab)
+            self._release(slab)
+
+    def trim(self) -> int:
+        """Hand the pages of empty cached slabs back to the kernel
+
+        An empty slab is reset to its uncarved state first, so the free list
+        (which lives in the released pages) is not needed afterwards.
+
+        Returns:
+            Number of bytes released
+        """
+        advice = getattr(mmap, 'MADV_DONTNEED', None)
+        released = 0
+        for partial in self.partial:
+            for slab in partial:
+                if slab.live or slab.bump == slab.address:
+                    continue
+                slab.bump = slab.address
+                slab.free_head = 0
+                if advice is not None:
+                    slab.mapping.madvise(advice)
+                released += self.slab_size
+        return released
+
+    def _new_slab(self, block_size: int) -> Slab:
+        try:
+            mapping = mmap.mmap(-1, self.slab_size)
+        except (OSError, ValueError) as e:
+            raise AmatakMemoryError(f"Slab allocation failed: {str(e)}")
+        address = ctypes.addressof(ctypes.c_char.from_buffer(mapping))
+        slab = Slab(mapping, address, self.slab_size, block_size)
+        self.slabs.add(slab)
+        return slab
+
+    def _release(self, slab: Slab) -> None:
+        self.slabs.discard(slab)
+        slab.mapping.close()
+
+    def release_all(self) -> None:
+        """Unmap every slab; outstanding blocks become invalid"""
+        for slab in list(self.slabs):
+            self._release(slab)
+        for partial in self.partial:
+            partial.clear()
+
+    def get_stats(self) -> dict:
+        classes: Dict[int, dict] = {}
+        for slab in self.slabs:
+            entry = classes.setdefault(slab.block_size, {'slabs': 0, 'blocks': 0, 'capacity': 0})
+            entry['slabs'] += 1
+            entry['blocks'] += slab.live
+            entry['capacity'] += slab.capacity
+        for entry in classes.values():
+            entry['occupancy'] = entry['blocks'] / entry['capacity']
+        used = sum(slab.live * slab.block_size for slab in self.slabs)
+        mapped = len(self.slabs) * self.slab_size
+        return {
+            'slabs': len(self.slabs),
+            'mapped_bytes': mapped,
+            'used_bytes': used,
+            'blocks': sum(slab.live for slab in self.slabs),
+            'occupancy': used / mapped if mapped else 0.0,
+            'classes': dict(sorted(classes.items())),
+        }
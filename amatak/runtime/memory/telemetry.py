@@ -0,0 +1,133 @@
+"""Collector and allocator telemetry
+
+``GCTelemetry`` accumulates per-generation collection counts, pause
+histograms, survival rates and promoted bytes for a ``GarbageCollector``
+and forwards a ``GCEvent`` for every pause to registered listeners.
+"""
+import time
+from bisect import bisect_left
+from dataclasses import asdict, dataclass, field
+from typing import Callable, List, Tuple
+
+# Upper bounds (ms) of the pause histogram buckets; the last bucket is open
+PAUSE_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 25.0, 50.0, 100.0)
+
+class PauseHistogram:
+    """Bucketed record of collector pause times"""
+
+    def __init__(self, buckets_ms: Tuple[float, ...] = PAUSE_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds: float) -> None:
+        ms = seconds * 1000.0
+        self.counts[bisect_left(self.buckets_ms, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound (ms) of the bucket holding the given fraction of pauses"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return self.buckets_ms[i] if i < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        labels = [f'<={b}' for b in self.buckets_ms] + [f'>{self.buckets_ms[-1]}']
+        return {
+            'count': self.count,
+            'total_ms': self.total_ms,
+            'max_ms': self.max_ms,
+            'p50_ms': self.percentile(0.5),
+            'p99_ms': self.percentile(0.99),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+@dataclass
+class GCEvent:
+    """One collector pause"""
+    # 'collection' (stop-the-world), 'slice' (incremental step) or
+    # 'cycle' (an incremental collection finished; duration is the sum of its slices)
+    kind: str
+    # Oldest generation collected
+    generation: int
+    duration_ms: float
+    collected: int = 0
+    survived: int = 0
+    promoted_bytes: int = 0
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+class GCTelemetry:
+    """Counters, histograms and event listeners for one collector"""
+
+    GENERATIONS = 3
+
+    def __init__(self):
+        self.pauses = PauseHistogram()
+        self.pauses_by_generation = [PauseHistogram() for _ in range(self.GENERATIONS)]
+        self.collections = [0] * self.GENERATIONS
+        self.collected = [0] * self.GENERATIONS
+        self.survived = [0] * self.GENERATIONS
+        # Shallow bytes promoted out of each generation
+        self.promoted_bytes = [0] * self.GENERATIONS
+        self.listeners: List[Callable[[GCEvent], None]] = []
+        self.listener_errors = 0
+
+    def add_listener(self, listener: Callable[[GCEvent], None]) -> None:
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[GCEvent], None]) -> None:
+        self.listeners.remove(listener)
+
+    def record_pause(self, seconds: float) -> None:
+        self.pauses.record(seconds)
+
+    def record_generation(self, generation: int, collected: int, survived: int, promoted_bytes: int) -> None:
+        self.collections[generation] += 1
+        self.collected[generation] += collected
+        self.survived[generation] += survived
+        self.promoted_bytes[generation] += promoted_bytes
+
+    def emit(self, event: GCEvent) -> None:
+        """Record an event's pause per generation and pass it to listeners"""
+        if event.kind != 'slice':
+            self.pauses_by_generation[event.generation].record(event.duration_ms / 1000.0)
+        for listener in list(self.listeners):
+            try:
+                listener(event)
+            except Exception:
+                # A broken listener must not break collection
+                self.listener_errors += 1
+
+    def survival_rate(self, generation: int) -> float:
+        seen = self.collected[generation] + self.survived[generation]
+        return self.survived[generation] / seen if seen else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            'pauses': self.pauses.to_dict(),
+            'generations': [
+                {
+                    'collections': self.collections[g],
+                    'collected': self.collected[g],
+                    'survived': self.survived[g],
+                    'survival_rate': self.survival_rate(g),
+                    'promoted_bytes': self.promoted_bytes[g],
+                    'pauses': self.pauses_by_generation[g].to_dict(),
+                }
+                for g in range(self.GENERATIONS)
+            ],
+            'listener_errors': self.listener_errors,
+        }
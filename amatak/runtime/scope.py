@@ -35,4 +35,11 @@ class Scope:
 
     def create_child(self):
         """Create a new nested scope"""
-        return Scope(parent=self)
\ No newline at end of file
+        return Scope(parent=self)
+
+    def gc_roots(self):
+        """Values visible from this scope, for GC root discovery"""
+        scope = self
+        while scope is not None:
+            yield from scope.variables.values()
+            scope = scope.parent
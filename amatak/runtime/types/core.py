@@ -1,13 +1,77 @@
-from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Type, Union
+import inspect
+from dataclasses import FrozenInstanceError, dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type, Union
+from weakref import WeakValueDictionary
 from ..errors import AmatakTypeError
 
-@dataclass
-class AmatakType:
-    """Base type for all Amatak types"""
+# Hash-consing table: canonical constructor arguments -> the one instance
+_INTERNED: "WeakValueDictionary[tuple, AmatakType]" = WeakValueDictionary()
+_SIGNATURES: Dict[type, inspect.Signature] = {}
+
+def _intern_key(value: Any) -> Any:
+    """Hashable form of a constructor argument (TypeError if there is none)"""
+    if isinstance(value, AmatakType):
+        return value
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(_intern_key(item) for item in value))
+    if isinstance(value, dict):
+        return (dict, tuple((name, _intern_key(item)) for name, item in value.items()))
+    hash(value)
+    # The type keeps 1, 1.0 and True apart
+    return (type(value), value)
+
+def _rebuild(cls: type, args: tuple, kwargs: dict) -> 'AmatakType':
+    return cls(*args, **kwargs)
+
+class _Interned(type):
+    """Metaclass making type construction a hash-consing factory
+
+    Constructor arguments are bound to the ``__init__`` signature, so
+    ``IntegerType(0)`` and ``IntegerType(min_val=0)`` are the same object.
+    Instances are frozen once ``__init__`` returns. Arguments that have no
+    hashable form give a frozen instance that is not shared.
+    """
+
+    def __call__(cls, *args, **kwargs):
+        signature = _SIGNATURES.get(cls)
+        if signature is None:
+            signature = _SIGNATURES[cls] = inspect.signature(cls.__init__)
+        bound = signature.bind(None, *args, **kwargs)
+        bound.apply_defaults()
+        args, kwargs = bound.args[1:], bound.kwargs
+        try:
+            key = (cls, _intern_key(args), _intern_key(kwargs))
+        except TypeError:
+            key = None
+        else:
+            typ = _INTERNED.get(key)
+            if typ is not None:
+                return typ
+        typ = super().__call__(*args, **kwargs)
+        # Private copies, so callers mutating their arguments cannot reach in
+        typ._freeze(tuple(_copy_container(arg) for arg in args),
+                    {name: _copy_container(arg) for name, arg in kwargs.items()})
+        if key is not None:
+            _INTERNED[key] = typ
+        return typ
+
+def _copy_container(value: Any) -> Any:
+    if isinstance(value, (list, dict)):
+        return type(value)(value)
+    return value
+
+@dataclass(eq=False)
+class AmatakType(metaclass=_Interned):
+    """Base type for all Amatak types
+
+    Types are interned: constructing a type equal to an existing one
+    returns that instance, so types compare (and hash) by identity. They
+    are immutable once constructed.
+    """
     name: str
     default: Any = None
-    constraints: List[Any] = field(default_factory=list)
+    constraints: Tuple[Any, ...] = ()
     
     def validate(self, value: Any) -> bool:
         """Validate if a value matches this type"""
@@ -20,6 +84,34 @@ class AmatakType:
     def __str__(self) -> str:
         return self.name
 
+    def _freeze(self, args: tuple, kwargs: dict) -> None:
+        object.__setattr__(self, 'constraints', tuple(self.constraints))
+        object.__setattr__(self, '_args', (args, kwargs))
+        object.__setattr__(self, '_frozen', True)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if self.__dict__.get('_frozen'):
+            raise FrozenInstanceError(f"cannot assign to field '{name}' of type {self}")
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name: str) -> None:
+        if self.__dict__.get('_frozen'):
+            raise FrozenInstanceError(f"cannot delete field '{name}' of type {self}")
+        object.__delattr__(self, name)
+
+    def __reduce__(self):
+        # Copies and unpickled types go through the factory again
+        args, kwargs = self._args
+        return _rebuild, (type(self), args, kwargs)
+
+def _compiled_validator(typ: AmatakType):
+    """Cached generated validator of a built-in container type (see .validator)"""
+    validator = typ.__dict__.get('_validator')
+    if validator is None:
+        from .validator import compile_validator
+        validator = compile_validator(typ)
+    return validator
+
 class DynamicType(AmatakType):
     """Type that accepts any value (dynamic typing)"""
     def __init__(self):
@@ -35,9 +127,9 @@ class IntegerType(AmatakType):
         self.min = min_val
         self.max = max_val
         if min_val is not None:
-            self.constraints.append(f"min={min_val}")
+            self.constraints += (f"min={min_val}",)
         if max_val is not None:
-            self.constraints.append(f"max={max_val}")
+            self.constraints += (f"max={max_val}",)
     
     def validate(self, value: Any) -> bool:
         if not isinstance(value, int):
@@ -64,9 +156,9 @@ class FloatType(AmatakType):
         self.min = min_val
         self.max = max_val
         if min_val is not None:
-            self.constraints.append(f"min={min_val}")
+            self.constraints += (f"min={min_val}",)
         if max_val is not None:
-            self.constraints.append(f"max={max_val}")
+            self.constraints += (f"max={max_val}",)
     
     def validate(self, value: Any) -> bool:
         if not isinstance(value, (int, float)):
@@ -93,9 +185,9 @@ class StringType(AmatakType):
         self.max_length = max_length
         self.pattern = pattern
         if max_length is not None:
-            self.constraints.append(f"max_len={max_length}")
+            self.constraints += (f"max_len={max_length}",)
         if pattern is not None:
-            self.constraints.append(f"pattern={pattern}")
+            self.constraints += (f"pattern={pattern}",)
     
     def validate(self, value: Any) -> bool:
         if not isinstance(value, str):
@@ -144,13 +236,15 @@ class ArrayType(AmatakType):
         self.element_type = element_type
         self.min_len = min_len
         self.max_len = max_len
-        self.constraints.append(f"elements={element_type.name}")
+        self.constraints += (f"elements={element_type.name}",)
         if min_len is not None:
-            self.constraints.append(f"min_len={min_len}")
+            self.constraints += (f"min_len={min_len}",)
         if max_len is not None:
-            self.constraints.append(f"max_len={max_len}")
+            self.constraints += (f"max_len={max_len}",)
     
     def validate(self, value: Any) -> bool:
+        if type(self) is ArrayType:
+            return _compiled_validator(self)(value)
         if not isinstance(value, list):
             return False
         if self.min_len is not None and len(value) < self.min_len:
@@ -177,11 +271,13 @@ class ObjectType(AmatakType):
     """Structured object type"""
     def __init__(self, fields: Dict[str, AmatakType]):
         super().__init__("Object", {})
-        self.fields = fields
+        self.fields = MappingProxyType(dict(fields))
         for name, typ in fields.items():
-            self.constraints.append(f"{name}: {typ.name}")
+            self.constraints += (f"{name}: {typ.name}",)
     
     def validate(self, value: Any) -> bool:
+        if type(self) is ObjectType:
+            return _compiled_validator(self)(value)
         if not isinstance(value, dict):
             return False
         return all(
@@ -207,10 +303,10 @@ class FunctionType(AmatakType):
     """Function type"""
     def __init__(self, params: List[AmatakType], return_type: AmatakType):
         super().__init__("Function", None)
-        self.params = params
+        self.params = tuple(params)
         self.return_type = return_type
-        self.constraints.extend([f"param: {p.name}" for p in params])
-        self.constraints.append(f"returns: {return_type.name}")
+        self.constraints += tuple(f"param: {p.name}" for p in params)
+        self.constraints += (f"returns: {return_type.name}",)
     
     def validate(self, value: Any) -> bool:
         # In Amatak, functions are callable objects
@@ -230,6 +326,20 @@ class NullableType(AmatakType):
             return None
         return self.base_type.coerce(value)
 
+class AmatakObject:
+    """Base class for heap objects tracked by the garbage collector
+
+    Besides edges recorded with ``GarbageCollector.add_reference``, the
+    collector traces whatever ``gc_references`` returns.
+    """
+    def gc_references(self) -> Iterable[Any]:
+        """Values held by this object (objects or containers of them)"""
+        return ()
+
+    def __cleanup__(self) -> None:
+        """Release external resources when the object is collected"""
+        pass
+
 # Built-in type instances
 DYNAMIC = DynamicType()
 INTEGER = IntegerType()
@@ -1,4 +1,5 @@
-from typing import Dict, List, Optional, Union
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
 from .core import (
     AmatakType, DynamicType, IntegerType, FloatType, StringType, 
     BooleanType, ArrayType, ObjectType, FunctionType, NullableType,
@@ -8,9 +9,15 @@ from ..errors import AmatakTypeError
 
 class TypeInferrer:
     """Performs type inference and validation across the language runtime"""
+
+    # Subtype results kept, least recently used dropped first; the cache
+    # holds its types alive, so it must not grow with every type ever built
+    SUBTYPE_CACHE_SIZE = 1024
     
     def __init__(self):
         self._type_cache: Dict[str, AmatakType] = {}
+        # Types are interned, so pairs of them key the subtype relation
+        self._subtype_cache: 'OrderedDict[Tuple[AmatakType, AmatakType], bool]' = OrderedDict()
         self._current_scope = 0
         self._scopes: List[Dict[str, AmatakType]] = [{}]
     
@@ -54,8 +61,8 @@ class TypeInferrer:
         if op in {'+', '-', '*', '/', '%'}:
             if isinstance(left_type, (IntegerType, FloatType)) and \
                isinstance(right_type, (IntegerType, FloatType)):
-                # Promote to float if either operand is float
-                if isinstance(left_type, FloatType) or isinstance(right_type, FloatType):
+                # Promote to float if either operand is float; / is true division
+                if op == '/' or isinstance(left_type, FloatType) or isinstance(right_type, FloatType):
                     return FloatType()
                 return IntegerType()
             # String concatenation
@@ -132,6 +139,21 @@ class TypeInferrer:
     
     def is_subtype(self, subtype: AmatakType, supertype: AmatakType) -> bool:
         """Check if one type is a subtype of another"""
+        if subtype is supertype:
+            return True
+        key = (subtype, supertype)
+        cache = self._subtype_cache
+        result = cache.get(key)
+        if result is not None:
+            cache.move_to_end(key)
+            return result
+        result = self._is_subtype(subtype, supertype)
+        cache[key] = result
+        if len(cache) > self.SUBTYPE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return result
+
+    def _is_subtype(self, subtype: AmatakType, supertype: AmatakType) -> bool:
         # Every type is a subtype of Dynamic
         if isinstance(supertype, DynamicType):
             return True
@@ -150,8 +172,11 @@ class TypeInferrer:
                 if (isinstance(supertype, IntegerType) and 
                     isinstance(subtype, IntegerType)):
                     return (
-                        (supertype.min is None or subtype.min >= supertype.min) and
-                        (supertype.max is None or subtype.max <= supertype.max)
+                        (supertype.min is None or
+                         (subtype.min is not None and subtype.min >= supertype.min)) and
+                        (supertype.max is None or
+                         (subtype.max is not None and subtype.max <= supertype.max))
+                    )
                 # Int is subtype of Float
                 if isinstance(subtype, IntegerType) and isinstance(supertype, FloatType):
                     return True
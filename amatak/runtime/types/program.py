@@ -0,0 +1,762 @@
+"""Whole-program type inference over parsed Amatak programs
+
+``ProgramInferrer.infer`` types every function signature and variable of
+a program (the parser's statement list), with ``TypeInferrer``'s operator
+rules.
+
+The program is split into units: the module body and each function. A
+unit is analysed under an environment: its parameter types and the
+return types of the functions it calls. A parameter's type is the join of
+the argument types at every call site in the program; functions that are
+never called (embedders may call them) and functions defined more than
+once get Dynamic parameters. Units are solved together as a monotone
+fixpoint starting from "no information", so recursive functions get
+precise types too.
+
+Variables are typed per unit, flow-insensitively, as the join of every
+value assigned to them. A read that may run before the unit has assigned
+the name sees a caller's or a global binding (dynamic scoping), so such
+names are Dynamic. Arrays are shared by reference, so once any element
+store could break an array's element type every element type in the
+program becomes Dynamic.
+
+Unit analyses are memoized by (unit digest, environment) in the inferrer
+and, optionally, in a ``SignatureCache`` on disk: re-inferring after an
+edit re-analyses only the edited units and the units whose environment
+changed as a result. Digests do not include absolute line numbers, so
+code that merely moved is not re-analysed.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+from ...core.ast.optimizer import operator_symbol
+from ...core.ast.visitor import child_fields, walk
+from ...nodes import (
+    ASTNode, ArrayAccessNode, ArrayNode, AssignmentNode, BinOpNode, BooleanNode,
+    CallNode, ForNode, FuncNode, IdentifierNode, IfNode, NumberNode, PrintNode,
+    ReturnNode, StringNode, TernaryNode, UnaryOpNode
+)
+from ..errors import AmatakTypeError
+from .core import (
+    BOOLEAN, DYNAMIC, FLOAT, INTEGER, STRING, AmatakType, ArrayType,
+    FunctionType, NullableType, type_of
+)
+from .inference import TypeInferrer
+
+MODULE = '<module>'
+CACHE_VERSION = 1
+SIGNATURE_FILE = 'signatures.json'
+
+# Type of a bare ``return`` and of falling off the end of a function
+NULL = type_of(None)
+
+# Deeper array types are widened to arrays of Dynamic, so the fixpoint
+# terminates for functions that wrap their argument in an array
+MAX_ARRAY_DEPTH = 3
+
+_COMPARISONS = {'<', '>', '<=', '>='}
+
+def _array(element: AmatakType) -> AmatakType:
+    depth, current = 1, element
+    while isinstance(current, ArrayType):
+        depth += 1
+        current = current.element_type
+    return ArrayType(element if depth <= MAX_ARRAY_DEPTH else DYNAMIC)
+
+def join(a: Optional[AmatakType], b: Optional[AmatakType]) -> Optional[AmatakType]:
+    """Least common supertype of two inferred types (None is "no value yet")"""
+    if a is None or a is b:
+        return b
+    if b is None:
+        return a
+    if a is DYNAMIC or b is DYNAMIC:
+        return DYNAMIC
+    if b is NULL:
+        a, b = b, a
+    if a is NULL:
+        return b if isinstance(b, NullableType) else NullableType(b)
+    if isinstance(a, NullableType) or isinstance(b, NullableType):
+        base = join(getattr(a, 'base_type', a), getattr(b, 'base_type', b))
+        return DYNAMIC if base is DYNAMIC else NullableType(base)
+    if isinstance(a, ArrayType) and isinstance(b, ArrayType):
+        return _array(join(a.element_type, b.element_type))
+    if {a, b} == {INTEGER, FLOAT}:
+        return FLOAT
+    return DYNAMIC
+
+def encode_type(typ: Optional[AmatakType]) -> Any:
+    """JSON form of an inferred type"""
+    if typ is None:
+        return None
+    if isinstance(typ, NullableType):
+        return ['Nullable', encode_type(typ.base_type)]
+    if isinstance(typ, ArrayType):
+        return ['Array', encode_type(typ.element_type)]
+    if typ in (INTEGER, FLOAT, STRING, BOOLEAN):
+        return typ.name
+    return 'Dynamic'
+
+_SIMPLE = {typ.name: typ for typ in (INTEGER, FLOAT, STRING, BOOLEAN, DYNAMIC)}
+
+def decode_type(data: Any) -> Optional[AmatakType]:
+    """Inverse of ``encode_type`` (ValueError for malformed data)"""
+    if data is None:
+        return None
+    if isinstance(data, str) and data in _SIMPLE:
+        return _SIMPLE[data]
+    if isinstance(data, list) and len(data) == 2:
+        inner = decode_type(data[1])
+        if data[0] == 'Nullable' and inner is not None:
+            return NullableType(inner)
+        if data[0] == 'Array' and inner is not None:
+            return ArrayType(inner)
+    raise ValueError(f"bad type: {data!r}")
+
+# Units
+
+@dataclass
+class _Unit:
+    name: str
+    params: Tuple[str, ...]
+    body: List[Any]
+    line: Optional[int]
+    digest: str = ''
+    # Functions called by name, and names that may be read before assignment
+    callees: FrozenSet[str] = frozenset()
+    unbound_reads: FrozenSet[str] = frozenset()
+    falls_through: bool = True
+
+_CLOSE = object()
+
+def _unit_digest(unit: _Unit) -> str:
+    """Content hash of a unit, with lines relative to its first line;
+    nested function definitions contribute only their names"""
+    h = hashlib.sha256(repr((unit.name, unit.params)).encode('utf-8'))
+    todo: List[Any] = [unit.body]
+    while todo:
+        item = todo.pop()
+        if item is _CLOSE:
+            h.update(b')')
+        elif isinstance(item, list):
+            h.update(b'[')
+            todo.append(_CLOSE)
+            todo.extend(reversed(item))
+        elif isinstance(item, FuncNode):
+            h.update(f'def {item.name};'.encode('utf-8'))
+        elif isinstance(item, ASTNode):
+            fields = child_fields(item)
+            scalars = {name: value for name, value in vars(item).items() if name not in fields}
+            line = scalars.pop('line', None)
+            if line is not None and unit.line is not None:
+                line -= unit.line
+            h.update(repr((type(item).__name__, line, sorted(scalars.items()))).encode('utf-8'))
+            h.update(b'(')
+            todo.append(_CLOSE)
+            todo.extend(getattr(item, name) for name in reversed(fields))
+        else:
+            h.update(repr(item).encode('utf-8'))
+    return h.hexdigest()
+
+def _call_name(node: CallNode) -> str:
+    return node.name.name if isinstance(node.name, IdentifierNode) else node.name
+
+def _always_returns(stmts) -> bool:
+    if not isinstance(stmts, list):
+        stmts = [stmts]
+    for stmt in stmts:
+        if isinstance(stmt, ReturnNode):
+            return True
+        if isinstance(stmt, IfNode) and stmt.else_branch is not None:
+            if _always_returns(stmt.then_branch) and _always_returns(stmt.else_branch):
+                return True
+    return False
+
+def _own_nodes(body):
+    """Nodes of a unit body, not descending into nested functions"""
+    todo = [body]
+    while todo:
+        current = todo.pop()
+        if isinstance(current, list):
+            todo.extend(reversed(current))
+        elif isinstance(current, ASTNode):
+            yield current
+            if isinstance(current, FuncNode):
+                continue
+            for name in reversed(child_fields(current)):
+                value = getattr(current, name)
+                if isinstance(value, (ASTNode, list)):
+                    todo.append(value)
+
+class _Reads:
+    """Names a unit may read before assigning them itself"""
+
+    def __init__(self):
+        self.unbound: Set[str] = set()
+
+    def block(self, stmts, assigned: Set[str]) -> Set[str]:
+        for stmt in stmts if isinstance(stmts, list) else [stmts]:
+            assigned = self.statement(stmt, assigned)
+        return assigned
+
+    def statement(self, stmt, assigned: Set[str]) -> Set[str]:
+        if isinstance(stmt, FuncNode):
+            return assigned
+        if isinstance(stmt, IfNode):
+            self.expression(stmt.condition, assigned)
+            then = self.block(stmt.then_branch, set(assigned))
+            other = self.block(stmt.else_branch, set(assigned)) if stmt.else_branch is not None else assigned
+            return then & other
+        if isinstance(stmt, ForNode):
+            self.expression(stmt.start, assigned)
+            inner = set(assigned) | {stmt.var_name}
+            self.expression(stmt.condition, inner)
+            inner = self.block(stmt.body, inner)
+            self.statement(stmt.step, inner)
+            return set(assigned) | {stmt.var_name}
+        if isinstance(stmt, ReturnNode):
+            if stmt.expression is not None:
+                self.expression(stmt.expression, assigned)
+            return assigned
+        if isinstance(stmt, PrintNode):
+            self.expression(stmt.value, assigned)
+            return assigned
+        return self.expression(stmt, assigned)
+
+    def expression(self, node, assigned: Set[str]) -> Set[str]:
+        # Values are evaluated before their assignment's target is bound
+        nodes = list(_own_nodes(node))
+        targets = {id(current.name) for current in nodes if isinstance(current, AssignmentNode)}
+        for current in nodes:
+            if isinstance(current, IdentifierNode) and id(current) not in targets and current.name not in assigned:
+                self.unbound.add(current.name)
+        for current in nodes:
+            if isinstance(current, AssignmentNode):
+                target = current.name
+                if isinstance(target, IdentifierNode):
+                    assigned.add(target.name)
+                elif isinstance(target, str):
+                    assigned.add(target)
+        return assigned
+
+def _make_unit(name: str, params: Sequence[str], body: List[Any], line: Optional[int]) -> _Unit:
+    unit = _Unit(name, tuple(params), body, line)
+    unit.digest = _unit_digest(unit)
+    unit.callees = frozenset(_call_name(node) for node in _own_nodes(body) if isinstance(node, CallNode))
+    reads = _Reads()
+    reads.block(body, set(params))
+    unit.unbound_reads = frozenset(reads.unbound)
+    unit.falls_through = not _always_returns(body)
+    return unit
+
+def program_units(tree: List[Any]) -> List[_Unit]:
+    """The module body and every function of a program, module first"""
+    units = [_make_unit(MODULE, (), tree, None)]
+    for node in walk(tree):
+        if isinstance(node, FuncNode):
+            units.append(_make_unit(node.name, node.params, node.body, getattr(node, 'line', None)))
+    return units
+
+# Analysis of one unit
+
+@dataclass
+class UnitResult:
+    """What a unit's analysis found under one environment"""
+    returns: Optional[AmatakType]
+    variables: Dict[str, Optional[AmatakType]]
+    # callee -> join of the argument types at this unit's call sites
+    calls: Dict[str, Tuple[Optional[AmatakType], ...]]
+    # (line relative to the unit, message)
+    diagnostics: List[Tuple[Optional[int], str]] = field(default_factory=list)
+    # An element store may break an array's element type
+    mixed_arrays: bool = False
+
+    def to_json(self) -> dict:
+        return {
+            'returns': encode_type(self.returns),
+            'variables': {name: encode_type(typ) for name, typ in self.variables.items()},
+            'calls': {name: [encode_type(typ) for typ in args] for name, args in self.calls.items()},
+            'diagnostics': [list(entry) for entry in self.diagnostics],
+            'mixed_arrays': self.mixed_arrays,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'UnitResult':
+        return cls(
+            returns=decode_type(data['returns']),
+            variables={name: decode_type(typ) for name, typ in data['variables'].items()},
+            calls={name: tuple(decode_type(typ) for typ in args) for name, args in data['calls'].items()},
+            diagnostics=[(line, str(message)) for line, message in data['diagnostics']],
+            mixed_arrays=bool(data['mixed_arrays']),
+        )
+
+class _Analysis:
+    """Types of one unit's variables, returns and call arguments"""
+
+    def __init__(self, inferrer: TypeInferrer, unit: _Unit, params, callees: Dict[str, tuple],
+                 dynamic_arrays: bool):
+        self.inferrer = inferrer
+        self.unit = unit
+        self.params = params
+        # name -> (arity or None if unknown/redefined, return type)
+        self.callees = callees
+        self.dynamic_arrays = dynamic_arrays
+        self.reset({})
+
+    def reset(self, variables: Dict[str, Optional[AmatakType]]):
+        self.variables = variables
+        self.returns: Optional[AmatakType] = None
+        self.calls: Dict[str, Tuple[Optional[AmatakType], ...]] = {}
+        self.diagnostics: List[Tuple[Optional[int], str]] = []
+        self.mixed = False
+        self.line = self.unit.line
+
+    def run(self) -> UnitResult:
+        variables: Dict[str, Optional[AmatakType]] = {}
+        while True:
+            before = dict(variables)
+            self.reset(variables)
+            for name in self.unit.unbound_reads:
+                variables[name] = DYNAMIC
+            for name, typ in zip(self.unit.params, self.params):
+                variables[name] = join(variables.get(name), typ)
+            self.block(self.unit.body)
+            if variables == before:
+                break
+        returns = self.returns
+        if self.unit.name != MODULE and self.unit.falls_through:
+            returns = join(returns, NULL)
+        return UnitResult(returns, variables, self.calls, self.diagnostics, self.mixed)
+
+    def report(self, message: str):
+        line = self.line
+        if line is not None and self.unit.line is not None:
+            line -= self.unit.line
+        entry = (line, message)
+        if entry not in self.diagnostics:
+            self.diagnostics.append(entry)
+
+    # Statements
+
+    def block(self, stmts):
+        for stmt in stmts if isinstance(stmts, list) else [stmts]:
+            self.statement(stmt)
+
+    def statement(self, node):
+        line = getattr(node, 'line', None)
+        if line is not None:
+            self.line = line
+        if isinstance(node, FuncNode):
+            return
+        if isinstance(node, PrintNode):
+            self.expression(node.value)
+        elif isinstance(node, ReturnNode):
+            value = NULL if node.expression is None else self.expression(node.expression)
+            self.returns = join(self.returns, value)
+        elif isinstance(node, IfNode):
+            self.expression(node.condition)
+            self.block(node.then_branch)
+            if node.else_branch is not None:
+                self.block(node.else_branch)
+        elif isinstance(node, ForNode):
+            self.store(node.var_name, self.expression(node.start))
+            self.expression(node.condition)
+            self.block(node.body)
+            if isinstance(node.step, AssignmentNode):
+                self.expression(node.step)
+            else:
+                current = self.variables.get(node.var_name)
+                self.store(node.var_name, self.binary('+', current, self.expression(node.step)))
+        else:
+            self.expression(node)
+
+    def store(self, name: str, value: Optional[AmatakType]):
+        self.variables[name] = join(self.variables.get(name), value)
+
+    # Expressions
+
+    def expression(self, node) -> Optional[AmatakType]:
+        if isinstance(node, BinOpNode):
+            return self.binary_chain(node)
+        if isinstance(node, NumberNode):
+            value = node.value
+            if isinstance(value, str):
+                return FLOAT if '.' in value else INTEGER
+            return type_of(value)
+        if isinstance(node, StringNode):
+            return STRING
+        if isinstance(node, BooleanNode):
+            return BOOLEAN
+        if isinstance(node, IdentifierNode):
+            return self.variables.get(node.name, DYNAMIC)
+        if isinstance(node, AssignmentNode):
+            return self.assignment(node)
+        if isinstance(node, CallNode):
+            return self.call(node)
+        if isinstance(node, ArrayNode):
+            element = None
+            for item in node.elements:
+                element = join(element, self.expression(item))
+            if self.dynamic_arrays or not node.elements:
+                return ArrayType(DYNAMIC)
+            return None if element is None else _array(element)
+        if isinstance(node, ArrayAccessNode):
+            array = self.expression(node.array)
+            index = self.expression(node.index)
+            if array is None:
+                return None
+            if isinstance(array, ArrayType):
+                if index not in (None, DYNAMIC, INTEGER, BOOLEAN):
+                    self.report(f"Array index must be integer, got {index}")
+                return array.element_type
+            if array is STRING:
+                return STRING
+            return DYNAMIC
+        if isinstance(node, UnaryOpNode):
+            operand = self.expression(node.operand)
+            symbol = operator_symbol(node.op)
+            if symbol in ('!', 'not'):
+                return BOOLEAN
+            if operand is None or operand is DYNAMIC:
+                return operand
+            try:
+                return self.inferrer.infer_unary_op(symbol, operand)
+            except AmatakTypeError as e:
+                self.report(e.message)
+                return DYNAMIC
+        if isinstance(node, TernaryNode):
+            self.expression(node.condition)
+            return join(self.expression(node.true_expr), self.expression(node.false_expr))
+        return DYNAMIC
+
+    def binary_chain(self, node: BinOpNode) -> Optional[AmatakType]:
+        # Explicit stack: generated chains can be thousands of operations deep
+        values: List[Optional[AmatakType]] = []
+        todo = [(node, False)]
+        while todo:
+            current, ready = todo.pop()
+            if not ready:
+                if isinstance(current, BinOpNode):
+                    todo.append((current, True))
+                    todo.append((current.right, False))
+                    todo.append((current.left, False))
+                else:
+                    values.append(self.expression(current))
+                continue
+            right = values.pop()
+            left = values.pop()
+            values.append(self.binary(operator_symbol(current.op), left, right))
+        return values[0]
+
+    def binary(self, symbol: str, left, right) -> Optional[AmatakType]:
+        if left is None or right is None:
+            return None
+        if symbol in ('==', '!='):
+            return BOOLEAN
+        # Booleans are Python ints; None operands fail at run time anyway
+        left = INTEGER if left is BOOLEAN and symbol not in _COMPARISONS else left
+        right = INTEGER if right is BOOLEAN and symbol not in _COMPARISONS else right
+        if left is DYNAMIC or right is DYNAMIC or isinstance(left, NullableType) or isinstance(right, NullableType):
+            return BOOLEAN if symbol in _COMPARISONS else DYNAMIC
+        if symbol == '*' and {left, right} == {STRING, INTEGER}:
+            return STRING
+        try:
+            return self.inferrer.infer_binary_op(left, symbol, right)
+        except AmatakTypeError as e:
+            self.report(e.message)
+            return DYNAMIC
+
+    def assignment(self, node: AssignmentNode) -> Optional[AmatakType]:
+        target = node.name
+        if isinstance(target, ArrayAccessNode):
+            array = self.expression(target.array)
+            self.expression(target.index)
+            value = self.expression(node.value)
+            if value is not None and array is not None and not (
+                    isinstance(array, ArrayType) and self.inferrer.is_subtype(value, array.element_type)):
+                self.mixed = True
+            return value
+        value = self.expression(node.value)
+        self.store(target.name if isinstance(target, IdentifierNode) else target, value)
+        return value
+
+    def call(self, node: CallNode) -> Optional[AmatakType]:
+        name = _call_name(node)
+        args = tuple(self.expression(arg) for arg in node.args)
+        callee = self.callees.get(name)
+        if callee is None:
+            return DYNAMIC
+        arity, returns = callee
+        if arity is None:
+            return DYNAMIC
+        if arity != len(args):
+            self.report(f"Function {name} expects {arity} args, got {len(args)}")
+            return DYNAMIC
+        previous = self.calls.get(name)
+        self.calls[name] = args if previous is None else tuple(join(a, b) for a, b in zip(previous, args))
+        return returns
+
+# Results
+
+@dataclass
+class ProgramTypes:
+    """Inferred signatures and variable types of a program"""
+    signatures: Dict[str, FunctionType]
+    # unit name ('<module>' for the module body) -> variable -> type
+    variables: Dict[str, Dict[str, AmatakType]]
+    # (unit name, absolute line or None, message)
+    diagnostics: List[Tuple[str, Optional[int], str]]
+    dynamic_arrays: bool = False
+
+    def signature(self, name: str) -> Optional[FunctionType]:
+        return self.signatures.get(name)
+
+    def variable_type(self, unit: str, name: str) -> AmatakType:
+        return self.variables.get(unit, {}).get(name, DYNAMIC)
+
+    def typer(self, unit: str = MODULE) -> _Analysis:
+        """Types of expressions in a unit: ``expression(node)`` for a node,
+        ``binary(symbol, left, right)`` for an operation on typed operands
+        (None means nothing is known)"""
+        callees = {name: (len(sig.params), sig.return_type) for name, sig in self.signatures.items()}
+        typer = _Analysis(TypeInferrer(), _Unit(unit, (), [], None), (), callees, self.dynamic_arrays)
+        typer.variables = dict(self.variables.get(unit, {}))
+        return typer
+
+    def format_signatures(self) -> List[str]:
+        return [
+            f"{name}({', '.join(str(param) for param in sig.params)}) -> {sig.return_type}"
+            for name, sig in sorted(self.signatures.items())
+        ]
+
+    def format_diagnostics(self) -> List[str]:
+        lines = []
+        for unit, line, message in self.diagnostics:
+            where = f"line {line}" if line is not None else unit
+            lines.append(f"{where}: {message}" if unit == MODULE or line is None else f"{where} (in {unit}): {message}")
+        return lines
+
+    def annotate(self, module) -> int:
+        """Record proven signatures on a compiled module's VM functions;
+        returns how many functions were annotated"""
+        count = 0
+        for func in module.functions:
+            sig = self.signatures.get(func.name)
+            if sig is not None and len(sig.params) == func.arg_count:
+                func.returns = sig.return_type
+                func.param_types = sig.params
+                count += 1
+        return count
+
+# Driver
+
+class SignatureCache:
+    """On-disk store of unit analyses, keyed by unit digest and environment
+
+    Unreadable files are treated as empty; failures to write are ignored.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or default_cache_dir()
+        self.hits = 0
+        self.misses = 0
+        self._entries: Optional[Dict[str, dict]] = None
+        self._dirty = False
+
+    def _path(self) -> str:
+        return os.path.join(self.directory, SIGNATURE_FILE)
+
+    @property
+    def entries(self) -> Dict[str, dict]:
+        if self._entries is None:
+            try:
+                with open(self._path(), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                valid = isinstance(data, dict) and data.get('version') == CACHE_VERSION
+                self._entries = data.get('entries', {}) if valid else {}
+                if not isinstance(self._entries, dict):
+                    self._entries = {}
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def load(self, key: str) -> Optional[UnitResult]:
+        data = self.entries.get(key)
+        if data is not None:
+            try:
+                result = UnitResult.from_json(data)
+            except (ValueError, KeyError, TypeError, AttributeError):
+                result = None
+            if result is not None:
+                self.hits += 1
+                return result
+        self.misses += 1
+        return None
+
+    def store(self, key: str, result: UnitResult):
+        self.entries[key] = result.to_json()
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        data = json.dumps({'version': CACHE_VERSION, 'entries': self.entries}, sort_keys=True)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                os.replace(tmp, self._path())
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError:
+            return
+        self._dirty = False
+
+def default_cache_dir() -> str:
+    """``$AMATAK_TYPES_CACHE``, else ``cache/types`` under ``$AMATAK_HOME`` or ``~/.amatak``"""
+    explicit = os.environ.get('AMATAK_TYPES_CACHE')
+    if explicit:
+        return explicit
+    home = os.environ.get('AMATAK_HOME') or os.path.join(os.path.expanduser('~'), '.amatak')
+    return os.path.join(home, 'cache', 'types')
+
+class ProgramInferrer:
+    """Incremental whole-program type inference (see the module docstring)
+
+    ``analyzed`` names the units analysed (under any environment) by the
+    last ``infer`` call, as opposed to taken from the memo or the
+    signature cache.
+    """
+
+    def __init__(self, cache: Optional[SignatureCache] = None, inferrer: Optional[TypeInferrer] = None):
+        self.cache = cache
+        self.inferrer = inferrer or TypeInferrer()
+        self._memo: Dict[tuple, UnitResult] = {}
+        self.analyzed: List[str] = []
+
+    def infer(self, tree: List[Any]) -> ProgramTypes:
+        if not isinstance(tree, list):
+            tree = [tree]
+        self.analyzed = []
+        self._used: Dict[tuple, UnitResult] = {}
+        units = program_units(tree)
+        functions: Dict[str, List[_Unit]] = {}
+        for unit in units[1:]:
+            functions.setdefault(unit.name, []).append(unit)
+        redefined = {name for name, defs in functions.items() if len(defs) > 1}
+        called = set().union(*(unit.callees for unit in units))
+        callers: Dict[str, List[_Unit]] = {}
+        for unit in units:
+            for name in unit.callees:
+                callers.setdefault(name, []).append(unit)
+
+        def fixed_params(unit: _Unit) -> bool:
+            return unit.name in redefined or unit.name not in called
+
+        params: Dict[int, tuple] = {
+            id(unit): ((DYNAMIC,) if fixed_params(unit) else (None,)) * len(unit.params)
+            for unit in units
+        }
+        returns: Dict[str, Optional[AmatakType]] = {}
+        results: Dict[int, UnitResult] = {}
+        dynamic_arrays = False
+        todo = list(units)
+        pending = {id(unit) for unit in units}
+        while todo:
+            unit = todo.pop(0)
+            pending.discard(id(unit))
+            result = self._analyse(unit, params[id(unit)], functions, redefined, returns, dynamic_arrays)
+            results[id(unit)] = result
+            changed: List[_Unit] = []
+            if result.mixed_arrays and not dynamic_arrays:
+                dynamic_arrays = True
+                changed = list(units)
+            if unit.name in functions and unit.name not in redefined and returns.get(unit.name) is not result.returns:
+                returns[unit.name] = result.returns
+                changed.extend(callers.get(unit.name, ()))
+            for name in result.calls:
+                if name in redefined or name not in functions:
+                    continue
+                callee = functions[name][0]
+                joined = self._call_types(callee, callers.get(name, ()), results)
+                if joined != params[id(callee)]:
+                    params[id(callee)] = joined
+                    changed.append(callee)
+            for other in changed:
+                if id(other) not in pending:
+                    pending.add(id(other))
+                    todo.append(other)
+
+        # Keep what the next run of an edited program can reuse
+        self._memo = self._used
+        if self.cache is not None:
+            self.cache.save()
+        return self._collect(units, params, results, redefined, dynamic_arrays)
+
+    def _call_types(self, callee: _Unit, callers: Sequence[_Unit], results: Dict[int, UnitResult]) -> tuple:
+        joined = (None,) * len(callee.params)
+        for caller in callers:
+            result = results.get(id(caller))
+            args = result.calls.get(callee.name) if result is not None else None
+            if args is not None:
+                joined = tuple(join(a, b) for a, b in zip(joined, args))
+        return joined
+
+    def _analyse(self, unit: _Unit, params: tuple, functions, redefined, returns, dynamic_arrays) -> UnitResult:
+        callees = {}
+        for name in sorted(unit.callees):
+            if name in functions:
+                if name in redefined:
+                    callees[name] = (None, DYNAMIC)
+                else:
+                    callees[name] = (len(functions[name][0].params), returns.get(name))
+        key = (unit.digest, params, tuple(callees.items()), dynamic_arrays)
+        result = self._memo.get(key) or self._used.get(key)
+        if result is not None:
+            self._used[key] = result
+            return result
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key(key)
+            result = self.cache.load(cache_key)
+        if result is None:
+            if unit.name not in self.analyzed:
+                self.analyzed.append(unit.name)
+            result = _Analysis(self.inferrer, unit, params, callees, dynamic_arrays).run()
+            if cache_key is not None:
+                self.cache.store(cache_key, result)
+        self._used[key] = result
+        return result
+
+    @staticmethod
+    def _cache_key(key: tuple) -> str:
+        digest, params, callees, dynamic_arrays = key
+        text = json.dumps([
+            CACHE_VERSION, digest, [encode_type(typ) for typ in params],
+            [[name, arity, encode_type(typ)] for name, (arity, typ) in callees], dynamic_arrays,
+        ])
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _collect(self, units: List[_Unit], params, results, redefined, dynamic_arrays) -> ProgramTypes:
+        signatures: Dict[str, FunctionType] = {}
+        variables: Dict[str, Dict[str, AmatakType]] = {}
+        diagnostics: List[Tuple[str, Optional[int], str]] = []
+        for unit in units:
+            result = results[id(unit)]
+            unit_vars = {name: typ or DYNAMIC for name, typ in result.variables.items()}
+            if unit.name in redefined:
+                unit_vars = {name: DYNAMIC for name in unit_vars}
+            variables.setdefault(unit.name, {}).update(unit_vars)
+            if unit.name != MODULE and unit.name not in redefined:
+                signatures[unit.name] = FunctionType(
+                    [typ or DYNAMIC for typ in params[id(unit)]], result.returns or DYNAMIC)
+            for line, message in result.diagnostics:
+                if line is not None and unit.line is not None:
+                    line += unit.line
+                diagnostics.append((unit.name, line, message))
+        return ProgramTypes(signatures, variables, diagnostics, dynamic_arrays)
@@ -0,0 +1,110 @@
+"""Type-feedback specialization of binary operations
+
+Every binary operation site records the Python types of the operands it
+sees. Once a type pair has been observed ``WARMUP`` times, the site
+installs a variant for that pair (int-only, float-only, string-only,
+mixed string concatenation). The variant is checked and typed through
+``TypeInferrer.infer_binary_op`` and guarded by two type identity checks.
+On a guard failure the site runs the generic operation. A site that sees
+more than ``MAX_PAIRS`` type pairs stops re-specializing.
+"""
+import operator
+from typing import Any, Callable, Dict, Optional, Tuple
+from .core import AmatakType, STRING, type_of
+from .inference import TypeInferrer
+from ..errors import AmatakTypeError
+
+WARMUP = 2
+MAX_PAIRS = 4
+
+OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '%': operator.mod,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+def _generic_add(left, right):
+    # Numbers are converted when concatenated with strings
+    if isinstance(left, str) or isinstance(right, str):
+        return str(left) + str(right)
+    return left + right
+
+def _concat(left, right):
+    return str(left) + str(right)
+
+def generic_operation(symbol: str) -> Callable[[Any, Any], Any]:
+    """Unspecialized implementation of an operator"""
+    if symbol == '+':
+        return _generic_add
+    return OPERATORS[symbol]
+
+class Specializer:
+    """Builds and memoizes type-specialized operation variants"""
+
+    def __init__(self, inferrer: Optional[TypeInferrer] = None):
+        self.inferrer = inferrer or TypeInferrer()
+        self._variants: Dict[Tuple[str, type, type], Optional[Tuple[Callable, AmatakType]]] = {}
+
+    def specialize(self, symbol: str, left: Any, right: Any) -> Optional[Tuple[Callable, AmatakType]]:
+        """(operation, result type) for the operand types, or None to stay generic"""
+        key = (symbol, type(left), type(right))
+        if key not in self._variants:
+            self._variants[key] = self._build(symbol, left, right)
+        return self._variants[key]
+
+    def _build(self, symbol: str, left: Any, right: Any):
+        if symbol == '+' and (type(left) is str or type(right) is str):
+            if type(left) is str and type(right) is str:
+                return OPERATORS['+'], STRING
+            return _concat, STRING
+        try:
+            result_type = self.inferrer.infer_binary_op(type_of(left), symbol, type_of(right))
+        except AmatakTypeError:
+            return None
+        return OPERATORS[symbol], result_type
+
+class BinaryOpSite:
+    """Operation site with type feedback and a guarded fast path"""
+    __slots__ = ('symbol', 'generic', 'specializer', 'left_type', 'right_type',
+                 'fast', 'result_type', 'observed', 'misses')
+
+    def __init__(self, symbol: str, specializer: Specializer):
+        self.symbol = symbol
+        self.generic = generic_operation(symbol)
+        self.specializer = specializer
+        self.left_type: Optional[type] = None
+        self.right_type: Optional[type] = None
+        self.fast = self.generic
+        self.result_type: Optional[AmatakType] = None
+        self.observed: Dict[Tuple[type, type], int] = {}
+        self.misses = 0
+
+    def __call__(self, left: Any, right: Any) -> Any:
+        if type(left) is self.left_type and type(right) is self.right_type:
+            return self.fast(left, right)
+        return self.miss(left, right)
+
+    def miss(self, left: Any, right: Any) -> Any:
+        """Guard failure: record feedback, maybe specialize, run generically"""
+        self.misses += 1
+        pair = (type(left), type(right))
+        seen = self.observed.get(pair, 0) + 1
+        self.observed[pair] = seen
+        if seen >= WARMUP and len(self.observed) <= MAX_PAIRS:
+            variant = self.specializer.specialize(self.symbol, left, right)
+            if variant is not None:
+                self.left_type, self.right_type = pair
+                self.fast, self.result_type = variant
+        return self.generic(left, right)
+
+    @property
+    def specialized(self) -> bool:
+        return self.left_type is not None
@@ -0,0 +1,157 @@
+"""Compiled validators for AmatakType trees
+
+``compile_validator`` turns a type tree into a single generated Python
+function equivalent to ``type.validate``: every node's checks are inlined,
+containers are walked with plain loops, and the first failing check
+returns. Constraint values are inlined as literals and string patterns
+are compiled once. The function is generated on first use and cached on
+the (immutable, interned) type instance.
+
+``compile_batch_validator`` validates a list of records in one call and
+returns the indexes of the invalid ones.
+
+Only the built-in type classes are inlined. Instances of other classes,
+subclasses included, are checked by calling their own ``validate``.
+"""
+import math
+import re
+from typing import Any, Callable, Dict, Iterable, List
+from .core import (
+    AmatakType, ArrayType, BooleanType, DynamicType, FloatType, FunctionType,
+    IntegerType, NullableType, ObjectType, StringType
+)
+
+class _Generator:
+    def __init__(self):
+        self.lines: List[str] = []
+        self.namespace: Dict[str, Any] = {}
+        self._names = 0
+
+    def fresh(self, prefix: str) -> str:
+        self._names += 1
+        return f'{prefix}{self._names}'
+
+    def line(self, indent: int, text: str):
+        self.lines.append('    ' * indent + text)
+
+    def literal(self, value: Any) -> str:
+        """Source for a constant: a literal where exact, otherwise a global"""
+        if value is None or type(value) in (bool, str) or (
+                type(value) in (int, float) and math.isfinite(value)):
+            return repr(value)
+        name = self.fresh('_c')
+        self.namespace[name] = value
+        return name
+
+    def checks(self, typ: AmatakType, value: str, indent: int, fail: str):
+        """Emit statements running ``fail`` unless ``value`` is a ``typ``"""
+        kind = type(typ)
+        if kind is DynamicType:
+            return
+        if kind is IntegerType or kind is FloatType:
+            classes = 'int' if kind is IntegerType else '(int, float)'
+            self.line(indent, f'if not isinstance({value}, {classes}): {fail}')
+            if typ.min is not None:
+                self.line(indent, f'if {value} < {self.literal(typ.min)}: {fail}')
+            if typ.max is not None:
+                self.line(indent, f'if {value} > {self.literal(typ.max)}: {fail}')
+        elif kind is StringType:
+            self.line(indent, f'if not isinstance({value}, str): {fail}')
+            if typ.max_length is not None:
+                self.line(indent, f'if len({value}) > {self.literal(typ.max_length)}: {fail}')
+            if typ.pattern is not None:
+                pattern = self.fresh('_re')
+                self.namespace[pattern] = re.compile(typ.pattern).match
+                self.line(indent, f'if {pattern}({value}) is None: {fail}')
+        elif kind is BooleanType:
+            self.line(indent, f'if not isinstance({value}, bool): {fail}')
+        elif kind is FunctionType:
+            self.line(indent, f'if not callable({value}): {fail}')
+        elif kind is NullableType:
+            if type(typ.base_type) is DynamicType:
+                return
+            self.line(indent, f'if {value} is not None:')
+            before = len(self.lines)
+            self.checks(typ.base_type, value, indent + 1, fail)
+            if len(self.lines) == before:
+                self.line(indent + 1, 'pass')
+        elif kind is ArrayType:
+            self.line(indent, f'if not isinstance({value}, list): {fail}')
+            if typ.min_len is not None:
+                self.line(indent, f'if len({value}) < {self.literal(typ.min_len)}: {fail}')
+            if typ.max_len is not None:
+                self.line(indent, f'if len({value}) > {self.literal(typ.max_len)}: {fail}')
+            if type(typ.element_type) is not DynamicType:
+                item = self.fresh('e')
+                self.line(indent, f'for {item} in {value}:')
+                self.checks(typ.element_type, item, indent + 1, fail)
+        elif kind is ObjectType:
+            self.line(indent, f'if not isinstance({value}, dict): {fail}')
+            for name, field_type in typ.fields.items():
+                key = self.literal(name)
+                self.line(indent, f'if {key} not in {value}: {fail}')
+                if type(field_type) is DynamicType:
+                    continue
+                field = self.fresh('f')
+                self.line(indent, f'{field} = {value}[{key}]')
+                self.checks(field_type, field, indent, fail)
+        else:
+            check = self.fresh('_v')
+            self.namespace[check] = typ.validate
+            self.line(indent, f'if not {check}({value}): {fail}')
+
+    def build(self, name: str, filename: str) -> Callable:
+        source = '\n'.join(self.lines) + '\n'
+        exec(compile(source, filename, 'exec'), self.namespace)
+        function = self.namespace[name]
+        function.__amatak_source__ = source
+        return function
+
+def _has_loops(typ: AmatakType) -> bool:
+    kind = type(typ)
+    if kind is ArrayType:
+        return type(typ.element_type) is not DynamicType
+    if kind is NullableType:
+        return _has_loops(typ.base_type)
+    if kind is ObjectType:
+        return any(_has_loops(field_type) for field_type in typ.fields.values())
+    return False
+
+def compile_validator(typ: AmatakType) -> Callable[[Any], bool]:
+    """Specialized ``typ.validate``, generated once per type instance"""
+    validator = vars(typ).get('_validator')
+    if validator is None:
+        gen = _Generator()
+        gen.line(0, 'def __validate(v):')
+        gen.checks(typ, 'v', 1, 'return False')
+        gen.line(1, 'return True')
+        validator = gen.build('__validate', f'<validator:{typ}>')
+        vars(typ)['_validator'] = validator
+    return validator
+
+def compile_batch_validator(typ: AmatakType) -> Callable[[Iterable[Any]], List[int]]:
+    """Function returning the indexes of the records that are not ``typ``s,
+    generated once per type instance
+
+    Checks of types without nested loops are inlined into the loop over
+    the records; others call the compiled single-value validator.
+    """
+    validator = vars(typ).get('_batch_validator')
+    if validator is None:
+        gen = _Generator()
+        gen.line(0, 'def __validate_batch(records):')
+        gen.line(1, 'invalid = []')
+        gen.line(1, 'for i, v in enumerate(records):')
+        if _has_loops(typ):
+            gen.namespace['_check'] = compile_validator(typ)
+            gen.line(2, 'if not _check(v): invalid.append(i)')
+        else:
+            gen.checks(typ, 'v', 2, 'invalid.append(i); continue')
+        gen.line(1, 'return invalid')
+        validator = gen.build('__validate_batch', f'<batch validator:{typ}>')
+        vars(typ)['_batch_validator'] = validator
+    return validator
+
+def validate_batch(typ: AmatakType, records: Iterable[Any]) -> List[int]:
+    """Indexes of the records in ``records`` that are not ``typ``s"""
+    return compile_batch_validator(typ)(records)
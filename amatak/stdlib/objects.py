@@ -3,6 +3,8 @@
 
 import inspect
 import copy
+import functools
+from collections import OrderedDict
 from typing import Any, Dict, List
 from amatak.error_handling import ErrorHandler
 from amatak.security.middleware import SecurityMiddleware
@@ -87,16 +89,49 @@ class Objects:
             return tuple(obj)
         return obj
         
-    def memoize(self, func):
-        """Memoization decorator"""
-        cache = {}
-        
+    def memoize(self, func=None, maxsize: int = 128):
+        """
+        Memoization decorator with a bounded LRU cache
+
+        Usable as ``@objects.memoize`` or ``@objects.memoize(maxsize=...)``.
+        The wrapper's ``cache_stats()`` reports hits, misses and the hit
+        rate, and ``cache_clear()`` empties the cache.
+        """
+        if func is None:
+            return lambda f: self.memoize(f, maxsize)
+        if maxsize < 1:
+            raise ValueError("maxsize must be positive")
+        cache = OrderedDict()
+        stats = {'hits': 0, 'misses': 0}
+
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
             key = (args, frozenset(kwargs.items()))
-            if key not in cache:
-                cache[key] = func(*args, **kwargs)
-            return cache[key]
-            
+            if key in cache:
+                cache.move_to_end(key)
+                stats['hits'] += 1
+                return cache[key]
+            stats['misses'] += 1
+            result = cache[key] = func(*args, **kwargs)
+            if len(cache) > maxsize:
+                cache.popitem(last=False)
+            return result
+
+        def cache_stats() -> Dict[str, Any]:
+            calls = stats['hits'] + stats['misses']
+            return {
+                **stats,
+                'hit_rate': stats['hits'] / calls if calls else 0.0,
+                'size': len(cache),
+                'maxsize': maxsize,
+            }
+
+        def cache_clear():
+            cache.clear()
+            stats['hits'] = stats['misses'] = 0
+
+        wrapper.cache_stats = cache_stats
+        wrapper.cache_clear = cache_clear
         return wrapper
         
     def validate_schema(self, obj: Any, schema: Dict) -> bool:
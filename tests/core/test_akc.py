@@ -0,0 +1,107 @@
+import pytest
+from amatak.core.akc import load_module, write_module, serialize_module
+from amatak.core.codegen import BytecodeGenerator, compile_source
+from amatak.core.vm import VM
+from amatak.errors import AmatakRuntimeError
+from amatak.nodes import (
+    AssignmentNode, BinOpNode, CallNode, FuncNode, IdentifierNode,
+    NumberNode, ReturnNode, StringNode
+)
+from amatak.tokens import TokenType
+
+
+def build_module():
+    square = FuncNode("square", ["n"], [
+        ReturnNode(BinOpNode(IdentifierNode("n"), TokenType.MUL, IdentifierNode("n")))
+    ])
+    tree = [
+        square,
+        AssignmentNode(IdentifierNode("label"), StringNode("square")),
+        AssignmentNode(IdentifierNode("result"), CallNode("square", [NumberNode("7")])),
+        ReturnNode(IdentifierNode("result")),
+    ]
+    return BytecodeGenerator().generate(tree)
+
+
+class TestAKCContainer:
+    @pytest.fixture
+    def akc_path(self, tmp_path):
+        path = tmp_path / "module.akc"
+        write_module(build_module(), str(path))
+        return str(path)
+
+    def test_round_trip_executes(self, akc_path):
+        module = load_module(akc_path)
+        assert VM(jit_enabled=False).run_module(module) == 49
+
+    def test_constant_pool_is_deduplicated_and_shared(self, akc_path):
+        module = load_module(akc_path)
+        pool = list(module.constants)
+        # The function name and the "square" string constant share one entry
+        assert pool.count("square") == 1
+        assert all(func.constants is module.constants for func in module.functions)
+
+    def test_function_bytecode_is_not_copied(self, akc_path):
+        module = load_module(akc_path)
+        assert all(isinstance(func.bytecode, memoryview) for func in module.functions)
+        assert isinstance(module.code, memoryview)
+
+    def test_line_table(self, tmp_path):
+        path = tmp_path / "lines.akc"
+        write_module(compile_source("let x = 1\nlet y = x + 2\nprint y"), str(path))
+        module = load_module(str(path))
+        assert [line for _, line in module.line_table("<module>")] == [1, 2, 3]
+        assert module.line_for("<module>", 0) == 1
+
+    def test_checksum_mismatch_is_rejected(self, tmp_path):
+        data = bytearray(serialize_module(build_module()))
+        data[-2] ^= 0xFF
+        path = tmp_path / "corrupt.akc"
+        path.write_bytes(bytes(data))
+        with pytest.raises(AmatakRuntimeError):
+            load_module(str(path), verify=True)
+
+    def test_section_tables_are_checked_without_full_verify(self, tmp_path):
+        from amatak.core.akc import HEADER
+        data = bytearray(serialize_module(build_module()))
+        # First pool index entry
+        data[HEADER.size + 3] ^= 0x01
+        path = tmp_path / "corrupt.akc"
+        path.write_bytes(bytes(data))
+        with pytest.raises(AmatakRuntimeError):
+            load_module(str(path))
+
+    def test_truncated_module_is_rejected(self, tmp_path):
+        data = serialize_module(build_module())
+        path = tmp_path / "short.akc"
+        path.write_bytes(data[:len(data) // 2])
+        with pytest.raises(AmatakRuntimeError):
+            load_module(str(path))
+
+    def test_bad_magic_is_rejected(self, tmp_path):
+        path = tmp_path / "placeholder.akc"
+        path.write_bytes(b"AMATAK_BYTECODE" + b"\x00" * 64)
+        with pytest.raises(AmatakRuntimeError):
+            load_module(str(path))
+
+
+class TestBuildMatchesInterpreter:
+    SOURCE = 'print "Combined " + 123\nprint 1.5 + "x"\nprint 2 + 3\n'
+
+    def test_same_output(self, tmp_path, capsys):
+        from amatak.interpreter import Interpreter
+        from amatak.lexer import Lexer
+        from amatak.parser import Parser
+        Interpreter(Parser(Lexer(self.SOURCE).get_tokens()).parse()).interpret()
+        interpreted = capsys.readouterr().out
+        path = tmp_path / "mixed.akc"
+        write_module(compile_source(self.SOURCE, 2), str(path))
+        VM(jit_enabled=False).run_file(str(path))
+        assert capsys.readouterr().out == interpreted == "Combined 123\n1.5x\n5\n"
+
+    def test_tiered_concatenation(self):
+        label = FuncNode("label", ["n"], [ReturnNode(BinOpNode(StringNode("#"), TokenType.PLUS, IdentifierNode("n")))])
+        calls = [AssignmentNode(IdentifierNode("r"), CallNode("label", [NumberNode(str(i))])) for i in range(20)]
+        vm = VM()
+        assert vm.run_module(BytecodeGenerator().generate([label] + calls + [ReturnNode(IdentifierNode("r"))])) == "#19"
+        assert vm.functions["label"].tier is not None
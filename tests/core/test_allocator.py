@@ -0,0 +1,129 @@
+import ctypes
+import platform
+import pytest
+from amatak.runtime.errors import AmatakMemoryError
+from amatak.runtime.memory.allocator import MemoryAllocator
+from amatak.runtime.memory.slab import SLAB_SIZE, size_class
+
+
+@pytest.fixture
+def memory():
+    memory = MemoryAllocator()
+    yield memory
+    memory.cleanup()
+
+
+class TestSlabAllocator:
+    def test_size_classes(self):
+        assert [size_class(n) for n in (1, 64, 65, 128, 129, 4096, 5000)] == [64, 64, 128, 128, 256, 4096, 8192]
+
+    def test_small_blocks_share_a_slab(self, memory):
+        addresses = [memory.allocate(64) for _ in range(1000)]
+        stats = memory.get_usage_stats()['slabs']
+        assert stats['slabs'] == 1
+        assert stats['mapped_bytes'] == SLAB_SIZE
+        assert stats['used_bytes'] == 64 * 1000
+        assert len(set(addresses)) == 1000
+        ctypes.memset(addresses[5], 0xAB, 64)
+        assert ctypes.string_at(addresses[5], 64) == b'\xab' * 64
+
+    def test_freed_blocks_are_reused(self, memory):
+        first = memory.allocate(100)
+        memory.allocate(100)
+        memory.free(first)
+        assert memory.allocate(120) == first
+        assert memory.get_usage_stats()['total_allocated'] == 256
+
+    def test_full_slab_spills_and_empty_slab_is_released(self, memory):
+        per_slab = SLAB_SIZE // 1024
+        addresses = [memory.allocate(1024) for _ in range(per_slab + 1)]
+        assert memory.get_usage_stats()['slabs']['slabs'] == 2
+        for address in addresses[:per_slab]:
+            memory.free(address)
+        assert memory.get_usage_stats()['slabs']['slabs'] == 1
+        with pytest.raises(AmatakMemoryError):
+            memory.free(addresses[0])
+
+    def test_large_blocks_get_their_own_mapping(self, memory):
+        address = memory.allocate(100 * 1024)
+        assert memory.allocations[address].size == 128 * 1024
+        assert memory.get_usage_stats()['slabs']['slabs'] == 0
+        memory.free(address)
+        assert memory.allocate(70 * 1024) == address
+
+    def test_reallocate_copies_into_larger_class(self, memory):
+        address = memory.allocate(64)
+        ctypes.memset(address, 7, 64)
+        grown = memory.reallocate(address, 1000)
+        assert ctypes.string_at(grown, 64) == b'\x07' * 64
+        assert memory.allocations[grown].size == 1024
+
+
+def vm_flags(address):
+    """VmFlags of the mapping containing ``address`` (from /proc/self/smaps)"""
+    with open('/proc/self/smaps') as f:
+        current = False
+        for line in f:
+            first = line.split()[0]
+            if '-' in first and not first.endswith(':'):
+                start, end = (int(part, 16) for part in first.split('-'))
+                current = start <= address < end
+            elif current and first == 'VmFlags:':
+                return line.split()[1:]
+    return []
+
+linux_only = pytest.mark.skipif(platform.system() != 'Linux', reason="Linux mapping backend")
+
+
+@linux_only
+class TestLinuxBackend:
+    def test_large_block_grows_with_mremap(self, memory):
+        address = memory.allocate(64 * 1024 * 1024)
+        ctypes.memset(address, 1, 16)
+        ctypes.memset(address + 64 * 1024 * 1024 - 16, 2, 16)
+        grown = memory.reallocate(address, 1024 * 1024 * 1024)
+        assert ctypes.string_at(grown, 16) == b'\x01' * 16
+        assert ctypes.string_at(grown + 64 * 1024 * 1024 - 16, 16) == b'\x02' * 16
+        ctypes.memset(grown + 1024 * 1024 * 1024 - 1, 3, 1)
+        assert memory.allocations[grown].size == 1024 * 1024 * 1024
+        assert memory.get_usage_stats()['total_allocated'] == 1024 * 1024 * 1024
+
+    def test_huge_pages_requested_for_big_blocks(self):
+        memory = MemoryAllocator(huge_pages=True)
+        address = memory.allocate(4 * 1024 * 1024)
+        assert 'hg' in vm_flags(address)
+        memory.cleanup()
+
+    def test_trim_returns_idle_memory(self, memory):
+        blocks = [memory.allocate(256) for _ in range(100)]
+        large = memory.allocate(512 * 1024)
+        for address in blocks + [large]:
+            memory.free(address)
+        assert memory.trim() >= SLAB_SIZE + 512 * 1024
+        assert memory.get_usage_stats()['free_blocks'] == 0
+        assert memory.allocate(256) == blocks[0]
+
+
+class TestAllocatorTelemetry:
+    def test_peak_survives_frees(self, memory):
+        addresses = [memory.allocate(1024) for _ in range(10)]
+        for address in addresses:
+            memory.free(address)
+        telemetry = memory.get_telemetry()
+        assert telemetry['allocated_bytes'] == 0
+        assert telemetry['peak_allocated_bytes'] == 10 * 1024
+
+    def test_slab_occupancy_and_fragmentation(self, memory):
+        addresses = [memory.allocate(64) for _ in range(SLAB_SIZE // 64)]
+        assert memory.get_telemetry()['fragmentation'] == 0.0
+        for address in addresses[::2]:
+            memory.free(address)
+        telemetry = memory.get_telemetry()
+        assert telemetry['slabs']['classes'][64]['occupancy'] == 0.5
+        assert telemetry['fragmentation'] == pytest.approx(0.5)
+
+    def test_cached_large_blocks_count_as_fragmentation(self, memory):
+        memory.free(memory.allocate(128 * 1024))
+        telemetry = memory.get_telemetry()
+        assert telemetry['large']['cached_free_bytes'] == 128 * 1024
+        assert telemetry['fragmentation'] == 1.0
@@ -0,0 +1,83 @@
+import ctypes
+import os
+import platform
+import pytest
+from amatak.runtime.errors import AmatakMemoryError
+from amatak.runtime.memory.allocator import MemoryAllocator
+from amatak.runtime.memory.code_arena import CodeArena
+
+pytestmark = pytest.mark.skipif(platform.system() != 'Linux', reason="uses mprotect and /proc")
+
+
+def permissions(address):
+    """Permission string of the mapping containing ``address``"""
+    with open('/proc/self/maps') as f:
+        for line in f:
+            span, perms = line.split()[:2]
+            start, end = (int(part, 16) for part in span.split('-'))
+            if start <= address < end:
+                return perms
+    return None
+
+@pytest.fixture
+def arena():
+    return CodeArena(os.sysconf('SC_PAGESIZE'), chunk_size=64 * 1024)
+
+
+class TestCodeArena:
+    def test_small_functions_share_a_mapping(self, arena):
+        addresses = [arena.allocate_code(bytes([0xC3]) * 40) for _ in range(100)]
+        stats = arena.get_stats()
+        assert stats['chunks'] == 1
+        assert stats['functions'] == 100
+        assert stats['code_bytes'] == 100 * 48
+        assert stats['mapped_bytes'] == 64 * 1024
+        assert all(address % 16 == 0 for address in addresses)
+        assert ctypes.string_at(addresses[7], 40) == bytes([0xC3]) * 40
+
+    def test_pages_never_writable_and_executable(self, arena):
+        address = arena.allocate_code(b'\x90' * 32)
+        assert permissions(address).startswith('r-x')
+        arena.write(address, b'\xc3' * 32)
+        assert permissions(address).startswith('r-x')
+        assert ctypes.string_at(address, 1) == b'\xc3'
+
+    def test_freed_space_is_reused(self, arena):
+        first = arena.allocate(64)
+        second = arena.allocate(64)
+        arena.allocate(64)
+        arena.free(first)
+        arena.free(second)
+        assert arena.allocate(128) == first
+        with pytest.raises(AmatakMemoryError):
+            arena.free(first + 1)
+
+    def test_empty_mapping_is_unmapped(self, arena):
+        address = arena.allocate(arena.chunk_size)
+        arena.free(address)
+        assert arena.get_stats()['mapped_bytes'] == 0
+
+    def test_compact_moves_live_code(self, arena):
+        kept = []
+        for i in range(6):
+            arena.allocate(40 * 1024)
+            kept.append(arena.allocate_code(bytes([i]) * 100))
+        for chunk in list(arena.chunks):
+            for address in list(chunk.live):
+                if address not in kept:
+                    arena.free(address)
+        assert arena.get_stats()['chunks'] == 6
+        moved = arena.compact()
+        assert arena.get_stats()['chunks'] == 1
+        for i, address in enumerate(kept):
+            assert ctypes.string_at(moved[address], 100) == bytes([i]) * 100
+
+    def test_allocator_routes_executable_memory(self):
+        memory = MemoryAllocator()
+        address = memory.allocate_executable(100)
+        memory.write_executable(address, b'\xc3' * 100)
+        assert memory.get_usage_stats()['code']['code_bytes'] == 112
+        address = memory.reallocate(address, 400)
+        assert ctypes.string_at(address, 100) == b'\xc3' * 100
+        memory.free(address)
+        assert memory.get_usage_stats()['code']['functions'] == 0
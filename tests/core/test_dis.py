@@ -0,0 +1,40 @@
+import json
+from amatak.core.codegen import compile_source
+from amatak.core.dis import disassemble
+from amatak.core.vm import VM
+
+
+SOURCE = "let x = 2\nlet y = x * 21\nprint \"done\""
+
+
+class TestDisassembler:
+    def test_resolves_constants_names_and_lines(self):
+        listing = disassemble(compile_source(SOURCE))
+        assert "Disassembly of <module>:" in listing
+        assert "LOAD_CONST" in listing and "(21)" in listing
+        assert "STORE_VAR" in listing and "(y)" in listing
+        assert "'done'" in listing
+        numbered = [line.split()[0] for line in listing.splitlines()[1:] if line[:5].strip()]
+        assert numbered == ["1", "2", "3"]
+
+
+class TestOpcodeCounters:
+    def test_counts_opcodes_and_pairs(self, tmp_path):
+        vm = VM(jit_enabled=False)
+        counters = vm.enable_counters()
+        vm.run_module(compile_source("let x = 2\nlet y = x * 21"))
+
+        stats = counters.to_dict()
+        assert stats['opcodes']['BINARY_MUL']['count'] == 1
+        assert stats['opcodes']['STORE_VAR']['count'] == 2
+        assert stats['pairs']['STORE_VAR -> POP'] == 2
+        assert stats['total'] == sum(op['count'] for op in stats['opcodes'].values())
+
+        path = tmp_path / "opcodes.json"
+        counters.dump(str(path))
+        assert json.loads(path.read_text())['total'] == stats['total']
+
+    def test_counters_are_opt_in(self):
+        vm = VM(jit_enabled=False)
+        vm.run_module(compile_source("let x = 1"))
+        assert vm.counters is None
@@ -0,0 +1,130 @@
+import pytest
+from amatak.core.codegen import BytecodeGenerator
+from amatak.core.escape import scalar_replace, scalar_replace_module
+from amatak.core.ir import IRBuilder
+from amatak.core.pytier import PythonTierCompiler
+from amatak.core.vm import VM, OpCode, iter_instructions
+from amatak.nodes import (
+    ArrayAccessNode, ArrayNode, AssignmentNode, BinOpNode, CallNode, ForNode,
+    FuncNode, IdentifierNode, IfNode, NumberNode, PrintNode, ReturnNode
+)
+from amatak.tokens import TokenType
+
+
+def num(value):
+    return NumberNode(str(value))
+
+def var(name):
+    return IdentifierNode(name)
+
+def let(name, value):
+    return AssignmentNode(var(name), value)
+
+def at(name, index):
+    return ArrayAccessNode(var(name), num(index))
+
+# p = [x, x + 1]; p[1] = p[1] * 2; return p[0] + p[-1]
+PAIR = FuncNode("pair", ["x"], [
+    let("p", ArrayNode([var("x"), BinOpNode(var("x"), TokenType.PLUS, num(1))])),
+    AssignmentNode(at("p", 1), BinOpNode(at("p", 1), TokenType.MUL, num(2))),
+    ReturnNode(BinOpNode(at("p", 0), TokenType.PLUS, at("p", -1))),
+])
+
+def opcodes(code):
+    return {instr.op for instr in iter_instructions(code)}
+
+def ops(func):
+    return [instr.op for instr in func.instructions()]
+
+def function(tree, name, optimize=True):
+    module = BytecodeGenerator(optimize=optimize, whole_program=True).generate(tree)
+    return module, next(f for f in module.functions if f.name == name)
+
+
+class TestScalarReplacement:
+    def test_local_arrays_become_scalars(self):
+        module, pair = function([PAIR], "pair")
+        assert not opcodes(pair.bytecode) & {OpCode.MAKE_ARRAY, OpCode.ARRAY_GET, OpCode.ARRAY_SET}
+        vm = VM(jit_enabled=False)
+        vm.run_module(module)
+        assert vm._invoke(vm.functions["pair"], [5]) == 5 + 12
+
+    def test_indexed_temporaries_are_replaced(self):
+        module = IRBuilder().build([PrintNode(ArrayAccessNode(ArrayNode([var("a"), num(7)]), num(1)))])
+        assert scalar_replace(module.body) == 1
+        assert 'array' not in ops(module.body) and 'index' not in ops(module.body)
+
+    @pytest.mark.parametrize("escape", [
+        CallNode("keep", [var("p")]),
+        PrintNode(ArrayAccessNode(var("p"), var("i"))),
+        PrintNode(at("p", 5)),
+    ])
+    def test_escaping_arrays_are_kept(self, escape):
+        func = FuncNode("f", ["i"], [let("p", ArrayNode([num(1), num(2)])), escape])
+        module = IRBuilder().build([func])
+        assert scalar_replace_module(module, whole_program=True) == 0
+
+    def test_reads_before_assignment_are_kept(self):
+        # The first read may see a caller's ``p``
+        func = FuncNode("f", [], [PrintNode(at("p", 0)), let("p", ArrayNode([num(1)]))])
+        assert scalar_replace(IRBuilder().build([func]).functions[0]) == 0
+
+    def test_names_callees_read_are_kept(self):
+        reader = FuncNode("reader", [], [PrintNode(at("p", 0))])
+        caller = FuncNode("caller", [], [let("p", ArrayNode([num(1)])), PrintNode(CallNode("reader", []))])
+        assert scalar_replace_module(IRBuilder().build([reader, caller]), whole_program=True) == 0
+
+    def test_globals_need_whole_program(self):
+        tree = [let("g", ArrayNode([num(1)])), PrintNode(at("g", 0))]
+        assert scalar_replace_module(IRBuilder().build(tree)) == 0
+        assert scalar_replace_module(IRBuilder().build(tree), whole_program=True) == 1
+
+
+class TestAllocationSinking:
+    def test_allocation_moves_to_the_escaping_branch(self, capsys):
+        func = FuncNode("f", ["x"], [
+            let("p", ArrayNode([var("x"), num(2)])),
+            IfNode(BinOpNode(var("x"), TokenType.GT, num(100)), [PrintNode(var("p"))]),
+            ReturnNode(at("p", 0)),
+        ])
+        module = IRBuilder().build([func])
+        ir = module.functions[0]
+        assert scalar_replace(ir) == 1
+        assert 'array' not in [instr.op for instr in ir.entry.instrs]
+        assert sum(op == 'array' for op in ops(ir)) == 1
+
+        module, _ = function([func], "f")
+        vm = VM(jit_enabled=False)
+        vm.run_module(module)
+        assert vm._invoke(vm.functions["f"], [101]) == 101
+        assert capsys.readouterr().out.split() == ["[101,", "2]"]
+
+    def test_no_sinking_into_loops(self):
+        func = FuncNode("f", [], [
+            let("p", ArrayNode([num(1)])),
+            ForNode("i", num(0), BinOpNode(var("i"), TokenType.LT, num(3)), num(1), [PrintNode(var("p"))]),
+        ])
+        assert scalar_replace(IRBuilder().build([func]).functions[0]) == 0
+
+
+class TestTiers:
+    def test_python_tier_scalar_replaces_leaf_functions(self):
+        module, pair = function([PAIR], "pair", optimize=False)
+        assert OpCode.MAKE_ARRAY in opcodes(pair.bytecode)
+        vm = VM(jit_enabled=False)
+        vm.run_module(module)
+        tier = PythonTierCompiler(vm)
+        tiered = tier.compile(vm.functions["pair"])
+        assert tiered(5) == 17
+        assert "[" not in tier.sources["pair"].replace("frame[", "").replace("frames[0]", "")
+
+    def test_replaced_functions_enter_the_native_subset(self):
+        vm = VM()
+        if vm.jit is None:
+            pytest.skip("native JIT unavailable")
+        module, pair = function([PAIR], "pair")
+        vm.run_module(module)
+        assert vm.jit.accepts(vm.functions["pair"])
+        assert vm.jit.compile_function("pair", ("i",)).size > 0
+        _, unoptimized = function([PAIR], "pair", optimize=False)
+        assert not vm.jit.accepts(unoptimized)
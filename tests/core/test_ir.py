@@ -0,0 +1,139 @@
+import pytest
+from amatak.core.codegen import BytecodeGenerator, CompiledModule
+from amatak.core.ir import (
+    IRBuilder, IRFunction, BasicBlock, IRInstr, fold_constants, lift, simplify_cfg
+)
+from amatak.core.verifier import verify_bytecode
+from amatak.core.vm import VM
+from amatak.errors import CompilationError
+from amatak.nodes import (
+    AssignmentNode, BinOpNode, CallNode, ForNode, FuncNode, IdentifierNode, IfNode,
+    NumberNode, PrintNode, ReturnNode, StringNode, TernaryNode, UnaryOpNode
+)
+from amatak.tokens import TokenType
+
+
+def num(value):
+    return NumberNode(str(value))
+
+def var(name):
+    return IdentifierNode(name)
+
+def ops(block):
+    return [instr.op for instr in block.instrs]
+
+LOOP = ForNode(
+    "i", num(0), BinOpNode(var("i"), TokenType.LT, num(3)), num(1),
+    [PrintNode(var("i"))]
+)
+
+@pytest.fixture
+def generator():
+    return BytecodeGenerator()
+
+
+class TestBuilder:
+    def test_for_loop_becomes_header_body_and_exit_blocks(self):
+        body = IRBuilder().build([LOOP]).body
+        entry, header, loop, exit_block = body.blocks
+        assert ops(header) == ['load', 'const', 'binop', 'branch']
+        assert header.successors() == [loop.label, exit_block.label]
+        assert loop.successors() == [header.label]
+        assert sorted(body.predecessors()[header.label]) == [entry.label, loop.label]
+
+    def test_comparisons_stay_single_instructions(self):
+        body = IRBuilder().build([PrintNode(BinOpNode(var("x"), TokenType.GT, num(1)))]).body
+        assert len(body.blocks) == 1
+        assert ops(body.entry) == ['load', 'const', 'binop', 'print', 'return']
+
+    def test_temporaries_are_explicit(self):
+        body = IRBuilder().build([AssignmentNode(var("y"), BinOpNode(var("x"), TokenType.PLUS, num(2)))]).body
+        load, const, add, store, _ = body.entry.instrs
+        assert add.args == ('+', load.dest, const.dest)
+        assert store.args == ('y', add.dest)
+
+    def test_code_after_return_is_dropped(self):
+        func = FuncNode("f", [], [ReturnNode(num(1)), PrintNode(num(2))])
+        ir = IRBuilder().build([func]).functions[0]
+        assert simplify_cfg(ir) == 1
+        assert [ops(block) for block in ir.blocks] == [['const', 'return']]
+
+    def test_definitely_assigned_merges_branches(self):
+        tree = [IfNode(var("c"), [AssignmentNode(var("a"), num(1)), AssignmentNode(var("b"), num(1))],
+                       [AssignmentNode(var("a"), num(2))])]
+        body = IRBuilder().build(tree).body
+        end = body.blocks[-1].label
+        assert body.definitely_assigned(set())[end] == {"a"}
+
+
+class TestBytecode:
+    def test_lowered_control_flow_runs(self, generator, capsys):
+        tree = [AssignmentNode(var("x"), num(5)), LOOP,
+                IfNode(BinOpNode(var("x"), TokenType.GT, num(3)), [PrintNode(num(1))], [PrintNode(num(2))])]
+        VM(jit_enabled=False).run_module(generator.generate(tree))
+        assert capsys.readouterr().out.split() == ["0", "1", "2", "1"]
+
+    def test_reused_temporaries_are_spilled(self, generator, capsys):
+        # t0 is read twice, so it cannot stay on the operand stack
+        func = IRFunction("<module>", temp_count=2)
+        block = BasicBlock(0)
+        t0, t1 = func.new_temp(), func.new_temp()
+        block.instrs = [
+            IRInstr('const', t0, (21,)),
+            IRInstr('binop', t1, ('+', t0, t0)),
+            IRInstr('print', None, (t1,)),
+            IRInstr('return'),
+        ]
+        func.blocks = [block]
+        code = generator.emit_function(func)
+        VM(jit_enabled=False).run_module(CompiledModule(code, generator.constants))
+        assert capsys.readouterr().out.split() == ["42"]
+
+    def test_ternary_lowering(self, capsys):
+        # sign(x) = x < 0 ? "neg" : x; hot enough to be tiered
+        sign = FuncNode("sign", ["x"], [ReturnNode(TernaryNode(
+            BinOpNode(var("x"), TokenType.LT, num(0)), StringNode("neg"), var("x")))])
+        calls = [PrintNode(CallNode("sign", [num(x)])) for x in range(-10, 10)]
+        for optimize in (False, True):
+            vm = VM()
+            vm.run_module(BytecodeGenerator(optimize=optimize).generate([sign] + calls))
+            assert capsys.readouterr().out.split() == ["neg"] * 10 + [str(x) for x in range(10)]
+
+    def test_unsupported_constructs_are_named(self, generator):
+        negate = PrintNode(UnaryOpNode(TokenType.MINUS, var("x")))
+        negate.line = 4
+        with pytest.raises(CompilationError, match=r"unary operators to bytecode \(line 4\)"):
+            generator.generate([negate])
+
+
+class TestLiftAndPasses:
+    def lifted(self, generator, tree):
+        module = generator.generate(tree)
+        func = module.functions[0]
+        result = verify_bytecode(func.bytecode, module.constants, func.arg_count, func.name)
+        return lift(func.name, func.arg_count, result, module.constants)
+
+    def test_lift_recovers_blocks_at_bytecode_offsets(self, generator):
+        func = FuncNode("f", ["n"], [
+            IfNode(BinOpNode(var("n"), TokenType.LT, num(2)), [ReturnNode(var("n"))]),
+            ReturnNode(num(0)),
+        ])
+        ir = self.lifted(generator, [func])
+        assert len(ir.blocks) == 3
+        assert ir.entry.terminator.op == 'branch'
+        assert ir.stored_names() == {"n"}
+
+    def test_fold_constants_resolves_constant_branches(self, generator):
+        func = FuncNode("f", [], [
+            IfNode(BinOpNode(num(1), TokenType.LT, num(2)), [ReturnNode(num(1))]),
+            ReturnNode(BinOpNode(num(1), TokenType.DIV, num(0))),
+        ])
+        ir = self.lifted(generator, [func])
+        assert fold_constants(ir) == 2
+        assert [ops(block) for block in ir.blocks] == [['jump'], ['const', 'return']]
+
+    def test_failing_operations_are_not_folded(self, generator):
+        func = FuncNode("f", [], [ReturnNode(BinOpNode(num(1), TokenType.DIV, num(0)))])
+        ir = self.lifted(generator, [func])
+        assert fold_constants(ir) == 0
+        assert 'binop' in ops(ir.entry)
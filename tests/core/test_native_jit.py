@@ -0,0 +1,231 @@
+import platform
+import pytest
+from dataclasses import replace
+from amatak.core.codegen import BytecodeGenerator
+from amatak.core.vm import VM
+from amatak.core.x86_64 import INT, FLOAT
+from amatak.errors import AmatakRuntimeError
+from amatak.nodes import (
+    AssignmentNode, BinOpNode, CallNode, ForNode, FuncNode, IdentifierNode,
+    IfNode, NumberNode, ReturnNode
+)
+from amatak.tokens import TokenType
+
+pytestmark = pytest.mark.skipif(
+    platform.machine().lower() not in ('x86_64', 'amd64') or platform.system() != 'Linux',
+    reason="native JIT targets x86-64 Linux"
+)
+
+
+def ident(name):
+    return IdentifierNode(name)
+
+def num(value):
+    return NumberNode(str(value))
+
+def binop(left, op, right):
+    return BinOpNode(left, op, right)
+
+def loop(var, limit, body, step=1):
+    return ForNode(
+        var, num(0), binop(ident(var), TokenType.LT, limit),
+        AssignmentNode(ident(var), binop(ident(var), TokenType.PLUS, num(step))),
+        body
+    )
+
+FIB = FuncNode("fib", ["n"], [
+    IfNode(binop(ident("n"), TokenType.LT, num(2)), [ReturnNode(ident("n"))]),
+    ReturnNode(binop(
+        CallNode("fib", [binop(ident("n"), TokenType.MINUS, num(1))]),
+        TokenType.PLUS,
+        CallNode("fib", [binop(ident("n"), TokenType.MINUS, num(2))])
+    )),
+])
+
+# total starts as an int and becomes a float inside the loop
+PRICE = FuncNode("price", ["qty", "unit"], [
+    AssignmentNode(ident("total"), num(0)),
+    loop("i", ident("qty"), [
+        AssignmentNode(ident("total"), binop(
+            ident("total"), TokenType.PLUS,
+            binop(ident("unit"), TokenType.MUL, binop(num(1), TokenType.MINUS, binop(ident("i"), TokenType.DIV, num(100))))
+        )),
+    ]),
+    ReturnNode(ident("total")),
+])
+
+MOD = FuncNode("mod", ["a", "b"], [ReturnNode(binop(ident("a"), TokenType.MOD, ident("b")))])
+
+SQUARE = FuncNode("square", ["x"], [ReturnNode(binop(ident("x"), TokenType.MUL, ident("x")))])
+
+HALF = FuncNode("half", ["x"], [ReturnNode(binop(ident("x"), TokenType.DIV, num(2)))])
+
+LESS = FuncNode("less", ["a", "b"], [ReturnNode(binop(ident("a"), TokenType.LT, ident("b")))])
+
+
+def run(tree, jit_enabled=True):
+    vm = VM(jit_enabled=jit_enabled)
+    result = vm.run_module(BytecodeGenerator().generate(tree))
+    return vm, result
+
+def call(vm, name, *args):
+    return vm._invoke(vm.functions[name], list(args))
+
+@pytest.fixture
+def vm():
+    vm, _ = run([FIB, PRICE, MOD, SQUARE, HALF, LESS])
+    return vm
+
+
+class TestNativeJIT:
+    def test_recursive_function_runs_natively(self):
+        vm, result = run([FIB, ReturnNode(CallNode("fib", [num(20)]))])
+        assert result == 6765
+        assert vm.jit.variants[("fib", (INT,))].size > 0
+
+    def test_matches_interpreter(self, vm):
+        interp, _ = run([FIB, PRICE, MOD, SQUARE, HALF, LESS], jit_enabled=False)
+        vm.jit.warmup(["price", "mod", "square", "half", "less"])
+        cases = [
+            ("price", 50, 2.5), ("price", 0, 2.5), ("price", 10, 3),
+            ("mod", 7, 3), ("mod", -7, 3), ("mod", 7, -3), ("mod", -7, -3), ("mod", 5, -1),
+            ("square", 3), ("square", -1.5), ("half", 7), ("half", 7.0),
+            ("less", 1, 2), ("less", 2.5, 1), ("less", 1, float('nan')),
+        ]
+        for name, *args in cases:
+            expected = call(interp, name, *args)
+            actual = call(vm, name, *args)
+            assert actual == expected or (actual != actual and expected != expected), (name, args)
+            assert type(actual) is type(expected), (name, args)
+
+    def test_float_signature_compiles_separately(self, vm):
+        vm.jit.compile_function("square", (FLOAT,))
+        assert call(vm, "square", 1.5) == 2.25
+        assert ("square", (FLOAT,)) in vm.jit.variants
+
+    def test_overflow_deoptimizes_to_vm(self, vm):
+        vm.jit.warmup(["square"])
+        assert call(vm, "square", 2 ** 40) == 2 ** 80
+        assert vm.jit.deopts["square"] == 1
+
+    def test_large_ints_compare_exactly_with_floats(self):
+        same = FuncNode("same", ["a", "b"], [ReturnNode(binop(ident("a"), TokenType.EQ, ident("b")))])
+        vm, _ = run([same, LESS])
+        vm.jit.warmup(["same", "less"])
+        assert call(vm, "same", 2 ** 53 + 1, 2.0 ** 53) is False
+        assert call(vm, "less", 2.0 ** 53, 2 ** 53 + 1) is True
+        assert call(vm, "same", 2 ** 53, 2.0 ** 53) is True
+        assert vm.jit.deopts["same"] == 1
+
+    def test_division_by_zero_raised_by_vm(self, vm):
+        vm.jit.warmup(["half", "mod"])
+        with pytest.raises(AmatakRuntimeError):
+            call(vm, "mod", 1, 0)
+
+    def test_non_numeric_argument_deoptimizes(self, vm):
+        vm.jit.warmup(["square"])
+        with pytest.raises(AmatakRuntimeError):
+            call(vm, "square", "ab")
+        assert vm.functions["square"].tier is None
+
+    def test_redefining_callee_invalidates_caller(self):
+        twice = FuncNode("twice", ["x"], [ReturnNode(binop(CallNode("square", [ident("x")]), TokenType.MUL, num(2)))])
+        identity = FuncNode("identity", ["x"], [ReturnNode(ident("x"))])
+        vm, _ = run([SQUARE, twice, identity])
+        vm.jit.warmup(["twice"])
+        assert call(vm, "twice", 3) == 18
+        vm.functions["square"] = replace(vm.functions["identity"], name="square", tier=None)
+        vm.invalidate_call_sites()
+        assert call(vm, "twice", 3) == 6
+
+    def test_impure_function_not_accepted(self, vm):
+        reads_global = FuncNode("scaled", ["x"], [ReturnNode(binop(ident("x"), TokenType.MUL, ident("scale")))])
+        vm.run_module(BytecodeGenerator().generate([reads_global]))
+        assert not vm.jit.accepts(vm.functions["scaled"])
+        with pytest.raises(AmatakRuntimeError):
+            vm.jit.compile_function("scaled")
+
+
+class TestJITCache:
+    def make_vm(self, tmp_path):
+        vm = VM(jit_cache=str(tmp_path))
+        vm.run_module(BytecodeGenerator().generate([FIB, ReturnNode(CallNode("fib", [num(15)]))]))
+        return vm
+
+    def test_code_and_profile_persist(self, tmp_path):
+        first = self.make_vm(tmp_path)
+        assert first.jit.cache.misses >= 1
+        assert list(tmp_path.glob("*.bin"))
+
+        second = self.make_vm(tmp_path)
+        # Promoted at load time from the profile, with code mapped from disk
+        assert second.jit_context.hot_functions.get("fib", 0) == 0
+        assert second.jit.cache.hits >= 1
+        assert call(second, "fib", 20) == 6765
+
+    def test_changed_function_misses(self, tmp_path):
+        self.make_vm(tmp_path)
+        changed = FuncNode("fib", ["n"], [ReturnNode(binop(ident("n"), TokenType.PLUS, num(7)))])
+        vm = VM(jit_cache=str(tmp_path))
+        vm.run_module(BytecodeGenerator().generate([changed]))
+        assert vm.functions["fib"].tier is None
+        vm.jit.warmup(["fib"])
+        assert vm.jit.cache.hits == 0
+        assert call(vm, "fib", 1) == 8
+
+    def test_corrupt_entry_is_ignored(self, tmp_path):
+        self.make_vm(tmp_path)
+        for path in tmp_path.glob("*.bin"):
+            path.write_bytes(b"junk")
+        vm = self.make_vm(tmp_path)
+        assert call(vm, "fib", 10) == 55
+
+    def test_flipped_code_byte_is_a_miss(self, tmp_path):
+        self.make_vm(tmp_path)
+        for path in tmp_path.glob("*.bin"):
+            data = bytearray(path.read_bytes())
+            data[-1] ^= 0xFF
+            path.write_bytes(bytes(data))
+        vm = self.make_vm(tmp_path)
+        assert vm.jit.cache.hits == 0
+        assert call(vm, "fib", 10) == 55
+
+    def test_truncated_entry_is_a_miss(self, tmp_path):
+        self.make_vm(tmp_path)
+        for path in tmp_path.glob("*.bin"):
+            data = path.read_bytes()
+            path.write_bytes(data[:len(data) - 16])
+        vm = self.make_vm(tmp_path)
+        assert vm.jit.cache.hits == 0
+        assert call(vm, "fib", 10) == 55
+
+    def test_relocation_outside_code_is_rejected(self, tmp_path):
+        from amatak.core.jitcache import JITCache
+        cache = JITCache(str(tmp_path), arch='x86_64', version='test')
+        cache.store_code('k', b'\x90' * 16, [[12, 'depth']], 'int')
+        assert cache.load_code('k') is None
+        cache.store_code('k', b'\x90' * 16, [[8, 'depth']], 'int')
+        assert cache.load_code('k').relocations == [[8, 'depth']]
+
+
+class TestCodeMemory:
+    def test_recompiled_variant_is_freed(self):
+        vm, _ = run([SQUARE, FIB])
+        vm.jit.warmup(["square"])
+        before = vm.jit.memory.code_arena.get_stats()['functions']
+        stale = vm.jit.variants[("square", (INT,))]
+        vm.functions["square"] = replace(vm.functions["square"], tier=None)
+        vm.jit.warmup(["square"])
+        assert stale.address == 0
+        assert vm.jit.memory.code_arena.get_stats()['functions'] == before
+        assert call(vm, "square", 9) == 81
+
+    def test_compaction_preserves_results(self, vm):
+        vm.jit.memory.code_arena.chunk_size = 4096
+        vm.jit.warmup(["fib", "square", "mod"])
+        vm.jit.compile_function("square", (FLOAT,))
+        assert vm.jit.compact_code() >= 0
+        assert vm.jit.memory.code_arena.get_stats()['chunks'] == 1
+        assert call(vm, "fib", 20) == 6765
+        assert call(vm, "square", 1.5) == 2.25
+        assert call(vm, "mod", -7, 3) == 2
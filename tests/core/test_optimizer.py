@@ -0,0 +1,336 @@
+import pytest
+from amatak.core.ast.optimizer import ASTOptimizer, walk
+from amatak.core.ast import passes
+from amatak.core.ast.passes import OptimizationPass, PassManager, resolve_passes
+from amatak.core.codegen import BytecodeGenerator, compile_source
+from amatak.core.vm import VM, OpCode, iter_instructions
+from amatak.nodes import (
+    AssignmentNode, BinOpNode, CallNode, ForNode, FuncNode, IdentifierNode,
+    IfNode, NumberNode, PrintNode, ReturnNode, TernaryNode
+)
+from amatak.tokens import TokenType
+
+
+def num(value):
+    return NumberNode(str(value))
+
+def var(name):
+    return IdentifierNode(name)
+
+def let(name, value):
+    return AssignmentNode(var(name), value)
+
+def binop(left, op, right):
+    return BinOpNode(left, op, right)
+
+def run(tree, capsys):
+    VM(jit_enabled=False).run_module(BytecodeGenerator().generate(tree))
+    return capsys.readouterr().out.split()
+
+def opcodes(module):
+    return [instr.op for instr in iter_instructions(module.code)]
+
+@pytest.fixture
+def optimizer():
+    return ASTOptimizer(whole_program=True)
+
+
+class TestFolding:
+    def test_propagates_and_folds_source(self, capsys):
+        source = "let x = 2\nlet y = x * 21\nlet z = y + 1 < 50\nprint y\nprint z"
+        module = compile_source(source, opt_level=3)
+        ops = opcodes(module)
+        assert OpCode.BINARY_MUL not in ops and OpCode.COMPARE_LT not in ops
+        # Nothing reads x, y or z once their values are propagated
+        assert OpCode.STORE_VAR not in ops
+        VM(jit_enabled=False).run_module(module)
+        assert capsys.readouterr().out.split() == ["42", "True"]
+
+    def test_results_match_vm_semantics(self, optimizer):
+        tree = [PrintNode(binop(num(7), TokenType.DIV, num(2))),
+                PrintNode(binop(num(7), TokenType.MOD, num(-3)))]
+        folded = optimizer.optimize(tree)
+        assert [stmt.value.value for stmt in folded] == ["3.5", str(7 % -3)]
+
+    def test_failing_operations_are_left_to_run_time(self, optimizer):
+        tree = [PrintNode(binop(num(1), TokenType.DIV, num(0)))]
+        folded = optimizer.optimize(tree)
+        assert isinstance(folded[0].value, BinOpNode)
+
+    def test_constant_ternary_picks_a_branch(self, optimizer):
+        tree = [PrintNode(TernaryNode(binop(num(1), TokenType.LT, num(2)), var("a"), var("b")))]
+        assert optimizer.optimize(tree)[0].value.name == "a"
+
+    def test_statement_lines_are_kept(self, optimizer):
+        stmt = PrintNode(binop(num(1), TokenType.PLUS, num(2)))
+        stmt.line = 7
+        assert optimizer.optimize([stmt])[0].line == 7
+
+
+class TestPropagation:
+    def test_loop_assignments_are_not_propagated(self, optimizer, capsys):
+        tree = [
+            let("total", num(0)),
+            ForNode("i", num(0), binop(var("i"), TokenType.LT, num(3)), num(1), [
+                let("total", binop(var("total"), TokenType.PLUS, var("i"))),
+            ]),
+            PrintNode(var("total")),
+        ]
+        assert run(optimizer.optimize(tree), capsys) == ["3"]
+
+    def test_if_join_keeps_agreeing_bindings_only(self, optimizer):
+        tree = [
+            let("a", num(1)),
+            let("b", num(1)),
+            IfNode(var("c"), [let("b", num(2))], [let("b", num(3))]),
+            PrintNode(var("a")),
+            PrintNode(var("b")),
+        ]
+        out = optimizer.optimize(tree)
+        assert out[-2].value.value == "1"
+        assert isinstance(out[-1].value, IdentifierNode)
+
+    def test_calls_kill_names_functions_assign(self, optimizer):
+        tree = [
+            FuncNode("f", [], [let("n", CallNode("g", []))]),
+            let("n", num(1)),
+            let("m", num(1)),
+            CallNode("f", []),
+            PrintNode(var("n")),
+            PrintNode(var("m")),
+        ]
+        out = optimizer.optimize(tree)
+        assert isinstance(out[-2].value, IdentifierNode)
+        assert out[-1].value.value == "1"
+
+
+class TestDeadCode:
+    def test_statements_after_return_are_dropped(self, optimizer):
+        tree = [FuncNode("f", ["x"], [ReturnNode(var("x")), PrintNode(var("x"))])]
+        assert len(optimizer.optimize(tree)[0].body) == 1
+        assert optimizer.stats["unreachable"] == 1
+
+    def test_constant_if_is_spliced(self, optimizer, capsys):
+        tree = [IfNode(binop(num(2), TokenType.GT, num(1)), [PrintNode(num(1))], [PrintNode(num(2))])]
+        out = optimizer.optimize(tree)
+        assert isinstance(out[0], PrintNode)
+        assert run(out, capsys) == ["1"]
+
+    def test_loop_that_never_runs_keeps_its_init(self, optimizer, capsys):
+        tree = [
+            ForNode("i", num(5), binop(var("i"), TokenType.LT, num(3)), num(1), [PrintNode(var("i"))]),
+            PrintNode(var("i")),
+        ]
+        out = optimizer.optimize(tree)
+        assert not any(isinstance(stmt, ForNode) for stmt in out)
+        assert run(out, capsys) == ["5"]
+
+    def test_top_level_stores_survive_without_whole_program(self):
+        tree = [let("x", num(1))]
+        assert len(ASTOptimizer().optimize(tree)) == 1
+        assert ASTOptimizer(whole_program=True).optimize(tree) == []
+
+    def test_dead_stores_in_functions_are_removed(self):
+        tree = [FuncNode("f", [], [let("unused", num(1)), ReturnNode(num(2))])]
+        body = ASTOptimizer().optimize(tree)[0].body
+        assert len(body) == 1 and isinstance(body[0], ReturnNode)
+
+
+class TestCSE:
+    def expr(self):
+        return binop(binop(var("a"), TokenType.MUL, var("b")), TokenType.PLUS, var("c"))
+
+    def test_repeated_expression_is_computed_once(self, optimizer, capsys):
+        tree = [
+            FuncNode("f", ["a", "b", "c"], [
+                PrintNode(self.expr()),
+                PrintNode(self.expr()),
+                ReturnNode(self.expr()),
+            ]),
+            PrintNode(CallNode("f", [num(2), num(3), num(4)])),
+        ]
+        out = optimizer.optimize(tree)
+        body = out[0].body
+        assert optimizer.stats["cse"] == 1
+        assert isinstance(body[0], AssignmentNode) and body[0].name.name.startswith("__cse")
+        assert all(isinstance(stmt.value if isinstance(stmt, PrintNode) else stmt.expression, IdentifierNode)
+                   for stmt in body[1:])
+        assert run(out, capsys) == ["10", "10", "10"]
+
+    def test_assignment_to_operand_splits_groups(self, optimizer):
+        tree = [FuncNode("f", ["a", "b", "c"], [
+            PrintNode(self.expr()),
+            let("a", CallNode("g", [])),
+            PrintNode(self.expr()),
+        ])]
+        optimizer.optimize(tree)
+        assert optimizer.stats["cse"] == 0
+
+    def test_definitions_do_not_run_before_calls(self, optimizer, capsys):
+        # The first statement calls g before evaluating a / b, which raises
+        quotient = lambda: binop(binop(var("a"), TokenType.DIV, var("b")), TokenType.PLUS, var("a"))
+        tree = [
+            FuncNode("g", [], [PrintNode(num(1)), ReturnNode(num(0))]),
+            FuncNode("f", ["a", "b"], [
+                let("r", binop(CallNode("g", []), TokenType.PLUS, quotient())),
+                PrintNode(quotient()),
+                ReturnNode(quotient()),
+            ]),
+            PrintNode(CallNode("f", [num(1), num(0)])),
+        ]
+        with pytest.raises(Exception):
+            VM(jit_enabled=False).run_module(BytecodeGenerator().generate(optimizer.optimize(tree)))
+        assert capsys.readouterr().out.split() == ["1"]
+
+    def test_cheap_expressions_are_not_hoisted(self, optimizer):
+        tree = [FuncNode("f", ["a", "b"], [
+            PrintNode(binop(var("a"), TokenType.PLUS, var("b"))),
+            PrintNode(binop(var("a"), TokenType.PLUS, var("b"))),
+        ])]
+        optimizer.optimize(tree)
+        assert optimizer.stats["cse"] == 0
+
+
+class TestInlining:
+    def test_small_function_is_inlined(self, optimizer, capsys):
+        tree = [
+            FuncNode("sq", ["x"], [ReturnNode(binop(var("x"), TokenType.MUL, var("x")))]),
+            let("y", var("n")),
+            PrintNode(binop(CallNode("sq", [var("y")]), TokenType.PLUS, CallNode("sq", [num(2)]))),
+        ]
+        out = optimizer.optimize([let("n", num(3))] + tree)
+        assert optimizer.stats["inlined"] == 2
+        assert not any(isinstance(node, CallNode) for node in walk(out[1:]))
+        assert run(out, capsys) == ["13"]
+
+    def test_callee_locals_do_not_clobber_caller(self, optimizer, capsys):
+        tree = [
+            FuncNode("f", ["a"], [let("t", binop(var("a"), TokenType.PLUS, num(1))), ReturnNode(var("t"))]),
+            FuncNode("main", [], [
+                let("t", num(10)),
+                let("a", CallNode("f", [num(1)])),
+                PrintNode(binop(var("t"), TokenType.PLUS, var("a"))),
+            ]),
+            CallNode("main", []),
+        ]
+        out = optimizer.optimize(tree)
+        # f into main, then main (now a leaf) into the module
+        assert optimizer.stats["inlined"] == 2
+        assert run(out, capsys) == ["12"]
+
+    def test_recursive_and_printing_calls_stay(self, optimizer):
+        tree = [
+            FuncNode("r", ["x"], [ReturnNode(CallNode("r", [var("x")]))]),
+            FuncNode("p", ["x"], [PrintNode(var("x")), ReturnNode(var("x"))]),
+            PrintNode(CallNode("r", [var("v")])),
+            PrintNode(binop(num(1), TokenType.PLUS, CallNode("p", [var("v")]))),
+        ]
+        optimizer.optimize(tree)
+        assert optimizer.stats["inlined"] == 0
+
+
+class TestLoops:
+    def loop(self, bound, body, step=None):
+        return ForNode("i", num(0), binop(var("i"), TokenType.LT, bound), step or num(1), body)
+
+    def test_short_constant_loop_is_unrolled(self, optimizer, capsys):
+        tree = [self.loop(num(3), [PrintNode(binop(var("i"), TokenType.MUL, num(10)))]), PrintNode(var("i"))]
+        out = optimizer.optimize(tree)
+        assert optimizer.stats["unrolled"] == 1
+        assert not any(isinstance(stmt, ForNode) for stmt in out)
+        assert run(out, capsys) == ["0", "10", "20", "3"]
+
+    def test_long_loops_are_not_unrolled(self, optimizer):
+        step = let("i", binop(var("i"), TokenType.PLUS, num(1)))
+        optimizer.optimize([self.loop(num(1000), [PrintNode(var("i"))], step)])
+        assert optimizer.stats["unrolled"] == 0
+
+    def test_invariants_are_hoisted_behind_a_guard(self, optimizer, capsys):
+        body = [PrintNode(binop(binop(var("k"), TokenType.MUL, var("k")), TokenType.PLUS, var("i")))]
+        tree = [FuncNode("f", ["n", "k"], [self.loop(binop(var("n"), TokenType.MUL, num(2)), body)]),
+                CallNode("f", [num(1), num(3)])]
+        out = optimizer.optimize(tree)
+        assert optimizer.stats["hoisted"] == 2
+        guard = out[0].body[-1]
+        assert isinstance(guard, IfNode) and isinstance(guard.then_branch[-1], ForNode)
+        assert run(out, capsys) == ["9", "10"]
+
+    def test_zero_trip_loop_does_not_evaluate_body_invariants(self, optimizer, capsys):
+        body = [PrintNode(binop(num(1), TokenType.DIV, var("k")))]
+        tree = [FuncNode("f", ["n", "k"], [self.loop(var("n"), body), ReturnNode(num(7))]),
+                PrintNode(CallNode("f", [num(0), num(0)]))]
+        assert run(optimizer.optimize(tree), capsys) == ["7"]
+
+    def test_invariants_after_side_effects_stay_in_the_loop(self, optimizer, capsys):
+        body = [PrintNode(var("i")), let("d", binop(var("x"), TokenType.MOD, var("k")))]
+        tree = [FuncNode("f", ["n", "x", "k"], [self.loop(var("n"), body)]),
+                CallNode("f", [num(2), num(5), num(0)])]
+        out = optimizer.optimize(tree)
+        assert optimizer.stats["hoisted"] == 0
+        with pytest.raises(Exception):
+            VM(jit_enabled=False).run_module(BytecodeGenerator().generate(out))
+        assert capsys.readouterr().out.split() == ["0"]
+
+    def test_induction_multiplies_become_adds(self, optimizer, capsys):
+        scaled = lambda: binop(var("i"), TokenType.MUL, num(4))
+        body = [let("s", binop(binop(var("s"), TokenType.PLUS, scaled()), TokenType.PLUS, scaled())),
+                PrintNode(scaled())]
+        tree = [FuncNode("f", ["n"], [let("s", num(0)), self.loop(var("n"), body), ReturnNode(var("s"))]),
+                PrintNode(CallNode("f", [num(3)]))]
+        out = optimizer.optimize(tree)
+        assert optimizer.stats["strength_reduced"] == 1
+        ops = [node.op for node in walk(out[0]) if isinstance(node, BinOpNode)]
+        assert TokenType.MUL not in ops
+        assert run(out, capsys) == ["0", "4", "8", "24"]
+
+
+class TestPassManager:
+    def test_requirements_are_added_and_run_first(self):
+        names = [opt_pass.name for opt_pass in resolve_passes(["cse", "dead_stores"])]
+        assert names == ["propagate", "cse", "dead_stores"]
+
+    def test_unknown_passes_and_cycles_are_rejected(self):
+        with pytest.raises(ValueError):
+            resolve_passes(["nope"])
+        registry = {
+            "a": OptimizationPass("a", lambda tree, optimizer: tree, ("b",)),
+            "b": OptimizationPass("b", lambda tree, optimizer: tree, ("a",)),
+        }
+        with pytest.raises(ValueError, match="cycle"):
+            resolve_passes(["a"], registry)
+
+    def test_levels_select_passes(self):
+        def tree():
+            return [FuncNode("f", ["a", "b", "c"], [
+                PrintNode(binop(binop(var("a"), TokenType.MUL, var("b")), TokenType.PLUS, var("c")))
+                for _ in range(3)
+            ] + [let("unused", binop(num(1), TokenType.PLUS, num(1)))])]
+        assert len(PassManager.for_level(0).run(tree())[0].body) == 4
+        assert len(PassManager.for_level(1).run(tree())[0].body) == 3
+        body = PassManager.for_level(2).run(tree())[0].body
+        assert isinstance(body[0], AssignmentNode) and body[0].name.name.startswith("__cse")
+        with pytest.raises(ValueError):
+            PassManager.for_level(7)
+
+    def test_report_has_time_and_rewrites_per_pass(self):
+        manager = PassManager.for_level(1, whole_program=True)
+        manager.run([let("x", num(2)), PrintNode(binop(var("x"), TokenType.MUL, num(21)))])
+        report = manager.report()
+        by_name = {entry["name"]: entry for entry in report["passes"]}
+        assert by_name["propagate"]["rewrites"] == 2
+        assert by_name["dead_stores"]["rewrites"] == 1
+        assert all(entry["time_ms"] >= 0 for entry in report["passes"])
+        assert report["level"] == 1 and report["rounds"] == 2
+        assert "propagate" in manager.format_report()
+
+    def test_lowering_passes_run_once(self, monkeypatch):
+        calls = []
+
+        def lower(tree, optimizer):
+            calls.append(1)
+            return tree
+
+        monkeypatch.setitem(passes.PASSES, "lower", OptimizationPass("lower", lower, repeat=False))
+        manager = PassManager(["lower", "propagate"])
+        manager.run([PrintNode(binop(num(1), TokenType.PLUS, num(1)))])
+        assert manager.rounds == 2 and len(calls) == 1
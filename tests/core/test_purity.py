@@ -0,0 +1,134 @@
+import pytest
+from amatak.core.codegen import BytecodeGenerator
+from amatak.core.purity import MemoCache, pure_functions
+from amatak.core.vm import VM
+from amatak.nodes import (
+    ArrayAccessNode, ArrayNode, AssignmentNode, BinOpNode, CallNode, FuncNode,
+    IdentifierNode, IfNode, NumberNode, PrintNode, ReturnNode, StringNode
+)
+from amatak.tokens import TokenType
+
+
+def num(value):
+    return NumberNode(str(value))
+
+def var(name):
+    return IdentifierNode(name)
+
+def binop(left, op, right):
+    return BinOpNode(left, op, right)
+
+# fib(n): if n < 2 return n; return fib(n - 1) + fib(n - 2)
+FIB = FuncNode("fib", ["n"], [
+    IfNode(binop(var("n"), TokenType.LT, num(2)), [ReturnNode(var("n"))]),
+    ReturnNode(binop(
+        CallNode("fib", [binop(var("n"), TokenType.MINUS, num(1))]),
+        TokenType.PLUS,
+        CallNode("fib", [binop(var("n"), TokenType.MINUS, num(2))]),
+    )),
+])
+SQUARE = FuncNode("square", ["x"], [ReturnNode(binop(var("x"), TokenType.MUL, var("x")))])
+NOISY = FuncNode("noisy", ["x"], [PrintNode(var("x")), ReturnNode(var("x"))])
+# Reads ``scale`` from whoever calls it
+SCALED = FuncNode("scaled", ["x"], [ReturnNode(binop(var("x"), TokenType.MUL, var("scale")))])
+POKE = FuncNode("poke", ["a"], [AssignmentNode(ArrayAccessNode(var("a"), num(0)), num(1)), ReturnNode(num(0))])
+CALLS_NOISY = FuncNode("calls_noisy", ["x"], [ReturnNode(CallNode("noisy", [var("x")]))])
+PAIR = FuncNode("pair", ["x"], [ReturnNode(ArrayNode([var("x"), var("x")]))])
+
+ALL = [FIB, SQUARE, NOISY, SCALED, POKE, CALLS_NOISY, PAIR]
+
+
+def load(tree, memoize=16, **options):
+    vm = VM(jit_enabled=False, **options)
+    vm.run_module(BytecodeGenerator().generate(tree))
+    memo = vm.enable_memoization(memoize) if memoize else None
+    return vm, memo
+
+def call(vm, name, *args):
+    return vm._invoke(vm.functions[name], list(args))
+
+
+class TestPurityAnalysis:
+    def test_classifies_functions(self):
+        module = BytecodeGenerator().generate(ALL)
+        assert pure_functions(module.functions, module.constants) == {"fib", "square", "pair"}
+
+    def test_recursion_through_impure_callees(self):
+        module = BytecodeGenerator().generate(ALL)
+        pure = pure_functions([f for f in module.functions if f.name != "noisy"], module.constants)
+        # Unknown callees are not assumed pure
+        assert "calls_noisy" not in pure
+
+
+class TestMemoization:
+    def test_pure_calls_hit_the_cache(self):
+        vm, memo = load([FIB])
+        assert call(vm, "fib", 20) == 6765
+        stats = memo.stats()
+        # Every fib(k) is computed once
+        assert stats["functions"]["fib"]["misses"] == 21
+        assert stats["hits"] == 18
+        assert stats["hit_rate"] == pytest.approx(18 / 39)
+        assert stats["pure"] == ["fib"]
+
+    def test_caches_are_bounded(self):
+        vm, memo = load([SQUARE], memoize=4)
+        for x in range(10):
+            assert call(vm, "square", x) == x * x
+        assert len(memo.entries["square"]) == 4
+        assert memo.evictions == 6
+        assert call(vm, "square", 9) == 81
+        assert call(vm, "square", 0) == 0
+        assert memo.stats()["functions"]["square"] == {"hits": 1, "misses": 11, "hit_rate": 1 / 12, "size": 4}
+
+    def test_keys_distinguish_types(self):
+        vm, memo = load([SQUARE])
+        assert call(vm, "square", 2) == 4
+        assert type(call(vm, "square", 2.0)) is float
+        assert memo.stats()["hits"] == 0
+
+    def test_keys_keep_the_sign_of_zero(self):
+        show = FuncNode("show", ["x"], [ReturnNode(binop(StringNode(""), TokenType.PLUS, var("x")))])
+        vm, memo = load([show])
+        assert call(vm, "show", 0.0) == "0.0"
+        assert call(vm, "show", -0.0) == "-0.0"
+        assert call(vm, "show", float("nan")) == call(vm, "show", float("nan")) == "nan"
+        assert memo.stats()["hits"] == 1
+
+    def test_impure_functions_always_run(self, capsys):
+        vm, memo = load([NOISY, CALLS_NOISY])
+        for _ in range(2):
+            call(vm, "calls_noisy", 3)
+        assert capsys.readouterr().out.split() == ["3", "3"]
+        assert memo.stats()["functions"] == {}
+
+    def test_arrays_are_not_cached(self):
+        vm, memo = load([PAIR])
+        first, second = call(vm, "pair", 1), call(vm, "pair", 1)
+        assert first == second and first is not second
+        assert call(vm, "pair", [1]) == [[1], [1]]
+        assert memo.entries.get("pair", {}) == {}
+
+    def test_redefinition_invalidates(self):
+        vm, memo = load([SQUARE])
+        assert call(vm, "square", 3) == 9
+        cube = BytecodeGenerator().generate([FuncNode("square", ["x"], [
+            ReturnNode(binop(binop(var("x"), TokenType.MUL, var("x")), TokenType.MUL, var("x")))])])
+        vm.run_module(cube)
+        assert call(vm, "square", 3) == 27
+
+    def test_disabled_by_default(self):
+        vm, memo = load([SQUARE], memoize=None)
+        assert vm.memo is None and call(vm, "square", 3) == 9
+        with pytest.raises(ValueError):
+            MemoCache(vm, max_size=0)
+
+    def test_tiered_call_sites_use_the_cache(self):
+        vm, memo = load([FIB])
+        vm.jit_context = None
+        from amatak.core.pytier import PythonTierCompiler
+        fib = vm.functions["fib"]
+        fib.tier = PythonTierCompiler(vm).compile(fib)
+        assert call(vm, "fib", 25) == 75025
+        assert memo.stats()["functions"]["fib"]["misses"] == 26
+
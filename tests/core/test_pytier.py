@@ -0,0 +1,102 @@
+from amatak.core.codegen import BytecodeGenerator
+from amatak.core.vm import VM
+from amatak.nodes import (
+    AssignmentNode, BinOpNode, CallNode, ForNode, FuncNode, IdentifierNode,
+    IfNode, NumberNode, ReturnNode
+)
+from amatak.tokens import TokenType
+
+
+def ident(name):
+    return IdentifierNode(name)
+
+def num(value):
+    return NumberNode(str(value))
+
+FIB = FuncNode("fib", ["n"], [
+    IfNode(BinOpNode(ident("n"), TokenType.LT, num(2)), [ReturnNode(ident("n"))]),
+    ReturnNode(BinOpNode(
+        CallNode("fib", [BinOpNode(ident("n"), TokenType.MINUS, num(1))]),
+        TokenType.PLUS,
+        CallNode("fib", [BinOpNode(ident("n"), TokenType.MINUS, num(2))])
+    )),
+])
+
+SUM_SCALED = FuncNode("sum_scaled", ["n"], [
+    AssignmentNode(ident("acc"), num(0)),
+    ForNode(
+        "i", num(0),
+        BinOpNode(ident("i"), TokenType.LT, ident("n")),
+        AssignmentNode(ident("i"), BinOpNode(ident("i"), TokenType.PLUS, num(1))),
+        [AssignmentNode(ident("acc"), BinOpNode(
+            ident("acc"), TokenType.PLUS, BinOpNode(ident("i"), TokenType.MUL, ident("scale"))
+        ))]
+    ),
+    ReturnNode(ident("acc")),
+])
+
+
+def run(tree, jit_enabled=True):
+    vm = VM(jit_enabled=jit_enabled)
+    if vm.jit is not None:
+        # Keep numeric functions off the native backend
+        vm.jit.supported = False
+    result = vm.run_module(BytecodeGenerator().generate(tree))
+    return vm, result
+
+
+class TestPythonTier:
+    def test_hot_recursive_function_is_promoted(self):
+        vm, result = run([FIB, ReturnNode(CallNode("fib", [num(15)]))])
+        assert result == 610
+        assert vm.functions["fib"].tier is not None
+
+    def test_results_match_interpreter(self):
+        calls = [AssignmentNode(ident("scale"), num(3))]
+        calls += [AssignmentNode(ident(f"r{i}"), CallNode("sum_scaled", [num(i)])) for i in range(20)]
+        tree = [SUM_SCALED] + calls + [ReturnNode(ident("r19"))]
+        vm_jit, tiered = run(tree)
+        _, interpreted = run(tree, jit_enabled=False)
+        assert tiered == interpreted == 3 * sum(range(19))
+        assert vm_jit.functions["sum_scaled"].tier is not None
+        assert vm_jit.frames[0]["r7"] == 3 * sum(range(7))
+
+    def test_cold_functions_stay_interpreted(self):
+        vm, _ = run([FIB, ReturnNode(CallNode("fib", [num(3)]))])
+        assert vm.functions["fib"].tier is None
+
+    def test_global_rebinding_is_seen_by_tiered_code(self):
+        vm, _ = run([SUM_SCALED, AssignmentNode(ident("scale"), num(1))] +
+                    [AssignmentNode(ident("x"), CallNode("sum_scaled", [num(4)])) for _ in range(15)])
+        assert vm.functions["sum_scaled"].tier is not None
+        vm.frames[0]["scale"] = 10
+        vm.invalidate_global_sites()
+        assert vm._invoke(vm.functions["sum_scaled"], [4]) == 60
+
+    def test_tiered_locals_shadow_cached_globals(self):
+        # g reads x from its caller; f binds a local x before calling g
+        g = FuncNode("g", [], [ReturnNode(ident("x"))])
+        f = FuncNode("f", ["y"], [
+            AssignmentNode(ident("x"), BinOpNode(ident("y"), TokenType.PLUS, num(1))),
+            ReturnNode(CallNode("g", [])),
+        ])
+        calls = [AssignmentNode(ident(f"r{i}"), BinOpNode(CallNode("g", []), TokenType.PLUS, CallNode("f", [num(1)])))
+                 for i in range(20)]
+        vm = VM()
+        vm.jit.supported = False
+        # Keep g interpreted, reading x through its load-site cache
+        vm.jit_context.python_tier.deopts["g"] = vm.jit_context.python_tier.max_deopts
+        tree = [g, f, AssignmentNode(ident("x"), num(1))] + calls + [ReturnNode(ident("r19"))]
+        assert vm.run_module(BytecodeGenerator().generate(tree)) == 3
+        assert vm.functions["f"].tier is not None and vm.functions["g"].tier is None
+
+    def test_constant_pool_change_deoptimizes(self):
+        vm, _ = run([FIB, ReturnNode(CallNode("fib", [num(12)]))])
+        fib = vm.functions["fib"]
+        stale = fib.tier
+        assert stale is not None
+        vm.constants = list(vm.constants)
+        assert vm._invoke(fib, [10]) == 55
+        assert vm.jit_context.python_tier.deopts["fib"] == 1
+        # Re-promoted against the new pool once it got hot again
+        assert fib.tier is not stale
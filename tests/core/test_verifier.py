@@ -0,0 +1,81 @@
+import struct
+import pytest
+from amatak.core.codegen import compile_source, BytecodeGenerator
+from amatak.core.verifier import BytecodeVerifier, verify_bytecode
+from amatak.core.vm import VM, OpCode
+from amatak.errors import VerificationError
+from amatak.nodes import ForNode, AssignmentNode, IdentifierNode, BinOpNode, NumberNode, PrintNode
+from amatak.tokens import TokenType
+
+
+def op(code, *operands):
+    return bytes([code.value]) + b"".join(operands)
+
+def u16(value):
+    return struct.pack('>H', value)
+
+def i16(value):
+    return struct.pack('>h', value)
+
+
+class TestBytecodeVerifier:
+    def test_max_stack_depth(self):
+        module = compile_source("let x = 1 + 2 * 3\nprint x")
+        result = BytecodeVerifier(module.constants).verify(module.code)
+        # The first term stays on the stack while the second is loaded
+        assert result.max_stack == 2
+
+    def test_loop_is_balanced(self):
+        loop = ForNode(
+            "i", NumberNode("0"),
+            BinOpNode(IdentifierNode("i"), TokenType.LT, NumberNode("3")),
+            AssignmentNode(IdentifierNode("i"), BinOpNode(IdentifierNode("i"), TokenType.PLUS, NumberNode("1"))),
+            [PrintNode(IdentifierNode("i"))]
+        )
+        module = BytecodeGenerator().generate([loop])
+        result = BytecodeVerifier(module.constants).verify(module.code)
+        assert len(result.block_starts) >= 2
+
+    def test_stack_underflow_rejected(self):
+        with pytest.raises(VerificationError):
+            verify_bytecode(op(OpCode.BINARY_ADD) + op(OpCode.RETURN))
+
+    def test_constant_out_of_range_rejected(self):
+        with pytest.raises(VerificationError):
+            verify_bytecode(op(OpCode.LOAD_CONST, u16(5)) + op(OpCode.RETURN), constants=[1])
+
+    def test_truncated_operand_rejected(self):
+        with pytest.raises(VerificationError):
+            verify_bytecode(bytes([OpCode.LOAD_CONST.value, 0]))
+
+    def test_jump_into_operand_rejected(self):
+        code = op(OpCode.JUMP, i16(1)) + op(OpCode.LOAD_CONST, u16(0)) + op(OpCode.RETURN)
+        with pytest.raises(VerificationError):
+            verify_bytecode(code, constants=[0])
+
+    def test_unbalanced_merge_rejected(self):
+        # One path pushes a value before joining the other
+        code = (
+            op(OpCode.LOAD_CONST, u16(0)) +
+            op(OpCode.JUMP_IF_FALSE, i16(3)) +
+            op(OpCode.LOAD_CONST, u16(0)) +
+            op(OpCode.RETURN)
+        )
+        with pytest.raises(VerificationError):
+            verify_bytecode(code, constants=[0])
+
+    def test_falling_off_end_rejected(self):
+        with pytest.raises(VerificationError):
+            verify_bytecode(op(OpCode.LOAD_CONST, u16(0)), constants=[0])
+
+    def test_vm_rejects_bad_module_up_front(self):
+        module = compile_source("print 1")
+        module.code = op(OpCode.POP) + op(OpCode.RETURN)
+        with pytest.raises(VerificationError):
+            VM(jit_enabled=False).run_module(module)
+
+    def test_vm_runs_verified_module(self):
+        module = compile_source("let x = 4\nlet y = x * x")
+        vm = VM(jit_enabled=False)
+        vm.run_module(module)
+        assert vm.frames[0]["y"] == 16
@@ -0,0 +1,82 @@
+import pytest
+from amatak.core.ast.visitor import ASTVisitor, walk
+from amatak.core.codegen import compile_source
+from amatak.core.vm import VM
+from amatak.interpreter import Interpreter
+from amatak.nodes import (
+    AssignmentNode, BinOpNode, IdentifierNode, NumberNode, PrintNode
+)
+from amatak.tokens import TokenType
+
+DEPTH = 20000
+
+
+def num(value):
+    return NumberNode(str(value))
+
+def var(name):
+    return IdentifierNode(name)
+
+def chain(leaf, depth=DEPTH):
+    node = leaf()
+    for _ in range(depth - 1):
+        node = BinOpNode(node, TokenType.PLUS, leaf())
+    return node
+
+
+class Rename(ASTVisitor):
+    def visit_IdentifierNode(self, node):
+        return var("b") if node.name == "a" else node
+
+
+class TestASTVisitor:
+    def test_copies_only_changed_paths(self):
+        kept = BinOpNode(num(1), TokenType.PLUS, num(2))
+        tree = [PrintNode(BinOpNode(var("a"), TokenType.PLUS, kept))]
+        result = Rename().visit(tree)
+        assert tree[0].value.left.name == "a"
+        assert result[0].value.left.name == "b"
+        assert result[0] is not tree[0]
+        assert result[0].value.right is kept
+
+    def test_in_place_mutates_the_input(self):
+        tree = [AssignmentNode(var("x"), BinOpNode(var("a"), TokenType.PLUS, num(1)))]
+        value = tree[0].value
+        result = Rename(in_place=True).visit(tree)
+        assert result is tree and tree[0].value is value
+        assert value.left.name == "b"
+
+    def test_enter_replaces_without_visiting_children(self):
+        class Prune(Rename):
+            def enter(self, node):
+                return num(0) if isinstance(node, BinOpNode) else None
+
+        result = Prune().visit(PrintNode(BinOpNode(var("a"), TokenType.PLUS, num(1))))
+        assert isinstance(result.value, NumberNode)
+
+    def test_handlers_are_cached_per_class(self):
+        class Numbers(ASTVisitor):
+            def visit_NumberNode(self, node):
+                return num(int(node.value) + 1)
+
+        ASTVisitor().visit(num(1))
+        assert Numbers().visit(num(1)).value == "2"
+        assert Numbers._handlers[NumberNode] is Numbers.visit_NumberNode
+        assert ASTVisitor._handlers[NumberNode] is ASTVisitor.generic_visit
+
+    def test_deep_trees_do_not_recurse(self):
+        tree = chain(lambda: var("a"))
+        result = Rename().visit(tree)
+        assert sum(isinstance(node, IdentifierNode) and node.name == "b" for node in walk(result)) == DEPTH
+
+
+class TestDeepExpressions:
+    def test_interpreter_evaluates_long_chains(self, capsys):
+        Interpreter([PrintNode(chain(lambda: num(1)))]).interpret()
+        assert capsys.readouterr().out.split() == [str(DEPTH)]
+
+    @pytest.mark.parametrize("level", [0, 2])
+    def test_compiler_handles_long_chains(self, level, capsys):
+        source = "let x = 1\nprint " + " + ".join(["x"] * 5000)
+        VM(jit_enabled=False).run_module(compile_source(source, opt_level=level))
+        assert capsys.readouterr().out.split() == ["5000"]
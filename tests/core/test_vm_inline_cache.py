@@ -0,0 +1,88 @@
+import struct
+import pytest
+from amatak.core.vm import VM, OpCode
+
+
+def op(code, *operands):
+    return bytes([code.value]) + b"".join(operands)
+
+def u8(value):
+    return bytes([value])
+
+def u16(value):
+    return struct.pack('>H', value)
+
+def name(text):
+    data = text.encode('utf-8')
+    return u16(len(data)) + data
+
+def make_function(fname, arg_count, body, local_count=0):
+    return op(OpCode.MAKE_FUNCTION, name(fname), u8(arg_count), u16(len(body)), body, u8(local_count))
+
+
+class TestInlineCaches:
+    @pytest.fixture
+    def vm(self):
+        vm = VM(jit_enabled=False)
+        vm.constants = [1, 2, 10]
+        return vm
+
+    def test_call_site_hits_after_first_call(self, vm):
+        double = op(OpCode.LOAD_ARG, u8(0)) + op(OpCode.LOAD_ARG, u8(0)) + \
+            op(OpCode.BINARY_ADD) + op(OpCode.RETURN)
+        vm.execute(make_function("double", 1, double))
+
+        program = op(OpCode.LOAD_CONST, u16(2)) + op(OpCode.CALL_FUNCTION, name("double"), u8(1)) + \
+            op(OpCode.RETURN)
+        assert vm.execute(program) == 20
+        assert vm.execute(program) == 20
+
+        stats = vm.get_cache_stats()
+        assert stats['misses'] >= 1
+        assert stats['hits'] >= 1
+
+    def test_redefinition_invalidates_call_site(self, vm):
+        one = op(OpCode.LOAD_CONST, u16(0)) + op(OpCode.RETURN)
+        two = op(OpCode.LOAD_CONST, u16(1)) + op(OpCode.RETURN)
+        program = op(OpCode.CALL_FUNCTION, name("f"), u8(0)) + op(OpCode.RETURN)
+
+        vm.execute(make_function("f", 0, one))
+        assert vm.execute(program) == 1
+        vm.execute(make_function("f", 0, two))
+        assert vm.execute(program) == 2
+
+    def test_global_rebinding_invalidates_load_site(self, vm):
+        load = op(OpCode.LOAD_VAR, name("x")) + op(OpCode.RETURN)
+        vm.frames[0]["x"] = 1
+        assert vm.execute(load) == 1
+        assert vm.execute(load) == 1
+
+        vm.execute(op(OpCode.LOAD_CONST, u16(2)) + op(OpCode.STORE_VAR, name("x")))
+        assert vm.execute(load) == 10
+
+    def test_local_shadowing_is_respected(self, vm):
+        vm.frames[0]["arg0"] = "global"
+        body = op(OpCode.LOAD_VAR, name("arg0")) + op(OpCode.RETURN)
+        vm.execute(make_function("shadow", 1, body))
+        program = op(OpCode.LOAD_CONST, u16(0)) + op(OpCode.CALL_FUNCTION, name("shadow"), u8(1)) + \
+            op(OpCode.RETURN)
+        assert vm.execute(program) == 1
+
+    def test_execution_continues_after_call(self, vm):
+        one = op(OpCode.LOAD_CONST, u16(0)) + op(OpCode.RETURN)
+        vm.execute(make_function("one", 0, one))
+        program = op(OpCode.CALL_FUNCTION, name("one"), u8(0)) + \
+            op(OpCode.LOAD_CONST, u16(2)) + op(OpCode.BINARY_ADD) + op(OpCode.RETURN)
+        assert vm.execute(program) == 11
+
+    def test_cache_tables_are_bounded(self, vm):
+        vm.MAX_CODE_ENTRIES = 4
+        programs = [op(OpCode.LOAD_CONST, u16(0)) + op(OpCode.LOAD_VAR, name(f"x{i}")) + op(OpCode.RETURN)
+                    for i in range(10)]
+        for i, program in enumerate(programs):
+            vm.frames[0][f"x{i}"] = i
+            assert vm.execute(program) == i
+        assert len(vm._inline_caches) == 4
+        # Evicted code gets fresh caches when it runs again
+        assert vm.execute(programs[0]) == 0
+        assert vm._inline_caches[id(programs[0])][0] is programs[0]
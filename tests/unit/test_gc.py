@@ -0,0 +1,304 @@
+import pytest
+from amatak.core.vm import VM
+from amatak.errors import AmatakRuntimeError
+from amatak.interpreter import Context
+from amatak.runtime.memory.allocator import MemoryAllocator
+from amatak.runtime.memory.gc import GarbageCollector
+from amatak.runtime.scope import Scope
+from amatak.runtime.types.core import AmatakObject
+
+
+class Node(AmatakObject):
+    def __init__(self, *children):
+        self.children = list(children)
+        self.cleaned = False
+
+    def gc_references(self):
+        return self.children
+
+    def __cleanup__(self):
+        self.cleaned = True
+
+@pytest.fixture
+def gc():
+    return GarbageCollector(MemoryAllocator())
+
+def track(gc, *objects):
+    for obj in objects:
+        gc.register_object(obj)
+    return objects
+
+
+class TestRootDiscovery:
+    def test_unreachable_objects_are_swept(self, gc):
+        kept, dropped = track(gc, Node(), Node())
+        context = Context()
+        context.set('x', kept)
+        gc.add_root_provider(context)
+        gc.collect(0)
+        assert not kept.cleaned
+        assert dropped.cleaned
+        assert gc.get_stats()['gen1_objects'] == 1
+
+    def test_context_chain_and_containers(self, gc):
+        leaf, inner, outer = track(gc, Node(), Node(), Node())
+        inner.children.append(leaf)
+        parent = Context()
+        parent.set('items', [{'key': (outer,)}])
+        child = Context(parent)
+        child.functions['f'] = inner
+        gc.add_root_provider(child)
+        gc.collect(0)
+        assert not any(obj.cleaned for obj in (leaf, inner, outer))
+
+    def test_explicit_references_are_followed(self, gc):
+        root, target = track(gc, Node(), Node())
+        gc.add_reference(root, target)
+        gc.pin(root)
+        gc.collect(0)
+        assert not target.cleaned
+
+    def test_vm_stack_and_frames(self, gc):
+        on_stack, in_frame, dropped = track(gc, Node(), Node(), Node())
+        vm = VM(jit_enabled=False)
+        vm.stack.append(on_stack)
+        vm.frames.append({'arg0': in_frame})
+        gc.add_root_provider(vm)
+        gc.collect(0)
+        assert not on_stack.cleaned and not in_frame.cleaned
+        assert dropped.cleaned
+
+    def test_scope_chain(self, gc):
+        obj, = track(gc, Node())
+        scope = Scope()
+        scope.declare('obj', obj)
+        gc.add_root_provider(scope.create_child())
+        gc.collect(0)
+        # The child scope is only weakly held, so it is gone by now
+        assert obj.cleaned
+
+        obj, = track(gc, Node())
+        scope.variables['obj'] = obj
+        child = scope.create_child()
+        gc.add_root_provider(child)
+        gc.collect(0)
+        assert not obj.cleaned
+
+    def test_pin_and_unpin(self, gc):
+        obj, = track(gc, Node())
+        handle = gc.pin(obj)
+        gc.collect(0)
+        assert not obj.cleaned
+        gc.unpin(handle)
+        gc.collect(1)
+        assert obj.cleaned
+        with pytest.raises(AmatakRuntimeError):
+            gc.unpin(handle)
+
+    def test_provider_must_expose_roots(self, gc):
+        with pytest.raises(AmatakRuntimeError):
+            gc.add_root_provider(object())
+
+
+class TestIncrementalGC:
+    def test_cycle_runs_in_bounded_slices(self, gc):
+        gc.set_threshold(gen0=10 ** 9)
+        head, = track(gc, Node())
+        gc.pin(head)
+        # A long chain keeps marking busy across many slices
+        node = head
+        for _ in range(20000):
+            child, = track(gc, Node())
+            gc.add_reference(node, child)
+            node = child
+        garbage = track(gc, *[Node() for _ in range(10)])
+        gc.set_incremental(max_pause_ms=0.5)
+        slices = 1
+        while not gc.step():
+            slices += 1
+        assert slices > 1
+        assert not head.cleaned and not node.cleaned
+        assert all(obj.cleaned for obj in garbage)
+        assert gc._cycle_collected == len(garbage)
+        pauses = gc.get_stats()['pauses']
+        assert pauses['count'] == slices
+        assert pauses['p50_ms'] <= 2.0
+
+    def test_write_barrier_greys_new_target(self, gc):
+        gc.set_incremental()
+        root, other = track(gc, Node(), Node())
+        gc.pin(root)
+        filler = track(gc, *[Node() for _ in range(50)])
+        gc.add_reference(root, filler[0])
+        for a, b in zip(filler, filler[1:]):
+            gc.add_reference(a, b)
+        gc._start_cycle()
+        assert gc._mark_slice(float('-inf')) is False
+        # root is already black; storing an edge must keep ``other`` alive
+        gc.add_reference(root, other)
+        gc._advance(float('inf'))
+        assert not other.cleaned
+
+    def test_gc_references_mutation_uses_barrier(self, gc):
+        gc.set_incremental()
+        root, late = track(gc, Node(), Node())
+        filler = track(gc, *[Node() for _ in range(50)])
+        root.children.extend(filler)
+        gc.pin(root)
+        gc._start_cycle()
+        gc._mark_slice(float('-inf'))
+        root.children.append(late)
+        gc.write_barrier(root)
+        gc._advance(float('inf'))
+        assert not late.cleaned
+
+    def test_root_scan_is_spread_over_slices(self, gc):
+        gc.set_threshold(gen0=10 ** 9)
+        nodes = track(gc, *[Node() for _ in range(2000)])
+        context = Context()
+        context.set('rows', [[node, {'id': i}] for i, node in enumerate(nodes)])
+        gc.add_root_provider(context)
+        gc.set_incremental()
+        gc._start_cycle()
+        assert gc._mark_slice(float('-inf')) is False
+        assert gc._root_todo
+        gc._advance(float('inf'))
+        assert not any(node.cleaned for node in nodes)
+
+    def test_root_gained_during_marking_survives(self, gc):
+        gc.set_threshold(gen0=10 ** 9)
+        late, = track(gc, Node())
+        context = Context()
+        context.set('rows', [[Node()] for _ in range(500)])
+        gc.add_root_provider(context)
+        gc.set_incremental()
+        gc._start_cycle()
+        gc._mark_slice(float('-inf'))
+        context.set('late', late)
+        gc._advance(float('inf'))
+        assert not late.cleaned
+
+    def test_objects_allocated_during_marking_survive(self, gc):
+        gc.set_incremental()
+        root, = track(gc, Node())
+        gc.pin(root)
+        gc._start_cycle()
+        young, = track(gc, Node())
+        gc._advance(float('inf'))
+        assert not young.cleaned
+
+    def test_collect_finishes_cycle_in_progress(self, gc):
+        gc.set_incremental()
+        garbage, = track(gc, Node())
+        gc._start_cycle()
+        gc.collect(0)
+        assert garbage.cleaned
+        assert gc.get_stats()['phase'] == 'idle'
+
+
+class TestRememberedSet:
+    def promote(self, gc, *objects):
+        """Track objects and move them to generation 1"""
+        gc.set_threshold(gen0=10 ** 6)
+        track(gc, *objects)
+        handles = [gc.pin(obj) for obj in objects]
+        gc.collect(0)
+        for handle in handles:
+            gc.unpin(handle)
+        assert all(id(obj) in gc.gen1 for obj in objects)
+
+    def test_old_to_young_edge_is_remembered(self, gc):
+        old = Node()
+        self.promote(gc, old)
+        young, = track(gc, Node())
+        gc.add_reference(old, young)
+        assert gc.remembered == {id(old)}
+        gc.collect(0)
+        assert not young.cleaned
+        assert not gc.remembered
+
+    def test_gc_references_mutation_needs_barrier(self, gc):
+        old = Node()
+        self.promote(gc, old)
+        young, = track(gc, Node())
+        old.children.append(young)
+        gc.write_barrier(old)
+        gc.collect(0)
+        assert not young.cleaned
+
+    def test_minor_collection_skips_old_objects(self, gc, monkeypatch):
+        old = [Node() for _ in range(2000)]
+        for a, b in zip(old, old[1:]):
+            a.children.append(b)
+        self.promote(gc, *old)
+        gc.pin(old[0])
+        young = track(gc, *[Node() for _ in range(5)])
+        gc.pin(young[0])
+        gc.add_reference(old[-1], young[1])
+        scanned = []
+        original = gc._scan_object
+        monkeypatch.setattr(gc, '_scan_object', lambda obj_id, *args: (scanned.append(obj_id), original(obj_id, *args)))
+        gc.collect(0)
+        assert set(scanned) == {id(young[0]), id(young[1])}
+        assert [obj.cleaned for obj in young] == [False, False, True, True, True]
+
+    def test_incremental_promotion_remembers_young_referents(self, gc):
+        gc.set_incremental()
+        parent, = track(gc, Node())
+        gc.pin(parent)
+        gc._start_cycle()
+        gc._mark_slice(float('inf'))
+        gc._begin_sweep()
+        # Allocated after the sweep snapshot, so it stays young
+        gc.incremental = False
+        child, = track(gc, Node())
+        gc.add_reference(parent, child)
+        assert not gc.remembered
+        gc._advance(float('inf'))
+        assert id(parent) in gc.gen1 and id(child) in gc.gen0
+        assert id(parent) in gc.remembered
+        gc.collect(0)
+        assert not child.cleaned
+
+
+class TestTelemetry:
+    def test_per_generation_counts_and_survival(self, gc):
+        kept, dropped, other = track(gc, Node(), Node(), Node())
+        gc.pin(kept)
+        gc.collect(0)
+        generations = gc.get_telemetry()['generations']
+        assert generations[0]['collections'] == 1
+        assert generations[0]['collected'] == 2
+        assert generations[0]['survived'] == 1
+        assert generations[0]['survival_rate'] == pytest.approx(1 / 3)
+        assert generations[0]['promoted_bytes'] > 0
+        assert generations[1]['collections'] == 0
+        assert generations[0]['pauses']['count'] == 1
+
+    def test_listeners_receive_pause_events(self, gc):
+        events = []
+        gc.add_listener(events.append)
+        gc.add_listener(lambda event: 1 / 0)
+        track(gc, Node())
+        gc.collect(0)
+        assert [event.kind for event in events] == ['collection']
+        assert events[0].generation == 0 and events[0].collected == 1
+        assert gc.get_telemetry()['listener_errors'] == 1
+        gc.remove_listener(events.append)
+        gc.collect(0)
+        assert len(events) == 1
+
+    def test_incremental_cycle_reports_slices(self, gc):
+        gc.set_incremental(max_pause_ms=1.0)
+        events = []
+        gc.add_listener(events.append)
+        gc.incremental = False
+        track(gc, *[Node() for _ in range(50)])
+        gc.incremental = True
+        gc._start_cycle()
+        while gc._phase != 'idle':
+            gc.step()
+        kinds = [event.kind for event in events]
+        assert 'slice' in kinds and kinds[-1] == 'cycle'
+        assert events[-1].collected == 50
+        assert gc.get_telemetry()['generations'][0]['collections'] == 1
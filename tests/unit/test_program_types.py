@@ -0,0 +1,182 @@
+import copy
+import pytest
+from amatak.core.ast.passes import PassManager
+from amatak.core.codegen import BytecodeGenerator
+from amatak.nodes import (
+    ArrayAccessNode, ArrayNode, AssignmentNode, BinOpNode, CallNode, FuncNode,
+    IdentifierNode, IfNode, NumberNode, PrintNode, ReturnNode, StringNode
+)
+from amatak.runtime.types.core import (
+    DYNAMIC, FLOAT, INTEGER, STRING, ArrayType, FunctionType, NullableType
+)
+from amatak.runtime.types.program import (
+    MODULE, ProgramInferrer, SignatureCache, decode_type, encode_type, join
+)
+from amatak.tokens import TokenType
+
+
+def num(value):
+    return NumberNode(str(value))
+
+def var(name):
+    return IdentifierNode(name)
+
+def binop(left, op, right):
+    return BinOpNode(left, op, right)
+
+def assign(name, value):
+    return AssignmentNode(var(name), value)
+
+def fib():
+    return FuncNode("fib", ["n"], [
+        IfNode(binop(var("n"), TokenType.LT, num(2)), [ReturnNode(var("n"))]),
+        ReturnNode(binop(
+            CallNode("fib", [binop(var("n"), TokenType.MINUS, num(1))]),
+            TokenType.PLUS,
+            CallNode("fib", [binop(var("n"), TokenType.MINUS, num(2))]),
+        )),
+    ])
+
+def program():
+    return [
+        fib(),
+        FuncNode("half", ["x"], [ReturnNode(binop(var("x"), TokenType.DIV, num(2)))]),
+        FuncNode("label", ["s"], [ReturnNode(binop(var("s"), TokenType.PLUS, StringNode("!")))]),
+        assign("a", CallNode("fib", [num(20)])),
+        assign("b", CallNode("half", [var("a")])),
+        PrintNode(CallNode("label", [StringNode("done")])),
+    ]
+
+
+class TestJoin:
+    def test_lattice(self):
+        assert join(None, INTEGER) is INTEGER
+        assert join(INTEGER, FLOAT) is FLOAT
+        assert join(INTEGER, STRING) is DYNAMIC
+        assert join(join(None, INTEGER), DYNAMIC) is DYNAMIC
+        assert join(ArrayType(INTEGER), ArrayType(FLOAT)) is ArrayType(FLOAT)
+        assert join(NullableType(DYNAMIC), STRING) is NullableType(STRING)
+
+    def test_encoding_round_trips(self):
+        for typ in (INTEGER, DYNAMIC, ArrayType(NullableType(FLOAT)), None):
+            assert decode_type(encode_type(typ)) is typ
+        with pytest.raises(ValueError):
+            decode_type(["Tuple", "Integer"])
+
+
+class TestProgramInference:
+    def test_signatures(self):
+        types = ProgramInferrer().infer(program())
+        assert types.signature("fib") is FunctionType([INTEGER], INTEGER)
+        assert types.signature("half") is FunctionType([INTEGER], FLOAT)
+        assert types.signature("label") is FunctionType([STRING], STRING)
+        assert types.variable_type(MODULE, "b") is FLOAT
+        assert types.diagnostics == []
+
+    def test_uncalled_functions_take_anything(self):
+        tree = [FuncNode("ident", ["x"], [ReturnNode(var("x"))])]
+        assert ProgramInferrer().infer(tree).signature("ident") is FunctionType([DYNAMIC], DYNAMIC)
+
+    def test_dynamically_scoped_reads_are_dynamic(self):
+        scaled = FuncNode("scaled", ["x"], [ReturnNode(binop(var("x"), TokenType.MUL, var("scale")))])
+        tree = [scaled, assign("scale", num(2)), assign("y", CallNode("scaled", [num(3)]))]
+        types = ProgramInferrer().infer(tree)
+        assert types.variable_type("scaled", "scale") is DYNAMIC
+        assert types.signature("scaled").return_type is DYNAMIC
+        assert types.variable_type(MODULE, "scale") is INTEGER
+
+    def test_fall_through_returns_are_nullable(self):
+        maybe = FuncNode("maybe", ["x"], [IfNode(var("x"), [ReturnNode(num(1))])])
+        types = ProgramInferrer().infer([maybe, PrintNode(CallNode("maybe", [num(1)]))])
+        assert types.signature("maybe").return_type is NullableType(INTEGER)
+
+    def test_array_stores_widen_element_types(self):
+        tree = [assign("xs", ArrayNode([num(1)])), assign("ys", ArrayNode([num(2)]))]
+        assert ProgramInferrer().infer(tree).variable_type(MODULE, "xs") is ArrayType(INTEGER)
+        tree.append(AssignmentNode(ArrayAccessNode(var("ys"), num(0)), StringNode("s")))
+        assert ProgramInferrer().infer(tree).variable_type(MODULE, "xs") is ArrayType(DYNAMIC)
+
+    def test_type_errors_are_reported(self):
+        bad = assign("z", binop(StringNode("a"), TokenType.MINUS, num(1)))
+        bad.line = 7
+        arity = PrintNode(CallNode("fib", [num(1), num(2)]))
+        types = ProgramInferrer().infer([fib(), bad, arity])
+        assert types.format_diagnostics() == [
+            "line 7: Invalid operands for -: String and Integer",
+            "line 7: Function fib expects 1 args, got 2",
+        ]
+        assert types.variable_type(MODULE, "z") is DYNAMIC
+
+
+class TestIncrementalInference:
+    def test_only_affected_units_are_reanalyzed(self):
+        inferrer = ProgramInferrer()
+        tree = program()
+        inferrer.infer(tree)
+        assert inferrer.infer(tree) and inferrer.analyzed == []
+        # Same types: only the edited function is re-analysed
+        edited = copy.deepcopy(tree)
+        edited[2].body = [ReturnNode(binop(StringNode(">"), TokenType.PLUS, var("s")))]
+        inferrer.infer(edited)
+        assert inferrer.analyzed == ["label"]
+        # half now returns a string: its callers are re-analysed too
+        edited[1].body = [ReturnNode(StringNode("half"))]
+        types = inferrer.infer(edited)
+        assert sorted(inferrer.analyzed) == [MODULE, "half"]
+        assert types.variable_type(MODULE, "b") is STRING
+
+    def test_moved_code_is_not_reanalyzed(self):
+        inferrer = ProgramInferrer()
+        tree = program()
+        inferrer.infer(tree)
+        moved = copy.deepcopy(tree)
+        for unit in moved[:3]:
+            unit.line = 40
+        inferrer.infer(moved)
+        assert inferrer.analyzed == []
+
+    def test_signature_cache_persists(self, tmp_path):
+        first = ProgramInferrer(SignatureCache(str(tmp_path)))
+        expected = first.infer(program())
+        cache = SignatureCache(str(tmp_path))
+        second = ProgramInferrer(cache)
+        assert second.infer(program()).signatures == expected.signatures
+        assert second.analyzed == [] and cache.misses == 0 and cache.hits > 0
+
+    def test_corrupt_cache_is_ignored(self, tmp_path):
+        (tmp_path / "signatures.json").write_text("{not json")
+        types = ProgramInferrer(SignatureCache(str(tmp_path))).infer(program())
+        assert types.signature("fib") is FunctionType([INTEGER], INTEGER)
+
+
+class TestConsumers:
+    def test_annotate_vm_functions(self):
+        tree = program()
+        module = BytecodeGenerator().generate(tree)
+        types = ProgramInferrer().infer(tree)
+        assert types.annotate(module) == 3
+        functions = {func.name: func for func in module.functions}
+        assert functions["half"].param_types == (INTEGER,)
+        assert functions["half"].returns is FLOAT
+
+    def test_typed_identities(self):
+        # step(n) = n < 1 ? 0 : step(n - 1 + 0) * 1
+        step = FuncNode("step", ["n"], [
+            IfNode(binop(var("n"), TokenType.LT, num(1)), [ReturnNode(num(0))]),
+            ReturnNode(binop(
+                CallNode("step", [binop(binop(var("n"), TokenType.MINUS, num(1)), TokenType.PLUS, num(0))]),
+                TokenType.MUL, num(1))),
+        ])
+        concat = FuncNode("concat", ["s"], [ReturnNode(binop(var("s"), TokenType.PLUS, num(0)))])
+        tree = [step, concat, PrintNode(CallNode("step", [num(3)])), PrintNode(CallNode("concat", [var("t")]))]
+        passes = PassManager(["typed"], whole_program=True)
+        out = passes.run(tree)
+        assert passes.optimizer.stats["identities"] == 2
+        call = out[0].body[1].expression
+        assert isinstance(call, CallNode)
+        assert call.args[0].op == TokenType.MINUS
+        # Dynamic operands are left alone, as are library-style trees
+        assert isinstance(out[1].body[0].expression, BinOpNode)
+        passes = PassManager(["typed"])
+        passes.run(tree)
+        assert passes.optimizer.stats["identities"] == 0
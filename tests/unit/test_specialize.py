@@ -0,0 +1,60 @@
+import pytest
+from amatak.interpreter import Interpreter
+from amatak.nodes import BinOpNode, NumberNode, StringNode
+from amatak.runtime.types.core import IntegerType, FloatType, StringType
+from amatak.runtime.types.specialize import BinaryOpSite, Specializer, WARMUP
+from amatak.tokens import TokenType
+
+
+class TestBinaryOpSpecialization:
+    @pytest.fixture
+    def site(self):
+        return BinaryOpSite('+', Specializer())
+
+    def test_int_site_specializes(self, site):
+        for _ in range(WARMUP):
+            assert site(2, 3) == 5
+        assert site.specialized
+        assert isinstance(site.result_type, IntegerType)
+        misses = site.misses
+        assert site(4, 5) == 9
+        assert site.misses == misses
+
+    def test_guard_failure_falls_back_to_generic(self, site):
+        for _ in range(WARMUP):
+            site(2, 3)
+        assert site(1.5, 2) == 3.5
+        assert site("a", 1) == "a1"
+        assert site.left_type is int
+
+    def test_mixed_string_concatenation_variant(self, site):
+        for _ in range(WARMUP):
+            assert site("n=", 4) == "n=4"
+        assert isinstance(site.result_type, StringType)
+        assert site("x", 2.5) == "x2.5"
+
+    def test_division_result_is_float(self):
+        site = BinaryOpSite('/', Specializer())
+        for _ in range(WARMUP):
+            assert site(7, 2) == 3.5
+        assert isinstance(site.result_type, FloatType)
+
+    def test_bools_stay_generic(self, site):
+        for _ in range(WARMUP + 1):
+            assert site(True, 1) == 2
+        assert not site.specialized
+
+    def test_interpreter_uses_sites(self):
+        interpreter = Interpreter([])
+        node = BinOpNode(StringNode("total: "), TokenType.PLUS, NumberNode("3"))
+        for _ in range(WARMUP + 1):
+            assert interpreter.visit(node) == "total: 3"
+        assert interpreter.binop_sites[node].specialized
+
+    def test_sites_do_not_keep_nodes_alive(self):
+        interpreter = Interpreter([])
+        node = BinOpNode(NumberNode("1"), TokenType.PLUS, NumberNode("2"))
+        interpreter.visit(node)
+        assert len(interpreter.binop_sites) == 1
+        del node
+        assert len(interpreter.binop_sites) == 0
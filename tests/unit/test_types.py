@@ -0,0 +1,85 @@
+import copy
+import pickle
+from dataclasses import FrozenInstanceError
+import pytest
+from amatak.runtime.types.core import (
+    INTEGER, AmatakType, ArrayType, DynamicType, FloatType, FunctionType,
+    IntegerType, NullableType, ObjectType, StringType, type_of
+)
+from amatak.runtime.types.inference import TypeInferrer
+
+
+class Tagged(AmatakType):
+    def __init__(self, tags):
+        super().__init__("Tagged")
+        self.tags = tags
+
+
+class TestInterning:
+    def test_equal_types_are_identical(self):
+        assert IntegerType() is INTEGER
+        assert IntegerType(0, 10) is IntegerType(min_val=0, max_val=10)
+        assert IntegerType(0, 10) is not IntegerType(0, 11)
+        assert FloatType(1) is not FloatType(1.0)
+        assert ArrayType(IntegerType()) is type_of([1, 2])
+        assert ObjectType({"a": StringType()}) is type_of({"a": "x"})
+        assert FunctionType([IntegerType()], FloatType()) is FunctionType([INTEGER], FloatType())
+
+    def test_types_are_hashable(self):
+        cache = {ArrayType(IntegerType()): "ints"}
+        assert cache[type_of([3])] == "ints"
+        assert len({NullableType(DynamicType()), type_of(None)}) == 1
+
+    def test_types_are_frozen(self):
+        typ = IntegerType(0, 10)
+        with pytest.raises(FrozenInstanceError):
+            typ.min = 5
+        with pytest.raises(FrozenInstanceError):
+            del typ.max
+        with pytest.raises(TypeError):
+            ObjectType({"a": INTEGER}).fields["b"] = INTEGER
+        assert isinstance(typ.constraints, tuple)
+
+    def test_arguments_are_copied(self):
+        fields = {"a": INTEGER}
+        typ = ObjectType(fields)
+        fields["b"] = INTEGER
+        assert list(typ.fields) == ["a"]
+        assert ObjectType({"a": INTEGER}) is typ
+
+    def test_copies_and_pickles_keep_identity(self):
+        typ = ObjectType({"xs": ArrayType(NullableType(IntegerType(0)))})
+        assert copy.copy(typ) is typ
+        assert copy.deepcopy(typ) is typ
+        assert pickle.loads(pickle.dumps(typ)) is typ
+
+    def test_unhashable_arguments_are_not_shared(self):
+        first, second = Tagged([{1}]), Tagged([{1}])
+        assert first is not second
+        with pytest.raises(FrozenInstanceError):
+            first.tags = []
+
+
+class TestInferrerCache:
+    def test_subtype_results_are_cached(self):
+        inferrer = TypeInferrer()
+        sub, sup = ArrayType(IntegerType(0, 5)), ArrayType(IntegerType())
+        assert inferrer.is_subtype(sub, sup)
+        assert not inferrer.is_subtype(sup, sub)
+        assert inferrer._subtype_cache[(sub, sup)] is True
+        assert inferrer.is_subtype(FloatType(), FloatType())
+
+    def test_subtype_cache_is_bounded(self):
+        inferrer = TypeInferrer()
+        inferrer.SUBTYPE_CACHE_SIZE = 8
+        for n in range(20):
+            assert inferrer.is_subtype(IntegerType(0, n), IntegerType())
+        assert len(inferrer._subtype_cache) == 8
+        assert (IntegerType(0, 19), INTEGER) in inferrer._subtype_cache
+        # Dropped entries no longer keep their types alive
+        assert (IntegerType(0, 0), INTEGER) not in inferrer._subtype_cache
+
+    def test_constraints_are_tuples(self):
+        assert AmatakType("Plain").constraints == ()
+        assert IntegerType(0, 3).constraints == ("min=0", "max=3")
+        assert isinstance(FunctionType([INTEGER], INTEGER).constraints, tuple)
@@ -0,0 +1,104 @@
+import pytest
+from amatak.runtime.types.core import (
+    AmatakType, ArrayType, BooleanType, DynamicType, FloatType, FunctionType,
+    IntegerType, NullableType, ObjectType, StringType
+)
+from amatak.runtime.types.validator import (
+    compile_batch_validator, compile_validator, validate_batch
+)
+
+
+class Even(IntegerType):
+    def validate(self, value):
+        return super().validate(value) and value % 2 == 0
+
+
+def record_type():
+    return ObjectType({
+        "id": IntegerType(min_val=1),
+        "name": StringType(max_length=8, pattern=r"[a-z]+$"),
+        "score": NullableType(FloatType(0, 1)),
+        "active": BooleanType(),
+        "meta": DynamicType(),
+    })
+
+RECORDS = [
+    {"id": 1, "name": "ann", "score": 0.5, "active": True, "meta": None},
+    {"id": 0, "name": "bob", "score": None, "active": False, "meta": 1},
+    {"id": 2, "name": "Cy", "score": 1, "active": True, "meta": []},
+    {"id": 3, "name": "dora", "score": 2.0, "active": True, "meta": {}},
+    {"id": 4, "name": "eve", "score": None, "active": 1, "meta": "x"},
+    {"id": 5, "name": "fay", "score": None, "active": False},
+    {"id": 6, "name": "toolongname", "score": None, "active": False, "meta": 0},
+    {"id": 7, "name": "gus", "score": 1.0, "active": False, "meta": 0},
+    ["not", "a", "record"],
+]
+
+# Validity of RECORDS[i] against record_type()
+EXPECTED = [True, False, False, False, False, False, False, True, False]
+
+NESTED = [
+    [],
+    [[1, 2], [3]],
+    [[1, 2], [3, "4"]],
+    [[1, 2], None],
+    [[1, 2, 3, 4]],
+    [[]],
+    [[1], [2], [3], [4]],
+    "[[1]]",
+]
+
+def nested_type():
+    return ArrayType(ArrayType(IntegerType(max_val=9), max_len=3), min_len=1, max_len=3)
+
+
+class TestCompiledValidator:
+    @pytest.mark.parametrize("index", range(len(RECORDS)))
+    def test_matches_generic_validation(self, index):
+        assert compile_validator(record_type())(RECORDS[index]) is EXPECTED[index]
+
+    @pytest.mark.parametrize("value", NESTED)
+    def test_nested_arrays(self, value):
+        typ = nested_type()
+        generic = (isinstance(value, list) and 1 <= len(value) <= 3 and all(
+            isinstance(row, list) and len(row) <= 3 and all(type(x) is int and x <= 9 for x in row)
+            for row in value))
+        assert compile_validator(typ)(value) is generic
+        assert typ.validate(value) is generic
+
+    def test_scalars(self):
+        assert compile_validator(IntegerType(0, 10))(True)  # bool is an int, as in validate
+        assert not compile_validator(IntegerType(0, 10))(11)
+        assert compile_validator(FloatType())(3)
+        assert compile_validator(FunctionType([], DynamicType()))(len)
+        assert compile_validator(NullableType(DynamicType()))(object())
+
+    def test_cached_per_instance(self):
+        typ = record_type()
+        assert compile_validator(typ) is compile_validator(typ)
+        # Equal types are one interned instance
+        assert compile_validator(typ) is compile_validator(record_type())
+        assert compile_validator(typ) is not compile_validator(nested_type())
+        assert "for" not in compile_validator(typ).__amatak_source__
+
+    def test_other_types_use_their_own_validate(self):
+        typ = ArrayType(Even())
+        assert compile_validator(typ)([2, 4])
+        assert not compile_validator(typ)([2, 3])
+        assert compile_validator(AmatakType("Custom"))(object())
+
+
+class TestBatchValidation:
+    def test_returns_invalid_indexes(self):
+        expected = [i for i, valid in enumerate(EXPECTED) if not valid]
+        assert validate_batch(record_type(), RECORDS) == expected
+
+    def test_types_with_loops(self):
+        typ = nested_type()
+        expected = [i for i, value in enumerate(NESTED) if not compile_validator(typ)(value)]
+        assert validate_batch(typ, NESTED) == expected
+        assert "_check" in compile_batch_validator(typ).__amatak_source__
+
+    def test_accepts_iterables(self):
+        assert validate_batch(IntegerType(), iter([1, "2", 3])) == [1]
+        assert validate_batch(IntegerType(), []) == []